@@ -1,250 +1,31 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-from datetime import date, timedelta
+from contextlib import ExitStack
+from datetime import date
+
+# Solo il nucleo scalare all'avvio: pandas, Plotly e i moduli che ne dipendono (timeline,
+# tabelle regionali, ottimizzatore, Monte Carlo) sono importati dalla sezione che li usa
+from pensionbridge.archivio import archivio_scenari
+from pensionbridge.calcoli import TIPI_CONTRIBUZIONE
+from pensionbridge.diagnostica import configura_log, fase, interrompi_attive, misura, profila, registra_json
+from pensionbridge.scenario import (
+    ANNI_EXTRA_PROIEZIONE,
+    calcola_scenario_memo,
+    grafo_scenario,
+    statistiche_cache_scenari,
+)
+from pensionbridge.regole import parametri_anno
+from pensionbridge.risorse import FATTORI_COSTO_VITA, REGIONI, layout_grafici
 
 # --- CONFIGURAZIONE PAGINA ---
 st.set_page_config(page_title="PensionBridge Win-Win", layout="wide")
 
-# --- DATI REGIONALI COSTO DELLA VITA ---
-COSTO_VITA_REGIONALE = {
-    "Abruzzo": 0.90,
-    "Basilicata": 0.85,
-    "Calabria": 0.82,
-    "Campania": 0.88,
-    "Emilia-Romagna": 1.05,
-    "Friuli-Venezia Giulia": 1.00,
-    "Lazio": 1.15,
-    "Liguria": 1.08,
-    "Lombardia": 1.12,
-    "Marche": 0.92,
-    "Molise": 0.83,
-    "Piemonte": 1.02,
-    "Puglia": 0.87,
-    "Sardegna": 0.89,
-    "Sicilia": 0.86,
-    "Toscana": 1.06,
-    "Trentino-Alto Adige": 1.10,
-    "Umbria": 0.91,
-    "Valle d'Aosta": 1.05,
-    "Veneto": 1.03
-}
-
-# --- FUNZIONI DI UTILITÀ (SIMULAZIONE SEMPLIFICATA) ---
-def calcola_data_pensione(eta_attuale, anni_contributi, sesso, is_lavoratore_precoce=False, 
-                         is_lavoratore_usurante=False, tipo_contribuzione="Dipendente Privato"):
-    """
-    Stima data pensione basata su regole attuali semplificate (2025).
-    Include lavoratori precoci, usuranti e diverse tipologie contributive.
-    """
-    oggi = date.today()
-    # Regola Vecchiaia: 67 anni
-    anni_mancanti_vecchiaia = 67 - eta_attuale
-    data_vecchiaia = oggi.replace(year=oggi.year + int(anni_mancanti_vecchiaia))
-    
-    # Regola Anticipata (42y 10m Uomini, 41y 10m Donne)
-    soglia_anni = 42 if sesso == 'Uomo' else 41
-    mesi_extra = 10
-    
-    # Lavoratori Precoci: possono andare in pensione con 41 anni di contributi 
-    # se hanno almeno 12 mesi di contributi prima dei 19 anni
-    if is_lavoratore_precoce:
-        soglia_anni = 41
-        mesi_extra = 0
-    
-    # Lavoratori Usuranti: possibilità di uscita anticipata
-    # (notturni, catena di montaggio, conducenti, etc.)
-    if is_lavoratore_usurante:
-        # Quota 97.6 (somma età + contributi) con almeno 61 anni e 7 mesi di età
-        eta_minima_usuranti = 61.58  # 61 anni e 7 mesi
-        if eta_attuale >= eta_minima_usuranti and (eta_attuale + anni_contributi) >= 97.6:
-            return oggi, data_vecchiaia, oggi
-        # Altrimenti calcola quando si raggiunge la quota
-        anni_per_quota = max(0, 97.6 - (eta_attuale + anni_contributi))
-        data_usuranti = today_plus_months(oggi, int(anni_per_quota * 12))
-        if eta_attuale + anni_per_quota >= eta_minima_usuranti:
-            return data_usuranti, data_vecchiaia, data_usuranti
-    
-    # Contribuzione autonomi/artigiani: potrebbero avere requisiti leggermente diversi
-    if tipo_contribuzione in ["Artigiani", "Commercianti", "Autonomi"]:
-        # Stesse regole ma con aliquote contributive diverse (considerate nel calcolo pensione)
-        pass
-    
-    anni_contributivi_mancanti = soglia_anni - anni_contributi
-    # Convertiamo tutto in mesi per semplicità
-    mesi_totali_mancanti = (anni_contributivi_mancanti * 12) + mesi_extra
-    
-    if mesi_totali_mancanti < 0:
-        mesi_totali_mancanti = 0
-        
-    data_anticipata = today_plus_months(oggi, int(mesi_totali_mancanti))
-    
-    # Ritorna la data più vicina tra le due opzioni
-    return min(data_vecchiaia, data_anticipata), data_vecchiaia, data_anticipata
-
-def today_plus_months(current_date, months_to_add):
-    new_month = current_date.month - 1 + months_to_add
-    year = current_date.year + new_month // 12
-    month = new_month % 12 + 1
-    day = min(current_date.day, [31,
-        29 if year % 4 == 0 and not year % 100 == 0 or year % 400 == 0 else 28,
-        31,30,31,30,31,31,30,31,30,31][month-1])
-    return date(year, month, day)
-
-def stima_pensione_netta(ral, anni_contributi, tipo_contribuzione="Dipendente Privato"):
-    """
-    Stima MOLTO semplificata del tasso di sostituzione.
-    In un'app reale, qui andrebbe il calcolo contributivo/retributivo.
-    Ipotesi: ~70% dell'ultimo netto per carriere lunghe.
-    Considera tipo di contribuzione (dipendente, artigiano, autonomo, agricolo).
-    """
-    netto_mensile_stimato = (ral * 0.65) / 13 # Stima tassazione e 13 mensilità
-    
-    # Fattore correttivo basato sugli anni (più anni = più pensione)
-    fattore_anni = min(anni_contributi / 40.0, 1.1)
-    
-    # Aliquote contributive diverse per tipologie
-    if tipo_contribuzione == "Dipendente Privato":
-        tasso_sostituzione_base = 0.75
-    elif tipo_contribuzione in ["Artigiani", "Commercianti"]:
-        # Aliquota contributiva più bassa = pensione più bassa
-        tasso_sostituzione_base = 0.65
-    elif tipo_contribuzione == "Autonomi":
-        tasso_sostituzione_base = 0.60
-    elif tipo_contribuzione == "Coltivatori Diretti":
-        tasso_sostituzione_base = 0.55
-    else:
-        tasso_sostituzione_base = 0.70
-    
-    pensione = netto_mensile_stimato * tasso_sostituzione_base * fattore_anni
-    return pensione
-
-def calcola_naspi(ral, mesi_contributi_ultimi_4_anni):
-    """
-    Calcola l'importo della NASPI (indennità di disoccupazione).
-    La NASPI copre anche figurativamente i contributi previdenziali.
-    Importo: 75% della retribuzione media mensile fino a €1,352.19 (2024)
-            + 25% dell'eccedenza
-    Durata: metà delle settimane contributive degli ultimi 4 anni
-    """
-    retribuzione_mensile = ral / 13
-    soglia_naspi = 1352.19  # Valore 2024, va indicizzato annualmente
-    
-    if retribuzione_mensile <= soglia_naspi:
-        naspi_mensile = retribuzione_mensile * 0.75
-    else:
-        naspi_mensile = soglia_naspi * 0.75 + (retribuzione_mensile - soglia_naspi) * 0.25
-    
-    # La NASPI si riduce del 3% ogni mese dal 4° mese
-    # Durata massima basata sui mesi contributivi
-    durata_mesi = min(mesi_contributi_ultimi_4_anni / 2, 24)
-    
-    return naspi_mensile, durata_mesi
-
-def calcola_ape_sociale(eta, anni_contributi, ral, is_disoccupato=False, 
-                        is_caregiver=False, is_invalido=False, is_lavoratore_usurante=False):
-    """
-    Calcola l'APE Sociale (Anticipo Pensionistico Sociale).
-    Requisiti:
-    - Almeno 63 anni di età
-    - 30 o 36 anni di contributi (a seconda della categoria)
-    - Condizione: disoccupato, caregiver, invalido ≥74%, lavoro usurante/gravoso
-    """
-    if eta < 63:
-        return 0, False, "Età minima 63 anni non raggiunta"
-    
-    anni_contributi_richiesti = 30
-    if is_lavoratore_usurante:
-        anni_contributi_richiesti = 36
-    
-    if anni_contributi < anni_contributi_richiesti:
-        return 0, False, f"Servono almeno {anni_contributi_richiesti} anni di contributi"
-    
-    # Verifica condizioni
-    ha_diritto = is_disoccupato or is_caregiver or is_invalido or is_lavoratore_usurante
-    
-    if not ha_diritto:
-        return 0, False, "Non si rientra nelle categorie previste per l'APE Sociale"
-    
-    # L'APE sociale è pari all'importo della pensione calcolata al momento della domanda
-    # ma con un massimale di €1,500 mensili (circa)
-    pensione_teorica = stima_pensione_netta(ral, anni_contributi)
-    ape_importo = min(pensione_teorica, 1500)
-    
-    return ape_importo, True, "APE Sociale concedibile"
-
-def calcola_rita(montante_complementare, eta, anni_a_pensione):
-    """
-    Calcola la R.I.T.A. (Rendita Integrativa Temporanea Anticipata).
-    Permette di anticipare l'erogazione della previdenza complementare
-    in forma di rendita fino al raggiungimento della pensione obbligatoria.
-    
-    Requisiti:
-    - Cessazione attività lavorativa
-    - Maturazione diritto pensione vecchiaia/anticipata entro 5 anni (10 per inoccupati >24 mesi)
-    - Almeno 20 anni di contributi al fondo pensione o 5 anni + 5 anni a pensione
-    """
-    if anni_a_pensione > 5:
-        return 0, False, "Troppo lontano dalla pensione (max 5 anni)"
-    
-    if montante_complementare <= 0:
-        return 0, False, "Nessun montante previdenza complementare"
-    
-    # Calcolo rendita: il montante viene erogato come rendita temporanea
-    # Coefficiente di conversione dipende da età e anni di rendita
-    # Semplificazione: montante / (anni_a_pensione * 12)
-    if anni_a_pensione < 1:
-        anni_a_pensione = 1
-    
-    rita_mensile = montante_complementare / (anni_a_pensione * 12)
-    
-    # Tassazione agevolata al 15% (ridotta dello 0.3% per ogni anno oltre il 15°)
-    tassazione = max(0.09, 0.15 - 0.003 * max(0, 20 - 15))  # Ipotesi 20 anni nel fondo
-    rita_netta = rita_mensile * (1 - tassazione)
-    
-    return rita_netta, True, "R.I.T.A. disponibile"
-
-def calcola_incentivo_esodo_regionale(ral, mesi_mancanti, regione, naspi_mensile=0, 
-                                     pensione_anticipata_effettiva=0):
-    """
-    Calcola l'incentivo all'esodo considerando:
-    1. Il delta tra retribuzione e quello che percepirebbe (NASPI + eventuali altre forme)
-    2. Il costo della vita regionale
-    3. Il valore del tempo libero corretto per regione
-    
-    Formula: Incentivo = (Stipendio_Netto - Coperture) * Mesi * Fattore_Regionale
-    """
-    stipendio_netto_mensile = (ral * 0.65) / 13
-    
-    # Calcolo del gap mensile da coprire
-    copertura_mensile = naspi_mensile + pensione_anticipata_effettiva
-    gap_mensile = stipendio_netto_mensile - copertura_mensile
-    
-    # Applicazione del fattore regionale sul gap
-    fattore_regionale = COSTO_VITA_REGIONALE.get(regione, 1.0)
-    gap_mensile_corretto = gap_mensile * fattore_regionale
-    
-    # Incentivo base per coprire il periodo
-    incentivo_base = gap_mensile_corretto * mesi_mancanti
-    
-    # Valore del tempo libero (funzione decrescente con l'età e variabile per regione)
-    # Più alto nelle regioni con costo vita basso (più potere d'acquisto)
-    valore_tempo_mensile = 1000 * (1.5 - fattore_regionale)  # Inversamente proporzionale
-    valore_tempo_totale = valore_tempo_mensile * mesi_mancanti
-    
-    # Incentivo totale suggerito
-    incentivo_totale = incentivo_base + valore_tempo_totale
-    
-    return {
-        'incentivo_base': incentivo_base,
-        'valore_tempo': valore_tempo_totale,
-        'incentivo_totale': incentivo_totale,
-        'gap_mensile': gap_mensile,
-        'fattore_regionale': fattore_regionale,
-        'stipendio_netto': stipendio_netto_mensile,
-        'copertura_mensile': copertura_mensile
-    }
+# --- DIAGNOSTICA ---
+# Tempi per fase (se attivati nel pannello della sidebar) e cProfile di una sola rerun,
+# richiesto dal pulsante del pannello: misura e profilo si chiudono in fondo allo script.
+interrompi_attive()
+diagnostica = ExitStack()
+misura_rerun = diagnostica.enter_context(misura()) if st.session_state.get('diagnostica_attiva') else None
+profilo_rerun = diagnostica.enter_context(profila()) if st.session_state.pop('profila_rerun', False) else None
 
 # --- INTERFACCIA UTENTE ---
 
@@ -256,118 +37,216 @@ Include tutte le variabili della legge italiana: lavoratori precoci, usuranti, c
 NASPI, APE Sociale, R.I.T.A., previdenza complementare e costo vita regionale.
 """)
 
+# --- SCENARIO RICARICATO DALL'ARCHIVIO ---
+# I suoi input diventano i valori iniziali della sidebar. La versione nelle chiavi dei widget
+# cambia a ogni ricarica, così i widget ripartono dai valori salvati.
+ricaricato = st.session_state.get('scenario_ricaricato')
+valori_iniziali = ricaricato['input'] if ricaricato else {}
+versione_widget = st.session_state.get('versione_ricarica', 0)
+
+def iniziale(nome, default):
+    return valori_iniziali.get(nome, default)
+
+def chiave(nome):
+    return f"{nome}_{versione_widget}"
+
+def ricarica_scenario(id_scenario, dipendente):
+    input_salvato, scenario_salvato = archivio_scenari().carica(id_scenario)
+    st.session_state['scenario_ricaricato'] = {
+        'input': input_salvato, 'scenario': scenario_salvato, 'dipendente': dipendente
+    }
+    st.session_state['versione_ricarica'] = versione_widget + 1
+    st.session_state['ultimo_archiviato'] = (dipendente, {**input_salvato, 'oggi': scenario_salvato['oggi']})
+
 # --- SIDEBAR: INPUT DATI ---
 st.sidebar.header("1. Dati Anagrafici")
 
-sesso = st.sidebar.selectbox("Sesso", ["Uomo", "Donna"])
-eta = st.sidebar.number_input("Età Anagrafica", 50, 70, 62)
-regione = st.sidebar.selectbox("Regione di Residenza", sorted(COSTO_VITA_REGIONALE.keys()))
+dipendente = st.sidebar.text_input(
+    "Dipendente (matricola o nome)", ricaricato['dipendente'] if ricaricato else "", key=chiave('dipendente')
+)
+archivia = st.sidebar.checkbox("Archivia gli scenari calcolati", value=True, key='archivia')
+opzioni_sesso = ["Uomo", "Donna"]
+sesso = st.sidebar.selectbox("Sesso", opzioni_sesso, index=opzioni_sesso.index(iniziale('sesso', "Uomo")),
+                             key=chiave('sesso'))
+eta = st.sidebar.number_input("Età Anagrafica", 50, 70, int(iniziale('eta', 62)), key=chiave('eta'))
+regione = st.sidebar.selectbox("Regione di Residenza", REGIONI,
+                               index=REGIONI.index(iniziale('regione', REGIONI[0])),
+                               key=chiave('regione'))
 
 st.sidebar.markdown("---")
 st.sidebar.header("2. Dati Contributivi")
 
 tipo_contribuzione = st.sidebar.selectbox(
     "Tipo Contribuzione Principale",
-    ["Dipendente Privato", "Artigiani", "Commercianti", "Autonomi", "Coltivatori Diretti"]
+    TIPI_CONTRIBUZIONE,
+    index=TIPI_CONTRIBUZIONE.index(iniziale('tipo_contribuzione', TIPI_CONTRIBUZIONE[0])),
+    key=chiave('tipo_contribuzione')
 )
-anni_contributi = st.sidebar.number_input("Anni di Contributi maturati", 20, 50, 38)
+anni_contributi = st.sidebar.number_input("Anni di Contributi maturati", 20, 50,
+                                          int(iniziale('anni_contributi', 38)), key=chiave('anni_contributi'))
 
 # Categorie speciali
 is_lavoratore_precoce = st.sidebar.checkbox(
     "Lavoratore Precoce (almeno 12 mesi prima dei 19 anni)", 
-    value=False
+    value=iniziale('is_lavoratore_precoce', False), key=chiave('is_lavoratore_precoce')
 )
 is_lavoratore_usurante = st.sidebar.checkbox(
     "Lavoratore Usurante/Gravoso (notturni, catena montaggio, etc.)", 
-    value=False
+    value=iniziale('is_lavoratore_usurante', False), key=chiave('is_lavoratore_usurante')
 )
 
 st.sidebar.markdown("---")
 st.sidebar.header("3. Dati Economici")
 
-ral = st.sidebar.number_input("RAL Attuale (€)", 20000, 200000, 45000, step=1000)
-costo_azienda_annuo = ral * 1.35 # Stima costo azienda (INPS + TFR)
+ral = st.sidebar.number_input("RAL Attuale (€)", 20000, 200000, int(iniziale('ral', 45000)), step=1000,
+                              key=chiave('ral'))
 
 st.sidebar.markdown("---")
 st.sidebar.header("4. Previdenza Complementare")
 
-ha_previdenza_complementare = st.sidebar.checkbox("Ha Previdenza Complementare", value=False)
+ha_previdenza_complementare = st.sidebar.checkbox(
+    "Ha Previdenza Complementare", value=iniziale('montante_complementare', 0) > 0,
+    key=chiave('ha_previdenza_complementare')
+)
 montante_complementare = 0
 if ha_previdenza_complementare:
     montante_complementare = st.sidebar.number_input(
         "Montante Fondo Pensione (€)", 
-        0, 500000, 50000, step=5000
+        0, 500000, int(iniziale('montante_complementare', 0) or 50000), step=5000,
+        key=chiave('montante_complementare')
     )
 
 st.sidebar.markdown("---")
 st.sidebar.header("5. Situazione Lavorativa")
 
-is_disoccupato = st.sidebar.checkbox("Disoccupato/Rischio disoccupazione", value=False)
+is_disoccupato = st.sidebar.checkbox("Disoccupato/Rischio disoccupazione",
+                                     value=iniziale('is_disoccupato', False), key=chiave('is_disoccupato'))
 mesi_contributi_ultimi_4_anni = st.sidebar.number_input(
     "Mesi contributi ultimi 4 anni (per NASPI)", 
-    0, 48, 48
+    0, 48, int(iniziale('mesi_contributi_ultimi_4_anni', 48)), key=chiave('mesi_contributi_ultimi_4_anni')
 )
-is_caregiver = st.sidebar.checkbox("Caregiver (assiste familiare disabile)", value=False)
-is_invalido = st.sidebar.checkbox("Invalido ≥74%", value=False)
+is_caregiver = st.sidebar.checkbox("Caregiver (assiste familiare disabile)",
+                                   value=iniziale('is_caregiver', False), key=chiave('is_caregiver'))
+is_invalido = st.sidebar.checkbox("Invalido ≥74%", value=iniziale('is_invalido', False), key=chiave('is_invalido'))
 
 st.sidebar.markdown("---")
 st.sidebar.header("6. Incentivo Proposto")
 
-usa_calcolo_automatico = st.sidebar.checkbox("Usa calcolo automatico incentivo", value=True)
+usa_calcolo_automatico = st.sidebar.checkbox(
+    "Usa calcolo automatico incentivo", value=iniziale('incentivo_proposto', None) is None,
+    key=chiave('usa_calcolo_automatico')
+)
 if not usa_calcolo_automatico:
     incentivo_proposto = st.sidebar.number_input(
         "Incentivo all'esodo proposto (Lordo)", 
-        0, 500000, 30000, step=5000
+        0, 500000, int(iniziale('incentivo_proposto', None) or 30000), step=5000,
+        key=chiave('incentivo_proposto')
     )
 
 # --- CALCOLI CORE ---
-data_target, data_vecchiaia, data_anticipata = calcola_data_pensione(
-    eta, anni_contributi, sesso, is_lavoratore_precoce, is_lavoratore_usurante, tipo_contribuzione
-)
-pensione_stimata = stima_pensione_netta(ral, anni_contributi, tipo_contribuzione)
-stipendio_netto_mensile = (ral * 0.65) / 13
-
-# Calcolo NASPI
-naspi_mensile, durata_naspi = calcola_naspi(ral, mesi_contributi_ultimi_4_anni)
-
-# Calcolo APE Sociale
-ape_importo, ape_ammissibile, ape_messaggio = calcola_ape_sociale(
-    eta, anni_contributi, ral, is_disoccupato, is_caregiver, is_invalido, is_lavoratore_usurante
+# Scenario memorizzato in una cache LRU condivisa tra sessioni: a parità di input
+# (anche tornando a valori già visti) nessun ricalcolo. Gli scenari non in cache passano dal
+# grafo della sessione, che ricalcola solo i valori dipendenti dagli input cambiati.
+if 'grafo_scenario' not in st.session_state:
+    st.session_state['grafo_scenario'] = grafo_scenario()
+grafo = st.session_state['grafo_scenario']
+oggi = date.today()  # unica data di riferimento per tutta la rerun
+input_scenario = dict(
+    oggi=oggi, sesso=sesso, eta=eta, regione=regione, tipo_contribuzione=tipo_contribuzione,
+    anni_contributi=anni_contributi, ral=ral,
+    is_lavoratore_precoce=is_lavoratore_precoce, is_lavoratore_usurante=is_lavoratore_usurante,
+    montante_complementare=montante_complementare,
+    mesi_contributi_ultimi_4_anni=mesi_contributi_ultimi_4_anni,
+    is_disoccupato=is_disoccupato, is_caregiver=is_caregiver, is_invalido=is_invalido,
+    incentivo_proposto=None if usa_calcolo_automatico else incentivo_proposto
 )
+if ricaricato and ricaricato['input'] == {k: v for k, v in input_scenario.items() if k != 'oggi'}:
+    # Scenario ricaricato e non modificato: risultati dall'archivio alla data di riferimento originale
+    scenario = ricaricato['scenario']
+    oggi = input_scenario['oggi'] = scenario['oggi']
+else:
+    with fase("scenario"):
+        scenario = calcola_scenario_memo(**input_scenario, grafo=grafo)
+# Ogni caso valutato (dipendente, input, data) è archiviato una volta: le rerun che non lo
+# cambiano non riscrivono l'archivio. Vale anche per uno scenario ricaricato con un altro nome.
+caso_valutato = (dipendente.strip(), input_scenario)
+if archivia and st.session_state.get('ultimo_archiviato') != caso_valutato:
+    with fase("archiviazione"):
+        archivio_scenari().salva(input_scenario, scenario, dipendente.strip())
+    st.session_state['ultimo_archiviato'] = caso_valutato
+regole = parametri_anno(oggi.year)
+data_target = scenario['data_target']
+data_vecchiaia = scenario['data_vecchiaia']
+data_anticipata = scenario['data_anticipata']
+pensione_stimata = scenario['pensione_stimata']
+stipendio_netto_mensile = scenario['stipendio_netto_mensile']
+naspi_mensile, durata_naspi = scenario['naspi_mensile'], scenario['durata_naspi']
+ape_importo, ape_ammissibile, ape_messaggio = \
+    scenario['ape_importo'], scenario['ape_ammissibile'], scenario['ape_messaggio']
+rita_mensile, rita_disponibile, rita_messaggio = \
+    scenario['rita_mensile'], scenario['rita_disponibile'], scenario['rita_messaggio']
+mesi_mancanti = scenario['mesi_mancanti']
+risultato_incentivo = scenario['risultato_incentivo']
+incentivo_proposto = scenario['incentivo_proposto']
+costo_azienda_annuo = scenario['costo_azienda_annuo']
+
+with st.sidebar.expander("Cache scenari"):
+    stat_cache = statistiche_cache_scenari()
+    st.caption(
+        f"Hit: {stat_cache['hit']} · Miss: {stat_cache['miss']} · "
+        f"Hit rate: {stat_cache['hit_rate']:.0%} · Voci: {stat_cache['voci']}/{stat_cache['dimensione_massima']}"
+    )
+    stat_grafo = grafo.statistiche()
+    st.caption(
+        f"Grafo di calcolo: {stat_grafo['valutazioni']} valutazioni · nodi ricalcolati "
+        f"{stat_grafo['nodi_ricalcolati']} · saltati {stat_grafo['nodi_saltati']}"
+        + (f" (ultima: ricalcolati {', '.join(stat_grafo['ultimi_ricalcolati']) or 'nessuno'}; "
+           f"saltati {len(stat_grafo['ultimi_saltati'])}/{stat_grafo['nodi']})" if stat_grafo['valutazioni'] else "")
+    )
+    rendering_pigro = st.checkbox(
+        "Calcola solo la scheda visibile", value=True, key='rendering_pigro',
+        help="Le altre schede sono calcolate e disegnate solo quando vengono aperte."
+    )
 
-# Calcolo R.I.T.A.
-anni_a_pensione = (data_target.year - date.today().year) + \
-                  (data_target.month - date.today().month) / 12
-rita_mensile, rita_disponibile, rita_messaggio = calcola_rita(
-    montante_complementare, eta, anni_a_pensione
-)
+def richiedi_profilo():
+    st.session_state['profila_rerun'] = True
 
-# Calcolo mesi mancanti alla pensione
-mesi_mancanti = (data_target.year - date.today().year) * 12 + \
-                (data_target.month - date.today().month)
-if mesi_mancanti < 1: 
-    mesi_mancanti = 1
+with st.sidebar.expander("Diagnostica"):
+    st.checkbox(
+        "Misura i tempi di ogni rerun", value=False, key='diagnostica_attiva',
+        help="Tempi per fase di calcolo e per scheda, registrati anche come log JSON su stderr."
+    )
+    st.button("Profila una rerun (cProfile)", on_click=richiedi_profilo,
+              help="Esegue la rerun successiva sotto cProfile e rende scaricabile il profilo.")
+    pannello_diagnostica = st.container()
 
-# Calcolo incentivo esodo regionale
-risultato_incentivo = calcola_incentivo_esodo_regionale(
-    ral, mesi_mancanti, regione, naspi_mensile, 
-    ape_importo if ape_ammissibile else 0
-)
+# --- TABELLONE PRINCIPALE ---
+# Ogni scheda è una funzione: in modalità pigra viene eseguita solo quella aperta.
+# Streamlit scarta lo stato dei widget non eseguiti in una rerun: quello dei widget delle
+# schede viene riassegnato a ogni rerun, così sopravvive mentre la scheda è chiusa.
+# I valori iniziali stanno qui e non nei widget.
+STATO_WIDGET_SCHEDE = {
+    'asse_heatmap': "Mesi alla pensione",
+    'obiettivo_offerta': 'equo',
+    'budget_offerta': 0,
+    'montecarlo_attivo': False,
+    'percorsi_montecarlo': 20000,
+    'seme_montecarlo': 42,
+    'budget_portafoglio': 1000000,
+    'massimo_regione_portafoglio': 0,
+    'minimo_uscite_portafoglio': 0,
+    'asse_forza_lavoro': "Risparmio aziendale",
+    'tasso_sconto_breakeven': 2.0,
+    'filtro_dipendente_archivio': "Tutti",
+    'filtro_regione_archivio': "Tutte",
+    'limite_archivio': 200
+}
+for chiave_widget, valore_iniziale in STATO_WIDGET_SCHEDE.items():
+    st.session_state[chiave_widget] = st.session_state.get(chiave_widget, valore_iniziale)
 
-# Imposta incentivo proposto
-if usa_calcolo_automatico:
-    incentivo_proposto = risultato_incentivo['incentivo_totale']
+def sezione_analisi_pensionistica():
+    from pensionbridge.contributivo import calcola_pensione_contributiva_batch, storia_retributiva
 
-# --- TABELLONE PRINCIPALE ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "📊 Analisi Pensionistica", 
-    "💰 Strumenti di Sostegno",
-    "⚖️ Incentivo Esodo", 
-    "🏢 Analisi Aziendale",
-    "⚙️ Strategia Temporale"
-])
-
-with tab1:
     st.header("Quando puoi andare in pensione?")
     
     col1, col2, col3 = st.columns(3)
@@ -375,12 +254,28 @@ with tab1:
     col2.metric("Pensione Netta Stimata", f"€ {pensione_stimata:,.2f} / mese")
     col3.metric("Ultimo Stipendio Netto", f"€ {stipendio_netto_mensile:,.2f} / mese")
     
+    # Calcolo contributivo su una storia ricostruita da RAL e anni di contributi
+    with st.expander("🧮 Calcolo Contributivo (montante e coefficiente di trasformazione)"):
+        anni_a_pensione = max(scenario['anni_a_pensione'], 0)
+        with fase("calcolo contributivo"):
+            retribuzioni, colonna_uscita = storia_retributiva(ral, anni_contributi, anni_a_pensione)
+            contributivo = calcola_pensione_contributiva_batch(
+                retribuzioni, eta + anni_a_pensione, tipo_contribuzione, colonna_uscita=colonna_uscita
+            )
+        col_c1, col_c2, col_c3 = st.columns(3)
+        col_c1.metric("Montante all'Uscita", f"€ {contributivo['montante'][0]:,.0f}")
+        col_c2.metric("Coefficiente di Trasformazione", f"{contributivo['coefficiente'][0]:.3%}",
+                      help=f"Età all'uscita: {eta + anni_a_pensione:.1f} anni")
+        col_c3.metric("Pensione Lorda Contributiva", f"€ {contributivo['pensione_lorda_mensile'][0]:,.2f} / mese")
+        st.caption("Retribuzioni passate ricostruite dalla RAL attuale (+1% l'anno) e rivalutate al 2% annuo. "
+                   "Con l'estratto conto INPS si usa la storia reale anno per anno.")
+    
     # Mostra dettagli specifici per categoria
     categoria_info = []
     if is_lavoratore_precoce:
-        categoria_info.append("✓ **Lavoratore Precoce**: Requisiti ridotti (41 anni contributi)")
+        categoria_info.append(f"✓ **Lavoratore Precoce**: Requisiti ridotti ({regole['anni_anticipata_precoci']} anni contributi)")
     if is_lavoratore_usurante:
-        categoria_info.append("✓ **Lavoratore Usurante**: Accesso anticipato con Quota 97.6")
+        categoria_info.append(f"✓ **Lavoratore Usurante**: Accesso anticipato con Quota {regole['quota_usuranti']}")
     if tipo_contribuzione != "Dipendente Privato":
         categoria_info.append(f"✓ **Contribuzione {tipo_contribuzione}**: Aliquote specifiche applicate")
     
@@ -389,15 +284,18 @@ with tab1:
     
     st.info(f"""
     **Dettaglio Normativo:**
-    - Per la **Pensione di Vecchiaia** (67 anni) ti mancano ancora {max(0, (data_vecchiaia - date.today()).days // 365)} anni.
-    - Per la **Pensione Anticipata** ti mancano ancora {max(0, (data_anticipata - date.today()).days // 365)} anni.
+    - Per la **Pensione di Vecchiaia** ({regole['eta_vecchiaia']} anni) ti mancano ancora {max(0, (data_vecchiaia - oggi).days // 365)} anni.
+    - Per la **Pensione Anticipata** ti mancano ancora {max(0, (data_anticipata - oggi).days // 365)} anni.
     - Mesi totali alla pensione: **{mesi_mancanti} mesi**
     - Tipo contribuzione: **{tipo_contribuzione}**
     
     *Nota: Questa è una simulazione. I calcoli reali richiedono l'estratto conto contributivo INPS.*
     """)
 
-with tab2:
+def sezione_strumenti_sostegno():
+    import plotly.graph_objects as go
+    from pensionbridge.timeline import timeline_da_scenario
+
     st.header("🛡️ Strumenti di Sostegno al Reddito")
     st.markdown("Analisi degli strumenti disponibili per il periodo di transizione alla pensione.")
     
@@ -444,8 +342,31 @@ with tab2:
     col_cov1.metric("Copertura Mensile Totale", f"€ {copertura_totale_mensile:,.2f}")
     col_cov2.metric("% vs Stipendio", f"{percentuale_copertura:.1f}%")
     col_cov3.metric("Gap da Coprire", f"€ {gap_vs_stipendio:,.2f}")
+    
+    # Flussi mese per mese: NASPI con decalage e durata, R.I.T.A. per la sua durata
+    st.markdown("---")
+    st.subheader("📅 Flussi Mensili fino alla Pensione")
+    with fase("timeline"):
+        df_timeline = timeline_da_scenario(scenario)
+    fig_flussi = go.Figure(data=[
+        go.Scatter(x=df_timeline.index, y=df_timeline[fonte], name=nome, mode='lines', stackgroup='flussi')
+        for fonte, nome in (('naspi', "NASPI"), ('ape', "APE Sociale"), ('rita', "R.I.T.A."), ('pensione', "Pensione"))
+    ], layout=layout_grafici()['flussi'])
+    st.plotly_chart(fig_flussi, use_container_width=True)
+    
+    periodo_uscita = df_timeline.iloc[:mesi_mancanti]
+    col_tl1, col_tl2, col_tl3 = st.columns(3)
+    col_tl1.metric("Copertura Totale nel Periodo", f"€ {periodo_uscita['copertura_cumulata'].iloc[-1]:,.0f}")
+    col_tl2.metric("Gap Totale nel Periodo", f"€ {periodo_uscita['gap_cumulato'].iloc[-1]:,.0f}")
+    col_tl3.metric("NASPI Totale (con riduzione)", f"€ {periodo_uscita['naspi'].sum():,.0f}")
+    st.caption("La NASPI si riduce del 3% al mese dal 4° mese e si interrompe alla fine della durata spettante.")
+
+def sezione_incentivo_esodo():
+    import pandas as pd
+    import plotly.graph_objects as go
+    from pensionbridge.sensibilita import analisi_sensibilita
+    from pensionbridge.tabella_regionale import confronto_regioni, matrice_heatmap, tabella_incentivi
 
-with tab3:
     st.header("💼 Calcolo Incentivo all'Esodo")
     st.markdown(f"""
     Calcolo dell'incentivo ottimale considerando:
@@ -478,14 +399,20 @@ with tab3:
             f"€ {risultato_incentivo['incentivo_totale']:,.2f}",
             delta=f"+{risultato_incentivo['valore_tempo']:,.0f} (tempo libero)"
         )
+        # L'incentivo all'esodo è soggetto a tassazione separata (aliquota media IRPEF)
+        st.metric(
+            "Incentivo Proposto al Netto",
+            f"€ {scenario['incentivo_netto']:,.2f}",
+            delta=f"-{incentivo_proposto - scenario['incentivo_netto']:,.0f} (tassazione separata)",
+            delta_color="off"
+        )
         
         # Grafico a torta composizione incentivo
         fig_comp = go.Figure(data=[go.Pie(
             labels=['Copertura Gap Salariale', 'Valore Tempo Libero'],
             values=[risultato_incentivo['incentivo_base'], risultato_incentivo['valore_tempo']],
             hole=.3
-        )])
-        fig_comp.update_layout(title="Composizione Incentivo")
+        )], layout=layout_grafici()['composizione'])
         st.plotly_chart(fig_comp, use_container_width=True)
     
     # Comparazione regionale
@@ -496,22 +423,98 @@ with tab3:
     il valore del tempo libero è più alto (maggiore potere d'acquisto).
     """)
     
-    # Calcolo incentivi per tutte le regioni (campione)
-    regioni_campione = ["Lombardia", "Lazio", "Campania", "Calabria", "Toscana"]
-    dati_regionali = []
-    for reg in regioni_campione:
-        ris = calcola_incentivo_esodo_regionale(ral, mesi_mancanti, reg, naspi_mensile, 
-                                                ape_importo if ape_ammissibile else 0)
-        dati_regionali.append({
-            'Regione': reg,
-            'Fattore Costo Vita': COSTO_VITA_REGIONALE[reg],
-            'Incentivo': ris['incentivo_totale']
-        })
-    
-    df_regioni = pd.DataFrame(dati_regionali)
-    st.bar_chart(df_regioni.set_index('Regione')['Incentivo'])
-
-with tab4:
+    # Tutte le regioni da una tabella precalcolata (una per configurazione di copertura)
+    with fase("tabella regionale"):
+        tabella_regionale = tabella_incentivi(mesi_contributi_ultimi_4_anni, anni_contributi, ape_ammissibile)
+        incentivi_regionali = confronto_regioni(tabella_regionale, ral, mesi_mancanti)
+    fig_regioni = go.Figure(data=[go.Bar(
+        x=REGIONI, y=incentivi_regionali, customdata=FATTORI_COSTO_VITA,
+        hovertemplate="%{x}: € %{y:,.0f}<br>Fattore costo vita %{customdata:.2f}<extra></extra>"
+    )], layout=layout_grafici()['regioni'])
+    st.plotly_chart(fig_regioni, use_container_width=True)
+    
+    asse_heatmap = st.radio(
+        "Heatmap incentivo per regione rispetto a", ["Mesi alla pensione", "RAL"], horizontal=True,
+        key='asse_heatmap'
+    )
+    with fase("heatmap"):
+        if asse_heatmap == "Mesi alla pensione":
+            asse_x, valori_heatmap = matrice_heatmap(tabella_regionale, ral=ral)
+            titolo_x = f"Mesi alla pensione (RAL € {ral:,.0f})"
+        else:
+            asse_x, valori_heatmap = matrice_heatmap(tabella_regionale, mesi_mancanti=mesi_mancanti)
+            titolo_x = f"RAL (€, {mesi_mancanti} mesi alla pensione)"
+    with fase("figura heatmap"):
+        fig_heatmap = go.Figure(data=[go.Heatmap(
+            z=valori_heatmap, x=asse_x, y=REGIONI, colorscale="RdYlGn", colorbar=dict(title="€")
+        )])
+        fig_heatmap.update_layout(title="Incentivo Esodo per Regione", xaxis_title=titolo_x, height=600)
+    with fase("invio heatmap"):
+        st.plotly_chart(fig_heatmap, use_container_width=True)
+
+    # Sensibilità: tutte le varianti degli input valutate in un'unica chiamata batch
+    st.markdown("---")
+    st.subheader("🌪️ Sensibilità dell'Incentivo")
+    st.markdown("""
+    Quanto cambia l'incentivo suggerito se cambia un solo input: RAL ±10%, età ±1 anno,
+    contributi ±2 anni, montante ±10.000 €, mesi di contribuzione ±12 e tutte le alternative
+    per regione, tipo di contribuzione, sesso e condizioni.
+    """)
+    with fase("sensibilità"):
+        sensibilita = analisi_sensibilita(input_scenario)
+    tornado = sensibilita['tornado']
+    incentivo_base = sensibilita['base']
+    tornado_grafico = tornado[tornado['escursione'] > 0].iloc[::-1]
+    fig_tornado = go.Figure(data=[
+        go.Bar(name="Valore basso", y=tornado_grafico['etichetta'], x=tornado_grafico['metrica_bassa'] - incentivo_base,
+               base=incentivo_base, orientation='h', customdata=tornado_grafico['valore_basso'].astype(str),
+               hovertemplate="%{y} = %{customdata}<br>Incentivo € %{x:,.0f}<extra></extra>"),
+        go.Bar(name="Valore alto", y=tornado_grafico['etichetta'], x=tornado_grafico['metrica_alta'] - incentivo_base,
+               base=incentivo_base, orientation='h', customdata=tornado_grafico['valore_alto'].astype(str),
+               hovertemplate="%{y} = %{customdata}<br>Incentivo € %{x:,.0f}<extra></extra>")
+    ])
+    fig_tornado.update_layout(
+        title=f"Tornado: incentivo base € {incentivo_base:,.0f}", barmode='overlay',
+        xaxis_title="Incentivo Esodo (€)", height=150 + 40 * len(tornado_grafico)
+    )
+    st.plotly_chart(fig_tornado, use_container_width=True)
+    st.dataframe(pd.DataFrame({
+        'Input': tornado['etichetta'],
+        'Valore basso': tornado['valore_basso'].astype(str),
+        'Valore alto': tornado['valore_alto'].astype(str),
+        'Incentivo basso (€)': tornado['metrica_bassa'].round(0),
+        'Incentivo alto (€)': tornado['metrica_alta'].round(0),
+        'Escursione (€)': tornado['escursione'].round(0),
+        'Elasticità': tornado['elasticita'].round(2)
+    }), hide_index=True, use_container_width=True)
+    st.caption("Elasticità: variazione % dell'incentivo per 1% di variazione dell'input (solo input numerici).")
+
+def carica_forza_lavoro(file_forza_lavoro):
+    # Il file viene letto e valutato una sola volta: dati e risultati restano nella sessione
+    # anche quando la scheda è chiusa e l'uploader non viene eseguito
+    import pandas as pd
+    from pensionbridge.batch import calcola_scenari_batch
+    from pensionbridge.cli import TIPI_COLONNE
+
+    caricata = st.session_state.get('forza_lavoro_portafoglio')
+    if caricata is not None and caricata['file_id'] == file_forza_lavoro.file_id:
+        return
+    dati = pd.read_csv(file_forza_lavoro, dtype=TIPI_COLONNE)
+    with fase("batch forza lavoro"):
+        risultati = calcola_scenari_batch(dati, scenario['oggi'])
+    st.session_state['forza_lavoro_portafoglio'] = {
+        'file_id': file_forza_lavoro.file_id, 'nome': file_forza_lavoro.name,
+        'dati': dati, 'risultati': risultati
+    }
+
+def sezione_analisi_aziendale():
+    import json
+    import plotly.graph_objects as go
+    from pensionbridge.batch import COLONNE_BATCH_OBBLIGATORIE
+    from pensionbridge.grafici import figura_bande_timeline, figura_dispersione
+    from pensionbridge.ottimizzatore import OBIETTIVI, ottimizza_incentivo
+    from pensionbridge.portafoglio import seleziona_portafoglio
+
     st.header("🏢 Analisi Costi/Benefici Aziendali")
     st.markdown("Valutazione della convenienza per l'azienda.")
     
@@ -522,7 +525,7 @@ with tab4:
     
     with col_az1:
         st.subheader("💸 Scenario: Mantenimento Dipendente")
-        costo_totale_mantenimento = costo_azienda_annuo * (mesi_mancanti / 12)
+        costo_totale_mantenimento = scenario['costo_totale_mantenimento']
         
         st.write(f"**Costo azienda mensile:** €{costo_azienda_annuo/12:,.2f}")
         st.write(f"**Mesi fino a pensione:** {mesi_mancanti}")
@@ -532,7 +535,7 @@ with tab4:
         st.subheader("🎯 Scenario: Incentivo all'Esodo")
         st.metric("Incentivo da Erogare", f"€ {incentivo_proposto:,.2f}")
         
-        risparmio_aziendale = costo_totale_mantenimento - incentivo_proposto
+        risparmio_aziendale = scenario['risparmio_aziendale']
         
         if risparmio_aziendale > 0:
             st.success(f"✅ **Risparmio Aziendale: €{risparmio_aziendale:,.2f}**")
@@ -540,6 +543,152 @@ with tab4:
         else:
             st.error(f"❌ **Costo Extra: €{abs(risparmio_aziendale):,.2f}**")
     
+    # Ricerca dell'offerta su tutta la griglia mese di uscita × incentivo
+    st.markdown("---")
+    st.subheader("🎯 Ottimizzazione Offerta (Frontiera Win-Win)")
+    
+    col_opt1, col_opt2 = st.columns(2)
+    obiettivo_offerta = col_opt1.selectbox(
+        "Obiettivo", list(OBIETTIVI), format_func=OBIETTIVI.get, key='obiettivo_offerta'
+    )
+    budget_offerta = col_opt2.number_input(
+        "Budget massimo incentivo (€, 0 = nessun limite)", 0, 1000000, step=5000, key='budget_offerta'
+    )
+    with fase("ottimizzazione offerta"):
+        esito_offerta = ottimizza_incentivo(
+            {k: v for k, v in input_scenario.items() if k != 'incentivo_proposto'},
+            budget_massimo=budget_offerta or None, obiettivo=obiettivo_offerta
+        )
+    
+    if esito_offerta['migliore'] is None:
+        st.warning("Nessuna offerta rispetta i vincoli (beneficio e risparmio non negativi).")
+    else:
+        offerta = esito_offerta['migliore']
+        col_off1, col_off2, col_off3, col_off4 = st.columns(4)
+        col_off1.metric("Uscita tra", f"{offerta['mese_uscita']} mesi")
+        col_off2.metric("Incentivo Ottimale", f"€ {offerta['incentivo']:,.0f}")
+        col_off3.metric("Beneficio Lavoratore", f"€ {offerta['beneficio_lavoratore']:,.0f}")
+        col_off4.metric("Risparmio Azienda", f"€ {offerta['risparmio_azienda']:,.0f}")
+    
+    frontiera = esito_offerta['frontiera']
+    with fase("figura frontiera"):
+        fig_frontiera = go.Figure(data=[go.Scatter(
+            x=frontiera['beneficio_lavoratore'], y=frontiera['risparmio_azienda'],
+            mode='lines+markers', customdata=frontiera[['mese_uscita', 'incentivo']],
+            hovertemplate="Uscita tra %{customdata[0]} mesi<br>Incentivo € %{customdata[1]:,.0f}<extra></extra>"
+        )])
+        fig_frontiera.update_layout(
+            title="Frontiera di Pareto", xaxis_title="Beneficio Lavoratore (€)", yaxis_title="Risparmio Azienda (€)"
+        )
+    with fase("invio frontiera"):
+        st.plotly_chart(fig_frontiera, use_container_width=True)
+    
+    # Portafoglio: a quali dipendenti dell'intera azienda offrire l'incentivo, dato un budget
+    st.markdown("---")
+    st.subheader("🧮 Portafoglio Uscite Aziendale")
+    file_forza_lavoro = st.file_uploader(
+        "CSV della forza lavoro (stesso formato del batch HR)", type="csv", key='file_forza_lavoro',
+        help=f"Colonne obbligatorie: {', '.join(COLONNE_BATCH_OBBLIGATORIE)}. Le altre assumono i valori di default."
+    )
+    if file_forza_lavoro is not None:
+        try:
+            carica_forza_lavoro(file_forza_lavoro)
+        except ValueError as errore:
+            st.error(f"File non valido: {errore}")
+    forza_lavoro = st.session_state.get('forza_lavoro_portafoglio')
+    
+    if forza_lavoro is None:
+        st.info("Carica un CSV dei dipendenti per scegliere a chi offrire l'incentivo entro un budget.")
+    else:
+        dati_portafoglio, risultati_portafoglio = forza_lavoro['dati'], forza_lavoro['risultati']
+        st.caption(f"{forza_lavoro['nome']}: {len(dati_portafoglio):,} dipendenti, "
+                   f"{int((risultati_portafoglio['risparmio_aziendale'] > 0).sum()):,} con uscita conveniente")
+        col_pf1, col_pf2, col_pf3 = st.columns(3)
+        budget_portafoglio = col_pf1.number_input(
+            "Budget incentivi (€)", 0, 1000000000, step=100000, key='budget_portafoglio'
+        )
+        massimo_regione = col_pf2.number_input(
+            "Uscite massime per regione (0 = nessun limite)", 0, 1000000, step=10, key='massimo_regione_portafoglio'
+        )
+        minimo_uscite = col_pf3.number_input(
+            "Uscite minime", 0, 1000000, step=10, key='minimo_uscite_portafoglio'
+        )
+        with fase("portafoglio uscite"):
+            portafoglio = seleziona_portafoglio(
+                risultati_portafoglio, dati_portafoglio['regione'], budget_portafoglio,
+                massimo_per_regione=massimo_regione or None, minimo_dipendenti=minimo_uscite
+            )
+        
+        if not portafoglio['fattibile']:
+            st.warning(f"Il minimo di {minimo_uscite:,} uscite non è raggiungibile con budget e limiti regionali: "
+                       f"mostrato il portafoglio più numeroso possibile.")
+        col_pr1, col_pr2, col_pr3, col_pr4 = st.columns(4)
+        col_pr1.metric("Dipendenti Selezionati", f"{portafoglio['dipendenti']:,}")
+        col_pr2.metric("Incentivi Erogati", f"€ {portafoglio['incentivo_totale']:,.0f}",
+                       delta=f"€ {portafoglio['budget_residuo']:,.0f} residui", delta_color="off")
+        col_pr3.metric("Risparmio Totale", f"€ {portafoglio['risparmio_totale']:,.0f}")
+        col_pr4.metric("Distanza dall'Ottimo", f"≤ {portafoglio['gap']:.2%}",
+                       help=f"Limite superiore al risparmio: € {portafoglio['limite_superiore']:,.0f}")
+        st.dataframe(
+            portafoglio['per_regione'].rename(columns={
+                'dipendenti': "Selezionati", 'incentivo': "Incentivi (€)", 'risparmio': "Risparmio (€)",
+                'candidati': "Candidati", 'tetto': "Limite"
+            }).round(0),
+            use_container_width=True
+        )
+        selezionati = dati_portafoglio[portafoglio['selezionati']].assign(
+            incentivo_proposto=risultati_portafoglio['incentivo_proposto'].to_numpy()[portafoglio['selezionati']],
+            risparmio_aziendale=risultati_portafoglio['risparmio_aziendale'].to_numpy()[portafoglio['selezionati']]
+        )
+        st.download_button("Scarica i dipendenti selezionati (.csv)", selezionati.to_csv(index=False),
+                           file_name="portafoglio_uscite.csv", mime="text/csv", on_click='ignore')
+
+        # Vista dell'intera forza lavoro: WebGL, punti sfoltiti lato server, figure in cache per
+        # contenuto del file (una rerun con gli stessi dati non ricalcola nulla)
+        st.markdown("##### 📈 Vista Forza Lavoro")
+        asse_forza_lavoro = st.radio(
+            "Incentivo proposto rispetto a", ["Risparmio aziendale", "Mesi alla pensione"], horizontal=True,
+            key='asse_forza_lavoro'
+        )
+        with fase("figure forza lavoro"):
+            if asse_forza_lavoro == "Risparmio aziendale":
+                fig_dispersione = figura_dispersione(
+                    risultati_portafoglio['risparmio_aziendale'], risultati_portafoglio['incentivo_proposto'],
+                    risultati_portafoglio['mesi_mancanti'], "Incentivo vs Risparmio Aziendale",
+                    "Risparmio aziendale (€)", "Incentivo proposto (€)", "Mesi alla pensione"
+                )
+            else:
+                fig_dispersione = figura_dispersione(
+                    risultati_portafoglio['mesi_mancanti'], risultati_portafoglio['incentivo_proposto'],
+                    risultati_portafoglio['risparmio_aziendale'], "Incentivo vs Mesi alla Pensione",
+                    "Mesi alla pensione", "Incentivo proposto (€)", "Risparmio aziendale (€)"
+                )
+            fig_bande = figura_bande_timeline(risultati_portafoglio)
+        with fase("invio figure forza lavoro"):
+            st.plotly_chart(json.loads(fig_dispersione), use_container_width=True)
+            st.plotly_chart(json.loads(fig_bande), use_container_width=True)
+
+        # Dossier stampabili per i tavoli di negoziazione: generati su richiesta e tenuti nella
+        # sessione finché non cambia il file, così il download non li ricalcola a ogni rerun
+        st.markdown("##### 📁 Dossier Individuali")
+        if st.button(f"Prepara i dossier di tutti i {len(dati_portafoglio):,} dipendenti (.zip)"):
+            from io import BytesIO
+            from pensionbridge.dossier import esporta_dossier
+            archivio_dossier = BytesIO()
+            with fase("dossier forza lavoro"), st.spinner("Generazione dei dossier..."):
+                esporta_dossier(dati_portafoglio, archivio_dossier,
+                                colonna_id='matricola' if 'matricola' in dati_portafoglio else None,
+                                oggi=scenario['oggi'])
+            st.session_state['dossier_forza_lavoro'] = {
+                'file_id': forza_lavoro['file_id'], 'zip': archivio_dossier.getvalue()
+            }
+        dossier = st.session_state.get('dossier_forza_lavoro')
+        if dossier is not None and dossier['file_id'] == forza_lavoro['file_id']:
+            st.download_button("Scarica i dossier (.zip)", dossier['zip'], file_name="dossier_dipendenti.zip",
+                               mime="application/zip", on_click='ignore')
+            st.caption("Un dossier HTML per dipendente (schede 1–5 e grafici): aprirlo nel browser e "
+                       "stamparlo in PDF. Tenere pensionbridge_dossier.js nella stessa cartella.")
+    
     # Analisi benefici intangibili
     st.markdown("---")
     st.subheader("📈 Benefici Intangibili per l'Azienda")
@@ -549,17 +698,18 @@ with tab4:
     col_b2.metric("Clima Aziendale", "✓", delta="Gestione proattiva")
     col_b3.metric("Riduzione Conflitti", "✓", delta="Soluzione win-win")
 
-with tab5:
+def sezione_strategia_temporale():
+    import pandas as pd
+    import plotly.graph_objects as go
+    from pensionbridge.breakeven import calcola_breakeven
+    from pensionbridge.montecarlo import PROCESSI_INTERATTIVI, simula_montecarlo
+
     st.header("⏰ Ottimizzazione Data Uscita")
     st.write("Analizziamo come cambia l'importo della pensione lavorando 1, 2 o 3 anni in più.")
     
-    anni_extra = [0, 1, 2, 3, 4, 5]
-    pensioni_future = []
-    
-    for a in anni_extra:
-        p = stima_pensione_netta(ral * (1.01**a), anni_contributi + a, tipo_contribuzione)
-        pensioni_future.append(p)
-        
+    anni_extra = ANNI_EXTRA_PROIEZIONE
+    pensioni_future = scenario['pensioni_future']
+
     df_proiezione = pd.DataFrame({
         "Anni Extra Lavoro": anni_extra,
         "Pensione Stimata (€)": pensioni_future,
@@ -568,31 +718,146 @@ with tab5:
     
     st.table(df_proiezione)
     
-    st.line_chart(df_proiezione, x="Anni Extra Lavoro", y="Pensione Stimata (€)")
+    fig_proiezione = go.Figure(data=[go.Scatter(
+        x=df_proiezione["Anni Extra Lavoro"], y=df_proiezione["Pensione Stimata (€)"], mode='lines+markers'
+    )], layout=layout_grafici()['proiezione'])
+    st.plotly_chart(fig_proiezione, use_container_width=True)
     st.caption("Nota: Lavorare di più aumenta il montante contributivo e il coefficiente di trasformazione (età più alta).")
     
     # Analisi break-even
     st.markdown("---")
     st.subheader("📊 Analisi Break-Even")
     st.markdown("""
-    Considera che ogni anno di lavoro in più aumenta la pensione ma riduce gli anni di godimento.
-    L'analisi break-even considera l'aspettativa di vita e il valore attuale dei flussi pensionistici.
+    Ogni mese di lavoro in più aumenta la pensione ma riduce i mesi in cui viene percepita.
+    Per ogni mese di uscita si calcola il valore attuale atteso di stipendio e pensione: i flussi
+    mensili sono pesati per la probabilità di sopravvivenza (tavola di mortalità per sesso ed età)
+    e scontati al tasso indicato.
     """)
     
-    # Semplice calcolo break-even
-    aspettativa_vita = 85  # Ipotesi
-    anni_pensione_se_esci_ora = aspettativa_vita - eta
+    tasso_sconto = st.number_input(
+        "Tasso di sconto reale annuo (%)", 0.0, 10.0, step=0.5, key='tasso_sconto_breakeven'
+    )
+    with fase("break-even"):
+        breakeven = calcola_breakeven(
+            eta, sesso, ral, anni_contributi, tipo_contribuzione, mesi_mancanti, tasso_sconto / 100,
+            regione=regione
+        )
     
-    st.info(f"""
-    **Scenario attuale:**
-    - Uscita tra {mesi_mancanti} mesi → Pensione €{pensione_stimata:,.2f}/mese per circa {anni_pensione_se_esci_ora:.0f} anni
-    - Totale lifetime: €{pensione_stimata * 12 * anni_pensione_se_esci_ora:,.0f}
+    col_be1, col_be2, col_be3 = st.columns(3)
+    col_be1.metric("Speranza di Vita Residua", f"{breakeven['speranza_vita']:.1f} anni")
+    col_be2.metric("Uscita Ottimale (valore pensione)", f"tra {breakeven['mese_ottimale']} mesi",
+                   delta=f"+{breakeven['mese_ottimale'] - mesi_mancanti} mesi", delta_color="off")
+    col_be3.metric("Ultima Uscita in Pareggio", f"tra {breakeven['mese_pareggio']} mesi",
+                   delta=f"+{breakeven['mese_pareggio'] - mesi_mancanti} mesi", delta_color="off")
+    
+    df_breakeven = pd.DataFrame({
+        "Mesi di Lavoro Extra": breakeven['mesi_uscita'] - mesi_mancanti,
+        "Valore Attuale Pensione (€)": breakeven['van_pensione'],
+        "Valore Attuale Stipendio + Pensione (€)": breakeven['van_totale']
+    })
+    fig_breakeven = go.Figure(data=[
+        go.Scatter(x=df_breakeven["Mesi di Lavoro Extra"], y=df_breakeven[colonna], name=colonna, mode='lines')
+        for colonna in ("Valore Attuale Pensione (€)", "Valore Attuale Stipendio + Pensione (€)")
+    ], layout=layout_grafici()['breakeven'])
+    st.plotly_chart(fig_breakeven, use_container_width=True)
+    st.caption(
+        "Pareggio: oltre questo mese di uscita la pensione più alta non compensa più, in valore atteso, "
+        "i mesi di pensione persi rispetto all'uscita alla prima data utile."
+    )
+
+    # Simulazione stocastica: distribuzioni invece di stime puntuali
+    st.markdown("---")
+    st.subheader("🎲 Simulazione Monte Carlo")
+    st.markdown("""
+    Simula migliaia di percorsi per crescita salariale, rendimenti del fondo pensione e longevità,
+    e mostra le bande di percentili al posto dei valori puntuali.
+    """)
     
-    **Se lavori 2 anni in più:**
-    - Pensione €{pensioni_future[2]:,.2f}/mese per circa {anni_pensione_se_esci_ora - 2:.0f} anni
-    - Totale lifetime: €{pensioni_future[2] * 12 * (anni_pensione_se_esci_ora - 2):,.0f}
+    if st.checkbox("Attiva modalità Monte Carlo", key='montecarlo_attivo'):
+        col_mc1, col_mc2 = st.columns(2)
+        n_percorsi = col_mc1.select_slider(
+            "Percorsi simulati", [5000, 10000, 20000, 50000, 100000], key='percorsi_montecarlo'
+        )
+        seme_mc = col_mc2.number_input("Seme casuale", 0, 2**31 - 1, key='seme_montecarlo')
+        
+        with fase("simulazione Monte Carlo"):
+            esito_mc = simula_montecarlo(
+                input_scenario, n_percorsi, seme=int(seme_mc), processi=PROCESSI_INTERATTIVI, budget_secondi=2.0
+            )
+        st.table(esito_mc['bande'].style.format("€ {:,.0f}"))
+        st.caption(
+            f"{esito_mc['n_percorsi']:,} percorsi in {esito_mc['tempo_secondi']:.2f}s"
+            + ("" if esito_mc['completa'] else " (interrotta per budget di tempo)")
+            + ". Scarto Incentivo > 0: l'incentivo copre il reddito netto perso al netto dei sostegni."
+        )
+
+def sezione_archivio_scenari():
+    import plotly.graph_objects as go
+
+    st.subheader("🗂️ Archivio Scenari")
+    st.markdown("""
+    Ogni scenario calcolato viene salvato con input e risultati. Filtra, confronta gli scenari
+    salvati e ricaricane uno nella sidebar senza ricalcolo.
     """)
+    archivio = archivio_scenari()
+
+    col_f1, col_f2, col_f3 = st.columns(3)
+    filtro_dipendente = col_f1.selectbox("Dipendente", ["Tutti", *archivio.dipendenti()],
+                                         format_func=lambda d: d or "(senza nome)", key='filtro_dipendente_archivio')
+    filtro_regione = col_f2.selectbox("Regione", ["Tutte", *REGIONI], key='filtro_regione_archivio')
+    limite_elenco = col_f3.number_input("Scenari mostrati", 10, 1000, step=10, key='limite_archivio')
+
+    with fase("query archivio"):
+        elenco_scenari = archivio.elenca(
+            dipendente=None if filtro_dipendente == "Tutti" else filtro_dipendente,
+            regione=None if filtro_regione == "Tutte" else filtro_regione,
+            limite=limite_elenco
+        )
+    if elenco_scenari.empty:
+        st.info("Nessuno scenario in archivio per i filtri selezionati.")
+    else:
+        st.dataframe(elenco_scenari, use_container_width=True)
+        etichetta_scenario = lambda i: (
+            f"#{i} · {elenco_scenari.at[i, 'dipendente'] or '(senza nome)'} · {elenco_scenari.at[i, 'regione']} · "
+            f"€ {elenco_scenari.at[i, 'incentivo_proposto']:,.0f}"
+        )
 
+        st.markdown("#### Confronto")
+        selezionati = st.multiselect(
+            "Scenari da confrontare", elenco_scenari.index.tolist(),
+            default=elenco_scenari.index[:3].tolist(), format_func=etichetta_scenario
+        )
+        if selezionati:
+            confronto = archivio.confronta(selezionati)
+            st.dataframe(confronto, use_container_width=True)
+            fig_confronto = go.Figure([
+                go.Bar(name=nome, x=[f"#{i}" for i in confronto.index], y=confronto[colonna])
+                for colonna, nome in (('incentivo_proposto', "Incentivo"),
+                                      ('risparmio_aziendale', "Risparmio Aziendale"))
+            ])
+            fig_confronto.update_layout(barmode='group', yaxis_title="€", height=350)
+            st.plotly_chart(fig_confronto, use_container_width=True)
+
+        st.markdown("#### Ricarica")
+        id_ricarica = st.selectbox("Scenario da ricaricare", elenco_scenari.index.tolist(),
+                                   format_func=etichetta_scenario)
+        st.button("↩️ Ricarica nella sidebar", on_click=ricarica_scenario,
+                  args=(id_ricarica, elenco_scenari.at[id_ricarica, 'dipendente']))
+
+SEZIONI = {
+    "📊 Analisi Pensionistica": sezione_analisi_pensionistica,
+    "💰 Strumenti di Sostegno": sezione_strumenti_sostegno,
+    "⚖️ Incentivo Esodo": sezione_incentivo_esodo,
+    "🏢 Analisi Aziendale": sezione_analisi_aziendale,
+    "⚙️ Strategia Temporale": sezione_strategia_temporale,
+    "🗂️ Archivio Scenari": sezione_archivio_scenari
+}
+schede = st.tabs(list(SEZIONI), key='scheda', on_change='rerun' if rendering_pigro else 'ignore')
+for scheda, (etichetta, sezione) in zip(schede, SEZIONI.items()):
+    if rendering_pigro and not scheda.open:
+        continue
+    with scheda, fase(etichetta):
+        sezione()
 
 # --- FOOTER ---
 st.markdown("---")
@@ -613,3 +878,27 @@ Per calcoli precisi consultare l'estratto conto INPS e un consulente previdenzia
 - Contribuzioni diversificate (artigiani, commercianti, autonomi, agricoli)
 - Costo della vita regionale
 """)
+
+# --- PANNELLO DIAGNOSTICA ---
+# Misura e profilo si chiudono qui, così includono l'intera rerun
+diagnostica.close()
+if profilo_rerun is not None:
+    st.session_state['profilo_rerun'] = profilo_rerun
+with pannello_diagnostica:
+    if misura_rerun is not None:
+        configura_log()
+        registra_json('rerun', misura_rerun, scheda=st.session_state.get('scheda'), rendering_pigro=rendering_pigro)
+        misurato_ms = sum(voce['ms'] for voce in misura_rerun.fasi if voce['livello'] == 0)
+        st.caption(f"Ultima rerun: {misura_rerun.totale_ms:,.0f} ms")
+        st.dataframe(
+            [{'Fase': "\u2003" * voce['livello'] + voce['fase'].rsplit("/", 1)[-1], 'ms': round(voce['ms'], 1)}
+             for voce in misura_rerun.fasi]
+            + [{'Fase': "altro (sidebar, layout)", 'ms': round(misura_rerun.totale_ms - misurato_ms, 1)}],
+            hide_index=True, use_container_width=True
+        )
+    profilo = st.session_state.get('profilo_rerun')
+    if profilo is not None:
+        st.download_button("Scarica profilo (.prof)", profilo['dati'], file_name="pensionbridge_rerun.prof",
+                           mime="application/octet-stream", on_click='ignore')
+        st.caption("Apribile con `python -m pstats` o snakeviz. Funzioni con tempo cumulativo maggiore:")
+        st.code(profilo['testo'], language=None, height=300)
@@ -0,0 +1,270 @@
+"""
+Benchmark di PensionBridge: funzioni di calcolo scalari e batch, batch da 100k e 1M
+dipendenti e rerun completa della pagina Streamlit in modalità headless (AppTest).
+
+I risultati vengono salvati in JSON; con --confronta si confrontano con una run precedente
+e si segnalano le regressioni oltre la soglia (exit code 1).
+
+Esempi:
+    python benchmarks/bench.py --output bench_base.json
+    python benchmarks/bench.py --output bench_nuovo.json --confronta bench_base.json --soglia 0.2
+    python benchmarks/bench.py --filtro batch --rapido
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from functools import cached_property
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RADICE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RADICE))
+
+# Le rerun della pagina archiviano gli scenari: su un archivio temporaneo, mai quello dell'utente.
+# Va impostato prima che pensionbridge.archivio legga il percorso.
+_CARTELLA_ARCHIVIO = tempfile.TemporaryDirectory()
+os.environ['PENSIONBRIDGE_ARCHIVIO'] = str(Path(_CARTELLA_ARCHIVIO.name) / "scenari.sqlite")
+
+import pensionbridge as pb  # noqa: E402
+
+# Data di riferimento fissa: i tempi non dipendono dal giorno in cui gira il benchmark
+OGGI = date(2025, 1, 15)
+
+INPUT_SCENARIO = dict(
+    sesso="Uomo", eta=62, regione="Lombardia", tipo_contribuzione="Dipendente Privato",
+    anni_contributi=38, ral=45000, montante_complementare=50000, is_disoccupato=True, oggi=OGGI
+)
+
+def forza_lavoro(n, seme=0):
+    """Forza lavoro sintetica con la stessa distribuzione degli input della sidebar."""
+    rng = np.random.default_rng(seme)
+    return pd.DataFrame({
+        'eta': rng.integers(50, 71, n),
+        'anni_contributi': rng.integers(20, 51, n),
+        'sesso': rng.choice(["Uomo", "Donna"], n),
+        'ral': rng.integers(20, 201, n) * 1000.0,
+        'regione': rng.choice(pb.REGIONI, n),
+        'tipo_contribuzione': rng.choice(pb.TIPI_CONTRIBUZIONE, n),
+        'is_lavoratore_precoce': rng.random(n) < 0.1,
+        'is_lavoratore_usurante': rng.random(n) < 0.1,
+        'montante_complementare': rng.choice([0.0, 30000.0, 80000.0], n),
+        'mesi_contributi_ultimi_4_anni': rng.integers(0, 49, n),
+        'is_disoccupato': rng.random(n) < 0.2,
+        'is_caregiver': rng.random(n) < 0.05,
+        'is_invalido': rng.random(n) < 0.05
+    })
+
+def _benchmark_scalari():
+    return {
+        'scalare.calcola_data_pensione': lambda: pb.calcola_data_pensione(62, 38, "Uomo", oggi=OGGI),
+        'scalare.stima_pensione_netta': lambda: pb.stima_pensione_netta(45000, 38, "Artigiani"),
+        'scalare.calcola_naspi': lambda: pb.calcola_naspi(45000, 48),
+        'scalare.calcola_ape_sociale': lambda: pb.calcola_ape_sociale(64, 38, 45000, is_disoccupato=True),
+        'scalare.calcola_rita': lambda: pb.calcola_rita(50000, 62, 3.5),
+        'scalare.calcola_incentivo_esodo_regionale':
+            lambda: pb.calcola_incentivo_esodo_regionale(45000, 58, "Lazio", 1541.48, 0),
+        'scalare.calcola_scenario': lambda: pb.calcola_scenario(**INPUT_SCENARIO),
+        'scalare.calcola_scenario_memo': lambda: pb.calcola_scenario_memo(**INPUT_SCENARIO),
+        'scalare.timeline_da_scenario':
+            lambda: pb.timeline_da_scenario(pb.calcola_scenario_memo(**INPUT_SCENARIO)),
+        'scalare.ottimizza_incentivo': lambda: pb.ottimizza_incentivo(INPUT_SCENARIO),
+        'scalare.simula_montecarlo_20k':
+            lambda: pb.simula_montecarlo(INPUT_SCENARIO, 20000, seme=1, processi=1),
+        'scalare.calcola_breakeven': lambda: pb.calcola_breakeven(62, "Uomo", 45000, 38, mesi_mancanti=80),
+        'scalare.cerca_incentivo':
+            lambda: pb.cerca_incentivo(pb.tabella_incentivi(48, 38, False), "Lazio", 45000, 58)
+    }
+
+class _DatiBatch:
+    """
+    Forza lavoro, colonne e risultati di un gruppo batch, costruiti al primo accesso: un
+    --filtro che esclude il gruppo non ne paga la costruzione, e per gli altri avviene nella
+    chiamata di riscaldamento di misura(), fuori dai tempi.
+    """
+
+    def __init__(self, n):
+        self.n = n
+
+    @cached_property
+    def dati(self):
+        return forza_lavoro(self.n)
+
+    @cached_property
+    def col(self):
+        return {c: self.dati[c].to_numpy() for c in self.dati.columns}
+
+    @cached_property
+    def risultati(self):
+        return pb.calcola_scenari_batch(self.dati, OGGI)
+
+def _benchmark_batch(n):
+    d = _DatiBatch(n)
+
+    def pensione_contributiva():
+        # Storia ricostruita compresa: è il percorso usato quando manca l'estratto conto
+        anni_a_pensione = d.risultati['anni_a_pensione'].to_numpy()
+        retribuzioni, colonna_uscita = pb.storia_retributiva(d.col['ral'], d.col['anni_contributi'], anni_a_pensione)
+        return pb.calcola_pensione_contributiva_batch(
+            retribuzioni, d.col['eta'] + anni_a_pensione, d.col['tipo_contribuzione'], colonna_uscita=colonna_uscita)
+
+    return {
+        f'batch_{n}.calcola_data_pensione_batch': lambda: pb.calcola_data_pensione_batch(
+            d.col['eta'], d.col['anni_contributi'], d.col['sesso'], d.col['is_lavoratore_precoce'],
+            d.col['is_lavoratore_usurante'], d.col['tipo_contribuzione'], OGGI),
+        f'batch_{n}.stima_pensione_netta_batch': lambda: pb.stima_pensione_netta_batch(
+            d.col['ral'], d.col['anni_contributi'], d.col['tipo_contribuzione']),
+        f'batch_{n}.netto_annuo': lambda: pb.netto_annuo(d.col['ral'], d.col['regione']),
+        f'batch_{n}.calcola_naspi_batch': lambda: pb.calcola_naspi_batch(
+            d.col['ral'], d.col['mesi_contributi_ultimi_4_anni']),
+        f'batch_{n}.calcola_ape_sociale_batch': lambda: pb.calcola_ape_sociale_batch(
+            d.col['eta'], d.col['anni_contributi'], d.col['ral'], d.col['is_disoccupato'], d.col['is_caregiver'],
+            d.col['is_invalido'], d.col['is_lavoratore_usurante']),
+        f'batch_{n}.calcola_rita_batch': lambda: pb.calcola_rita_batch(
+            d.col['montante_complementare'], d.col['eta'], d.risultati['anni_a_pensione'].to_numpy()),
+        f'batch_{n}.calcola_incentivo_esodo_regionale_batch': lambda: pb.calcola_incentivo_esodo_regionale_batch(
+            d.col['ral'], d.risultati['mesi_mancanti'].to_numpy(), d.col['regione'],
+            d.risultati['naspi_mensile'].to_numpy(), d.risultati['ape_importo'].to_numpy()),
+        f'batch_{n}.calcola_scenari_batch': lambda: pb.calcola_scenari_batch(d.dati, OGGI),
+        f'batch_{n}.riepiloga_timeline_batch': lambda: pb.riepiloga_timeline_batch(d.risultati),
+        f'batch_{n}.calcola_breakeven_batch': lambda: pb.calcola_breakeven_batch(
+            d.col['eta'], d.col['sesso'], d.col['ral'], d.col['anni_contributi'], d.col['tipo_contribuzione'],
+            d.risultati['mesi_mancanti'].to_numpy()),
+        f'batch_{n}.calcola_pensione_contributiva_batch': pensione_contributiva,
+        f'batch_{n}.seleziona_portafoglio': lambda: pb.seleziona_portafoglio(
+            d.risultati, d.col['regione'], 0.2 * d.risultati['incentivo_proposto'].sum(), massimo_per_regione=n // 50),
+        f'batch_{n}.sfoltisci': lambda: pb.sfoltisci(
+            d.risultati['risparmio_aziendale'].to_numpy(), d.risultati['incentivo_proposto'].to_numpy()),
+        f'batch_{n}.bande_timeline': lambda: pb.bande_timeline(d.risultati)
+    }
+
+def _benchmark_dossier():
+    dati = forza_lavoro(1000)
+    return {
+        'dossier.esporta_dossier_1000': lambda: pb.esporta_dossier(dati, BytesIO(), oggi=OGGI, processi=1)
+    }
+
+def _benchmark_pagina():
+    from streamlit.testing.v1 import AppTest
+
+    app = str(RADICE / "app.py")
+    stato = {}
+
+    def prima_esecuzione():
+        stato['at'] = AppTest.from_file(app, default_timeout=120).run()
+
+    def rerun():
+        if 'at' not in stato:
+            prima_esecuzione()
+        stato['at'].run()
+
+    def rerun_con_modifica():
+        if 'at' not in stato:
+            prima_esecuzione()
+        widget_eta = stato['at'].sidebar.number_input[0]
+        widget_eta.set_value(63 if widget_eta.value == 62 else 62).run()
+
+    return {
+        'pagina.prima_esecuzione': prima_esecuzione,
+        'pagina.rerun': rerun,
+        'pagina.rerun_con_modifica': rerun_con_modifica
+    }
+
+def misura(funzione, ripetizioni, tempo_minimo=0.2):
+    """Mediana e minimo di `ripetizioni` misure; le funzioni veloci vengono ripetute in loop."""
+    inizio = time.perf_counter()
+    funzione()
+    durata = time.perf_counter() - inizio
+    cicli = max(1, int(tempo_minimo / ripetizioni / durata)) if durata > 0 else 1000
+
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        for _ in range(cicli):
+            funzione()
+        tempi.append((time.perf_counter() - inizio) / cicli)
+    return {
+        'mediana_s': statistics.median(tempi),
+        'min_s': min(tempi),
+        'ripetizioni': ripetizioni,
+        'cicli': cicli
+    }
+
+def confronta(attuali, precedenti, soglia):
+    """
+    Ritorna le righe di confronto (nome, precedente, attuale, rapporto, regressione).
+    Si confrontano i tempi minimi, meno sensibili al rumore della macchina delle mediane.
+    """
+    righe = []
+    for nome, misura_attuale in attuali.items():
+        if nome not in precedenti:
+            continue
+        prima = precedenti[nome]['min_s']
+        adesso = misura_attuale['min_s']
+        rapporto = adesso / prima if prima > 0 else float('inf')
+        righe.append((nome, prima, adesso, rapporto, rapporto > 1 + soglia))
+    return righe
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PensionBridge")
+    parser.add_argument("--output", default="bench_output.json", help="File JSON dei risultati")
+    parser.add_argument("--confronta", default=None, help="JSON di una run precedente da confrontare")
+    parser.add_argument("--soglia", type=float, default=0.2,
+                        help="Rallentamento relativo oltre cui segnalare una regressione (default 0.2 = +20%%)")
+    parser.add_argument("--filtro", default=None, help="Esegue solo i benchmark il cui nome contiene il testo")
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--rapido", action="store_true", help="Salta il batch da 1M dipendenti")
+    parser.add_argument("--senza-pagina", action="store_true", help="Salta la rerun della pagina Streamlit")
+    args = parser.parse_args(argv)
+
+    gruppi = [_benchmark_scalari, lambda: _benchmark_batch(100_000), _benchmark_dossier]
+    if not args.rapido:
+        gruppi.append(lambda: _benchmark_batch(1_000_000))
+    if not args.senza_pagina:
+        gruppi.append(_benchmark_pagina)
+
+    risultati = {}
+    for gruppo in gruppi:
+        for nome, funzione in gruppo().items():
+            if args.filtro and args.filtro not in nome:
+                continue
+            ripetizioni = 3 if nome.startswith(('batch_1000000', 'pagina')) else args.ripetizioni
+            risultati[nome] = misura(funzione, ripetizioni)
+            print(f"{nome:<60} {risultati[nome]['mediana_s'] * 1000:>12.3f} ms", flush=True)
+
+    rapporto = {
+        'meta': {
+            'data': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'piattaforma': platform.platform()
+        },
+        'risultati': risultati
+    }
+    Path(args.output).write_text(json.dumps(rapporto, indent=2))
+    print(f"Risultati salvati in {args.output}")
+
+    if args.confronta:
+        precedenti = json.loads(Path(args.confronta).read_text())['risultati']
+        regressioni = 0
+        print(f"\nConfronto con {args.confronta} (soglia +{args.soglia:.0%}):")
+        for nome, prima, adesso, rapporto_tempi, regressione in confronta(risultati, precedenti, args.soglia):
+            regressioni += regressione
+            segnale = "  REGRESSIONE" if regressione else ""
+            print(f"{nome:<60} {prima * 1000:>10.3f} -> {adesso * 1000:>10.3f} ms  x{rapporto_tempi:.2f}{segnale}")
+        if regressioni:
+            print(f"\n{regressioni} regressioni oltre la soglia")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
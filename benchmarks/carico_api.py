@@ -0,0 +1,171 @@
+"""
+Test di carico del servizio HTTP (pensionbridge.servizio) su localhost.
+
+Più client concorrenti (thread con connessioni keep-alive) inviano richieste per la durata
+indicata; al termine si riportano throughput (richieste e dipendenti al secondo), latenze
+p50/p95/p99/max, errori e risposte 503 (backpressure). Senza --url il servizio viene avviato
+in un sottoprocesso su una porta libera e fermato alla fine.
+
+Esempi:
+    python benchmarks/carico_api.py --concorrenza 16 --dipendenti-per-richiesta 1000
+    python benchmarks/carico_api.py --endpoint scenario --concorrenza 32 --durata 10
+    python benchmarks/carico_api.py --url http://127.0.0.1:8765 --output carico.json
+"""
+import argparse
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from bench import INPUT_SCENARIO, OGGI, RADICE, forza_lavoro
+
+def _porta_libera():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def avvia_servizio(processi, timeout=60):
+    """Avvia il servizio su una porta libera e attende /salute. Ritorna (processo, url)."""
+    porta = _porta_libera()
+    comando = [sys.executable, "-m", "pensionbridge.servizio", "--porta", str(porta)]
+    if processi:
+        comando += ["--processi", str(processi)]
+    processo = subprocess.Popen(comando, cwd=RADICE)
+    url = f"http://127.0.0.1:{porta}"
+    scadenza = time.perf_counter() + timeout
+    while time.perf_counter() < scadenza:
+        if processo.poll() is not None:
+            raise RuntimeError(f"Il servizio è terminato all'avvio (codice {processo.returncode})")
+        try:
+            stato, _ = _richiesta(_connessione(url), "GET", "/salute")
+            if stato == 200:
+                return processo, url
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("Il servizio non ha risposto entro il timeout")
+
+def _connessione(url):
+    parti = urlsplit(url)
+    return http.client.HTTPConnection(parti.hostname, parti.port, timeout=120)
+
+def _richiesta(connessione, metodo, percorso, corpo=None):
+    connessione.request(metodo, percorso, corpo, {"Content-Type": "application/json"} if corpo else {})
+    risposta = connessione.getresponse()
+    return risposta.status, risposta.read()
+
+def costruisci_payload(endpoint, dipendenti_per_richiesta, distinti):
+    """`distinti` corpi diversi (la deduplicazione delle richieste identiche non falsa la misura)."""
+    if endpoint == 'scenario':
+        rng = np.random.default_rng(0)
+        return [json.dumps({**INPUT_SCENARIO, 'oggi': OGGI.isoformat(), 'eta': int(eta), 'ral': float(ral)}).encode()
+                for eta, ral in zip(rng.integers(55, 68, distinti), rng.integers(20, 200, distinti) * 1000)]
+    return [json.dumps({
+        'dipendenti': forza_lavoro(dipendenti_per_richiesta, seme=i).to_dict(orient='records'),
+        'oggi': OGGI.isoformat()
+    }).encode() for i in range(distinti)]
+
+def esegui_carico(url, endpoint, payload, concorrenza, durata):
+    """Invia richieste da `concorrenza` thread per `durata` secondi. Ritorna latenze e stati."""
+    latenze, stati = [], []
+    lock = threading.Lock()
+    fine = time.perf_counter() + durata
+
+    def client(indice):
+        connessione = _connessione(url)
+        locali, stati_locali = [], []
+        i = indice
+        while time.perf_counter() < fine:
+            corpo = payload[i % len(payload)]
+            i += concorrenza
+            inizio = time.perf_counter()
+            try:
+                stato, _ = _richiesta(connessione, "POST", f"/{endpoint}", corpo)
+            except (OSError, http.client.HTTPException):
+                connessione.close()
+                connessione = _connessione(url)
+                stato = 0
+            locali.append(time.perf_counter() - inizio)
+            stati_locali.append(stato)
+            if stato == 503:
+                time.sleep(0.05)
+        connessione.close()
+        with lock:
+            latenze.extend(locali)
+            stati.extend(stati_locali)
+
+    inizio = time.perf_counter()
+    thread = [threading.Thread(target=client, args=(i,)) for i in range(concorrenza)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    return np.array(latenze), np.array(stati), time.perf_counter() - inizio
+
+def riepilogo(latenze, stati, durata, dipendenti_per_richiesta):
+    ok = stati == 200
+    latenze_ok = latenze[ok] * 1000 if ok.any() else np.zeros(1)
+    return {
+        'richieste': int(len(stati)),
+        'ok': int(ok.sum()),
+        'rifiutate_503': int((stati == 503).sum()),
+        'errori': int((~ok & (stati != 503)).sum()),
+        'richieste_al_secondo': ok.sum() / durata,
+        'dipendenti_al_secondo': ok.sum() * dipendenti_per_richiesta / durata,
+        'latenza_ms': {
+            'p50': float(np.percentile(latenze_ok, 50)),
+            'p95': float(np.percentile(latenze_ok, 95)),
+            'p99': float(np.percentile(latenze_ok, 99)),
+            'max': float(latenze_ok.max()),
+        },
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test di carico del servizio HTTP PensionBridge")
+    parser.add_argument("--url", default=None, help="Servizio già avviato (default: ne avvia uno locale)")
+    parser.add_argument("--processi", type=int, default=None, help="Worker del servizio avviato localmente")
+    parser.add_argument("--endpoint", choices=["batch", "scenario"], default="batch")
+    parser.add_argument("--concorrenza", type=int, default=16, help="Client concorrenti")
+    parser.add_argument("--durata", type=float, default=15.0, help="Secondi di carico")
+    parser.add_argument("--dipendenti-per-richiesta", type=int, default=1000)
+    parser.add_argument("--payload-distinti", type=int, default=64,
+                        help="Corpi di richiesta diversi inviati a rotazione")
+    parser.add_argument("--output", default=None, help="Salva il riepilogo in JSON")
+    args = parser.parse_args(argv)
+
+    dipendenti = args.dipendenti_per_richiesta if args.endpoint == 'batch' else 1
+    payload = costruisci_payload(args.endpoint, dipendenti, args.payload_distinti)
+    processo, url = (None, args.url) if args.url else avvia_servizio(args.processi)
+    try:
+        esegui_carico(url, args.endpoint, payload[:1], 1, 0.5)  # riscaldamento
+        latenze, stati, durata = esegui_carico(url, args.endpoint, payload, args.concorrenza, args.durata)
+        _, statistiche = _richiesta(_connessione(url), "GET", "/salute")
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    risultato = {
+        'endpoint': args.endpoint, 'concorrenza': args.concorrenza, 'dipendenti_per_richiesta': dipendenti,
+        **riepilogo(latenze, stati, durata, dipendenti), 'servizio': json.loads(statistiche),
+    }
+    lat = risultato['latenza_ms']
+    print(f"{risultato['ok']} richieste ok in {durata:.1f}s ({risultato['rifiutate_503']} rifiutate 503, "
+          f"{risultato['errori']} errori)")
+    print(f"throughput: {risultato['richieste_al_secondo']:,.1f} richieste/s, "
+          f"{risultato['dipendenti_al_secondo']:,.0f} dipendenti/s")
+    print(f"latenza ms: p50 {lat['p50']:.1f}  p95 {lat['p95']:.1f}  p99 {lat['p99']:.1f}  max {lat['max']:.1f}")
+    print(f"servizio: {risultato['servizio']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(risultato, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Test di carico dell'interfaccia Streamlit: N sessioni simulate in parallelo nello stesso processo.
+
+Ogni sessione è un AppTest headless di app.py servito da un thread, come fa il server Streamlit
+con le sessioni dei suoi utenti: dopo il primo caricamento esegue interazioni in sequenza sulla
+sidebar (età, RAL, regione, anni di contributi, flag) e sui cambi di scheda, scelte a caso con
+un seme per sessione. Per ogni livello di concorrenza si riportano le latenze p50/p95/p99/max
+delle rerun (misurate attorno a AppTest.run, quindi comprese l'esecuzione dello script e la
+lettura dell'albero degli elementi), il throughput, la memoria per sessione (crescita della RSS
+del processo divisa per le sessioni, e dimensione dello stato di sessione) e i contatori della
+cache degli scenari, che è condivisa tra le sessioni.
+
+Un livello di riscaldamento iniziale importa i moduli e popola le risorse condivise, così la
+memoria per sessione non include l'avvio del processo.
+
+Esempi:
+    python benchmarks/carico_sessioni.py
+    python benchmarks/carico_sessioni.py --sessioni 1 4 16 32 --interazioni 30 --pausa 0.2
+    python benchmarks/carico_sessioni.py --sessioni 8 --output carico_sessioni.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from streamlit import config
+from streamlit.logger import set_log_level
+
+from bench import RADICE
+from pensionbridge.risorse import REGIONI
+from pensionbridge.scenario import statistiche_cache_scenari
+
+APP = str(RADICE / "app.py")
+
+def _imposta(at, tipo, chiave_widget, valore):
+    getattr(at.sidebar, tipo)(key=chiave_widget).set_value(valore)
+
+# Interazione -> funzione(at, rng, schede) che modifica un widget prima della rerun.
+# Le chiavi dei widget della sidebar hanno il suffisso della versione (0 senza ricariche).
+INTERAZIONI = {
+    'eta': lambda at, rng, schede: _imposta(at, 'number_input', 'eta_0', int(rng.integers(55, 68))),
+    'ral': lambda at, rng, schede: _imposta(at, 'number_input', 'ral_0', int(rng.integers(20, 200)) * 1000),
+    'regione': lambda at, rng, schede: _imposta(at, 'selectbox', 'regione_0', str(rng.choice(REGIONI))),
+    'anni_contributi': lambda at, rng, schede: _imposta(at, 'number_input', 'anni_contributi_0',
+                                                        int(rng.integers(30, 43))),
+    'disoccupato': lambda at, rng, schede: _imposta(at, 'checkbox', 'is_disoccupato_0',
+                                                    not at.sidebar.checkbox(key='is_disoccupato_0').value),
+    'caregiver': lambda at, rng, schede: _imposta(at, 'checkbox', 'is_caregiver_0',
+                                                  not at.sidebar.checkbox(key='is_caregiver_0').value),
+    'scheda': lambda at, rng, schede: at.session_state.__setitem__('scheda', str(rng.choice(schede))),
+}
+
+@contextmanager
+def runtime_condiviso():
+    """
+    Runtime unico per tutte le sessioni, come in un processo Streamlit reale.
+
+    AppTest è pensato per una sessione alla volta: a ogni run installa un proprio Runtime
+    fittizio come istanza globale e la azzera alla fine, quindi run concorrenti in thread
+    diversi si toglierebbero il Runtime a vicenda. Qui Runtime.instance() ritorna sempre lo
+    stesso Runtime fittizio (costruito come quello di AppTest) e l'opzione global.appTest resta
+    attiva per tutta la durata, così le uscite dei run annidati non la ripristinano. Anche la
+    cache del bytecode dello script è unica, come nel server: AppTest ne crea una per run e
+    ricompilerebbe app.py a ogni rerun (e la compilazione concorrente di ast non è sicura
+    tra thread in CPython 3.11).
+
+    Usa interni privati di Streamlit: requirements.txt fissa l'intervallo di versioni provato.
+    """
+    from unittest.mock import MagicMock, patch
+
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import patch_config_options
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    registro_componenti = BidiComponentManager()
+    registro_componenti.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = registro_componenti
+    cache_script = ScriptCache()
+
+    with patch_config_options({"global.appTest": True}), \
+            patch.object(Runtime, 'instance', classmethod(lambda cls: runtime)), \
+            patch.object(Runtime, 'exists', classmethod(lambda cls: True)), \
+            patch("streamlit.testing.v1.app_test.ScriptCache", lambda: cache_script), \
+            patch("streamlit.testing.v1.local_script_runner.ScriptCache", lambda: cache_script):
+        yield runtime
+
+def _rss_mb():
+    """RSS del processo in MB (Linux), None dove /proc non è disponibile."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return None
+
+def _dimensione(oggetto, visti=None):
+    """Dimensione profonda approssimata in byte: contenitori, array NumPy e DataFrame per contenuto."""
+    visti = set() if visti is None else visti
+    if id(oggetto) in visti:
+        return 0
+    visti.add(id(oggetto))
+    if isinstance(oggetto, np.ndarray):
+        return oggetto.nbytes + sys.getsizeof(oggetto) if oggetto.base is None else sys.getsizeof(oggetto)
+    if hasattr(oggetto, 'memory_usage') and hasattr(oggetto, 'columns'):
+        return int(oggetto.memory_usage(deep=True).sum())
+    dimensione = sys.getsizeof(oggetto)
+    if isinstance(oggetto, dict):
+        dimensione += sum(_dimensione(k, visti) + _dimensione(v, visti) for k, v in oggetto.items())
+    elif isinstance(oggetto, (list, tuple, set, frozenset)):
+        dimensione += sum(_dimensione(v, visti) for v in oggetto)
+    return dimensione
+
+def _sessione(seme, interazioni, pausa, barriera, risultati, lock):
+    """Una sessione: primo caricamento, poi `interazioni` rerun. Aggiunge le misure a `risultati`."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seme)
+    at = AppTest.from_file(APP, default_timeout=300)
+    barriera.wait()
+    inizio = time.perf_counter()
+    at.run()
+    primo = time.perf_counter() - inizio
+    schede = [scheda.label for scheda in at.tabs]
+    nomi = list(INTERAZIONI)
+
+    latenze, errori = [], int(bool(at.exception))
+    for _ in range(interazioni):
+        if pausa:
+            time.sleep(rng.exponential(pausa))
+        INTERAZIONI[nomi[rng.integers(len(nomi))]](at, rng, schede)
+        inizio = time.perf_counter()
+        at.run()
+        latenze.append(time.perf_counter() - inizio)
+        errori += bool(at.exception)
+
+    with lock:
+        risultati['primo'].append(primo)
+        risultati['latenze'].extend(latenze)
+        risultati['errori'] += errori
+        risultati['stato'].append(_dimensione(at.session_state.to_dict()))
+        risultati['sessioni'].append(at)
+
+def esegui_livello(n_sessioni, interazioni, pausa, seme):
+    """`n_sessioni` sessioni concorrenti. Ritorna le misure grezze e la RSS prima/dopo."""
+    gc.collect()
+    rss_prima = _rss_mb()
+    risultati = {'primo': [], 'latenze': [], 'errori': 0, 'stato': [], 'sessioni': []}
+    lock = threading.Lock()
+    barriera = threading.Barrier(n_sessioni)
+    thread = [threading.Thread(target=_sessione, args=(seme + i, interazioni, pausa, barriera, risultati, lock))
+              for i in range(n_sessioni)]
+    inizio = time.perf_counter()
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    durata = time.perf_counter() - inizio
+    gc.collect()
+    # Le sessioni sono ancora vive: la crescita della RSS è la loro memoria
+    rss_dopo = _rss_mb()
+    risultati.pop('sessioni')
+    return risultati, durata, rss_prima, rss_dopo
+
+def riepilogo(n_sessioni, risultati, durata, rss_prima, rss_dopo):
+    latenze = np.array(risultati['latenze'] or [0.0]) * 1000
+    primo = np.array(risultati['primo']) * 1000
+    crescita = None if rss_prima is None else rss_dopo - rss_prima
+    return {
+        'sessioni': n_sessioni,
+        'rerun': len(risultati['latenze']),
+        'errori': risultati['errori'],
+        'rerun_al_secondo': len(risultati['latenze']) / durata,
+        'latenza_ms': {
+            'p50': float(np.percentile(latenze, 50)),
+            'p95': float(np.percentile(latenze, 95)),
+            'p99': float(np.percentile(latenze, 99)),
+            'max': float(latenze.max()),
+        },
+        'primo_caricamento_ms': {'p50': float(np.percentile(primo, 50)), 'max': float(primo.max())},
+        'memoria': {
+            'rss_mb': rss_dopo,
+            'crescita_rss_mb': crescita,
+            'mb_per_sessione': None if crescita is None else crescita / n_sessioni,
+            'stato_sessione_kb': float(np.mean(risultati['stato'])) / 1024,
+        },
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test di carico delle sessioni Streamlit di PensionBridge")
+    parser.add_argument("--sessioni", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Livelli di concorrenza (sessioni simultanee)")
+    parser.add_argument("--interazioni", type=int, default=20, help="Rerun per sessione dopo il primo caricamento")
+    parser.add_argument("--pausa", type=float, default=0.0,
+                        help="Pausa media (s, esponenziale) tra le interazioni di una sessione")
+    parser.add_argument("--seme", type=int, default=0)
+    parser.add_argument("--archivio", default=None,
+                        help="Database dell'archivio scenari (default: un file temporaneo)")
+    parser.add_argument("--output", default=None, help="Salva il riepilogo in JSON")
+    args = parser.parse_args(argv)
+
+    # Avvisi di deprecazione e di contesto ripetuti a ogni rerun di ogni sessione
+    config.set_option("logger.level", "error")
+    set_log_level("error")
+    with tempfile.TemporaryDirectory() as cartella:
+        os.environ['PENSIONBRIDGE_ARCHIVIO'] = args.archivio or os.path.join(cartella, "archivio.db")
+        livelli = []
+        with runtime_condiviso():
+            esegui_livello(1, len(INTERAZIONI), 0.0, seme=args.seme + 10 ** 6)  # riscaldamento
+            for n in args.sessioni:
+                risultato = riepilogo(n, *esegui_livello(n, args.interazioni, args.pausa, args.seme))
+                risultato['cache_scenari'] = statistiche_cache_scenari()
+                livelli.append(risultato)
+                lat, mem = risultato['latenza_ms'], risultato['memoria']
+                per_sessione = "n/d" if mem['mb_per_sessione'] is None else f"{mem['mb_per_sessione']:.1f} MB"
+                print(f"{n:>3} sessioni: {risultato['rerun']} rerun ({risultato['errori']} errori), "
+                      f"{risultato['rerun_al_secondo']:.1f} rerun/s | latenza ms p50 {lat['p50']:.0f} "
+                      f"p95 {lat['p95']:.0f} p99 {lat['p99']:.0f} max {lat['max']:.0f} | "
+                      f"memoria {per_sessione}/sessione, stato {mem['stato_sessione_kb']:.0f} KB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'interazioni': args.interazioni, 'pausa': args.pausa, 'cpu': os.cpu_count(),
+                       'livelli': livelli}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+PensionBridge: motore di calcolo per l'analisi e la negoziazione dell'uscita anticipata.
+L'interfaccia Streamlit (app.py) e il batch notturno (python -m pensionbridge) usano lo stesso nucleo.
+
+Il nucleo scalare (calcoli, fisco, scenario, grafo, calendario, regole, risorse, cache,
+diagnostica) dipende solo da NumPy ed è importato subito. I moduli che richiedono pandas o pyarrow (batch, Monte
+Carlo, timeline, ottimizzatore, tabelle, archivio, formati colonnari, break-even, sensibilità,
+portafoglio, calcolo contributivo, dossier, grafici, servizio HTTP) sono importati al primo
+accesso a un loro nome: un avvio a freddo che mostra solo lo scenario singolo non paga il loro
+import.
+"""
+import importlib
+
+from .calcoli import (
+    COSTO_VITA_REGIONALE,
+    TIPI_CONTRIBUZIONE,
+    TASSO_SOSTITUZIONE,
+    TASSO_SOSTITUZIONE_DEFAULT,
+    calcola_data_pensione,
+    today_plus_months,
+    stima_pensione_netta,
+    calcola_naspi,
+    calcola_ape_sociale,
+    calcola_rita,
+    calcola_incentivo_esodo_regionale,
+)
+from .cache import CacheLRU, memoizza
+from .fisco import (
+    netto_annuo,
+    stipendio_netto_mensile,
+    pensione_netta_mensile,
+    aliquota_tassazione_separata,
+    incentivo_netto,
+)
+from .diagnostica import Misura, fase, misura, profila, registra_json
+from .grafo import GrafoCalcolo, ordine_topologico, valuta_nodi
+from .scenario import (
+    calcola_scenario,
+    calcola_scenario_memo,
+    grafo_scenario,
+    normalizza_input_scenario,
+    statistiche_cache_scenari,
+)
+from .calendario import (
+    data_riferimento,
+    aggiungi_mesi,
+    mesi_tra,
+    anni_frazionari_tra,
+    mesi_alla_pensione,
+)
+from .regole import (
+    PARAMETRI_REGOLE,
+    carica_regole,
+    regole_pensionistiche,
+    parametri_anno,
+)
+from .risorse import (
+    REGIONI,
+    INDICE_REGIONE,
+    FATTORI_COSTO_VITA,
+    layout_grafici,
+)
+
+# Nome pubblico -> modulo, importato al primo accesso (PEP 562)
+_DIFFERITI = {
+    'COLONNE_BATCH_DEFAULT': 'batch',
+    'COLONNE_BATCH_OBBLIGATORIE': 'batch',
+    'calcola_data_pensione_batch': 'batch',
+    'stima_pensione_netta_batch': 'batch',
+    'calcola_naspi_batch': 'batch',
+    'calcola_ape_sociale_batch': 'batch',
+    'calcola_rita_batch': 'batch',
+    'calcola_incentivo_esodo_regionale_batch': 'batch',
+    'calcola_scenari_batch': 'batch',
+    'PARAMETRI_MONTECARLO_DEFAULT': 'montecarlo',
+    'simula_montecarlo': 'montecarlo',
+    'FONTI_TIMELINE': 'timeline',
+    'costruisci_timeline_batch': 'timeline',
+    'analizza_timeline': 'timeline',
+    'timeline_da_scenario': 'timeline',
+    'riepiloga_timeline_batch': 'timeline',
+    'OBIETTIVI': 'ottimizzatore',
+    'frontiera_pareto': 'ottimizzatore',
+    'ottimizza_incentivo': 'ottimizzatore',
+    'ottimizza_incentivo_batch': 'ottimizzatore',
+    'costruisci_tabella_incentivi': 'tabella_regionale',
+    'tabella_incentivi': 'tabella_regionale',
+    'cerca_incentivo': 'tabella_regionale',
+    'confronto_regioni': 'tabella_regionale',
+    'matrice_heatmap': 'tabella_regionale',
+    'ArchivioScenari': 'archivio',
+    'archivio_scenari': 'archivio',
+    'formato_colonnare': 'colonnare',
+    'leggi_blocchi': 'colonnare',
+    'scrivi_colonnare': 'colonnare',
+    'elabora_colonnare': 'colonnare',
+    'tavola_mortalita': 'breakeven',
+    'calcola_breakeven': 'breakeven',
+    'calcola_breakeven_batch': 'breakeven',
+    'varianti_scenario': 'sensibilita',
+    'analisi_sensibilita': 'sensibilita',
+    'seleziona_portafoglio': 'portafoglio',
+    'coefficienti_trasformazione': 'contributivo',
+    'storia_retributiva': 'contributivo',
+    'montante_contributivo': 'contributivo',
+    'calcola_pensione_contributiva': 'contributivo',
+    'calcola_pensione_contributiva_batch': 'contributivo',
+    'esporta_dossier': 'dossier',
+    'sfoltisci': 'grafici',
+    'figura_dispersione': 'grafici',
+    'bande_timeline': 'grafici',
+    'figura_bande_timeline': 'grafici',
+    'crea_app': 'servizio',
+    'Coalescitore': 'servizio',
+}
+
+def __getattr__(nome):
+    if nome not in _DIFFERITI:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valore = getattr(importlib.import_module(f".{_DIFFERITI[nome]}", __name__), nome)
+    globals()[nome] = valore
+    return valore
+
+def __dir__():
+    return sorted(set(globals()) | set(_DIFFERITI))
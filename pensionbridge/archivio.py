@@ -0,0 +1,198 @@
+"""
+Archivio persistente degli scenari valutati (SQLite, libreria standard).
+
+Ogni scenario è salvato con gli input e tutti i risultati di calcola_scenario
+(date, strumenti di sostegno, risultato_incentivo) serializzati in JSON, così da
+poterlo ricaricare identico senza ricalcolo. Le grandezze usate per elencare e
+confrontare (dipendente, regione, data di riferimento, incentivo, risparmio, ...)
+sono anche colonne indicizzate: liste e confronti leggono solo le righe richieste
+tramite indice, senza scansioni della tabella né decodifica del JSON. pandas serve solo
+per elenchi e confronti ed è importato lì: salvare e ricaricare non lo richiedono.
+
+Lo stesso caso (dipendente, input, data di riferimento) occupa una sola riga: rivalutarlo
+aggiorna solo l'istante di salvataggio.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+from .scenario import normalizza_input_scenario
+
+PERCORSO_ARCHIVIO = Path(os.environ.get("PENSIONBRIDGE_ARCHIVIO", "scenari.sqlite"))
+
+# Risultati copiati anche in colonne dedicate, per elenchi e confronti senza decodificare il JSON
+COLONNE_RIEPILOGO = (
+    'data_target', 'mesi_mancanti', 'pensione_stimata', 'naspi_mensile', 'ape_importo', 'rita_mensile',
+    'incentivo_proposto', 'costo_totale_mantenimento', 'risparmio_aziendale'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenari (
+    id INTEGER PRIMARY KEY,
+    chiave TEXT NOT NULL UNIQUE,
+    dipendente TEXT NOT NULL,
+    regione TEXT NOT NULL,
+    data_riferimento TEXT NOT NULL,
+    salvato TEXT NOT NULL,
+    eta REAL,
+    ral REAL,
+    data_target TEXT,
+    mesi_mancanti INTEGER,
+    pensione_stimata REAL,
+    naspi_mensile REAL,
+    ape_importo REAL,
+    rita_mensile REAL,
+    incentivo_proposto REAL,
+    costo_totale_mantenimento REAL,
+    risparmio_aziendale REAL,
+    input TEXT NOT NULL,
+    risultati TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenari_dipendente ON scenari (dipendente, salvato);
+CREATE INDEX IF NOT EXISTS scenari_regione ON scenari (regione, salvato);
+CREATE INDEX IF NOT EXISTS scenari_data ON scenari (data_riferimento);
+CREATE INDEX IF NOT EXISTS scenari_salvato ON scenari (salvato);
+"""
+
+_COLONNE_ELENCO = ['id', 'dipendente', 'regione', 'data_riferimento', 'salvato', 'eta', 'ral',
+                   *COLONNE_RIEPILOGO]
+
+def _codifica(valore):
+    """Tipi non JSON nativi: date marcate per il ripristino, scalari numpy convertiti."""
+    if isinstance(valore, date):
+        return {'__data__': valore.isoformat()}
+    if isinstance(valore, np.generic):
+        return valore.item()
+    raise TypeError(f"Valore non serializzabile: {type(valore).__name__}")
+
+def _decodifica(oggetto):
+    return date.fromisoformat(oggetto['__data__']) if set(oggetto) == {'__data__'} else oggetto
+
+def _valore_colonna(valore):
+    """Valore di una colonna di riepilogo nel tipo SQLite corrispondente (date in ISO)."""
+    if isinstance(valore, date):
+        return valore.isoformat()
+    return valore.item() if isinstance(valore, np.generic) else valore
+
+def _json(valore):
+    return json.dumps(valore, default=_codifica, ensure_ascii=False)
+
+class ArchivioScenari:
+    """
+    Archivio SQLite degli scenari, condivisibile tra thread (e quindi tra sessioni Streamlit):
+    una connessione per istanza, accessi serializzati da un lock.
+    """
+
+    def __init__(self, percorso=PERCORSO_ARCHIVIO):
+        self.percorso = str(percorso)
+        self._lock = threading.Lock()
+        self._connessione = sqlite3.connect(self.percorso, check_same_thread=False)
+        if self.percorso != ':memory:':
+            self._connessione.execute("PRAGMA journal_mode=WAL")
+        self._connessione.executescript(_SCHEMA)
+
+    def salva(self, input_scenario, scenario, dipendente=""):
+        """
+        Salva (o aggiorna) uno scenario. `input_scenario` sono gli argomenti di calcola_scenario
+        (senza `oggi`, presa dallo scenario), `scenario` il dict che ha restituito. Ritorna l'id.
+        """
+        input_scenario = {k: v for k, v in input_scenario.items() if k != 'oggi'}
+        oggi = scenario['oggi']
+        chiave = hashlib.sha1(
+            _json([dipendente, oggi, normalizza_input_scenario(**input_scenario)]).encode()
+        ).hexdigest()
+        riga = [chiave, dipendente, input_scenario['regione'], oggi.isoformat(),
+                datetime.now().isoformat(timespec='seconds'),
+                float(input_scenario['eta']), float(input_scenario['ral']),
+                *[_valore_colonna(scenario[c]) for c in COLONNE_RIEPILOGO],
+                _json(input_scenario), _json(scenario)]
+        with self._lock, self._connessione:
+            cursore = self._connessione.execute(
+                f"INSERT INTO scenari (chiave, dipendente, regione, data_riferimento, salvato, eta, ral, "
+                f"{', '.join(COLONNE_RIEPILOGO)}, input, risultati) "
+                f"VALUES ({', '.join('?' * len(riga))}) "
+                "ON CONFLICT (chiave) DO UPDATE SET salvato = excluded.salvato RETURNING id",
+                riga
+            )
+            return cursore.fetchone()[0]
+
+    def carica(self, id_scenario):
+        """Ritorna (input_scenario, scenario) così come salvati, con le date ripristinate."""
+        with self._lock:
+            riga = self._connessione.execute(
+                "SELECT input, risultati FROM scenari WHERE id = ?", (int(id_scenario),)
+            ).fetchone()
+        if riga is None:
+            raise KeyError(f"Scenario {id_scenario} non presente in archivio")
+        return tuple(json.loads(testo, object_hook=_decodifica) for testo in riga)
+
+    def elenca(self, dipendente=None, regione=None, dal=None, al=None, limite=500):
+        """
+        Riepilogo degli scenari più recenti, filtrati per dipendente, regione e intervallo
+        della data di riferimento (estremi inclusi). Ritorna un DataFrame indicizzato per id.
+        """
+        import pandas as pd
+
+        condizioni, parametri = [], []
+        for colonna, operatore, valore in (('dipendente', '=', dipendente), ('regione', '=', regione),
+                                           ('data_riferimento', '>=', dal), ('data_riferimento', '<=', al)):
+            if valore is not None:
+                condizioni.append(f"{colonna} {operatore} ?")
+                parametri.append(valore.isoformat() if isinstance(valore, date) else valore)
+        dove = f"WHERE {' AND '.join(condizioni)}" if condizioni else ""
+        with self._lock:
+            righe = self._connessione.execute(
+                f"SELECT {', '.join(_COLONNE_ELENCO)} FROM scenari {dove} ORDER BY salvato DESC LIMIT ?",
+                (*parametri, int(limite))
+            ).fetchall()
+        return pd.DataFrame(righe, columns=_COLONNE_ELENCO).set_index('id')
+
+    def confronta(self, id_scenari):
+        """Riepilogo degli scenari indicati, letti per chiave primaria, nell'ordine richiesto."""
+        import pandas as pd
+
+        id_scenari = [int(i) for i in id_scenari]
+        with self._lock:
+            righe = self._connessione.execute(
+                f"SELECT {', '.join(_COLONNE_ELENCO)} FROM scenari "
+                f"WHERE id IN ({', '.join('?' * len(id_scenari))})",
+                id_scenari
+            ).fetchall()
+        elenco = pd.DataFrame(righe, columns=_COLONNE_ELENCO).set_index('id')
+        return elenco.reindex([i for i in id_scenari if i in elenco.index])
+
+    def dipendenti(self):
+        """Dipendenti presenti in archivio (letti dall'indice)."""
+        with self._lock:
+            return [r[0] for r in self._connessione.execute(
+                "SELECT DISTINCT dipendente FROM scenari ORDER BY dipendente"
+            )]
+
+    def elimina(self, id_scenario):
+        with self._lock, self._connessione:
+            self._connessione.execute("DELETE FROM scenari WHERE id = ?", (int(id_scenario),))
+
+    def __len__(self):
+        with self._lock:
+            return self._connessione.execute("SELECT COUNT(*) FROM scenari").fetchone()[0]
+
+    def chiudi(self):
+        with self._lock:
+            self._connessione.close()
+
+_archivio = None
+_lock_archivio = threading.Lock()
+
+def archivio_scenari():
+    """Archivio predefinito (PERCORSO_ARCHIVIO), aperto al primo utilizzo e condiviso nel processo."""
+    global _archivio
+    with _lock_archivio:
+        if _archivio is None:
+            _archivio = ArchivioScenari()
+        return _archivio
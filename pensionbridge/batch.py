@@ -0,0 +1,347 @@
+"""
+Motore batch vettoriale: versioni NumPy delle funzioni calcola_* su intere colonne
+di dipendenti. I risultati coincidono con quelli delle funzioni scalari riga per riga.
+"""
+import numpy as np
+import pandas as pd
+
+from .calendario import aggiungi_mesi, anni_e_mesi_tra, data_riferimento
+from .calcoli import COSTO_VITA_REGIONALE, TASSO_SOSTITUZIONE, TASSO_SOSTITUZIONE_DEFAULT
+from .fisco import (
+    INDICE_REGIONE_DEFAULT,
+    INDICE_REGIONE_FISCALE,
+    incentivo_netto,
+    pensione_netta_mensile,
+    stipendio_netto_mensile,
+)
+from .regole import indice_anno, parametri_batch
+
+# Colonne opzionali della forza lavoro e relativi default (come nella sidebar)
+COLONNE_BATCH_DEFAULT = {
+    'tipo_contribuzione': "Dipendente Privato",
+    'is_lavoratore_precoce': False,
+    'is_lavoratore_usurante': False,
+    'montante_complementare': 0,
+    'mesi_contributi_ultimi_4_anni': 48,
+    'is_disoccupato': False,
+    'is_caregiver': False,
+    'is_invalido': False
+}
+COLONNE_BATCH_OBBLIGATORIE = ['eta', 'anni_contributi', 'sesso', 'ral', 'regione']
+
+# Colonne scritte per dipendente (in quest'ordine)
+COLONNE_OUTPUT = [
+    'data_target',
+    'mesi_mancanti',
+    'pensione_stimata',
+    'naspi_mensile',
+    'durata_naspi',
+    'ape_importo',
+    'ape_ammissibile',
+    'rita_mensile',
+    'rita_disponibile',
+    'incentivo_totale',
+    'costo_totale_mantenimento',
+    'risparmio_aziendale'
+]
+
+def _mappa_categorie(valori, tabella, default):
+    """
+    Converte una colonna di etichette nei valori della tabella (una lookup per etichetta unica).
+    Le colonne categoriche (pd.Categorical) usano direttamente i loro codici, senza toccare le stringhe.
+    """
+    if isinstance(valori, pd.Categorical):
+        codici, uniche = valori.codes, valori.categories
+    else:
+        valori = np.asarray(valori)
+        codici, uniche = pd.factorize(valori.ravel())
+        codici = codici.reshape(valori.shape)
+    # Un valore in più in coda per i mancanti (codice -1)
+    lookup = np.array([tabella.get(v, default) for v in uniche.tolist()] + [default], dtype=float)
+    return lookup[codici]
+
+def _colonna(valori):
+    """Colonna di input come array NumPy; le categoriche restano pd.Categorical (codici + etichette)."""
+    if isinstance(getattr(valori, 'dtype', None), pd.CategoricalDtype):
+        return pd.Categorical(valori)
+    return np.asarray(valori)
+
+def _anno(date_array):
+    """Anno di calendario di un array datetime64."""
+    return np.asarray(date_array, dtype='datetime64[Y]').astype(np.int64) + 1970
+
+def _indici_regole(anno, oggi=None):
+    """Indici di riga delle regole: per l'anno indicato o, se assente, per l'anno di `oggi`."""
+    return indice_anno(_anno(data_riferimento(oggi)) if anno is None else anno)
+
+def calcola_data_pensione_batch(eta_attuale, anni_contributi, sesso, is_lavoratore_precoce=False,
+                                is_lavoratore_usurante=False, tipo_contribuzione="Dipendente Privato",
+                                oggi=None):
+    """
+    Versione vettoriale di calcola_data_pensione.
+    `oggi` è la data di riferimento: scalare, oppure un array con una data per dipendente.
+    Ogni dipendente è valutato con le regole dell'anno in cui matura la pensione.
+    Ritorna tre array datetime64[D]: data target, data vecchiaia, data anticipata.
+    """
+    argomenti = np.broadcast_arrays(
+        np.asarray(eta_attuale), np.asarray(anni_contributi), np.asarray(sesso),
+        np.asarray(is_lavoratore_precoce, dtype=bool), np.asarray(is_lavoratore_usurante, dtype=bool),
+        data_riferimento(oggi)
+    )
+    indici_oggi = indice_anno(_anno(argomenti[-1]))
+    date_pensione = _calcola_data_pensione_batch_regole(*argomenti, indici_oggi)
+
+    # Chi matura la pensione in un anno con regole diverse viene ricalcolato con quelle
+    indici_uscita = indice_anno(_anno(date_pensione[0]))
+    cambia = indici_uscita != indici_oggi
+    if cambia.any():
+        ricalcolo = _calcola_data_pensione_batch_regole(*argomenti, indici_uscita)
+        date_pensione = tuple(np.where(cambia, nuova, vecchia) for nuova, vecchia in zip(ricalcolo, date_pensione))
+    return date_pensione
+
+def _calcola_data_pensione_batch_regole(eta_attuale, anni_contributi, sesso, is_lavoratore_precoce,
+                                        is_lavoratore_usurante, oggi, indici_regole):
+    (eta_vecchiaia, anni_uomini, anni_donne, mesi_extra_anticipata, anni_precoci, mesi_extra_precoci,
+     quota_usuranti, eta_minima_usuranti) = parametri_batch(
+        indici_regole, 'eta_vecchiaia', 'anni_anticipata_uomini', 'anni_anticipata_donne',
+        'mesi_extra_anticipata', 'anni_anticipata_precoci', 'mesi_extra_precoci',
+        'quota_usuranti', 'eta_minima_usuranti'
+    )
+
+    # Regola Vecchiaia: 67 anni (int() tronca verso lo zero)
+    anni_mancanti_vecchiaia = np.trunc(eta_vecchiaia - eta_attuale).astype(np.int64)
+    data_vecchiaia = aggiungi_mesi(oggi, anni_mancanti_vecchiaia * 12)
+
+    # Regola Anticipata (42y 10m Uomini, 41y 10m Donne), precoci 41y 0m
+    soglia_anni = np.where(is_lavoratore_precoce, anni_precoci, np.where(sesso == 'Uomo', anni_uomini, anni_donne))
+    mesi_extra = np.where(is_lavoratore_precoce, mesi_extra_precoci, mesi_extra_anticipata)
+
+    mesi_totali_mancanti = np.maximum((soglia_anni - anni_contributi) * 12 + mesi_extra, 0)
+    data_anticipata = aggiungi_mesi(oggi, np.trunc(mesi_totali_mancanti).astype(np.int64))
+    data_target = np.minimum(data_vecchiaia, data_anticipata)
+
+    # Lavoratori Usuranti: Quota 97.6 con almeno 61 anni e 7 mesi di età.
+    # Chi ha già i requisiti ha anni_per_quota = 0, quindi data_usuranti = oggi:
+    # i due rami della versione scalare si riducono a un'unica maschera.
+    anni_per_quota = np.maximum(0, quota_usuranti - (eta_attuale + anni_contributi))
+    data_usuranti = aggiungi_mesi(oggi, np.trunc(anni_per_quota * 12).astype(np.int64))
+    usa_quota = is_lavoratore_usurante & (eta_attuale + anni_per_quota >= eta_minima_usuranti)
+
+    data_target = np.where(usa_quota, data_usuranti, data_target)
+    data_anticipata = np.where(usa_quota, data_usuranti, data_anticipata)
+    return data_target, data_vecchiaia, data_anticipata
+
+def _indice_regione_fiscale(regione):
+    """
+    Indici delle tabelle di pensionbridge.fisco, con una lookup per etichetta unica.
+    None usa la media nazionale; un array di interi è già un array di indici.
+    """
+    if regione is None:
+        return INDICE_REGIONE_DEFAULT
+    if isinstance(regione, np.ndarray) and np.issubdtype(regione.dtype, np.integer):
+        return regione
+    return _mappa_categorie(regione, INDICE_REGIONE_FISCALE, INDICE_REGIONE_DEFAULT).astype(np.int64)
+
+def stima_pensione_netta_batch(ral, anni_contributi, tipo_contribuzione="Dipendente Privato", regione=None):
+    """Versione vettoriale di stima_pensione_netta."""
+    ral = np.asarray(ral)
+    fattore_anni = np.minimum(np.asarray(anni_contributi) / 40.0, 1.1)
+    tasso_sostituzione_base = _mappa_categorie(tipo_contribuzione, TASSO_SOSTITUZIONE, TASSO_SOSTITUZIONE_DEFAULT)
+    return pensione_netta_mensile(ral * tasso_sostituzione_base * fattore_anni, _indice_regione_fiscale(regione))
+
+def calcola_naspi_batch(ral, mesi_contributi_ultimi_4_anni, anno=None):
+    """
+    Versione vettoriale di calcola_naspi. Ritorna (naspi_mensile, durata_mesi).
+    `anno` (scalare o array) sceglie le regole; default: anno corrente.
+    """
+    soglia_naspi, quota_sotto, quota_sopra, durata_massima = parametri_batch(
+        _indici_regole(anno), 'soglia_naspi', 'quota_naspi_sotto_soglia',
+        'quota_naspi_sopra_soglia', 'durata_massima_naspi'
+    )
+    retribuzione_mensile = np.asarray(ral) / 13
+
+    naspi_mensile = np.where(
+        retribuzione_mensile <= soglia_naspi,
+        retribuzione_mensile * quota_sotto,
+        soglia_naspi * quota_sotto + (retribuzione_mensile - soglia_naspi) * quota_sopra
+    )
+    durata_mesi = np.minimum(np.asarray(mesi_contributi_ultimi_4_anni) / 2, durata_massima)
+    return naspi_mensile, durata_mesi
+
+def calcola_ape_sociale_batch(eta, anni_contributi, ral, is_disoccupato=False,
+                              is_caregiver=False, is_invalido=False, is_lavoratore_usurante=False,
+                              anno=None):
+    """Versione vettoriale di calcola_ape_sociale. Ritorna (importo, ammissibile, messaggio)."""
+    eta_minima, anni_richiesti, anni_richiesti_usuranti, massimale = parametri_batch(
+        _indici_regole(anno), 'eta_minima_ape', 'anni_contributi_ape', 'anni_contributi_ape_usuranti',
+        'massimale_ape'
+    )
+    eta = np.asarray(eta)
+    anni_contributi = np.asarray(anni_contributi)
+    is_lavoratore_usurante = np.asarray(is_lavoratore_usurante, dtype=bool)
+
+    manca_eta = eta < eta_minima
+    anni_contributi_richiesti = np.where(is_lavoratore_usurante, anni_richiesti_usuranti, anni_richiesti)
+    mancano_contributi = ~manca_eta & (anni_contributi < anni_contributi_richiesti)
+    ha_diritto = (np.asarray(is_disoccupato, dtype=bool) | np.asarray(is_caregiver, dtype=bool) |
+                  np.asarray(is_invalido, dtype=bool) | is_lavoratore_usurante)
+    ammissibile = ~manca_eta & ~mancano_contributi & ha_diritto
+
+    messaggio = np.select(
+        [manca_eta, mancano_contributi, ~ha_diritto],
+        [_testo("Età minima ", eta_minima, " anni non raggiunta"),
+         _testo("Servono almeno ", anni_contributi_richiesti, " anni di contributi"),
+         "Non si rientra nelle categorie previste per l'APE Sociale"],
+        "APE Sociale concedibile"
+    )
+
+    # Come nella versione scalare, la pensione teorica usa la contribuzione di default
+    pensione_teorica = stima_pensione_netta_batch(ral, anni_contributi)
+    ape_importo = np.where(ammissibile, np.minimum(pensione_teorica, massimale), 0.0)
+    return ape_importo, ammissibile, messaggio
+
+def calcola_rita_batch(montante_complementare, eta, anni_a_pensione, anno=None):
+    """Versione vettoriale di calcola_rita. Ritorna (rita_netta, disponibile, messaggio)."""
+    (anni_massimi, aliquota, riduzione_annua, aliquota_minima, anni_esenti, anni_fondo) = parametri_batch(
+        _indici_regole(anno), 'anni_massimi_rita', 'aliquota_rita', 'riduzione_annua_rita',
+        'aliquota_minima_rita', 'anni_fondo_esenti_rita', 'anni_fondo_rita'
+    )
+    montante_complementare = np.asarray(montante_complementare)
+    anni_a_pensione = np.asarray(anni_a_pensione)
+
+    troppo_lontano = anni_a_pensione > anni_massimi
+    senza_montante = ~troppo_lontano & (montante_complementare <= 0)
+    disponibile = ~troppo_lontano & ~senza_montante
+
+    anni_erogazione = np.maximum(anni_a_pensione, 1)
+    rita_mensile = montante_complementare / (anni_erogazione * 12)
+    # Ipotesi 20 anni nel fondo, come nella versione scalare
+    tassazione = np.maximum(aliquota_minima, aliquota - riduzione_annua * np.maximum(0, anni_fondo - anni_esenti))
+    rita_netta = np.where(disponibile, rita_mensile * (1 - tassazione), 0.0)
+
+    messaggio = np.select(
+        [troppo_lontano, senza_montante],
+        [_testo("Troppo lontano dalla pensione (max ", anni_massimi, " anni)"),
+         "Nessun montante previdenza complementare"],
+        "R.I.T.A. disponibile"
+    )
+    return rita_netta, disponibile, messaggio
+
+def _testo(prima, valori, dopo):
+    """Messaggi con un valore numerico per riga (i parametri possono variare per anno)."""
+    return np.char.add(np.char.add(prima, np.asarray(valori).astype(str)), dopo)
+
+def calcola_incentivo_esodo_regionale_batch(ral, mesi_mancanti, regione, naspi_mensile=0,
+                                            pensione_anticipata_effettiva=0):
+    """Versione vettoriale di calcola_incentivo_esodo_regionale: stesso dict, con array come valori."""
+    stipendio_netto = stipendio_netto_mensile(ral, _indice_regione_fiscale(regione))
+    mesi_mancanti = np.asarray(mesi_mancanti)
+
+    copertura_mensile = np.asarray(naspi_mensile) + np.asarray(pensione_anticipata_effettiva)
+    gap_mensile = stipendio_netto - copertura_mensile
+
+    fattore_regionale = _mappa_categorie(regione, COSTO_VITA_REGIONALE, 1.0)
+    gap_mensile_corretto = gap_mensile * fattore_regionale
+    incentivo_base = gap_mensile_corretto * mesi_mancanti
+
+    valore_tempo_mensile = 1000 * (1.5 - fattore_regionale)
+    valore_tempo_totale = valore_tempo_mensile * mesi_mancanti
+
+    return {
+        'incentivo_base': incentivo_base,
+        'valore_tempo': valore_tempo_totale,
+        'incentivo_totale': incentivo_base + valore_tempo_totale,
+        'gap_mensile': gap_mensile,
+        'fattore_regionale': fattore_regionale,
+        'stipendio_netto': stipendio_netto,
+        'copertura_mensile': copertura_mensile
+    }
+
+def calcola_scenari_batch(dati, oggi=None):
+    """
+    Esegue l'intera catena dei "CALCOLI CORE" su tutta la forza lavoro in un solo passaggio.
+
+    `dati` è un DataFrame (o un dict di colonne) con almeno eta, anni_contributi, sesso, ral, regione;
+    le colonne opzionali in COLONNE_BATCH_DEFAULT assumono i valori di default della sidebar.
+    Se presente, la colonna incentivo_proposto sostituisce il calcolo automatico.
+    `oggi` è la data di riferimento (scalare o una per dipendente; default: data odierna).
+    Ritorna un DataFrame con una riga per dipendente e una colonna per ogni risultato.
+    """
+    mancanti = [c for c in COLONNE_BATCH_OBBLIGATORIE if c not in dati]
+    if mancanti:
+        raise ValueError(f"Colonne obbligatorie mancanti: {', '.join(mancanti)}")
+
+    oggi = data_riferimento(oggi)
+    indice = dati.index if isinstance(dati, pd.DataFrame) else None
+    colonne = {c: _colonna(dati[c]) for c in COLONNE_BATCH_OBBLIGATORIE}
+    n = len(colonne['eta'])
+    for c, default in COLONNE_BATCH_DEFAULT.items():
+        colonne[c] = _colonna(dati[c]) if c in dati else np.full(n, default)
+
+    eta = colonne['eta']
+    anni_contributi = colonne['anni_contributi']
+    ral = colonne['ral']
+
+    data_target, data_vecchiaia, data_anticipata = calcola_data_pensione_batch(
+        eta, anni_contributi, colonne['sesso'], colonne['is_lavoratore_precoce'],
+        colonne['is_lavoratore_usurante'], colonne['tipo_contribuzione'], oggi
+    )
+    indice_regione = _indice_regione_fiscale(colonne['regione'])
+    pensione_stimata = stima_pensione_netta_batch(ral, anni_contributi, colonne['tipo_contribuzione'], indice_regione)
+    stipendio_netto = stipendio_netto_mensile(ral, indice_regione)
+
+    anno = _anno(oggi)
+    naspi_mensile, durata_naspi = calcola_naspi_batch(ral, colonne['mesi_contributi_ultimi_4_anni'], anno)
+
+    ape_importo, ape_ammissibile, ape_messaggio = calcola_ape_sociale_batch(
+        eta, anni_contributi, ral, colonne['is_disoccupato'], colonne['is_caregiver'],
+        colonne['is_invalido'], colonne['is_lavoratore_usurante'], anno
+    )
+
+    # Anni e mesi alla pensione calcolati da anno/mese come nella versione scalare
+    delta_anni, delta_mesi = anni_e_mesi_tra(oggi, data_target)
+    anni_a_pensione = delta_anni + delta_mesi / 12
+
+    rita_mensile, rita_disponibile, rita_messaggio = calcola_rita_batch(
+        colonne['montante_complementare'], eta, anni_a_pensione, anno
+    )
+
+    mesi_mancanti = np.maximum(delta_anni * 12 + delta_mesi, 1)
+
+    risultato_incentivo = calcola_incentivo_esodo_regionale_batch(
+        ral, mesi_mancanti, colonne['regione'], naspi_mensile, ape_importo
+    )
+
+    if 'incentivo_proposto' in dati:
+        incentivo_proposto = np.asarray(dati['incentivo_proposto'], dtype=float)
+    else:
+        incentivo_proposto = risultato_incentivo['incentivo_totale']
+    costo_totale_mantenimento = ral * 1.35 * (mesi_mancanti / 12)
+
+    return pd.DataFrame({
+        'data_target': data_target,
+        'data_vecchiaia': data_vecchiaia,
+        'data_anticipata': data_anticipata,
+        'pensione_stimata': pensione_stimata,
+        'stipendio_netto_mensile': stipendio_netto,
+        'naspi_mensile': naspi_mensile,
+        'durata_naspi': durata_naspi,
+        'ape_importo': ape_importo,
+        'ape_ammissibile': ape_ammissibile,
+        'ape_messaggio': ape_messaggio,
+        'anni_a_pensione': anni_a_pensione,
+        'rita_mensile': rita_mensile,
+        'rita_disponibile': rita_disponibile,
+        'rita_messaggio': rita_messaggio,
+        'mesi_mancanti': mesi_mancanti,
+        'incentivo_base': risultato_incentivo['incentivo_base'],
+        'valore_tempo': risultato_incentivo['valore_tempo'],
+        'incentivo_totale': risultato_incentivo['incentivo_totale'],
+        'gap_mensile': risultato_incentivo['gap_mensile'],
+        'fattore_regionale': risultato_incentivo['fattore_regionale'],
+        'copertura_mensile': risultato_incentivo['copertura_mensile'],
+        'incentivo_proposto': incentivo_proposto,
+        'incentivo_netto': incentivo_netto(incentivo_proposto, ral),
+        'costo_totale_mantenimento': costo_totale_mantenimento,
+        'risparmio_aziendale': costo_totale_mantenimento - incentivo_proposto
+    }, index=indice)
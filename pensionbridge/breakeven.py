@@ -0,0 +1,202 @@
+"""
+Valore attuale atteso di stipendio e pensione per ogni mese di uscita possibile.
+
+Al posto di "pensione × 12 × (85 - età)" ogni flusso mensile è pesato per la probabilità di
+essere in vita (tavola di mortalità per sesso ed età) e scontato al tasso indicato. Con
+w(t) = S(t)·v^(t+1), dove S è il prodotto cumulato delle sopravvivenze mensili, l'uscita al
+mese k vale:
+- stipendio: Σ_{t<k} w(t)·stipendio(t)   (somma cumulata di w·stipendio letta in k)
+- pensione:  pensione(k)·Σ_{t≥k} w(t)    (somma cumulata inversa di w letta in k)
+Le somme cumulate dipendono solo da età, sesso e tasso: sono calcolate una volta per ogni
+coppia età/sesso distinta e lette per tutti i dipendenti e tutti i mesi di uscita con un
+indexing, senza cicli sugli anni.
+
+I mesi di uscita vanno dalla data di pensione (mesi_mancanti) a `mesi_extra` mesi dopo; la
+pensione di chi lavora d mesi in più segue la proiezione della tab 5 (RAL +1% l'anno, d/12 anni
+di contributi in più). Stipendio e pensione sono flussi mensili sulla stessa base, il netto annuo
+diviso 12: la pensione mensile in 13 mensilità è riportata a 12 rate, e il netto di entrambi usa
+le addizionali della regione come lo scenario scalare.
+- mese_ottimale: l'uscita con il valore atteso della pensione più alto;
+- mese_pareggio: l'ultima uscita il cui valore atteso della pensione è ancora almeno pari a
+  quello dell'uscita alla prima data utile (oltre, la pensione più alta non ripaga i mesi persi);
+  la prima data utile stessa quando il suo valore atteso è nullo (età oltre la tavola).
+
+La tavola (dati/tavola_mortalita.csv: probabilità annua di morte per età e sesso) è
+un'approssimazione di Gompertz-Makeham delle tavole ISTAT recenti e va sostituita con quella
+ufficiale mantenendo le stesse colonne. Età fuori tavola usano la riga più vicina.
+"""
+import csv
+from pathlib import Path
+
+import numpy as np
+
+from .batch import _indice_regione_fiscale, _mappa_categorie, stima_pensione_netta_batch
+from .fisco import MENSILITA, netto_annuo
+from .scenario import ANNI_EXTRA_PROIEZIONE
+
+PERCORSO_TAVOLA_MORTALITA = Path(__file__).parent / "dati" / "tavola_mortalita.csv"
+
+# Sesso -> colonna della tavola; sessi non in tavola usano la prima colonna
+COLONNE_SESSO = {'Uomo': 'uomo', 'Donna': 'donna'}
+
+# Tasso di sconto reale annuo
+TASSO_SCONTO_DEFAULT = 0.02
+
+# Crescita annua della RAL, come nella proiezione "Strategia Temporale"
+CRESCITA_SALARIO = 0.01
+
+MESI_EXTRA_DEFAULT = 12 * ANNI_EXTRA_PROIEZIONE[-1]
+
+# Righe elaborate insieme da calcola_breakeven_batch (memoria: righe × mesi di uscita)
+DIMENSIONE_BLOCCO_BREAKEVEN = 100_000
+
+def carica_tavola_mortalita(percorso=PERCORSO_TAVOLA_MORTALITA):
+    """
+    Legge e valida la tavola di mortalità. Ritorna un dict con 'eta' (array crescente e
+    contiguo) e 'q' (probabilità annue di morte, una riga per sesso in ordine di COLONNE_SESSO).
+    """
+    with open(percorso, newline='') as f:
+        righe = list(csv.DictReader(f))
+    if not righe:
+        raise ValueError(f"Tavola di mortalità vuota: {percorso}")
+
+    mancanti = (set(COLONNE_SESSO.values()) | {'eta'}) - set(righe[0])
+    if mancanti:
+        raise ValueError(f"Colonne mancanti nella tavola di mortalità: {', '.join(sorted(mancanti))}")
+
+    righe.sort(key=lambda r: int(r['eta']))
+    eta = np.array([int(r['eta']) for r in righe])
+    if np.any(np.diff(eta) != 1):
+        raise ValueError("Le età della tavola di mortalità devono essere uniche e consecutive")
+
+    q = np.array([[float(r[colonna]) for r in righe] for colonna in COLONNE_SESSO.values()])
+    if np.any((q < 0) | (q > 1)):
+        raise ValueError("Le probabilità di morte devono essere comprese tra 0 e 1")
+    return {'eta': eta, 'q': q}
+
+_tavola = None
+
+def tavola_mortalita():
+    """Tavola di mortalità, caricata al primo utilizzo e poi condivisa."""
+    global _tavola
+    if _tavola is None:
+        _tavola = carica_tavola_mortalita()
+    return _tavola
+
+def _somme_cumulate(eta, codice_sesso, tasso_sconto, tavola):
+    """
+    Per ogni coppia (età, sesso) le somme lette per mese di uscita k (array gruppi × mesi+1):
+    valore dello stipendio unitario fino a k, valore di una rendita unitaria da k, e la
+    speranza di vita residua in anni.
+    """
+    eta_fine = tavola['eta'][-1] + 1
+    mesi = np.arange(int(np.ceil((eta_fine - eta.min()) * 12)))
+    eta_mese = eta[:, None] + mesi / 12
+    riga = np.clip(np.floor(eta_mese).astype(np.int64) - tavola['eta'][0], 0, len(tavola['eta']) - 1)
+    sopravvivenza = np.cumprod((1 - tavola['q'][codice_sesso[:, None], riga]) ** (1 / 12), axis=1)
+
+    peso = sopravvivenza * (1 + tasso_sconto) ** (-(mesi + 1) / 12)
+    crescita = (1 + CRESCITA_SALARIO) ** (mesi // 12)
+    zero = np.zeros((len(eta), 1))
+    stipendio_fino_a = np.hstack([zero, np.cumsum(peso * crescita, axis=1)])
+    rendita_da = np.hstack([np.cumsum(peso[:, ::-1], axis=1)[:, ::-1], zero])
+    return stipendio_fino_a, rendita_da, sopravvivenza.sum(axis=1) / 12
+
+def _valori_uscita(eta, sesso, ral, anni_contributi, tipo_contribuzione, mesi_mancanti, tasso_sconto,
+                   mesi_extra, tavola, regione=None):
+    """Matrici righe × mesi di uscita: (mesi_uscita, pensione, van_stipendio, van_pensione) e speranza di vita."""
+    eta = np.asarray(eta, dtype=float)
+    codice_sesso = _mappa_categorie(sesso, {s: i for i, s in enumerate(COLONNE_SESSO)}, 0).astype(np.int64)
+    gruppi, inverso = np.unique(np.stack([eta, codice_sesso]), axis=1, return_inverse=True)
+    inverso = inverso.ravel()
+    stipendio_fino_a, rendita_da, speranza_vita = _somme_cumulate(
+        gruppi[0], gruppi[1].astype(np.int64), tasso_sconto, tavola
+    )
+
+    extra = np.arange(mesi_extra + 1)
+    mesi_uscita = np.asarray(mesi_mancanti, dtype=np.int64)[:, None] + extra
+    colonna = np.minimum(mesi_uscita, stipendio_fino_a.shape[1] - 1)
+    riga = inverso[:, None]
+
+    ral = np.asarray(ral, dtype=float)[:, None]
+    tipo = np.asarray(tipo_contribuzione, dtype=object)
+    indice_regione = np.asarray(_indice_regione_fiscale(regione))[..., None]
+    pensione = stima_pensione_netta_batch(
+        ral * (1 + CRESCITA_SALARIO) ** (extra / 12),
+        np.asarray(anni_contributi, dtype=float)[:, None] + extra / 12,
+        np.broadcast_to(tipo, eta.shape)[:, None],
+        indice_regione
+    )
+    van_stipendio = netto_annuo(ral, indice_regione) / 12 * stipendio_fino_a[riga, colonna]
+    van_pensione = pensione * MENSILITA / 12 * rendita_da[riga, colonna]
+    return mesi_uscita, pensione, van_stipendio, van_pensione, speranza_vita[inverso]
+
+def _pareggio(van_pensione):
+    """
+    Indice dell'ultima uscita con valore della pensione non inferiore a quello della prima.
+    Se la prima uscita vale già zero (età oltre la tavola) non c'è pareggio: ritorna la prima.
+    """
+    non_inferiore = van_pensione >= van_pensione[:, :1] * (1 - 1e-12)
+    ultima = van_pensione.shape[1] - 1 - np.argmax(non_inferiore[:, ::-1], axis=1)
+    return np.where(van_pensione[:, 0] > 0, ultima, 0)
+
+def calcola_breakeven(eta, sesso, ral, anni_contributi, tipo_contribuzione="Dipendente Privato",
+                      mesi_mancanti=1, tasso_sconto=TASSO_SCONTO_DEFAULT, mesi_extra=MESI_EXTRA_DEFAULT,
+                      regione=None):
+    """
+    Analisi di un dipendente. Ritorna un dict con, per ogni mese di uscita (da mesi_mancanti a
+    mesi_mancanti + mesi_extra): 'mesi_uscita', 'pensione' mensile (13 mensilità, come
+    stima_pensione_netta), 'van_stipendio', 'van_pensione', 'van_totale'; e 'mese_ottimale',
+    'mese_pareggio' (mesi da oggi) e 'speranza_vita' (anni residui).
+    `regione` sceglie le addizionali del netto (None = media nazionale).
+    """
+    mesi_uscita, pensione, van_stipendio, van_pensione, speranza_vita = _valori_uscita(
+        [eta], [sesso], [ral], [anni_contributi], [tipo_contribuzione], [mesi_mancanti],
+        tasso_sconto, mesi_extra, tavola_mortalita(), None if regione is None else [regione]
+    )
+    return {
+        'mesi_uscita': mesi_uscita[0],
+        'pensione': pensione[0],
+        'van_stipendio': van_stipendio[0],
+        'van_pensione': van_pensione[0],
+        'van_totale': van_stipendio[0] + van_pensione[0],
+        'mese_ottimale': int(mesi_uscita[0, van_pensione[0].argmax()]),
+        'mese_pareggio': int(mesi_uscita[0, _pareggio(van_pensione)[0]]),
+        'speranza_vita': float(speranza_vita[0])
+    }
+
+def calcola_breakeven_batch(eta, sesso, ral, anni_contributi, tipo_contribuzione="Dipendente Privato",
+                            mesi_mancanti=1, tasso_sconto=TASSO_SCONTO_DEFAULT, mesi_extra=MESI_EXTRA_DEFAULT,
+                            regione=None, dimensione_blocco=DIMENSIONE_BLOCCO_BREAKEVEN):
+    """
+    Versione vettoriale di calcola_breakeven per l'intera forza lavoro (mesi_mancanti ad esempio
+    dalla colonna omonima di calcola_scenari_batch). Ritorna un dict di array, uno per dipendente:
+    mese_ottimale, mese_pareggio, van_pensione_prima_uscita, van_pensione_ottimale, speranza_vita.
+    """
+    eta = np.asarray(eta)
+    n = len(eta)
+    colonne = [np.broadcast_to(np.asarray(c, dtype=object if i < 2 else None), (n,))
+               for i, c in enumerate((sesso, tipo_contribuzione, ral, anni_contributi, mesi_mancanti))]
+    sesso, tipo_contribuzione, ral, anni_contributi, mesi_mancanti = colonne
+    if regione is not None:
+        regione = np.broadcast_to(np.asarray(regione, dtype=object), (n,))
+    tavola = tavola_mortalita()
+
+    risultati = {nome: np.empty(n) for nome in ('van_pensione_prima_uscita', 'van_pensione_ottimale', 'speranza_vita')}
+    risultati['mese_ottimale'] = np.empty(n, dtype=np.int64)
+    risultati['mese_pareggio'] = np.empty(n, dtype=np.int64)
+    for inizio in range(0, n, dimensione_blocco):
+        blocco = slice(inizio, inizio + dimensione_blocco)
+        mesi_uscita, _, _, van_pensione, speranza_vita = _valori_uscita(
+            eta[blocco], sesso[blocco], ral[blocco], anni_contributi[blocco], tipo_contribuzione[blocco],
+            mesi_mancanti[blocco], tasso_sconto, mesi_extra, tavola,
+            None if regione is None else regione[blocco]
+        )
+        righe = np.arange(len(van_pensione))
+        ottimale = van_pensione.argmax(axis=1)
+        risultati['mese_ottimale'][blocco] = mesi_uscita[righe, ottimale]
+        risultati['mese_pareggio'][blocco] = mesi_uscita[righe, _pareggio(van_pensione)]
+        risultati['van_pensione_prima_uscita'][blocco] = van_pensione[:, 0]
+        risultati['van_pensione_ottimale'][blocco] = van_pensione[righe, ottimale]
+        risultati['speranza_vita'][blocco] = speranza_vita
+    return risultati
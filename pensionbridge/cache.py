@@ -0,0 +1,83 @@
+"""
+Cache LRU con scadenza (TTL) e contatori hit/miss, thread-safe.
+
+Un'istanza definita a livello di modulo vive una sola volta per processo: con Streamlit
+è quindi condivisa da tutte le sessioni servite dallo stesso server.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+class CacheLRU:
+    """
+    Cache a dimensione limitata: oltre `dimensione_massima` voci elimina la meno usata,
+    e le voci più vecchie di `ttl` secondi (se impostato) vengono ricalcolate.
+    """
+
+    def __init__(self, dimensione_massima=256, ttl=None):
+        if dimensione_massima < 1:
+            raise ValueError("dimensione_massima deve essere almeno 1")
+        self.dimensione_massima = dimensione_massima
+        self.ttl = ttl
+        self._voci = OrderedDict()
+        self._lock = threading.Lock()
+        self.hit = 0
+        self.miss = 0
+        self.evizioni = 0
+
+    def ottieni(self, chiave, calcola):
+        """Ritorna il valore in cache per `chiave`, oppure lo calcola con `calcola()` e lo memorizza."""
+        adesso = time.monotonic()
+        with self._lock:
+            voce = self._voci.get(chiave)
+            if voce is not None and (self.ttl is None or adesso - voce[0] < self.ttl):
+                self._voci.move_to_end(chiave)
+                self.hit += 1
+                return voce[1]
+            self.miss += 1
+
+        # Calcolo fuori dal lock: sessioni diverse non si bloccano a vicenda
+        valore = calcola()
+
+        with self._lock:
+            self._voci[chiave] = (time.monotonic(), valore)
+            self._voci.move_to_end(chiave)
+            while len(self._voci) > self.dimensione_massima:
+                self._voci.popitem(last=False)
+                self.evizioni += 1
+        return valore
+
+    def svuota(self):
+        with self._lock:
+            self._voci.clear()
+            self.hit = self.miss = self.evizioni = 0
+
+    def statistiche(self):
+        with self._lock:
+            richieste = self.hit + self.miss
+            return {
+                'hit': self.hit,
+                'miss': self.miss,
+                'evizioni': self.evizioni,
+                'voci': len(self._voci),
+                'dimensione_massima': self.dimensione_massima,
+                'hit_rate': self.hit / richieste if richieste else 0.0
+            }
+
+def memoizza(dimensione_massima=256, ttl=None):
+    """
+    Decoratore che memorizza i risultati in una CacheLRU, con chiave sugli argomenti.
+    La cache è accessibile come attributo `.cache` della funzione decorata.
+    """
+    def decoratore(funzione):
+        cache = CacheLRU(dimensione_massima, ttl)
+
+        @wraps(funzione)
+        def wrapper(*args, **kwargs):
+            chiave = (args, tuple(sorted(kwargs.items())))
+            return cache.ottieni(chiave, lambda: funzione(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+    return decoratore
@@ -0,0 +1,267 @@
+"""
+Nucleo di calcolo di PensionBridge: regole pensionistiche, strumenti di sostegno
+al reddito e incentivo all'esodo regionale per un singolo dipendente.
+Nessuna dipendenza da Streamlit o Plotly: importabile da job batch e worker.
+"""
+from datetime import date
+
+from .calendario import aggiungi_mesi_data
+from .fisco import pensione_netta_mensile, stipendio_netto_mensile
+from .regole import aliquota_rita, indice_anno, parametri_anno
+
+# --- DATI REGIONALI COSTO DELLA VITA ---
+COSTO_VITA_REGIONALE = {
+    "Abruzzo": 0.90,
+    "Basilicata": 0.85,
+    "Calabria": 0.82,
+    "Campania": 0.88,
+    "Emilia-Romagna": 1.05,
+    "Friuli-Venezia Giulia": 1.00,
+    "Lazio": 1.15,
+    "Liguria": 1.08,
+    "Lombardia": 1.12,
+    "Marche": 0.92,
+    "Molise": 0.83,
+    "Piemonte": 1.02,
+    "Puglia": 0.87,
+    "Sardegna": 0.89,
+    "Sicilia": 0.86,
+    "Toscana": 1.06,
+    "Trentino-Alto Adige": 1.10,
+    "Umbria": 0.91,
+    "Valle d'Aosta": 1.05,
+    "Veneto": 1.03
+}
+
+# --- TASSI DI SOSTITUZIONE PER TIPO DI CONTRIBUZIONE ---
+TIPI_CONTRIBUZIONE = ["Dipendente Privato", "Artigiani", "Commercianti", "Autonomi", "Coltivatori Diretti"]
+
+TASSO_SOSTITUZIONE = {
+    "Dipendente Privato": 0.75,
+    # Aliquota contributiva più bassa = pensione più bassa
+    "Artigiani": 0.65,
+    "Commercianti": 0.65,
+    "Autonomi": 0.60,
+    "Coltivatori Diretti": 0.55
+}
+TASSO_SOSTITUZIONE_DEFAULT = 0.70
+
+# --- FUNZIONI DI UTILITÀ (SIMULAZIONE SEMPLIFICATA) ---
+def calcola_data_pensione(eta_attuale, anni_contributi, sesso, is_lavoratore_precoce=False, 
+                         is_lavoratore_usurante=False, tipo_contribuzione="Dipendente Privato",
+                         oggi=None):
+    """
+    Stima data pensione basata su regole semplificate, con i parametri dell'anno di uscita.
+    Include lavoratori precoci, usuranti e diverse tipologie contributive.
+    `oggi` è la data di riferimento (default: data odierna).
+    """
+    oggi = oggi or date.today()
+    # Prima stima con le regole dell'anno corrente, poi, se la data cade in un anno
+    # con regole diverse, ricalcolo con i requisiti di quell'anno
+    date_pensione = _calcola_data_pensione_anno(
+        eta_attuale, anni_contributi, sesso, is_lavoratore_precoce, is_lavoratore_usurante,
+        oggi, parametri_anno(oggi.year)
+    )
+    if indice_anno(date_pensione[0].year) != indice_anno(oggi.year):
+        date_pensione = _calcola_data_pensione_anno(
+            eta_attuale, anni_contributi, sesso, is_lavoratore_precoce, is_lavoratore_usurante,
+            oggi, parametri_anno(date_pensione[0].year)
+        )
+    return date_pensione
+
+def _calcola_data_pensione_anno(eta_attuale, anni_contributi, sesso, is_lavoratore_precoce,
+                                is_lavoratore_usurante, oggi, regole):
+    # Regola Vecchiaia: 67 anni (un 29 febbraio diventa 28 negli anni non bisestili)
+    anni_mancanti_vecchiaia = regole['eta_vecchiaia'] - eta_attuale
+    data_vecchiaia = today_plus_months(oggi, int(anni_mancanti_vecchiaia) * 12)
+    
+    # Regola Anticipata (42y 10m Uomini, 41y 10m Donne)
+    soglia_anni = regole['anni_anticipata_uomini'] if sesso == 'Uomo' else regole['anni_anticipata_donne']
+    mesi_extra = regole['mesi_extra_anticipata']
+    
+    # Lavoratori Precoci: possono andare in pensione con 41 anni di contributi 
+    # se hanno almeno 12 mesi di contributi prima dei 19 anni
+    if is_lavoratore_precoce:
+        soglia_anni = regole['anni_anticipata_precoci']
+        mesi_extra = regole['mesi_extra_precoci']
+    
+    # Lavoratori Usuranti: possibilità di uscita anticipata
+    # (notturni, catena di montaggio, conducenti, etc.)
+    if is_lavoratore_usurante:
+        # Quota 97.6 (somma età + contributi) con almeno 61 anni e 7 mesi di età
+        eta_minima_usuranti = regole['eta_minima_usuranti']
+        quota_usuranti = regole['quota_usuranti']
+        if eta_attuale >= eta_minima_usuranti and (eta_attuale + anni_contributi) >= quota_usuranti:
+            return oggi, data_vecchiaia, oggi
+        # Altrimenti calcola quando si raggiunge la quota
+        anni_per_quota = max(0, quota_usuranti - (eta_attuale + anni_contributi))
+        data_usuranti = today_plus_months(oggi, int(anni_per_quota * 12))
+        if eta_attuale + anni_per_quota >= eta_minima_usuranti:
+            return data_usuranti, data_vecchiaia, data_usuranti
+    
+    # Contribuzione autonomi/artigiani: stesse regole ma con aliquote contributive
+    # diverse (considerate nel calcolo pensione)
+    
+    anni_contributivi_mancanti = soglia_anni - anni_contributi
+    # Convertiamo tutto in mesi per semplicità
+    mesi_totali_mancanti = (anni_contributivi_mancanti * 12) + mesi_extra
+    
+    if mesi_totali_mancanti < 0:
+        mesi_totali_mancanti = 0
+        
+    data_anticipata = today_plus_months(oggi, int(mesi_totali_mancanti))
+    
+    # Ritorna la data più vicina tra le due opzioni
+    return min(data_vecchiaia, data_anticipata), data_vecchiaia, data_anticipata
+
+def today_plus_months(current_date, months_to_add):
+    return aggiungi_mesi_data(current_date, months_to_add)
+
+def stima_pensione_netta(ral, anni_contributi, tipo_contribuzione="Dipendente Privato", regione=None):
+    """
+    Stima MOLTO semplificata del tasso di sostituzione.
+    Il calcolo contributivo sulla storia retributiva è in pensionbridge.contributivo.
+    Ipotesi: ~70% dell'ultima RAL per carriere lunghe, poi IRPEF e addizionali della
+    pensione (pensionbridge.fisco; regione None = addizionali medie nazionali).
+    Considera tipo di contribuzione (dipendente, artigiano, autonomo, agricolo).
+    """
+    # Fattore correttivo basato sugli anni (più anni = più pensione)
+    fattore_anni = min(anni_contributi / 40.0, 1.1)
+    
+    # Aliquote contributive diverse per tipologie
+    tasso_sostituzione_base = TASSO_SOSTITUZIONE.get(tipo_contribuzione, TASSO_SOSTITUZIONE_DEFAULT)
+    
+    pensione_lorda_annua = ral * tasso_sostituzione_base * fattore_anni
+    return pensione_netta_mensile(pensione_lorda_annua, regione)
+
+def calcola_naspi(ral, mesi_contributi_ultimi_4_anni, anno=None):
+    """
+    Calcola l'importo della NASPI (indennità di disoccupazione).
+    La NASPI copre anche figurativamente i contributi previdenziali.
+    Importo: 75% della retribuzione media mensile fino alla soglia dell'anno
+            + 25% dell'eccedenza
+    Durata: metà delle settimane contributive degli ultimi 4 anni
+    """
+    regole = parametri_anno(anno)
+    retribuzione_mensile = ral / 13
+    soglia_naspi = regole['soglia_naspi']  # Indicizzata annualmente
+    
+    if retribuzione_mensile <= soglia_naspi:
+        naspi_mensile = retribuzione_mensile * regole['quota_naspi_sotto_soglia']
+    else:
+        naspi_mensile = soglia_naspi * regole['quota_naspi_sotto_soglia'] + \
+                        (retribuzione_mensile - soglia_naspi) * regole['quota_naspi_sopra_soglia']
+    
+    # La NASPI si riduce del 3% ogni mese dal 4° mese
+    # Durata massima basata sui mesi contributivi
+    durata_mesi = min(mesi_contributi_ultimi_4_anni / 2, regole['durata_massima_naspi'])
+    
+    return naspi_mensile, durata_mesi
+
+def calcola_ape_sociale(eta, anni_contributi, ral, is_disoccupato=False, 
+                        is_caregiver=False, is_invalido=False, is_lavoratore_usurante=False,
+                        anno=None):
+    """
+    Calcola l'APE Sociale (Anticipo Pensionistico Sociale).
+    Requisiti:
+    - Almeno 63 anni di età
+    - 30 o 36 anni di contributi (a seconda della categoria)
+    - Condizione: disoccupato, caregiver, invalido ≥74%, lavoro usurante/gravoso
+    """
+    regole = parametri_anno(anno)
+    if eta < regole['eta_minima_ape']:
+        return 0, False, f"Età minima {regole['eta_minima_ape']} anni non raggiunta"
+    
+    anni_contributi_richiesti = regole['anni_contributi_ape']
+    if is_lavoratore_usurante:
+        anni_contributi_richiesti = regole['anni_contributi_ape_usuranti']
+    
+    if anni_contributi < anni_contributi_richiesti:
+        return 0, False, f"Servono almeno {anni_contributi_richiesti} anni di contributi"
+    
+    # Verifica condizioni
+    ha_diritto = is_disoccupato or is_caregiver or is_invalido or is_lavoratore_usurante
+    
+    if not ha_diritto:
+        return 0, False, "Non si rientra nelle categorie previste per l'APE Sociale"
+    
+    # L'APE sociale è pari all'importo della pensione calcolata al momento della domanda
+    # ma con un massimale di €1,500 mensili (circa)
+    pensione_teorica = stima_pensione_netta(ral, anni_contributi)
+    ape_importo = min(pensione_teorica, regole['massimale_ape'])
+    
+    return ape_importo, True, "APE Sociale concedibile"
+
+def calcola_rita(montante_complementare, eta, anni_a_pensione, anno=None):
+    """
+    Calcola la R.I.T.A. (Rendita Integrativa Temporanea Anticipata).
+    Permette di anticipare l'erogazione della previdenza complementare
+    in forma di rendita fino al raggiungimento della pensione obbligatoria.
+    
+    Requisiti:
+    - Cessazione attività lavorativa
+    - Maturazione diritto pensione vecchiaia/anticipata entro 5 anni (10 per inoccupati >24 mesi)
+    - Almeno 20 anni di contributi al fondo pensione o 5 anni + 5 anni a pensione
+    """
+    regole = parametri_anno(anno)
+    if anni_a_pensione > regole['anni_massimi_rita']:
+        return 0, False, f"Troppo lontano dalla pensione (max {regole['anni_massimi_rita']} anni)"
+    
+    if montante_complementare <= 0:
+        return 0, False, "Nessun montante previdenza complementare"
+    
+    # Calcolo rendita: il montante viene erogato come rendita temporanea
+    # Coefficiente di conversione dipende da età e anni di rendita
+    # Semplificazione: montante / (anni_a_pensione * 12)
+    if anni_a_pensione < 1:
+        anni_a_pensione = 1
+    
+    rita_mensile = montante_complementare / (anni_a_pensione * 12)
+    
+    # Tassazione agevolata al 15% (ridotta dello 0.3% per ogni anno oltre il 15°)
+    tassazione = aliquota_rita(regole)  # Ipotesi 20 anni nel fondo
+    rita_netta = rita_mensile * (1 - tassazione)
+    
+    return rita_netta, True, "R.I.T.A. disponibile"
+
+def calcola_incentivo_esodo_regionale(ral, mesi_mancanti, regione, naspi_mensile=0, 
+                                     pensione_anticipata_effettiva=0):
+    """
+    Calcola l'incentivo all'esodo considerando:
+    1. Il delta tra retribuzione e quello che percepirebbe (NASPI + eventuali altre forme)
+    2. Il costo della vita regionale
+    3. Il valore del tempo libero corretto per regione
+    
+    Formula: Incentivo = (Stipendio_Netto - Coperture) * Mesi * Fattore_Regionale
+    Lo stipendio netto sconta IRPEF e addizionali della regione (pensionbridge.fisco).
+    """
+    stipendio_netto = stipendio_netto_mensile(ral, regione)
+    
+    # Calcolo del gap mensile da coprire
+    copertura_mensile = naspi_mensile + pensione_anticipata_effettiva
+    gap_mensile = stipendio_netto - copertura_mensile
+    
+    # Applicazione del fattore regionale sul gap
+    fattore_regionale = COSTO_VITA_REGIONALE.get(regione, 1.0)
+    gap_mensile_corretto = gap_mensile * fattore_regionale
+    
+    # Incentivo base per coprire il periodo
+    incentivo_base = gap_mensile_corretto * mesi_mancanti
+    
+    # Valore del tempo libero (funzione decrescente con l'età e variabile per regione)
+    # Più alto nelle regioni con costo vita basso (più potere d'acquisto)
+    valore_tempo_mensile = 1000 * (1.5 - fattore_regionale)  # Inversamente proporzionale
+    valore_tempo_totale = valore_tempo_mensile * mesi_mancanti
+    
+    # Incentivo totale suggerito
+    incentivo_totale = incentivo_base + valore_tempo_totale
+    
+    return {
+        'incentivo_base': incentivo_base,
+        'valore_tempo': valore_tempo_totale,
+        'incentivo_totale': incentivo_totale,
+        'gap_mensile': gap_mensile,
+        'fattore_regionale': fattore_regionale,
+        'stipendio_netto': stipendio_netto,
+        'copertura_mensile': copertura_mensile
+    }
@@ -0,0 +1,59 @@
+"""
+Aritmetica delle date su array numpy.datetime64, per milioni di record in un solo passaggio.
+
+Tutte le funzioni accettano scalari (date, stringhe ISO, datetime64) o array e una data di
+riferimento iniettabile: a parità di data di riferimento i batch sono riproducibili.
+"""
+import calendar
+from datetime import date
+
+import numpy as np
+
+def data_riferimento(oggi=None):
+    """Data di riferimento dei calcoli come datetime64[D] (scalare o array); None = oggi."""
+    if oggi is None:
+        oggi = date.today()
+    return np.asarray(oggi, dtype='datetime64[D]')
+
+def aggiungi_mesi(date_base, mesi):
+    """
+    Aggiunge `mesi` (anche negativi) a `date_base`, con broadcasting tra i due argomenti.
+    Il giorno viene limitato alla fine del mese di arrivo (31/01 + 1 mese = 28 o 29/02).
+    """
+    date_base = np.asarray(date_base, dtype='datetime64[D]')
+    mesi = np.asarray(mesi, dtype=np.int64)
+
+    mese_base = date_base.astype('datetime64[M]')
+    giorno = (date_base - mese_base.astype('datetime64[D]')).astype(np.int64)
+
+    mese = mese_base + mesi
+    inizio_mese = mese.astype('datetime64[D]')
+    giorni_nel_mese = ((mese + 1).astype('datetime64[D]') - inizio_mese).astype(np.int64)
+    return inizio_mese + np.minimum(giorno, giorni_nel_mese - 1)
+
+def aggiungi_mesi_data(data_base, mesi):
+    """Versione scalare di aggiungi_mesi su datetime.date (senza passare da numpy)."""
+    nuovo_mese = data_base.month - 1 + mesi
+    anno = data_base.year + nuovo_mese // 12
+    mese = nuovo_mese % 12 + 1
+    return date(anno, mese, min(data_base.day, calendar.monthrange(anno, mese)[1]))
+
+def anni_e_mesi_tra(data_iniziale, data_finale):
+    """Differenza di anno e differenza di mese (separate) tra due date o array di date."""
+    mese_iniziale = np.asarray(data_iniziale, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    mese_finale = np.asarray(data_finale, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    return mese_finale // 12 - mese_iniziale // 12, mese_finale % 12 - mese_iniziale % 12
+
+def mesi_tra(data_iniziale, data_finale):
+    """Mesi di calendario tra due date, ignorando il giorno (come anno*12 + mese)."""
+    delta_anni, delta_mesi = anni_e_mesi_tra(data_iniziale, data_finale)
+    return delta_anni * 12 + delta_mesi
+
+def anni_frazionari_tra(data_iniziale, data_finale):
+    """Anni tra due date come delta_anni + delta_mesi / 12 (stesso arrotondamento del calcolo scalare)."""
+    delta_anni, delta_mesi = anni_e_mesi_tra(data_iniziale, data_finale)
+    return delta_anni + delta_mesi / 12
+
+def mesi_alla_pensione(data_target, oggi=None):
+    """Mesi mancanti alla data target, almeno 1 (come nei CALCOLI CORE)."""
+    return np.maximum(mesi_tra(data_riferimento(oggi), data_target), 1)
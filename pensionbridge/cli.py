@@ -0,0 +1,90 @@
+"""
+Batch notturno HR da riga di comando.
+
+Legge un CSV di dipendenti a blocchi (chunk) e scrive, per ogni dipendente, data di pensione,
+pensione stimata, NASPI, APE Sociale, R.I.T.A. e incentivo. La memoria resta costante
+qualunque sia il numero di righe: in RAM c'è un solo blocco alla volta.
+
+Input colonnari (Parquet, Arrow IPC, directory di colonne .npy) sono letti memory-mapped e
+i risultati scritti nello stesso formato, vedi pensionbridge.colonnare.
+
+Esempi:
+    python -m pensionbridge dipendenti.csv risultati.csv --chunksize 200000
+    python -m pensionbridge dipendenti.parquet risultati.parquet
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from .calendario import data_riferimento
+from .batch import COLONNE_BATCH_DEFAULT, COLONNE_BATCH_OBBLIGATORIE, COLONNE_OUTPUT, calcola_scenari_batch
+from .colonnare import elabora_colonnare, formato_colonnare
+
+# Tipi di lettura: le colonne booleane arrivano dal CSV come True/False
+TIPI_COLONNE = {
+    'sesso': 'str',
+    'regione': 'str',
+    'tipo_contribuzione': 'str'
+}
+
+def elabora_csv(sorgente, destinazione, chunksize=100_000, colonna_id=None, colonne_output=COLONNE_OUTPUT,
+                oggi=None):
+    """
+    Elabora `sorgente` a blocchi di `chunksize` righe e accoda i risultati a `destinazione`.
+    Sorgente e destinazione sono path o file-like. Ritorna il numero di dipendenti elaborati.
+    Tutti i blocchi usano la stessa data di riferimento `oggi` (default: data odierna).
+    """
+    oggi = data_riferimento(oggi)
+    colonne_input = set(COLONNE_BATCH_OBBLIGATORIE) | set(COLONNE_BATCH_DEFAULT) | {'incentivo_proposto'}
+    if colonna_id:
+        colonne_input.add(colonna_id)
+
+    righe = 0
+    lettore = pd.read_csv(
+        sorgente,
+        chunksize=chunksize,
+        usecols=lambda c: c in colonne_input,
+        dtype=TIPI_COLONNE
+    )
+    for blocco in lettore:
+        risultati = calcola_scenari_batch(blocco, oggi)[colonne_output]
+        if colonna_id:
+            risultati.insert(0, colonna_id, blocco[colonna_id].to_numpy())
+        risultati.to_csv(destinazione, mode='w' if righe == 0 else 'a', header=righe == 0,
+                         index=False, date_format='%Y-%m-%d', float_format='%.2f')
+        righe += len(blocco)
+    return righe
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="pensionbridge",
+        description="Calcolo batch PensionBridge su un file di dipendenti (lettura a blocchi, memoria costante)."
+    )
+    parser.add_argument("input", help="CSV dei dipendenti ('-' per stdin), Parquet, Arrow o directory .npy")
+    parser.add_argument("output", help="Risultati: CSV ('-' per stdout) o lo stesso formato colonnare dell'input")
+    parser.add_argument("--chunksize", type=int, default=100_000,
+                        help="Righe elaborate per blocco (default: 100000)")
+    parser.add_argument("--colonna-id", default=None,
+                        help="Colonna identificativa del dipendente da riportare nell'output (es. matricola)")
+    parser.add_argument("--data-riferimento", default=None, metavar="AAAA-MM-GG",
+                        help="Data di riferimento dei calcoli, per run riproducibili (default: oggi)")
+    args = parser.parse_args(argv)
+
+    formato = None if args.input == '-' else formato_colonnare(args.input)
+    sorgente = sys.stdin if args.input == '-' else args.input
+    if formato is not None:
+        if args.output == '-' or formato_colonnare(args.output) != formato:
+            parser.error(f"con input {formato} l'output deve essere nello stesso formato")
+        righe = elabora_colonnare(sorgente, args.output, args.chunksize, args.colonna_id,
+                                  oggi=args.data_riferimento)
+    elif args.output == '-':
+        righe = elabora_csv(sorgente, sys.stdout, args.chunksize, args.colonna_id,
+                            oggi=args.data_riferimento)
+    else:
+        with open(args.output, 'w', newline='') as destinazione:
+            righe = elabora_csv(sorgente, destinazione, args.chunksize, args.colonna_id,
+                                oggi=args.data_riferimento)
+
+    print(f"Elaborati {righe} dipendenti", file=sys.stderr)
+    return 0
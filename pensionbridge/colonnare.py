@@ -0,0 +1,245 @@
+"""
+Input e output colonnari memory-mapped per il batch sull'intera forza lavoro.
+
+Formati supportati (riconosciuti dal percorso):
+- Arrow IPC (.arrow, .feather, .ipc): file mappato in memoria, i blocchi sono viste zero-copy;
+- Parquet (.parquet, .pq): letto a batch di righe, un blocco decompresso alla volta;
+- directory di colonne .npy: un file <colonna>.npy per colonna, aperto con mmap; le colonne
+  categoriche (regione, tipo_contribuzione, ...) sono codici interi con le etichette in
+  categorie.json.
+
+Le colonne categoriche arrivano al motore come pd.Categorical: le lookup per regione e tipo
+di contribuzione lavorano sui codici, senza materializzare le stringhe. I risultati sono
+scritti nello stesso formato blocco per blocco, così il picco di memoria dipende solo dalla
+dimensione del blocco e non dal numero di dipendenti.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .batch import COLONNE_BATCH_DEFAULT, COLONNE_BATCH_OBBLIGATORIE, COLONNE_OUTPUT, calcola_scenari_batch
+from .calendario import data_riferimento
+
+ESTENSIONI_FORMATO = {
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+}
+
+# Colonne salvate come categoriche da scrivi_colonnare
+COLONNE_CATEGORICHE = ('sesso', 'regione', 'tipo_contribuzione')
+
+FILE_CATEGORIE = "categorie.json"
+
+DIMENSIONE_BLOCCO_DEFAULT = 100_000
+
+def formato_colonnare(percorso):
+    """'arrow', 'parquet' o 'npy' (directory); None se il percorso non è un formato colonnare."""
+    percorso = Path(percorso)
+    if percorso.is_dir() or (not percorso.suffix and not percorso.exists()):
+        return 'npy'
+    return ESTENSIONI_FORMATO.get(percorso.suffix.lower())
+
+# --- Lettura ---
+
+def _selezionate(nomi, colonne):
+    return [c for c in nomi if colonne is None or c in colonne]
+
+def _colonna_arrow(array):
+    """Colonna Arrow come array NumPy (zero-copy per i numerici senza nulli) o pd.Categorical."""
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if pa.types.is_dictionary(array.type):
+        return pd.Categorical.from_codes(
+            array.indices.fill_null(-1).to_numpy(zero_copy_only=False),
+            array.dictionary.to_pandas()
+        )
+    return array.to_numpy(zero_copy_only=False)
+
+def _blocchi_arrow(percorso, colonne, dimensione_blocco):
+    tabella = pa.ipc.open_file(pa.memory_map(str(percorso))).read_all()
+    nomi = _selezionate(tabella.column_names, colonne)
+    for inizio in range(0, tabella.num_rows, dimensione_blocco):
+        blocco = tabella.slice(inizio, dimensione_blocco)
+        yield {c: _colonna_arrow(blocco.column(c)) for c in nomi}
+
+def _blocchi_parquet(percorso, colonne, dimensione_blocco):
+    file = pq.ParquetFile(str(percorso), memory_map=True)
+    nomi = _selezionate(file.schema_arrow.names, colonne)
+    for blocco in file.iter_batches(batch_size=dimensione_blocco, columns=nomi):
+        yield {c: _colonna_arrow(blocco.column(c)) for c in nomi}
+
+def _categorie_npy(directory):
+    percorso = Path(directory) / FILE_CATEGORIE
+    return json.loads(percorso.read_text()) if percorso.exists() else {}
+
+def _blocchi_npy(directory, colonne, dimensione_blocco):
+    directory = Path(directory)
+    categorie = _categorie_npy(directory)
+    percorsi = {p.stem: p for p in sorted(directory.glob("*.npy"))}
+    array = {c: np.load(percorsi[c], mmap_mode='r') for c in _selezionate(percorsi, colonne)}
+    lunghezze = {len(a) for a in array.values()}
+    if len(lunghezze) > 1:
+        raise ValueError(f"Le colonne in {directory} hanno lunghezze diverse")
+    righe = lunghezze.pop() if lunghezze else 0
+    for inizio in range(0, righe, dimensione_blocco):
+        fine = inizio + dimensione_blocco
+        yield {
+            c: pd.Categorical.from_codes(a[inizio:fine], categorie[c]) if c in categorie else a[inizio:fine]
+            for c, a in array.items()
+        }
+
+_LETTORI = {'arrow': _blocchi_arrow, 'parquet': _blocchi_parquet, 'npy': _blocchi_npy}
+
+def leggi_blocchi(percorso, colonne=None, dimensione_blocco=DIMENSIONE_BLOCCO_DEFAULT):
+    """
+    Itera su `percorso` a blocchi di `dimensione_blocco` righe. Ogni blocco è un dict
+    colonna -> array NumPy (o pd.Categorical), direttamente utilizzabile da calcola_scenari_batch.
+    `colonne` limita le colonne lette (default: tutte).
+    """
+    formato = formato_colonnare(percorso)
+    if formato is None:
+        raise ValueError(f"Formato colonnare non riconosciuto: {percorso}")
+    if formato == 'npy' and not Path(percorso).is_dir():
+        raise FileNotFoundError(f"Directory di colonne .npy inesistente: {percorso}")
+    return _LETTORI[formato](percorso, None if colonne is None else set(colonne), dimensione_blocco)
+
+# --- Scrittura ---
+
+class _ScrittoreArrow:
+    """
+    Parquet o Arrow IPC scritto un blocco alla volta. Con `categorie=False` le colonne categoriche
+    sono scritte come valori: blocchi letti da file diversi possono avere dizionari diversi,
+    che il formato IPC non ammette.
+    """
+
+    def __init__(self, percorso, formato, categorie=True):
+        self.percorso, self.formato, self.categorie, self._scrittore = str(percorso), formato, categorie, None
+
+    def scrivi(self, blocco):
+        if not self.categorie:
+            blocco = blocco.astype({c: blocco[c].cat.categories.dtype for c in blocco
+                                    if isinstance(blocco[c].dtype, pd.CategoricalDtype)})
+        tabella = pa.Table.from_pandas(blocco, preserve_index=False)
+        if self._scrittore is None:
+            self._scrittore = (pq.ParquetWriter(self.percorso, tabella.schema) if self.formato == 'parquet'
+                               else pa.ipc.new_file(self.percorso, tabella.schema))
+        self._scrittore.write_table(tabella)
+
+    def chiudi(self):
+        if self._scrittore is not None:
+            self._scrittore.close()
+
+class _ScrittoreNpy:
+    """
+    Una colonna .npy per risultato, preallocata sulla lunghezza totale e riempita a blocchi
+    scrivendo sul file (non tramite mmap, per non accumulare pagine sporche in memoria).
+    """
+
+    def __init__(self, directory, righe):
+        self.directory, self.righe = Path(directory), righe
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._colonne, self._categorie, self._posizione = {}, {}, 0
+
+    def _apri(self, nome, dtype):
+        percorso = self.directory / f"{nome}.npy"
+        with open(percorso, 'wb') as file:
+            np.lib.format.write_array_header_1_0(
+                file, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (self.righe,)}
+            )
+            inizio_dati = file.tell()
+            file.truncate(inizio_dati + self.righe * dtype.itemsize)
+        return open(percorso, 'r+b'), inizio_dati
+
+    def scrivi(self, blocco):
+        for nome, serie in blocco.items():
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                etichette = serie.cat.categories.tolist()
+                if self._categorie.setdefault(nome, etichette) != etichette:
+                    raise ValueError(f"Categorie della colonna {nome} diverse tra i blocchi")
+                valori = serie.cat.codes.to_numpy()
+            elif serie.dtype.kind == 'M':
+                valori = serie.to_numpy().astype('datetime64[D]')
+            elif serie.dtype.kind == 'O':
+                raise ValueError(f"La colonna {nome} non è numerica: nel formato .npy va resa categorica")
+            else:
+                valori = serie.to_numpy()
+            if nome not in self._colonne:
+                self._colonne[nome] = self._apri(nome, valori.dtype)
+            file, inizio_dati = self._colonne[nome]
+            file.seek(inizio_dati + self._posizione * valori.dtype.itemsize)
+            np.ascontiguousarray(valori).tofile(file)
+        self._posizione += len(blocco)
+
+    def chiudi(self):
+        for file, _ in self._colonne.values():
+            file.close()
+        if self._categorie:
+            (self.directory / FILE_CATEGORIE).write_text(json.dumps(self._categorie, ensure_ascii=False))
+
+def _righe(percorso, formato):
+    """Numero di righe di un input colonnare, letto dai metadati senza caricare i dati."""
+    if formato == 'parquet':
+        return pq.ParquetFile(str(percorso)).metadata.num_rows
+    if formato == 'arrow':
+        lettore = pa.ipc.open_file(pa.memory_map(str(percorso)))
+        return sum(lettore.get_batch(i).num_rows for i in range(lettore.num_record_batches))
+    colonne = sorted(Path(percorso).glob("*.npy"))
+    return len(np.load(colonne[0], mmap_mode='r')) if colonne else 0
+
+def _scrittore(percorso, formato, righe, categorie=True):
+    return _ScrittoreNpy(percorso, righe) if formato == 'npy' else _ScrittoreArrow(percorso, formato, categorie)
+
+def scrivi_colonnare(dati, percorso, categoriche=COLONNE_CATEGORICHE, dimensione_blocco=DIMENSIONE_BLOCCO_DEFAULT):
+    """
+    Scrive un DataFrame in formato colonnare (dal percorso), con le colonne `categoriche`
+    codificate come categorie: utile per convertire una volta l'estratto HR dal CSV.
+    """
+    formato = formato_colonnare(percorso)
+    if formato is None:
+        raise ValueError(f"Formato colonnare non riconosciuto: {percorso}")
+    dati = dati.astype({c: 'category' for c in categoriche if c in dati})
+    scrittore = _scrittore(percorso, formato, len(dati))
+    try:
+        for inizio in range(0, len(dati), dimensione_blocco):
+            scrittore.scrivi(dati.iloc[inizio:inizio + dimensione_blocco])
+    finally:
+        scrittore.chiudi()
+
+# --- Elaborazione ---
+
+def elabora_colonnare(sorgente, destinazione, dimensione_blocco=DIMENSIONE_BLOCCO_DEFAULT, colonna_id=None,
+                      colonne_output=COLONNE_OUTPUT, oggi=None):
+    """
+    Come elabora_csv, su input colonnare: legge `sorgente` a blocchi senza copiarla in memoria e
+    scrive i risultati in `destinazione`, che deve avere lo stesso formato. Ritorna le righe elaborate.
+    """
+    formato = formato_colonnare(sorgente)
+    if formato is None:
+        raise ValueError(f"Formato colonnare non riconosciuto: {sorgente}")
+    if formato_colonnare(destinazione) != formato:
+        raise ValueError(f"La destinazione deve avere lo stesso formato dell'input ({formato})")
+
+    oggi = data_riferimento(oggi)
+    colonne_input = set(COLONNE_BATCH_OBBLIGATORIE) | set(COLONNE_BATCH_DEFAULT) | {'incentivo_proposto'}
+    if colonna_id:
+        colonne_input.add(colonna_id)
+
+    righe = 0
+    scrittore = _scrittore(destinazione, formato, _righe(sorgente, formato), categorie=False)
+    try:
+        for blocco in leggi_blocchi(sorgente, colonne_input, dimensione_blocco):
+            risultati = calcola_scenari_batch(blocco, oggi)[colonne_output]
+            if colonna_id:
+                risultati.insert(0, colonna_id, blocco[colonna_id])
+            scrittore.scrivi(risultati)
+            righe += len(risultati)
+    finally:
+        scrittore.chiudi()
+    return righe
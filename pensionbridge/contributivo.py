@@ -0,0 +1,158 @@
+"""
+Calcolo contributivo della pensione sulle storie retributive anno per anno.
+
+Le storie sono un array dipendenti × anni di calendario (imponibile annuo, 0 o NaN negli anni
+senza contributi). Per ogni cella:
+- contributo c_t = imponibile_t × aliquota di computo della gestione (tipo_contribuzione);
+- il montante si rivaluta dall'anno successivo al versamento al tasso r_t (media quinquennale
+  del PIL nominale). Con P_t = Π_{s≤t} (1 + r_s) il montante a fine anno t vale
+  P_t · Σ_{u≤t} c_u / P_u: un prodotto cumulato per la rivalutazione e una somma cumulata per
+  i contributi, su tutta la forza lavoro in un passaggio e senza cicli sugli anni;
+- all'uscita la pensione annua lorda è montante × coefficiente di trasformazione dell'età,
+  pagata in 13 mensilità.
+
+La tavola dei coefficienti (dati/coefficienti_trasformazione.csv) riporta i valori del biennio
+2023-2024 e va aggiornata a ogni revisione mantenendo le stesse colonne. Tra un'età e l'altra
+il coefficiente è interpolato linearmente (come l'INPS fa per i mesi); fuori tavola vale
+quello dell'età più vicina.
+"""
+import csv
+from pathlib import Path
+
+import numpy as np
+
+from .batch import _mappa_categorie
+
+PERCORSO_COEFFICIENTI = Path(__file__).parent / "dati" / "coefficienti_trasformazione.csv"
+
+# Aliquota di computo per gestione: la quota dell'imponibile accreditata sul montante
+ALIQUOTE_COMPUTO = {
+    "Dipendente Privato": 0.33,
+    "Artigiani": 0.24,
+    "Commercianti": 0.2448,
+    "Autonomi": 0.25,
+    "Coltivatori Diretti": 0.24
+}
+ALIQUOTA_COMPUTO_DEFAULT = 0.33
+
+# Tasso annuo di rivalutazione del montante (ipotesi di lungo periodo)
+TASSO_RIVALUTAZIONE_DEFAULT = 0.02
+
+# Crescita annua della retribuzione nelle storie ricostruite da RAL e anni di contributi
+CRESCITA_RETRIBUZIONE = 0.01
+
+MENSILITA_PENSIONE = 13
+
+def carica_coefficienti_trasformazione(percorso=PERCORSO_COEFFICIENTI):
+    """Legge e valida la tavola. Ritorna un dict con 'eta' (array crescente) e 'coefficiente'."""
+    with open(percorso, newline='') as f:
+        righe = list(csv.DictReader(f))
+    if not righe:
+        raise ValueError(f"Tavola dei coefficienti vuota: {percorso}")
+
+    mancanti = {'eta', 'coefficiente'} - set(righe[0])
+    if mancanti:
+        raise ValueError(f"Colonne mancanti nella tavola dei coefficienti: {', '.join(sorted(mancanti))}")
+
+    righe.sort(key=lambda r: float(r['eta']))
+    eta = np.array([float(r['eta']) for r in righe])
+    if np.any(np.diff(eta) <= 0):
+        raise ValueError("Le età della tavola dei coefficienti devono essere uniche")
+
+    coefficiente = np.array([float(r['coefficiente']) for r in righe])
+    if np.any((coefficiente <= 0) | (coefficiente >= 1)):
+        raise ValueError("I coefficienti di trasformazione devono essere compresi tra 0 e 1")
+    return {'eta': eta, 'coefficiente': coefficiente}
+
+_coefficienti = None
+
+def coefficienti_trasformazione():
+    """Tavola dei coefficienti, caricata al primo utilizzo e poi condivisa."""
+    global _coefficienti
+    if _coefficienti is None:
+        _coefficienti = carica_coefficienti_trasformazione()
+    return _coefficienti
+
+def coefficiente_trasformazione(eta_uscita, coefficienti=None):
+    """Coefficiente per età di uscita (scalare o array, anche frazionaria)."""
+    coefficienti = coefficienti or coefficienti_trasformazione()
+    return np.interp(eta_uscita, coefficienti['eta'], coefficienti['coefficiente'])
+
+def storia_retributiva(ral, anni_contributi, anni_futuri=0, crescita=CRESCITA_RETRIBUZIONE):
+    """
+    Storia ricostruita quando manca l'estratto conto: `anni_contributi` anni fino a oggi con la
+    RAL attuale scontata della crescita, più `anni_futuri` anni fino all'uscita con la RAL che
+    cresce. Gli anni parziali pesano per la frazione lavorata.
+    Ritorna (retribuzioni dipendenti × anni, colonna dell'ultimo anno di ciascun dipendente).
+    """
+    ral = np.atleast_1d(np.asarray(ral, dtype=float))
+    passati = np.broadcast_to(np.asarray(anni_contributi, dtype=float), ral.shape)
+    futuri = np.broadcast_to(np.maximum(np.asarray(anni_futuri, dtype=float), 0), ral.shape)
+
+    anni_passati = int(np.ceil(passati.max(initial=0)))
+    anni = np.arange(-anni_passati, int(np.ceil(futuri.max(initial=0))))  # anni rispetto a oggi
+    quota = np.where(anni < 0, np.clip(passati[:, None] + anni + 1, 0, 1), np.clip(futuri[:, None] - anni, 0, 1))
+    retribuzioni = ral[:, None] * (1 + crescita) ** anni * quota
+    colonna_uscita = np.maximum(anni_passati + np.ceil(futuri).astype(np.int64) - 1, 0)
+    return retribuzioni, colonna_uscita
+
+def montante_contributivo(retribuzioni, tipo_contribuzione="Dipendente Privato",
+                          tasso_rivalutazione=TASSO_RIVALUTAZIONE_DEFAULT, montante_iniziale=0):
+    """
+    Montante a fine di ogni anno (array dipendenti × anni) per le storie `retribuzioni`.
+    `tasso_rivalutazione` è uno scalare, un array per anno o un array dipendenti × anni;
+    `montante_iniziale` il montante già maturato prima del primo anno della storia.
+    """
+    retribuzioni = np.nan_to_num(np.atleast_2d(np.asarray(retribuzioni, dtype=float)))
+    n = len(retribuzioni)
+    aliquote = _mappa_categorie(np.broadcast_to(np.asarray(tipo_contribuzione, dtype=object), (n,)),
+                                ALIQUOTE_COMPUTO, ALIQUOTA_COMPUTO_DEFAULT)
+    # Con un tasso uguale per tutti il prodotto cumulato è un solo vettore per anno
+    fattori = 1 + np.asarray(tasso_rivalutazione, dtype=float)
+    if fattori.ndim < 2:
+        fattori = np.broadcast_to(fattori, retribuzioni.shape[1:])
+    prodotto = np.cumprod(fattori, axis=-1)
+    contributi = retribuzioni * aliquote[:, None]
+    iniziale = np.asarray(montante_iniziale, dtype=float).reshape(-1, 1)
+    return prodotto * (np.cumsum(contributi / prodotto, axis=1) + iniziale)
+
+def calcola_pensione_contributiva_batch(retribuzioni, eta_uscita, tipo_contribuzione="Dipendente Privato",
+                                        tasso_rivalutazione=TASSO_RIVALUTAZIONE_DEFAULT, montante_iniziale=0,
+                                        colonna_uscita=None):
+    """
+    Pensione contributiva di tutta la forza lavoro. `colonna_uscita` è l'ultimo anno della storia
+    di ciascun dipendente (default: l'ultima colonna). Ritorna un dict di array, uno per
+    dipendente: montante, coefficiente, pensione_lorda_annua, pensione_lorda_mensile.
+    """
+    traiettoria = montante_contributivo(retribuzioni, tipo_contribuzione, tasso_rivalutazione, montante_iniziale)
+    if colonna_uscita is None:
+        montante = traiettoria[:, -1]
+    else:
+        colonna = np.broadcast_to(np.asarray(colonna_uscita, dtype=np.int64), (len(traiettoria),))
+        montante = np.take_along_axis(traiettoria, colonna[:, None], axis=1)[:, 0]
+    coefficiente = coefficiente_trasformazione(np.broadcast_to(np.asarray(eta_uscita, dtype=float), montante.shape))
+    pensione_annua = montante * coefficiente
+    return {
+        'montante': montante,
+        'coefficiente': coefficiente,
+        'pensione_lorda_annua': pensione_annua,
+        'pensione_lorda_mensile': pensione_annua / MENSILITA_PENSIONE
+    }
+
+def calcola_pensione_contributiva(retribuzioni, eta_uscita, tipo_contribuzione="Dipendente Privato",
+                                  tasso_rivalutazione=TASSO_RIVALUTAZIONE_DEFAULT, montante_iniziale=0):
+    """
+    Pensione contributiva di un dipendente dalla sua storia (un imponibile per anno, fino
+    all'uscita). Ritorna un dict di scalari come calcola_pensione_contributiva_batch, più
+    'montante_annuo' (il montante a fine di ogni anno).
+    """
+    traiettoria = montante_contributivo([retribuzioni], tipo_contribuzione, tasso_rivalutazione, montante_iniziale)[0]
+    coefficiente = float(coefficiente_trasformazione(eta_uscita))
+    pensione_annua = float(traiettoria[-1]) * coefficiente
+    return {
+        'montante': float(traiettoria[-1]),
+        'coefficiente': coefficiente,
+        'pensione_lorda_annua': pensione_annua,
+        'pensione_lorda_mensile': pensione_annua / MENSILITA_PENSIONE,
+        'montante_annuo': traiettoria
+    }
@@ -0,0 +1,128 @@
+"""
+Tempi per fase e profilazione di una rerun, senza debugger.
+
+Il codice strumentato delimita le fasi con `fase(nome)`. Senza una misura attiva `fase`
+ritorna un contesto vuoto condiviso: in produzione il costo è una lettura di ContextVar.
+Dentro `misura()` i tempi vengono raccolti nell'ordine di apertura, con le fasi annidate
+indicate per percorso ("⚖️ Incentivo Esodo/heatmap"). La misura è legata al contesto
+corrente: ogni sessione Streamlit esegue lo script nel proprio thread, quindi le sessioni
+non si mescolano.
+
+`profila()` esegue cProfile sul blocco e produce il profilo nel formato di pstats
+(leggibile con `python -m pstats` o snakeviz) più un riepilogo testuale.
+"""
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import marshal
+import pstats
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+_misura_attiva = contextvars.ContextVar('misura_attiva', default=None)
+_profilo_attivo = contextvars.ContextVar('profilo_attivo', default=None)
+_NESSUNA_FASE = nullcontext()
+
+# Righe del riepilogo testuale del profilo (funzioni ordinate per tempo cumulativo)
+RIGHE_RIEPILOGO_PROFILO = 40
+
+class Misura:
+    """Tempi delle fasi di un blocco: `fasi` è una lista di dict fase/livello/ms in ordine di apertura."""
+
+    def __init__(self):
+        self.fasi = []
+        self._percorso = []
+        self._inizio = time.perf_counter()
+        self.totale_ms = None
+
+    @contextmanager
+    def fase(self, nome):
+        self._percorso.append(nome)
+        voce = {'fase': "/".join(self._percorso), 'livello': len(self._percorso) - 1, 'ms': None}
+        self.fasi.append(voce)
+        inizio = time.perf_counter()
+        try:
+            yield
+        finally:
+            voce['ms'] = (time.perf_counter() - inizio) * 1000
+            self._percorso.pop()
+
+    def termina(self):
+        self.totale_ms = (time.perf_counter() - self._inizio) * 1000
+        # Fasi interrotte da un'eccezione: durata fino alla fine della misura
+        for voce in self.fasi:
+            if voce['ms'] is None:
+                voce['ms'] = self.totale_ms
+
+    def riepilogo(self, **contesto):
+        """Dict serializzabile in JSON: contesto, tempo totale e fasi."""
+        return {**contesto, 'totale_ms': round(self.totale_ms, 3),
+                'fasi': [{**voce, 'ms': round(voce['ms'], 3)} for voce in self.fasi]}
+
+def fase(nome):
+    """Contesto che misura la fase `nome` nella misura attiva (nessun effetto senza misura)."""
+    misura_attiva = _misura_attiva.get()
+    return _NESSUNA_FASE if misura_attiva is None else misura_attiva.fase(nome)
+
+@contextmanager
+def misura():
+    """Attiva la raccolta dei tempi per il blocco e produce la Misura."""
+    nuova = Misura()
+    token = _misura_attiva.set(nuova)
+    try:
+        yield nuova
+    finally:
+        nuova.termina()
+        _misura_attiva.reset(token)
+
+@contextmanager
+def profila(righe=RIGHE_RIEPILOGO_PROFILO):
+    """
+    Esegue cProfile sul blocco. Produce un dict riempito all'uscita con 'dati' (bytes nel
+    formato di pstats.dump_stats) e 'testo' (le `righe` funzioni con tempo cumulativo maggiore).
+    """
+    risultato = {}
+    profiler = cProfile.Profile()
+    token = _profilo_attivo.set(profiler)
+    profiler.enable()
+    try:
+        yield risultato
+    finally:
+        profiler.disable()
+        _profilo_attivo.reset(token)
+        testo = io.StringIO()
+        statistiche = pstats.Stats(profiler, stream=testo)
+        statistiche.sort_stats('cumulative').print_stats(righe)
+        risultato['dati'] = marshal.dumps(statistiche.stats)
+        risultato['testo'] = testo.getvalue()
+
+def interrompi_attive():
+    """
+    Chiude misura e profilo rimasti attivi nel contesto corrente: una rerun interrotta
+    (nuova interazione, eccezione) non esce dai propri blocchi e lascerebbe cProfile acceso.
+    """
+    profiler = _profilo_attivo.get()
+    if profiler is not None:
+        profiler.disable()
+        _profilo_attivo.set(None)
+    _misura_attiva.set(None)
+
+def configura_log(livello=logging.INFO):
+    """Una riga JSON per evento su stderr, se l'applicazione non ha configurato altri handler."""
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(livello)
+
+def registra_json(evento, misura_terminata, **contesto):
+    """Emette il riepilogo di una misura come log JSON strutturato."""
+    logger.info(json.dumps(
+        {'evento': evento, 'ora': time.time(), **misura_terminata.riepilogo(**contesto)}, ensure_ascii=False
+    ))
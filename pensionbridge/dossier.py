@@ -0,0 +1,338 @@
+"""
+Esportazione massiva dei dossier individuali per i tavoli di negoziazione.
+
+Da un file della forza lavoro si ottiene un dossier per dipendente con il riepilogo delle
+schede 1–5 (pensione, strumenti di sostegno, incentivo, costi aziendali, proiezione degli anni
+extra), il grafico della composizione dell'incentivo e quello del confronto regionale.
+
+Formati:
+- html: pagina stampabile (stampa in PDF dal browser, un dossier per pagina); plotly.js e i
+  modelli delle figure (layout, tema, tracce) stanno in un unico script condiviso scritto una
+  volta sola, ogni dossier contiene solo i propri dati;
+- xlsx: una cartella di lavoro per dipendente (fogli Dossier, Regioni, Proiezione); scritta con
+  openpyxl (tra i requisiti) o xlsxwriter.
+
+I dipendenti sono divisi in blocchi: ogni blocco è valutato con calcola_scenari_batch (e un'unica
+chiamata vettoriale per dipendenti × regioni) e reso in un pool di processi. I dossier pronti
+sono scritti subito in una directory o in uno zip e in volo ci sono al massimo due blocchi per
+processo, quindi la memoria non cresce con il numero di dipendenti.
+
+Esempio:
+    python -m pensionbridge.dossier dipendenti.csv dossier.zip --colonna-id matricola
+"""
+import argparse
+import html
+import importlib.util
+import json
+import os
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from string import Template
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+
+from .batch import (
+    COLONNE_BATCH_DEFAULT,
+    calcola_incentivo_esodo_regionale_batch,
+    calcola_scenari_batch,
+    stima_pensione_netta_batch,
+)
+from .calendario import data_riferimento
+from .risorse import REGIONI, layout_grafici
+from .scenario import ANNI_EXTRA_PROIEZIONE
+
+FORMATI = ('html', 'xlsx')
+
+DIMENSIONE_BLOCCO_DEFAULT = 50
+
+# Script condiviso dai dossier html: plotly.js più i modelli delle figure
+FILE_SCRIPT = "pensionbridge_dossier.js"
+
+PAGINA = Template("""<!DOCTYPE html>
+<html lang="it"><head><meta charset="utf-8"><title>Dossier $titolo</title>
+<script src="$script"></script>
+<style>
+body{font-family:sans-serif;margin:2em;color:#222}
+h1{font-size:1.5em}h2{font-size:1.1em;margin-top:1.5em;border-bottom:1px solid #ccc}
+table{border-collapse:collapse}td,th{padding:.2em .8em;text-align:left}td.v{text-align:right}
+.figure{display:flex;flex-wrap:wrap}.figure div{width:480px;height:360px}
+@media print{body{margin:0}h2{break-after:avoid}.figure{break-inside:avoid}}
+</style></head><body>
+<h1>Dossier $titolo</h1>
+$sezioni
+<div class="figure"><div id="composizione"></div><div id="regioni"></div></div>
+<script>
+disegna("composizione", $composizione);
+disegna("regioni", $regioni);
+</script>
+</body></html>
+""")
+
+def _euro(valore):
+    return f"€ {valore:,.2f}"
+
+def _data(valore):
+    return pd.Timestamp(valore).strftime("%d/%m/%Y")
+
+def _modelli_figure():
+    """
+    Layout e tracce delle figure, costruiti una volta: per ogni dossier cambiano solo i
+    valori (le fette della torta, le barre delle regioni).
+    """
+    layout = layout_grafici()
+    composizione = go.Figure(data=[go.Pie(
+        labels=['Copertura Gap Salariale', 'Valore Tempo Libero'], values=[0, 0], hole=.3, sort=False
+    )], layout=layout['composizione'])
+    regioni = go.Figure(data=[go.Bar(x=REGIONI, y=[0] * len(REGIONI), marker_color="#636efa")],
+                        layout=layout['regioni'])
+    modelli = {}
+    for nome, figura in (('composizione', composizione), ('regioni', regioni)):
+        json_figura = json.loads(figura.to_json())
+        modelli[nome] = {'traccia': json_figura['data'][0], 'layout': json_figura['layout']}
+    return modelli
+
+def script_condiviso():
+    """Contenuto di FILE_SCRIPT: plotly.js, i modelli delle figure e la funzione che le disegna."""
+    return (
+        get_plotlyjs()
+        + "\nconst MODELLI = " + json.dumps(_modelli_figure(), separators=(',', ':')) + ";\n"
+        + "function disegna(id, dati) {\n"
+        + "  const modello = MODELLI[id];\n"
+        + "  Plotly.newPlot(id, [Object.assign({}, modello.traccia, dati)], modello.layout,\n"
+        + "                 {displaylogo: false, staticPlot: true});\n"
+        + "}\n"
+    )
+
+def _colonna_input(blocco, nome):
+    if nome in blocco:
+        return np.asarray(blocco[nome])
+    return np.full(len(blocco), COLONNE_BATCH_DEFAULT[nome])
+
+def _valuta_blocco(blocco, oggi):
+    """Scenari del blocco, incentivo in ogni regione (dipendenti × REGIONI) e proiezione degli anni extra."""
+    risultati = calcola_scenari_batch(blocco, oggi)
+    ral = np.asarray(blocco['ral'], dtype=float)
+    naspi = risultati['naspi_mensile'].to_numpy()
+    ape = np.where(risultati['ape_ammissibile'].to_numpy(dtype=bool), risultati['ape_importo'].to_numpy(), 0.0)
+    incentivi_regionali = calcola_incentivo_esodo_regionale_batch(
+        ral[:, None], risultati['mesi_mancanti'].to_numpy()[:, None], np.array(REGIONI)[None, :],
+        naspi[:, None], ape[:, None]
+    )['incentivo_totale']
+
+    anni_extra = np.asarray(ANNI_EXTRA_PROIEZIONE)
+    proiezione = stima_pensione_netta_batch(
+        ral[:, None] * 1.01 ** anni_extra, np.asarray(blocco['anni_contributi'], dtype=float)[:, None] + anni_extra,
+        _colonna_input(blocco, 'tipo_contribuzione')[:, None], np.asarray(blocco['regione'])[:, None]
+    )
+    return risultati, incentivi_regionali, proiezione
+
+def _voci(dipendente, scenario):
+    """Righe (sezione, voce, valore, testo) del dossier, le stesse per tutti i formati."""
+    stipendio = scenario['stipendio_netto_mensile']
+    copertura = scenario['copertura_mensile']
+    incentivo = scenario['incentivo_proposto']
+    risparmio = scenario['risparmio_aziendale']
+    voci = [
+        ("Dipendente", "Età", dipendente['eta'], f"{dipendente['eta']:g} anni"),
+        ("Dipendente", "Anni di contributi", dipendente['anni_contributi'], f"{dipendente['anni_contributi']:g}"),
+        ("Dipendente", "Sesso", dipendente['sesso'], dipendente['sesso']),
+        ("Dipendente", "RAL", dipendente['ral'], _euro(dipendente['ral'])),
+        ("Dipendente", "Regione", dipendente['regione'], dipendente['regione']),
+        ("Analisi Pensionistica", "Data prima uscita utile", scenario['data_target'], _data(scenario['data_target'])),
+        ("Analisi Pensionistica", "Pensione di vecchiaia", scenario['data_vecchiaia'],
+         _data(scenario['data_vecchiaia'])),
+        ("Analisi Pensionistica", "Pensione anticipata", scenario['data_anticipata'],
+         _data(scenario['data_anticipata'])),
+        ("Analisi Pensionistica", "Mesi alla pensione", scenario['mesi_mancanti'], f"{scenario['mesi_mancanti']}"),
+        ("Analisi Pensionistica", "Pensione netta stimata (mese)", scenario['pensione_stimata'],
+         _euro(scenario['pensione_stimata'])),
+        ("Analisi Pensionistica", "Ultimo stipendio netto (mese)", stipendio, _euro(stipendio)),
+        ("Strumenti di Sostegno", "NASPI (mese)", scenario['naspi_mensile'], _euro(scenario['naspi_mensile'])),
+        ("Strumenti di Sostegno", "Durata NASPI (mesi)", scenario['durata_naspi'], f"{scenario['durata_naspi']:.0f}"),
+        ("Strumenti di Sostegno", "APE Sociale (mese)", scenario['ape_importo'] if scenario['ape_ammissibile'] else 0.0,
+         _euro(scenario['ape_importo']) if scenario['ape_ammissibile'] else scenario['ape_messaggio']),
+        ("Strumenti di Sostegno", "R.I.T.A. (mese)", scenario['rita_mensile'] if scenario['rita_disponibile'] else 0.0,
+         _euro(scenario['rita_mensile']) if scenario['rita_disponibile'] else scenario['rita_messaggio']),
+        ("Strumenti di Sostegno", "Copertura mensile totale", copertura, _euro(copertura)),
+        ("Strumenti di Sostegno", "Copertura vs stipendio",
+         copertura / stipendio if stipendio > 0 else 0.0, f"{copertura / stipendio if stipendio > 0 else 0.0:.1%}"),
+        ("Incentivo all'Esodo", "Gap mensile", scenario['gap_mensile'], _euro(scenario['gap_mensile'])),
+        ("Incentivo all'Esodo", "Fattore regionale", scenario['fattore_regionale'],
+         f"{scenario['fattore_regionale']:.2f}x"),
+        ("Incentivo all'Esodo", "Incentivo base (copertura gap)", scenario['incentivo_base'],
+         _euro(scenario['incentivo_base'])),
+        ("Incentivo all'Esodo", "Valore tempo libero", scenario['valore_tempo'], _euro(scenario['valore_tempo'])),
+        ("Incentivo all'Esodo", "Incentivo suggerito", scenario['incentivo_totale'],
+         _euro(scenario['incentivo_totale'])),
+        ("Incentivo all'Esodo", "Incentivo proposto", incentivo, _euro(incentivo)),
+        ("Incentivo all'Esodo", "Incentivo proposto al netto", scenario['incentivo_netto'],
+         _euro(scenario['incentivo_netto'])),
+        ("Analisi Aziendale", "Costo totale mantenimento", scenario['costo_totale_mantenimento'],
+         _euro(scenario['costo_totale_mantenimento'])),
+        ("Analisi Aziendale", "Incentivo da erogare", incentivo, _euro(incentivo)),
+        ("Analisi Aziendale", "Risparmio aziendale", risparmio, _euro(risparmio)),
+    ]
+    if incentivo > 0:
+        voci.append(("Analisi Aziendale", "ROI", risparmio / incentivo, f"{risparmio / incentivo:.1%}"))
+    return voci
+
+def _html(titolo, voci, incentivi_regionali, proiezione, scenario):
+    sezioni = []
+    for sezione in dict.fromkeys(s for s, _, _, _ in voci):
+        righe = "".join(f'<tr><td>{html.escape(voce)}</td><td class="v">{html.escape(str(testo))}</td></tr>'
+                        for s, voce, _, testo in voci if s == sezione)
+        sezioni.append(f"<h2>{html.escape(sezione)}</h2><table>{righe}</table>")
+    righe = "".join(f'<tr><td>{a}</td><td class="v">{_euro(p)}</td><td class="v">{_euro(p - proiezione[0])}</td></tr>'
+                    for a, p in zip(ANNI_EXTRA_PROIEZIONE, proiezione.tolist()))
+    sezioni.append("<h2>Strategia Temporale</h2><table><tr><th>Anni extra di lavoro</th>"
+                   f"<th>Pensione stimata</th><th>Incremento mensile</th></tr>{righe}</table>")
+    return PAGINA.substitute(
+        titolo=html.escape(titolo), script=FILE_SCRIPT, sezioni="\n".join(sezioni),
+        composizione=json.dumps({'values': [round(scenario['incentivo_base'], 2), round(scenario['valore_tempo'], 2)]}),
+        regioni=json.dumps({'y': np.round(incentivi_regionali, 2).tolist()})
+    ).encode()
+
+def _xlsx(voci, incentivi_regionali, proiezione):
+    contenuto = BytesIO()
+    with pd.ExcelWriter(contenuto) as scrittore:
+        pd.DataFrame([(s, v, valore) for s, v, valore, _ in voci], columns=['Sezione', 'Voce', 'Valore']) \
+            .to_excel(scrittore, sheet_name='Dossier', index=False)
+        pd.DataFrame({'Regione': REGIONI, 'Incentivo (€)': incentivi_regionali}) \
+            .to_excel(scrittore, sheet_name='Regioni', index=False)
+        pd.DataFrame({
+            'Anni Extra Lavoro': ANNI_EXTRA_PROIEZIONE, 'Pensione Stimata (€)': proiezione,
+            'Incremento Mensile (€)': proiezione - proiezione[0]
+        }).to_excel(scrittore, sheet_name='Proiezione', index=False)
+    return contenuto.getvalue()
+
+def _nome_file(identificativo):
+    return re.sub(r'[^\w.-]+', '_', str(identificativo)).strip('_') or 'dipendente'
+
+def _dossier_blocco(blocco, oggi, formato, colonna_id):
+    """
+    Valuta e rende un blocco di dipendenti (nel worker). Ritorna [(nome, riga, contenuto), ...]
+    con il nome del file senza estensione e l'indice della riga nei dati.
+    """
+    risultati, incentivi_regionali, proiezione = _valuta_blocco(blocco, oggi)
+    identificativi = blocco[colonna_id].tolist() if colonna_id else blocco.index.tolist()
+    righe = blocco.index.tolist()
+    dossier = []
+    for i, (dipendente, scenario) in enumerate(zip(blocco.to_dict('records'), risultati.to_dict('records'))):
+        voci = _voci(dipendente, scenario)
+        nome = f"dossier_{_nome_file(identificativi[i])}"
+        if formato == 'html':
+            titolo = f"{colonna_id} {identificativi[i]}" if colonna_id else f"dipendente {identificativi[i]}"
+            dossier.append((nome, righe[i], _html(titolo, voci, incentivi_regionali[i], proiezione[i], scenario)))
+        else:
+            dossier.append((nome, righe[i], _xlsx(voci, incentivi_regionali[i], proiezione[i])))
+    return dossier
+
+def _nomi_unici(dossier, formato):
+    """
+    (nome file, contenuto) con nomi distinti: un identificativo già usato (colonna_id duplicata o
+    due valori che _nome_file rende uguali) prende l'indice della riga come suffisso, così nessun
+    dossier sovrascrive un altro file o duplica un membro dello zip.
+    """
+    usati = {FILE_SCRIPT}
+    for nome, riga, contenuto in dossier:
+        unico, ripetizione = f"{nome}.{formato}", 0
+        while unico in usati:
+            unico = f"{nome}_{riga}.{formato}" if ripetizione == 0 else f"{nome}_{riga}_{ripetizione}.{formato}"
+            ripetizione += 1
+        usati.add(unico)
+        yield unico, contenuto
+
+def _blocchi(dati, dimensione_blocco):
+    if isinstance(dati, pd.DataFrame):
+        for inizio in range(0, len(dati), dimensione_blocco):
+            yield dati.iloc[inizio:inizio + dimensione_blocco]
+    else:
+        yield from dati
+
+def _dossier(blocchi, oggi, formato, colonna_id, processi):
+    """Dossier pronti nell'ordine dei blocchi, con al massimo 2 × processi blocchi in volo."""
+    if processi <= 1:
+        for blocco in blocchi:
+            yield from _dossier_blocco(blocco, oggi, formato, colonna_id)
+        return
+    with ProcessPoolExecutor(max_workers=processi) as pool:
+        in_volo = deque()
+        for blocco in blocchi:
+            in_volo.append(pool.submit(_dossier_blocco, blocco, oggi, formato, colonna_id))
+            if len(in_volo) >= 2 * processi:
+                yield from in_volo.popleft().result()
+        while in_volo:
+            yield from in_volo.popleft().result()
+
+def esporta_dossier(dati, destinazione, formato='html', colonna_id=None, oggi=None, processi=None,
+                    dimensione_blocco=DIMENSIONE_BLOCCO_DEFAULT):
+    """
+    Scrive un dossier per dipendente.
+
+    `dati` è un DataFrame della forza lavoro (stesse colonne di calcola_scenari_batch) o un
+    iterabile di DataFrame a blocchi (es. pd.read_csv con chunksize). `destinazione` è un
+    percorso .zip, un file-like (zip scritto in streaming) o una directory. `colonna_id`
+    dà il nome ai file (default: l'indice della riga; gli identificativi ripetuti prendono l'indice
+    della riga come suffisso); `processi` è il numero di worker
+    (default: CPU disponibili, 1 = nessun pool).
+    Ritorna il numero di dossier scritti.
+    """
+    if formato not in FORMATI:
+        raise ValueError(f"Formato non supportato: {formato} (ammessi: {', '.join(FORMATI)})")
+    if formato == 'xlsx' and not any(importlib.util.find_spec(m) for m in ('openpyxl', 'xlsxwriter')):
+        raise ImportError("L'esportazione xlsx richiede openpyxl o xlsxwriter")
+    oggi = data_riferimento(oggi)
+    processi = processi or os.cpu_count() or 1
+    dossier = _nomi_unici(_dossier(_blocchi(dati, dimensione_blocco), oggi, formato, colonna_id, processi), formato)
+
+    scritti = 0
+    if hasattr(destinazione, 'write') or Path(destinazione).suffix.lower() == '.zip':
+        with zipfile.ZipFile(destinazione, 'w', zipfile.ZIP_DEFLATED) as archivio:
+            if formato == 'html':
+                archivio.writestr(FILE_SCRIPT, script_condiviso())
+            for nome, contenuto in dossier:
+                archivio.writestr(nome, contenuto)
+                scritti += 1
+    else:
+        directory = Path(destinazione)
+        directory.mkdir(parents=True, exist_ok=True)
+        if formato == 'html':
+            (directory / FILE_SCRIPT).write_text(script_condiviso(), encoding='utf-8')
+        for nome, contenuto in dossier:
+            (directory / nome).write_bytes(contenuto)
+            scritti += 1
+    return scritti
+
+def main(argv=None):
+    from .cli import TIPI_COLONNE
+
+    parser = argparse.ArgumentParser(prog="pensionbridge.dossier",
+                                     description="Un dossier stampabile per dipendente, da un CSV della forza lavoro.")
+    parser.add_argument("input", help="CSV dei dipendenti (stesso formato del batch HR)")
+    parser.add_argument("output", help="File .zip o directory dei dossier")
+    parser.add_argument("--formato", choices=FORMATI, default='html', help="html (stampabile in PDF) o xlsx")
+    parser.add_argument("--colonna-id", default=None, help="Colonna che dà il nome ai dossier (es. matricola)")
+    parser.add_argument("--processi", type=int, default=None, help="Worker del pool (default: CPU disponibili)")
+    parser.add_argument("--dimensione-blocco", type=int, default=DIMENSIONE_BLOCCO_DEFAULT,
+                        help=f"Dipendenti per blocco di lavoro (default: {DIMENSIONE_BLOCCO_DEFAULT})")
+    parser.add_argument("--data-riferimento", default=None, metavar="AAAA-MM-GG",
+                        help="Data di riferimento dei calcoli (default: oggi)")
+    args = parser.parse_args(argv)
+
+    tipi = dict(TIPI_COLONNE, **({args.colonna_id: 'str'} if args.colonna_id else {}))
+    with pd.read_csv(args.input, chunksize=args.dimensione_blocco, dtype=tipi) as blocchi:
+        scritti = esporta_dossier(blocchi, args.output, args.formato, args.colonna_id,
+                                  args.data_riferimento, args.processi)
+    print(f"Scritti {scritti} dossier in {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
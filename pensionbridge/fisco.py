@@ -0,0 +1,185 @@
+"""
+Dal lordo al netto: IRPEF a scaglioni, detrazioni, addizionali regionali e comunali e
+tassazione separata dell'incentivo all'esodo.
+
+Ogni tabella (scaglioni IRPEF, detrazioni, addizionali per regione) è compilata all'import in
+una funzione lineare a tratti: soglie di inizio dei tratti, valore all'inizio e pendenza di
+ciascun tratto. Il tratto di ogni importo si trova con np.searchsorted, quindi un'intera
+busta paga aziendale (o una griglia percorsi × anni) si tassa con un'unica chiamata vettoriale;
+gli scalari passano per la stessa strada e restituiscono scalari.
+
+- stipendio: imponibile = lordo al netto dei contributi a carico del dipendente, detrazioni
+  per lavoro dipendente;
+- pensione: nessun contributo, detrazioni per redditi da pensione;
+- addizionali: regionale a scaglioni e comunale (aliquota media dei comuni della regione),
+  dovute solo se l'IRPEF netta è positiva; regioni sconosciute o non indicate usano la media
+  nazionale;
+- incentivo all'esodo: tassazione separata all'aliquota media IRPEF del reddito di
+  riferimento, senza addizionali e senza detrazioni.
+
+Aliquote e soglie sono quelle 2025 arrotondate (addizionali: valori indicativi); vanno
+aggiornate insieme alle regole annuali.
+"""
+import numpy as np
+
+MENSILITA = 13
+
+# Quota dei contributi previdenziali a carico del dipendente
+CONTRIBUTI_DIPENDENTE = 0.0919
+
+# Scaglioni IRPEF: soglia di inizio -> aliquota
+SCAGLIONI_IRPEF = {0: 0.23, 28000: 0.35, 50000: 0.43}
+
+# Detrazioni (art. 13 TUIR): soglia di inizio -> (valore a inizio tratto, pendenza)
+DETRAZIONI_LAVORO = {
+    0: (1955, 0.0),
+    15000: (3100, -1190 / 13000),
+    28000: (1910, -1910 / 22000),
+    50000: (0, 0.0)
+}
+DETRAZIONI_PENSIONE = {
+    0: (1955, 0.0),
+    8500: (1955, -1255 / 19500),
+    28000: (700, -700 / 22000),
+    50000: (0, 0.0)
+}
+
+# Addizionale regionale: aliquote per scaglione, sulle stesse soglie per tutte le regioni
+SOGLIE_ADDIZIONALE_REGIONALE = (0, 15000, 28000, 50000)
+ADDIZIONALE_REGIONALE = {
+    "Abruzzo": (0.0167, 0.0287, 0.0333, 0.0333),
+    "Basilicata": (0.0123, 0.0173, 0.0233, 0.0233),
+    "Calabria": (0.0203, 0.0203, 0.0203, 0.0203),
+    "Campania": (0.0203, 0.0203, 0.0203, 0.0203),
+    "Emilia-Romagna": (0.0133, 0.0193, 0.0293, 0.0333),
+    "Friuli-Venezia Giulia": (0.0070, 0.0123, 0.0123, 0.0123),
+    "Lazio": (0.0173, 0.0173, 0.0333, 0.0333),
+    "Liguria": (0.0123, 0.0179, 0.0231, 0.0233),
+    "Lombardia": (0.0123, 0.0158, 0.0172, 0.0173),
+    "Marche": (0.0123, 0.0153, 0.0170, 0.0173),
+    "Molise": (0.0203, 0.0223, 0.0243, 0.0263),
+    "Piemonte": (0.0162, 0.0213, 0.0275, 0.0333),
+    "Puglia": (0.0133, 0.0143, 0.0163, 0.0185),
+    "Sardegna": (0.0123, 0.0123, 0.0123, 0.0123),
+    "Sicilia": (0.0123, 0.0123, 0.0123, 0.0123),
+    "Toscana": (0.0142, 0.0143, 0.0332, 0.0333),
+    "Trentino-Alto Adige": (0.0123, 0.0123, 0.0123, 0.0123),
+    "Umbria": (0.0123, 0.0163, 0.0168, 0.0183),
+    "Valle d'Aosta": (0.0123, 0.0123, 0.0123, 0.0123),
+    "Veneto": (0.0123, 0.0123, 0.0123, 0.0123)
+}
+ADDIZIONALE_REGIONALE_DEFAULT = (0.0150, 0.0170, 0.0210, 0.0230)
+
+# Addizionale comunale: aliquota media dei comuni della regione
+ADDIZIONALE_COMUNALE = {
+    "Abruzzo": 0.0070, "Basilicata": 0.0060, "Calabria": 0.0075, "Campania": 0.0080,
+    "Emilia-Romagna": 0.0070, "Friuli-Venezia Giulia": 0.0050, "Lazio": 0.0085,
+    "Liguria": 0.0075, "Lombardia": 0.0065, "Marche": 0.0065, "Molise": 0.0070,
+    "Piemonte": 0.0080, "Puglia": 0.0075, "Sardegna": 0.0045, "Sicilia": 0.0070,
+    "Toscana": 0.0070, "Trentino-Alto Adige": 0.0030, "Umbria": 0.0070,
+    "Valle d'Aosta": 0.0030, "Veneto": 0.0060
+}
+ADDIZIONALE_COMUNALE_DEFAULT = 0.0068
+
+# Regioni (gli stessi nomi di COSTO_VITA_REGIONALE) in ordine di indice: l'indice
+# len(REGIONI_FISCALI) è la media nazionale
+REGIONI_FISCALI = sorted(ADDIZIONALE_REGIONALE)
+INDICE_REGIONE_FISCALE = {regione: i for i, regione in enumerate(REGIONI_FISCALI)}
+INDICE_REGIONE_DEFAULT = len(REGIONI_FISCALI)
+
+def _compila(soglie, pendenze, valori_iniziali=None):
+    """
+    Tabella lineare a tratti (soglie, valori a inizio tratto, pendenze), una riga per tabella.
+    Senza valori iniziali è un'imposta a scaglioni: il valore a inizio tratto è l'imposta
+    cumulata degli scaglioni precedenti.
+    """
+    soglie = np.asarray(soglie, dtype=float)
+    pendenze = np.atleast_2d(np.asarray(pendenze, dtype=float))
+    if valori_iniziali is None:
+        valori_iniziali = np.zeros_like(pendenze)
+        valori_iniziali[:, 1:] = np.cumsum(pendenze[:, :-1] * np.diff(soglie), axis=1)
+    return soglie, np.atleast_2d(np.asarray(valori_iniziali, dtype=float)), pendenze
+
+def _valuta(tabella, importo, riga=0):
+    """Valore della tabella per `importo` (≥ 0) sulle righe `riga`, con un solo searchsorted."""
+    soglie, valori_iniziali, pendenze = tabella
+    tratto = np.maximum(np.searchsorted(soglie, importo, side='right') - 1, 0)
+    return valori_iniziali[riga, tratto] + pendenze[riga, tratto] * (importo - soglie[tratto])
+
+TABELLA_IRPEF = _compila(list(SCAGLIONI_IRPEF), list(SCAGLIONI_IRPEF.values()))
+TABELLA_DETRAZIONI_LAVORO = _compila(
+    list(DETRAZIONI_LAVORO), [p for _, p in DETRAZIONI_LAVORO.values()], [v for v, _ in DETRAZIONI_LAVORO.values()]
+)
+TABELLA_DETRAZIONI_PENSIONE = _compila(
+    list(DETRAZIONI_PENSIONE), [p for _, p in DETRAZIONI_PENSIONE.values()],
+    [v for v, _ in DETRAZIONI_PENSIONE.values()]
+)
+TABELLA_ADDIZIONALE_REGIONALE = _compila(
+    SOGLIE_ADDIZIONALE_REGIONALE,
+    [ADDIZIONALE_REGIONALE.get(r, ADDIZIONALE_REGIONALE_DEFAULT) for r in REGIONI_FISCALI]
+    + [ADDIZIONALE_REGIONALE_DEFAULT]
+)
+ALIQUOTE_COMUNALI = np.array(
+    [ADDIZIONALE_COMUNALE.get(r, ADDIZIONALE_COMUNALE_DEFAULT) for r in REGIONI_FISCALI]
+    + [ADDIZIONALE_COMUNALE_DEFAULT]
+)
+
+def indice_regione_fiscale(regione):
+    """
+    Indice delle tabelle regionali: None o regioni sconosciute -> media nazionale.
+    Accetta un nome, un array di nomi o un array di indici già calcolati (interi).
+    """
+    if regione is None:
+        return INDICE_REGIONE_DEFAULT
+    if isinstance(regione, str):
+        return INDICE_REGIONE_FISCALE.get(regione, INDICE_REGIONE_DEFAULT)
+    regione = np.asarray(regione)
+    if np.issubdtype(regione.dtype, np.integer):
+        return regione
+    uniche, inverso = np.unique(regione.astype(str), return_inverse=True)
+    lookup = np.array([INDICE_REGIONE_FISCALE.get(r, INDICE_REGIONE_DEFAULT) for r in uniche.tolist()])
+    return lookup[inverso.reshape(regione.shape)]
+
+def imposta_irpef(imponibile):
+    """IRPEF lorda a scaglioni (prima delle detrazioni)."""
+    return _valuta(TABELLA_IRPEF, np.maximum(imponibile, 0))
+
+def addizionali(imponibile, regione=None):
+    """Addizionale regionale (a scaglioni) più comunale (aliquota media della regione)."""
+    imponibile = np.maximum(imponibile, 0)
+    riga = indice_regione_fiscale(regione)
+    return _valuta(TABELLA_ADDIZIONALE_REGIONALE, imponibile, riga) + imponibile * ALIQUOTE_COMUNALI[riga]
+
+def netto_annuo(lordo, regione=None, pensione=False):
+    """
+    Netto annuo da un lordo annuo (RAL o pensione lorda), scalare o array di qualunque forma;
+    `regione` è un nome, un array di nomi broadcastabile con `lordo` o None (media nazionale).
+    """
+    lordo = np.asarray(lordo, dtype=float)
+    if pensione:
+        imponibile, detrazioni = lordo, TABELLA_DETRAZIONI_PENSIONE
+    else:
+        imponibile, detrazioni = lordo * (1 - CONTRIBUTI_DIPENDENTE), TABELLA_DETRAZIONI_LAVORO
+    imponibile = np.maximum(imponibile, 0)
+    irpef = np.maximum(imposta_irpef(imponibile) - _valuta(detrazioni, imponibile), 0)
+    # Sotto la no tax area (IRPEF netta nulla) le addizionali non sono dovute
+    addizionali_dovute = np.where(irpef > 0, addizionali(imponibile, regione), 0)
+    return imponibile - irpef - addizionali_dovute
+
+def stipendio_netto_mensile(ral, regione=None):
+    """Stipendio netto mensile (13 mensilità) dalla RAL."""
+    return netto_annuo(ral, regione) / MENSILITA
+
+def pensione_netta_mensile(pensione_lorda_annua, regione=None):
+    """Pensione netta mensile (13 mensilità) dalla pensione lorda annua."""
+    return netto_annuo(pensione_lorda_annua, regione, pensione=True) / MENSILITA
+
+def aliquota_tassazione_separata(ral):
+    """Aliquota media IRPEF del reddito di riferimento (l'imponibile da lavoro della RAL)."""
+    imponibile = np.maximum(np.asarray(ral, dtype=float) * (1 - CONTRIBUTI_DIPENDENTE), 0)
+    return np.where(imponibile > 0, imposta_irpef(imponibile) / np.where(imponibile > 0, imponibile, 1), 0.0)
+
+def incentivo_netto(incentivo, ral):
+    """Incentivo all'esodo al netto della tassazione separata (un incentivo negativo non è tassato)."""
+    incentivo = np.asarray(incentivo, dtype=float)
+    return incentivo - np.maximum(incentivo, 0) * aliquota_tassazione_separata(ral)
@@ -0,0 +1,195 @@
+"""
+Grafici sull'intera forza lavoro: dispersione di decine di migliaia di dipendenti e bande
+mensili della timeline.
+
+- Dispersione: tracce WebGL (Scattergl). Oltre MASSIMO_PUNTI i punti sono sfoltiti lato
+  server su una griglia: ogni cella tiene al più k punti (k il massimo che rientra nel
+  limite), quindi le zone dense vengono diradate mentre i punti isolati restano tutti.
+- Bande della timeline: per ogni mese la distribuzione della copertura mensile dei dipendenti
+  in uscita è accumulata in un istogramma, blocco per blocco, e i percentili sono letti
+  dall'istogramma cumulato: la memoria non dipende dal numero di dipendenti.
+
+Le figure sono serializzate in JSON una volta e tenute in una CacheLRU condivisa tra le
+sessioni, con chiave l'impronta (hash) degli input: a una rerun con gli stessi dati non
+si ricalcolano né aggregazioni né layout.
+"""
+import hashlib
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from .cache import CacheLRU
+from .timeline import _argomenti_timeline, costruisci_timeline_batch
+
+# Punti per traccia WebGL oltre cui la dispersione viene sfoltita
+MASSIMO_PUNTI = 20000
+
+# Celle per asse della griglia di sfoltimento
+CELLE_GRIGLIA = 128
+
+# Classi dell'istogramma mensile delle bande
+CLASSI_BANDE = 256
+
+PERCENTILI_BANDE = (10, 25, 50, 75, 90)
+
+# Colonne di calcola_scenari_batch da cui dipendono le bande della timeline
+COLONNE_TIMELINE = (
+    'stipendio_netto_mensile', 'mesi_mancanti', 'naspi_mensile', 'durata_naspi', 'ape_importo',
+    'ape_ammissibile', 'rita_mensile', 'rita_disponibile', 'anni_a_pensione', 'pensione_stimata'
+)
+
+_cache_figure = CacheLRU(dimensione_massima=32)
+
+def statistiche_cache_grafici():
+    """Contatori hit/miss/evizioni della cache delle figure."""
+    return _cache_figure.statistiche()
+
+def _impronta(*parti):
+    """Hash degli input di una figura: array per contenuto, dtype e forma; il resto per repr."""
+    h = hashlib.blake2b(digest_size=16)
+    for parte in parti:
+        if isinstance(parte, np.ndarray) or hasattr(parte, 'to_numpy'):
+            array = np.ascontiguousarray(np.asarray(parte))
+            if array.dtype == object:
+                array = array.astype(str)
+            h.update(f"{array.dtype}{array.shape}".encode())
+            h.update(array.tobytes())
+        else:
+            h.update(repr(parte).encode())
+        h.update(b"|")
+    return h.hexdigest()
+
+def _in_cache(nome, parti, costruisci):
+    """JSON della figura `nome` per gli input `parti`, costruita solo se non già in cache."""
+    return _cache_figure.ottieni((nome, _impronta(*parti)),
+                                 lambda: pio.to_json(costruisci(), validate=False))
+
+def sfoltisci(x, y, massimo_punti=MASSIMO_PUNTI, celle=CELLE_GRIGLIA, seme=0):
+    """
+    Indici (ordinati) di al più `massimo_punti` punti rappresentativi di (x, y).
+    Su una griglia celle × celle ogni cella conserva al più k punti scelti a caso (con seme
+    fisso), con k il massimo per cui il totale resta nel limite; ogni cella occupata conserva
+    comunque almeno un punto.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= massimo_punti:
+        return np.arange(n)
+
+    def cella(v):
+        minimo, massimo = np.nanmin(v), np.nanmax(v)
+        scala = (celle - 1) / (massimo - minimo) if massimo > minimo else 0.0
+        return np.nan_to_num((v - minimo) * scala).astype(np.int64)
+
+    celle_punti = cella(x) * celle + cella(y)
+    conteggi = np.bincount(celle_punti)
+    # Massimo k con Σ min(conteggio, k) ≤ massimo_punti: le j celle più piccole restano intere,
+    # le altre tengono k punti ciascuna (almeno uno, così nessuna cella occupata sparisce)
+    ordinati = np.sort(conteggi[conteggi > 0])
+    cumulati = np.concatenate([[0], np.cumsum(ordinati)])
+    totali = cumulati[:-1] + ordinati * (len(ordinati) - np.arange(len(ordinati)))
+    j = int(np.searchsorted(totali, massimo_punti, side='right'))
+    k = max(1, int((massimo_punti - cumulati[j]) // (len(ordinati) - j)))
+
+    # Rango casuale di ogni punto nella sua cella
+    ordine = np.random.default_rng(seme).permutation(n)
+    ordine = ordine[np.argsort(celle_punti[ordine], kind='stable')]
+    inizio_cella = np.concatenate([[0], np.cumsum(conteggi)[:-1]])
+    rango = np.arange(n) - inizio_cella[celle_punti[ordine]]
+    return np.sort(ordine[rango < k])
+
+def figura_dispersione(x, y, colore=None, titolo="", titolo_x="", titolo_y="", titolo_colore="",
+                       massimo_punti=MASSIMO_PUNTI):
+    """
+    JSON di un grafico a dispersione WebGL della forza lavoro (un punto per dipendente), sfoltito
+    oltre `massimo_punti`. Nel tooltip compare la riga del dipendente nel file.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    colore = None if colore is None else np.asarray(colore, dtype=float)
+
+    def costruisci():
+        indici = sfoltisci(x, y, massimo_punti)
+        marker = dict(size=4, opacity=0.6)
+        if colore is not None:
+            marker.update(color=colore[indici], colorscale="Viridis", colorbar=dict(title=titolo_colore))
+        figura = go.Figure(data=[go.Scattergl(
+            x=x[indici], y=y[indici], mode='markers', marker=marker, customdata=indici.astype(np.int32),
+            hovertemplate=f"Riga %{{customdata}}<br>{titolo_x}: %{{x:,.0f}}<br>{titolo_y}: %{{y:,.0f}}<extra></extra>"
+        )])
+        mostrati = f" ({len(indici):,} di {len(x):,} dipendenti)" if len(indici) < len(x) else ""
+        figura.update_layout(title=titolo + mostrati, xaxis_title=titolo_x, yaxis_title=titolo_y)
+        return figura
+
+    return _in_cache('dispersione', (x, y, colore, titolo, titolo_x, titolo_y, titolo_colore, massimo_punti),
+                     costruisci)
+
+def bande_timeline(risultati, percentili=PERCENTILI_BANDE, classi=CLASSI_BANDE, dimensione_blocco=5000):
+    """
+    Percentili mese per mese della copertura mensile (NASPI + APE + R.I.T.A.) dei dipendenti in
+    uscita, per l'output di calcola_scenari_batch. Ritorna (mesi, dict percentile -> array,
+    dipendenti in uscita per mese). I percentili sono interpolati nelle classi dell'istogramma
+    (errore al più un'ampiezza di classe).
+    """
+    argomenti = _argomenti_timeline({c: risultati[c].to_numpy() for c in COLONNE_TIMELINE})
+    mesi_mancanti = np.asarray(argomenti[1], dtype=np.int64)
+    orizzonte = int(mesi_mancanti.max(initial=0))
+    # Limite superiore della copertura: gli importi pieni, prima di decalage e durate
+    massimo = float(np.max(argomenti[2] + argomenti[4] + argomenti[5], initial=0.0)) or 1.0
+    ampiezza = massimo / classi
+
+    conteggi = np.zeros((orizzonte, classi), dtype=np.int64)
+    for inizio in range(0, len(mesi_mancanti), dimensione_blocco):
+        flussi = costruisci_timeline_batch(*(a[inizio:inizio + dimensione_blocco] for a in argomenti),
+                                           mesi_dopo_pensione=0)
+        copertura = flussi['naspi'] + flussi['ape'] + flussi['rita']
+        mese = np.broadcast_to(np.arange(copertura.shape[1]), copertura.shape)
+        in_uscita = mese < flussi['mesi_mancanti'][:, None]
+        classe = np.minimum((copertura[in_uscita] / ampiezza).astype(np.int64), classi - 1)
+        conteggi[:copertura.shape[1]] += np.bincount(
+            mese[in_uscita] * classi + classe, minlength=copertura.shape[1] * classi
+        ).reshape(-1, classi)
+
+    in_uscita = conteggi.sum(axis=1)
+    cumulati = np.cumsum(conteggi, axis=1)
+    bande = {}
+    for p in percentili:
+        obiettivo = in_uscita * p / 100
+        classe = np.minimum((cumulati < obiettivo[:, None]).sum(axis=1), classi - 1)
+        precedenti = np.take_along_axis(cumulati, classe[:, None], axis=1)[:, 0] - \
+            np.take_along_axis(conteggi, classe[:, None], axis=1)[:, 0]
+        nella_classe = np.take_along_axis(conteggi, classe[:, None], axis=1)[:, 0]
+        frazione = np.where(nella_classe > 0, (obiettivo - precedenti) / np.maximum(nella_classe, 1), 0.0)
+        bande[p] = np.where(in_uscita > 0, (classe + np.clip(frazione, 0, 1)) * ampiezza, np.nan)
+    return np.arange(orizzonte), bande, in_uscita
+
+def figura_bande_timeline(risultati, titolo="Copertura Mensile dei Dipendenti in Uscita"):
+    """
+    JSON delle bande P10–P90 e P25–P75 e della mediana della copertura mensile, con il numero di
+    dipendenti in uscita su un secondo asse.
+    """
+    def costruisci():
+        mesi, bande, in_uscita = bande_timeline(risultati)
+        tracce = []
+        for basso, alto, nome in ((10, 90, "P10–P90"), (25, 75, "P25–P75")):
+            tracce.append(go.Scatter(x=mesi, y=bande[alto], mode='lines', line=dict(width=0),
+                                     showlegend=False, hoverinfo='skip', legendgroup=nome))
+            tracce.append(go.Scatter(x=mesi, y=bande[basso], mode='lines', line=dict(width=0), fill='tonexty',
+                                     fillcolor="rgba(99, 110, 250, 0.2)", name=nome, legendgroup=nome,
+                                     hoverinfo='skip'))
+        tracce.append(go.Scatter(x=mesi, y=bande[50], mode='lines', name="Mediana",
+                                 line=dict(color="rgb(99, 110, 250)"),
+                                 hovertemplate="Mese %{x}: € %{y:,.0f}<extra>Mediana</extra>"))
+        tracce.append(go.Scatter(x=mesi, y=in_uscita, mode='lines', name="Dipendenti in uscita", yaxis='y2',
+                                 line=dict(color="gray", dash='dot')))
+        figura = go.Figure(data=tracce)
+        figura.update_layout(
+            title=titolo, xaxis_title="Mesi da oggi", yaxis_title="Copertura mensile (€)",
+            yaxis2=dict(title="Dipendenti in uscita", overlaying='y', side='right', showgrid=False),
+            legend=dict(orientation='h', y=-0.2)
+        )
+        return figura
+
+    return _in_cache('bande_timeline', (*[risultati[c] for c in COLONNE_TIMELINE], titolo), costruisci)
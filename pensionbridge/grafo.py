@@ -0,0 +1,108 @@
+"""
+Grafo reattivo di valori derivati, per il ricalcolo incrementale.
+
+Un grafo è un dict nome -> (funzione, dipendenze): le dipendenze sono nomi di altri nodi o di
+input, passati alla funzione in quell'ordine. Tra una valutazione e la successiva vengono
+ricalcolati solo i nodi sporchi, cioè quelli che dipendono (direttamente o tramite altri nodi)
+da un input cambiato. Se un nodo ricalcolato produce lo stesso valore di prima anche i suoi
+dipendenti restano puliti: un input che non sposta un risultato intermedio si ferma lì.
+
+Ogni ricalcolo di un nodo è una fase di diagnostica (vedi pensionbridge.diagnostica).
+"""
+from .diagnostica import fase
+
+def ordine_topologico(nodi):
+    """Nomi dei nodi in un ordine in cui ogni nodo segue i nodi da cui dipende."""
+    ordine, visitati, in_corso = [], set(), set()
+
+    def visita(nome):
+        if nome in visitati:
+            return
+        if nome in in_corso:
+            raise ValueError(f"Dipendenza circolare nel grafo: {nome}")
+        in_corso.add(nome)
+        for dipendenza in nodi[nome][1]:
+            if dipendenza in nodi:
+                visita(dipendenza)
+        in_corso.discard(nome)
+        visitati.add(nome)
+        ordine.append(nome)
+
+    for nome in nodi:
+        visita(nome)
+    return ordine
+
+def _uguali(a, b):
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+def valuta_nodi(nodi, ordine, ingressi, valori=None, cambiati=None):
+    """
+    Valuta i nodi nell'`ordine` dato con gli input `ingressi` (dict). Con i `valori` di una
+    valutazione precedente e l'insieme dei nomi di input `cambiati` ricalcola solo i nodi sporchi.
+    Ritorna (valori, nodi ricalcolati, nodi saltati).
+    """
+    incrementale = valori is not None
+    valori = dict(valori or {})
+    cambiati = set(cambiati or ())
+    ricalcolati, saltati = [], []
+    for nome in ordine:
+        funzione, dipendenze = nodi[nome]
+        if incrementale and nome in valori and cambiati.isdisjoint(dipendenze):
+            saltati.append(nome)
+            continue
+        with fase(nome):
+            valore = funzione(*(valori[d] if d in nodi else ingressi[d] for d in dipendenze))
+        ricalcolati.append(nome)
+        if not incrementale or nome not in valori or not _uguali(valori[nome], valore):
+            cambiati.add(nome)
+        valori[nome] = valore
+    return valori, ricalcolati, saltati
+
+class GrafoCalcolo:
+    """
+    Stato di un grafo tra valutazioni successive (ad esempio uno per sessione Streamlit).
+    aggiorna(**ingressi) ricalcola i soli nodi sporchi e ritorna componi(valori, ingressi);
+    gli input non passati assumono i valori `predefiniti`.
+    """
+
+    def __init__(self, nodi, componi=None, predefiniti=None):
+        self.nodi = nodi
+        self.ordine = ordine_topologico(nodi)
+        self.componi = componi or (lambda valori, ingressi: dict(valori))
+        self.predefiniti = dict(predefiniti or {})
+        self._input = None
+        self._valori = None
+        self.valutazioni = 0
+        self.nodi_ricalcolati = 0
+        self.nodi_saltati = 0
+        self.ultimi_ricalcolati = []
+        self.ultimi_saltati = []
+
+    def aggiorna(self, **ingressi):
+        ingressi = {**self.predefiniti, **ingressi}
+        if self._input is None:
+            cambiati = None
+        else:
+            cambiati = {k for k in ingressi.keys() | self._input.keys()
+                        if k not in ingressi or k not in self._input or not _uguali(ingressi[k], self._input[k])}
+        self._valori, self.ultimi_ricalcolati, self.ultimi_saltati = valuta_nodi(
+            self.nodi, self.ordine, ingressi, self._valori, cambiati
+        )
+        self._input = dict(ingressi)
+        self.valutazioni += 1
+        self.nodi_ricalcolati += len(self.ultimi_ricalcolati)
+        self.nodi_saltati += len(self.ultimi_saltati)
+        return self.componi(self._valori, self._input)
+
+    def statistiche(self):
+        return {
+            'nodi': len(self.ordine),
+            'valutazioni': self.valutazioni,
+            'nodi_ricalcolati': self.nodi_ricalcolati,
+            'nodi_saltati': self.nodi_saltati,
+            'ultimi_ricalcolati': list(self.ultimi_ricalcolati),
+            'ultimi_saltati': list(self.ultimi_saltati)
+        }
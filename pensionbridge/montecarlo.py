@@ -0,0 +1,226 @@
+"""
+Simulazione Monte Carlo di crescita salariale, rendimenti del fondo pensione e longevità.
+
+Al posto delle stime puntuali (aumento fisso dell'1%, aspettativa di vita di 85 anni,
+montante complementare statico) vengono simulati migliaia di percorsi come array NumPy
+(percorsi × anni) e restituite bande di percentili per:
+- pensione lifetime (dall'ultima RAL del percorso salariale, percepita dalla data target fino
+  alla morte simulata)
+- reddito R.I.T.A. complessivo (montante investito durante l'erogazione)
+- scarto dell'incentivo: incentivo proposto (netto della tassazione separata) meno il reddito
+  netto perso al netto dei sostegni
+
+I percorsi sono divisi in blocchi con semi indipendenti (SeedSequence.spawn): a parità di
+seme il risultato non dipende dal numero di processi. Con un budget di tempo vengono usati
+solo i blocchi completati entro la scadenza.
+"""
+import atexit
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from .batch import stima_pensione_netta_batch
+from .fisco import MENSILITA, stipendio_netto_mensile
+from .regole import aliquota_rita, parametri_anno
+from .scenario import calcola_scenario
+
+PARAMETRI_MONTECARLO_DEFAULT = {
+    # Crescita annua della RAL (lognormale): media 1% come nella proiezione della tab 5
+    'crescita_salario_media': 0.01,
+    'crescita_salario_volatilita': 0.02,
+    # Rendimento annuo del fondo pensione (normale, troncato a -95%)
+    'rendimento_fondo_medio': 0.03,
+    'rendimento_fondo_volatilita': 0.08,
+    # Mortalità di Gompertz: età modale di morte per sesso e tasso di crescita del rischio
+    'eta_modale_morte': {'Uomo': 86.0, 'Donna': 90.0},
+    'gompertz_b': 0.1,
+    # Tassazione agevolata R.I.T.A. dell'anno corrente (ipotesi 20 anni nel fondo, come calcola_rita)
+    'tassazione_rita': aliquota_rita(parametri_anno())
+}
+
+PERCENTILI = (5, 25, 50, 75, 95)
+
+METRICHE = {
+    'pensione_lifetime': "Pensione Lifetime (€)",
+    'rita_totale': "R.I.T.A. Totale (€)",
+    'scarto_incentivo': "Scarto Incentivo (€)"
+}
+
+# Processi usati dall'app: un valore fisso, così tutte le sessioni condividono lo stesso pool
+PROCESSI_INTERATTIVI = 2
+
+# Un pool per numero di processi, condiviso da tutti i thread (le sessioni Streamlit) del
+# processo. Un pool non viene mai sostituito: chiuderlo cancellerebbe i blocchi in corso di
+# un'altra sessione.
+_pool = {}
+_lock_pool = threading.Lock()
+
+def _ottieni_pool(processi):
+    """Pool di processi riusato tra le chiamate (avviare i worker costa più di un blocco)."""
+    with _lock_pool:
+        if processi not in _pool:
+            _pool[processi] = ProcessPoolExecutor(max_workers=processi)
+        return _pool[processi]
+
+@atexit.register
+def _chiudi_pool():
+    with _lock_pool:
+        for pool in _pool.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pool.clear()
+
+def _simula_blocco(base, parametri, seme, n):
+    """Simula `n` percorsi e ritorna un dict metrica -> array (n,)."""
+    rng = np.random.default_rng(seme)
+
+    mesi_lavoro = base['mesi_mancanti']
+    mesi_rita = base['mesi_rita']
+    anni_griglia = max(1, math.ceil(max(mesi_lavoro, mesi_rita) / 12))
+    inizio_anno = 12 * np.arange(anni_griglia)
+
+    # Mesi di ciascun anno della griglia coperti dal periodo di uscita e dalla R.I.T.A.
+    mesi_anno = np.clip(mesi_lavoro - inizio_anno, 0, 12)
+    mesi_rita_anno = np.clip(mesi_rita - inizio_anno, 0, 12)
+
+    # Longevità: età di morte da Gompertz condizionata all'età attuale (inversione della CDF)
+    b = parametri['gompertz_b']
+    eta_modale = parametri['eta_modale_morte'].get(base['sesso'], 88.0)
+    u = rng.random(n)
+    anni_residui = np.log1p(-np.log(u) / np.exp(b * (base['eta'] - eta_modale))) / b
+    mesi_vita = anni_residui * 12
+
+    # Mesi vissuti in ciascun anno della griglia (percorsi × anni)
+    mesi_vivo = np.clip(mesi_vita[:, None] - inizio_anno, 0, 12)
+
+    # Crescita salariale lognormale: il primo anno usa la RAL attuale
+    sigma_s = parametri['crescita_salario_volatilita']
+    mu_s = math.log1p(parametri['crescita_salario_media']) - sigma_s ** 2 / 2
+    crescita = np.exp(rng.normal(mu_s, sigma_s, (n, anni_griglia - 1)))
+    fattore_ral = np.cumprod(np.hstack([np.ones((n, 1)), crescita]), axis=1)
+    netto_mensile = stipendio_netto_mensile(base['ral'] * fattore_ral, base['regione'])
+
+    mesi_uscita_vivo = np.minimum(mesi_vivo, mesi_anno)
+    reddito_perso = (netto_mensile * mesi_uscita_vivo).sum(axis=1)
+
+    # Sostegni: NASPI per la sua durata, APE Sociale per tutto il periodo di uscita
+    mesi_naspi_anno = np.clip(base['durata_naspi'] - inizio_anno, 0, 12)
+    naspi = base['naspi_mensile'] * np.minimum(mesi_uscita_vivo, mesi_naspi_anno).sum(axis=1)
+    ape = base['ape_importo'] * mesi_uscita_vivo.sum(axis=1)
+
+    # R.I.T.A.: la rata mensile dell'anno k è montante / mesi_rita rivalutato dei rendimenti
+    # degli anni precedenti (il residuo resta investito), quindi un cumprod sui rendimenti
+    rita = np.zeros(n)
+    if base['rita_disponibile']:
+        rendimenti = np.maximum(
+            rng.normal(parametri['rendimento_fondo_medio'], parametri['rendimento_fondo_volatilita'],
+                       (n, anni_griglia - 1)),
+            -0.95
+        )
+        rivalutazione = np.cumprod(np.hstack([np.ones((n, 1)), 1 + rendimenti]), axis=1)
+        rata_mensile = base['montante_complementare'] / mesi_rita * rivalutazione
+        rita = (rata_mensile * np.minimum(mesi_vivo, mesi_rita_anno)).sum(axis=1) * \
+               (1 - parametri['tassazione_rita'])
+
+    # Pensione di ciascun percorso dall'ultima RAL (l'anno dell'uscita) e dai contributi alla
+    # data target, percepita in 13 mensilità l'anno dalla data target fino alla morte
+    anno_uscita = (mesi_lavoro - 1) // 12
+    pensione_mensile = stima_pensione_netta_batch(
+        base['ral'] * fattore_ral[:, anno_uscita], base['anni_contributi'] + mesi_lavoro / 12,
+        base['tipo_contribuzione'], base['regione']
+    )
+    anni_pensione = np.maximum(0, mesi_vita - mesi_lavoro) / 12
+    pensione_lifetime = pensione_mensile * MENSILITA * anni_pensione
+
+    return {
+        'pensione_lifetime': pensione_lifetime,
+        'rita_totale': rita,
+        'scarto_incentivo': base['incentivo_netto'] - (reddito_perso - naspi - ape - rita)
+    }
+
+def simula_montecarlo(input_scenario, n_percorsi=20000, seme=None, processi=1,
+                      budget_secondi=None, dimensione_blocco=5000, parametri=None):
+    """
+    Esegue la simulazione per un dipendente.
+
+    `input_scenario` contiene gli argomenti di calcola_scenario (sesso, eta, regione, ...).
+    Con processi > 1 i blocchi vengono distribuiti su un pool di processi; con `budget_secondi`
+    la simulazione si ferma alla scadenza (almeno un blocco viene sempre completato).
+
+    Ritorna un dict con le bande di percentili (DataFrame metrica × percentile), le medie,
+    il numero di percorsi effettivamente simulati e il tempo impiegato.
+    """
+    inizio = time.perf_counter()
+    parametri = {**PARAMETRI_MONTECARLO_DEFAULT, **(parametri or {})}
+    scenario = calcola_scenario(**input_scenario)
+
+    base = {
+        'sesso': input_scenario['sesso'],
+        'eta': float(input_scenario['eta']),
+        'ral': float(input_scenario['ral']),
+        'anni_contributi': float(input_scenario['anni_contributi']),
+        'tipo_contribuzione': input_scenario['tipo_contribuzione'],
+        'montante_complementare': float(input_scenario.get('montante_complementare', 0)),
+        'mesi_mancanti': int(scenario['mesi_mancanti']),
+        # Come calcola_rita: erogazione su almeno un anno
+        'mesi_rita': max(scenario['anni_a_pensione'], 1) * 12,
+        'rita_disponibile': bool(scenario['rita_disponibile']),
+        'naspi_mensile': float(scenario['naspi_mensile']),
+        'durata_naspi': float(scenario['durata_naspi']),
+        'ape_importo': float(scenario['ape_importo']) if scenario['ape_ammissibile'] else 0.0,
+        'regione': input_scenario['regione'],
+        'incentivo_netto': float(scenario['incentivo_netto'])
+    }
+
+    n_blocchi = max(1, math.ceil(n_percorsi / dimensione_blocco))
+    dimensioni = [dimensione_blocco] * (n_blocchi - 1) + [n_percorsi - dimensione_blocco * (n_blocchi - 1)]
+    semi = np.random.SeedSequence(seme).spawn(n_blocchi)
+    scadenza = None if budget_secondi is None else inizio + budget_secondi
+
+    risultati = {}
+    if processi is None:
+        processi = os.cpu_count() or 1
+    if processi <= 1 or n_blocchi == 1:
+        for i in range(n_blocchi):
+            if risultati and scadenza is not None and time.perf_counter() >= scadenza:
+                break
+            risultati[i] = _simula_blocco(base, parametri, semi[i], dimensioni[i])
+    else:
+        pool = _ottieni_pool(processi)
+        futuri = {pool.submit(_simula_blocco, base, parametri, semi[i], dimensioni[i]): i
+                  for i in range(n_blocchi)}
+        in_corso = set(futuri)
+        while in_corso:
+            attesa = None if scadenza is None else max(0.0, scadenza - time.perf_counter())
+            if risultati and attesa == 0.0:
+                break
+            if not risultati:
+                # Almeno un blocco viene sempre completato: fino ad allora si attende senza
+                # timeout, invece di interrogare il pool a vuoto dopo la scadenza
+                attesa = None
+            completati, in_corso = wait(in_corso, timeout=attesa, return_when=FIRST_COMPLETED)
+            for futuro in completati:
+                risultati[futuri[futuro]] = futuro.result()
+        for futuro in in_corso:
+            futuro.cancel()
+
+    # Concatenazione nell'ordine dei blocchi: riproducibile a parità di seme
+    campioni = {m: np.concatenate([risultati[i][m] for i in sorted(risultati)]) for m in METRICHE}
+
+    bande = pd.DataFrame(
+        [np.percentile(campioni[m], PERCENTILI) for m in METRICHE],
+        index=list(METRICHE.values()),
+        columns=[f"P{p}" for p in PERCENTILI]
+    )
+    return {
+        'bande': bande,
+        'media': {m: float(campioni[m].mean()) for m in METRICHE},
+        'campioni': campioni,
+        'n_percorsi': len(campioni['pensione_lifetime']),
+        'completa': len(risultati) == n_blocchi,
+        'tempo_secondi': time.perf_counter() - inizio
+    }
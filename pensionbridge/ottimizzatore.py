@@ -0,0 +1,215 @@
+"""
+Ottimizzatore dell'offerta di esodo: valuta in un solo passaggio vettoriale la griglia
+mese di uscita × importo dell'incentivo e ne ricava la frontiera di Pareto tra
+beneficio netto del lavoratore e risparmio dell'azienda.
+
+Per un'uscita al mese e (0 = subito) il periodo di ponte fino a data_target dura L = M - e mesi:
+- beneficio lavoratore = incentivo netto (tassazione separata) - gap corretto per il costo
+  della vita, dove il gap è lo stipendio netto perso meno NASPI (con decalage), APE Sociale
+  e R.I.T.A. spettanti uscendo a quel mese
+- risparmio azienda = costo azienda dei mesi non lavorati - incentivo
+
+Il mese di uscita fissa il surplus da spartire, l'incentivo decide come dividerlo: ogni euro
+di incentivo sposta un euro dal risparmio e (1 - aliquota separata) euro al beneficio.
+"""
+import numpy as np
+import pandas as pd
+
+from .batch import calcola_ape_sociale_batch, calcola_rita_batch, calcola_scenari_batch
+from .fisco import aliquota_tassazione_separata
+from .timeline import MESE_INIZIO_RIDUZIONE_NASPI, RIDUZIONE_MENSILE_NASPI
+
+OBIETTIVI = {
+    'equo': "Win-win: massimizza il minimo tra beneficio e risparmio",
+    'azienda': "Massimo risparmio aziendale",
+    'lavoratore': "Massimo beneficio per il lavoratore"
+}
+
+# Elementi massimi (dipendenti × mesi × importi) valutati insieme nel batch
+ELEMENTI_PER_BLOCCO = 4_000_000
+
+def _naspi_cumulata(mesi_massimi):
+    """NASPI cumulata per 1 € di importo iniziale dopo k mesi (k = 0..mesi_massimi), con decalage."""
+    mese = np.arange(mesi_massimi)
+    decalage = (1 - RIDUZIONE_MENSILE_NASPI) ** np.maximum(0, mese - (MESE_INIZIO_RIDUZIONE_NASPI - 2))
+    return np.concatenate([[0.0], np.cumsum(decalage)])
+
+def curve_uscita_batch(risultati, dati):
+    """
+    Per ogni dipendente e ogni mese di uscita e calcola gap corretto e costo residuo.
+
+    `risultati` è l'output di calcola_scenari_batch sugli stessi `dati`.
+    Ritorna (mesi_uscita (E,), gap_corretto (n, E), costo_residuo (n, E), valido (n, E)).
+    """
+    colonna = lambda c, default: np.asarray(dati[c]) if c in dati else np.full(len(risultati), default)
+    mesi_mancanti = risultati['mesi_mancanti'].to_numpy()
+    mesi_uscita = np.arange(int(mesi_mancanti.max()) if len(risultati) else 0)
+
+    ponte = mesi_mancanti[:, None] - mesi_uscita[None, :]
+    valido = ponte >= 1
+    ponte = np.maximum(ponte, 0)
+
+    eta = np.asarray(dati['eta'], dtype=float)[:, None] + mesi_uscita / 12
+    anni_contributi = np.asarray(dati['anni_contributi'], dtype=float)[:, None] + mesi_uscita / 12
+    ral = np.asarray(dati['ral'], dtype=float)[:, None]
+
+    # NASPI: importo iniziale × decalage cumulato sui mesi di ponte (frazioni di mese interpolate)
+    durata = np.minimum(ponte, risultati['durata_naspi'].to_numpy()[:, None])
+    naspi_cumulata = _naspi_cumulata(int(np.ceil(durata.max())) if durata.size else 0)
+    naspi = risultati['naspi_mensile'].to_numpy()[:, None] * \
+            np.interp(durata, np.arange(len(naspi_cumulata)), naspi_cumulata)
+
+    # APE Sociale e R.I.T.A. valutate all'età e ai contributi del mese di uscita
+    ape_importo, _, _ = calcola_ape_sociale_batch(
+        eta, anni_contributi, ral,
+        colonna('is_disoccupato', False)[:, None], colonna('is_caregiver', False)[:, None],
+        colonna('is_invalido', False)[:, None], colonna('is_lavoratore_usurante', False)[:, None]
+    )
+    rita_mensile, _, _ = calcola_rita_batch(
+        colonna('montante_complementare', 0)[:, None], eta, ponte / 12
+    )
+
+    perdita = risultati['stipendio_netto_mensile'].to_numpy()[:, None] * ponte
+    gap = perdita - naspi - (ape_importo + rita_mensile) * ponte
+    gap_corretto = gap * risultati['fattore_regionale'].to_numpy()[:, None]
+    costo_residuo = ral * 1.35 * (ponte / 12)
+    return mesi_uscita, gap_corretto, costo_residuo, valido
+
+def _valuta_griglia(gap_corretto, costo_residuo, valido, mesi_uscita, n_importi, incentivo_massimo,
+                    beneficio_minimo, risparmio_minimo, budget_massimo,
+                    mese_uscita_minimo, mese_uscita_massimo, obiettivo, aliquota=0.0):
+    """
+    Valuta la griglia (dipendenti × mesi × importi) e ritorna l'offerta migliore per dipendente.
+    `aliquota` è l'aliquota di tassazione separata dell'incentivo, per dipendente.
+    """
+    if obiettivo not in OBIETTIVI:
+        raise ValueError(f"Obiettivo non valido: {obiettivo} (ammessi: {', '.join(OBIETTIVI)})")
+
+    if incentivo_massimo is None:
+        incentivo_massimo = costo_residuo.max(axis=1)
+    importi = np.linspace(0, 1, n_importi)[None, :] * np.broadcast_to(
+        np.asarray(incentivo_massimo, dtype=float), (len(gap_corretto),))[:, None]
+
+    netto = importi * (1 - np.broadcast_to(np.asarray(aliquota, dtype=float), (len(gap_corretto),))[:, None])
+    beneficio = netto[:, None, :] - gap_corretto[:, :, None]
+    risparmio = costo_residuo[:, :, None] - importi[:, None, :]
+
+    ammesso = valido & (mesi_uscita >= mese_uscita_minimo)
+    if mese_uscita_massimo is not None:
+        ammesso &= mesi_uscita <= mese_uscita_massimo
+    ammesso = ammesso[:, :, None] & (beneficio >= beneficio_minimo) & (risparmio >= risparmio_minimo)
+    if budget_massimo is not None:
+        ammesso &= importi[:, None, :] <= budget_massimo
+
+    if obiettivo == 'equo':
+        punteggio = np.minimum(beneficio, risparmio)
+    elif obiettivo == 'azienda':
+        punteggio = risparmio
+    else:
+        punteggio = beneficio
+    punteggio = np.where(ammesso, punteggio, -np.inf).reshape(len(gap_corretto), -1)
+
+    migliore = punteggio.argmax(axis=1)
+    righe = np.arange(len(gap_corretto))
+    indice_mese, indice_importo = np.divmod(migliore, n_importi)
+    return {
+        'fattibile': np.isfinite(punteggio[righe, migliore]),
+        'mese_uscita': mesi_uscita[indice_mese],
+        'incentivo': importi[righe, indice_importo],
+        'beneficio_lavoratore': beneficio.reshape(len(righe), -1)[righe, migliore],
+        'risparmio_azienda': risparmio.reshape(len(righe), -1)[righe, migliore],
+        'griglia': (importi, beneficio, risparmio, ammesso)
+    }
+
+def frontiera_pareto(beneficio, risparmio):
+    """Indici dei punti non dominati (massimizzando entrambe le coordinate), per beneficio decrescente."""
+    beneficio = np.ravel(beneficio)
+    risparmio = np.ravel(risparmio)
+    ordine = np.lexsort((-risparmio, -beneficio))
+    risparmio_ordinato = risparmio[ordine]
+    massimo_precedente = np.concatenate([[-np.inf], np.maximum.accumulate(risparmio_ordinato)[:-1]])
+    return ordine[risparmio_ordinato > massimo_precedente]
+
+def ottimizza_incentivo(input_scenario, n_importi=201, incentivo_massimo=None, beneficio_minimo=0.0,
+                        risparmio_minimo=0.0, budget_massimo=None, mese_uscita_minimo=0,
+                        mese_uscita_massimo=None, obiettivo='equo'):
+    """
+    Ottimizza l'offerta per un dipendente (`input_scenario` come per calcola_scenario).
+
+    Ritorna un dict con l'offerta migliore sotto i vincoli ('migliore', None se nessun punto
+    li rispetta), la frontiera di Pareto (DataFrame) e la griglia completa
+    (mesi_uscita, importi, beneficio e risparmio come matrici mesi × importi).
+    """
+    input_scenario = dict(input_scenario)
+    oggi = input_scenario.pop('oggi', None)
+    dati = pd.DataFrame([input_scenario]).drop(columns=['incentivo_proposto'], errors='ignore')
+    risultati = calcola_scenari_batch(dati, oggi)
+    mesi_uscita, gap_corretto, costo_residuo, valido = curve_uscita_batch(risultati, dati)
+    esito = _valuta_griglia(gap_corretto, costo_residuo, valido, mesi_uscita, n_importi, incentivo_massimo,
+                            beneficio_minimo, risparmio_minimo, budget_massimo,
+                            mese_uscita_minimo, mese_uscita_massimo, obiettivo,
+                            aliquota_tassazione_separata(dati['ral'].to_numpy(dtype=float)))
+
+    importi, beneficio, risparmio, _ = esito['griglia']
+    beneficio, risparmio = beneficio[0][valido[0]], risparmio[0][valido[0]]
+    mesi_griglia = np.repeat(mesi_uscita[valido[0]], n_importi)
+    importi_griglia = np.tile(importi[0], valido[0].sum())
+
+    punti = frontiera_pareto(beneficio, risparmio)
+    frontiera = pd.DataFrame({
+        'mese_uscita': mesi_griglia[punti],
+        'incentivo': importi_griglia[punti],
+        'beneficio_lavoratore': beneficio.ravel()[punti],
+        'risparmio_azienda': risparmio.ravel()[punti]
+    })
+
+    migliore = None
+    if esito['fattibile'][0]:
+        migliore = {k: esito[k][0].item() for k in
+                    ('mese_uscita', 'incentivo', 'beneficio_lavoratore', 'risparmio_azienda')}
+    return {
+        'migliore': migliore,
+        'frontiera': frontiera,
+        'mesi_uscita': mesi_uscita[valido[0]],
+        'importi': importi[0],
+        'beneficio': beneficio.reshape(-1, n_importi),
+        'risparmio': risparmio.reshape(-1, n_importi)
+    }
+
+def ottimizza_incentivo_batch(dati, n_importi=101, incentivo_massimo=None, beneficio_minimo=0.0,
+                              risparmio_minimo=0.0, budget_massimo=None, mese_uscita_minimo=0,
+                              mese_uscita_massimo=None, obiettivo='equo', oggi=None):
+    """
+    Offerta migliore per ogni dipendente di `dati` (stesse colonne di calcola_scenari_batch).
+    I dipendenti vengono valutati a blocchi per tenere la griglia 3-D entro ELEMENTI_PER_BLOCCO.
+    Ritorna un DataFrame con fattibile, mese_uscita, incentivo, beneficio_lavoratore, risparmio_azienda.
+    """
+    if not isinstance(dati, pd.DataFrame):
+        dati = pd.DataFrame(dati)
+    risultati = calcola_scenari_batch(dati, oggi)
+    mesi_massimi = max(1, int(risultati['mesi_mancanti'].max()) if len(dati) else 1)
+    dimensione_blocco = max(1, ELEMENTI_PER_BLOCCO // (mesi_massimi * n_importi))
+
+    blocchi = []
+    for inizio in range(0, len(dati), dimensione_blocco):
+        fine = inizio + dimensione_blocco
+        dati_blocco = dati.iloc[inizio:fine]
+        risultati_blocco = risultati.iloc[inizio:fine]
+        mesi_uscita, gap_corretto, costo_residuo, valido = curve_uscita_batch(risultati_blocco, dati_blocco)
+        massimo = incentivo_massimo
+        if massimo is not None and np.ndim(massimo):
+            massimo = np.asarray(massimo)[inizio:fine]
+        esito = _valuta_griglia(gap_corretto, costo_residuo, valido, mesi_uscita, n_importi, massimo,
+                                beneficio_minimo, risparmio_minimo, budget_massimo,
+                                mese_uscita_minimo, mese_uscita_massimo, obiettivo,
+                                aliquota_tassazione_separata(np.asarray(dati_blocco['ral'], dtype=float)))
+        blocchi.append(pd.DataFrame({
+            k: esito[k] for k in ('fattibile', 'mese_uscita', 'incentivo', 'beneficio_lavoratore', 'risparmio_azienda')
+        }, index=dati_blocco.index))
+
+    if not blocchi:
+        return pd.DataFrame(columns=['fattibile', 'mese_uscita', 'incentivo', 'beneficio_lavoratore', 'risparmio_azienda'])
+    esito = pd.concat(blocchi)
+    # Dove nessuna offerta rispetta i vincoli non c'è un'offerta da proporre
+    esito.loc[~esito['fattibile'], ['incentivo', 'beneficio_lavoratore', 'risparmio_azienda']] = np.nan
+    return esito
@@ -0,0 +1,222 @@
+"""
+Selezione del portafoglio di uscite aziendale sotto un budget di incentivi.
+
+Tra i dipendenti valutati da calcola_scenari_batch si sceglie il sottoinsieme a cui offrire
+l'incentivo (costo: incentivo_proposto) che massimizza il risparmio aziendale complessivo
+(valore: risparmio_aziendale), con tetti facoltativi per regione e un numero minimo di uscite.
+
+Risolutore (zaino 0/1), tenendo la migliore tra le soluzioni ammissibili trovate:
+1. greedy per densità risparmio/incentivo, rispettando budget e tetti regionali;
+2. nucleo: i `dimensione_nucleo` candidati attorno al primo escluso dal greedy, dove si
+   decidono le scelte incerte, sono ottimizzati con programmazione dinamica sul budget
+   residuo (importi arrotondati per eccesso, quindi la soluzione resta ammissibile);
+3. con tetti regionali stringenti, greedy sui guadagni ridotti risparmio - μ·incentivo, con
+   μ il prezzo del budget del duale lagrangiano;
+4. minimo di uscite: un bonus λ per dipendente selezionato, cercato per bisezione, spinge
+   il risolutore verso portafogli più numerosi finché il minimo è raggiunto.
+Il limite superiore è il duale lagrangiano (senza tetti, il bound di Dantzig del rilassamento
+continuo): il gap rispetto a esso misura quanto la soluzione può distare dall'ottimo.
+"""
+import numpy as np
+import pandas as pd
+
+DIMENSIONE_NUCLEO = 2000
+
+# Unità del budget residuo nella programmazione dinamica del nucleo
+PASSI_BUDGET = 10000
+
+ITERAZIONI_BISEZIONE = 25
+
+ITERAZIONI_DUALE = 40
+
+def _ordine_densita(valore, costo):
+    """Indici per densità valore/costo decrescente (costo nullo: densità infinita)."""
+    densita = np.where(costo > 0, valore / np.where(costo > 0, costo, 1.0), np.inf)
+    return np.argsort(-densita, kind='stable')
+
+def _duale(valore, costo, regione, tetti, budget):
+    """
+    Bound lagrangiano: per ogni prezzo μ ≥ 0 del budget, μ·budget più la somma, per regione,
+    dei `tetto` guadagni ridotti (valore - μ·costo) positivi più alti è un limite superiore
+    all'ottimo. La funzione è convessa in μ: il minimo si cerca per sezione aurea.
+    Senza tetti coincide con il bound di Dantzig del rilassamento continuo.
+    Ritorna (limite, μ migliore).
+    """
+    gruppi = [(np.flatnonzero(regione == r), tetto) for r, tetto in enumerate(tetti.tolist())]
+
+    def limite(prezzo):
+        totale = prezzo * budget
+        for indici, tetto in gruppi:
+            if tetto <= 0:
+                continue
+            guadagno = valore[indici] - prezzo * costo[indici]
+            guadagno = guadagno[guadagno > 0]
+            if len(guadagno) > tetto:
+                guadagno = np.partition(guadagno, len(guadagno) - tetto)[len(guadagno) - tetto:]
+            totale += guadagno.sum()
+        return totale
+
+    positivi = (valore > 0) & (costo > 0)
+    basso, alto = 0.0, float((valore[positivi] / costo[positivi]).max()) if positivi.any() else 0.0
+    rapporto = (np.sqrt(5) - 1) / 2
+    a, b = alto - rapporto * (alto - basso), basso + rapporto * (alto - basso)
+    fa, fb = limite(a), limite(b)
+    for _ in range(ITERAZIONI_DUALE):
+        if fa <= fb:
+            alto, b, fb = b, a, fa
+            a = alto - rapporto * (alto - basso)
+            fa = limite(a)
+        else:
+            basso, a, fa = a, b, fb
+            b = basso + rapporto * (alto - basso)
+            fb = limite(b)
+    candidati = [(limite(basso), basso), (fa, a), (fb, b), (limite(alto), alto)]
+    return min(candidati)
+
+def _greedy(candidati, valore, costo, regione, tetti, budget, scelti=None):
+    """Aggiunge a `scelti` i `candidati` (in ordine) con valore positivo che rientrano in budget e tetti."""
+    scelti = np.zeros(len(valore), dtype=bool) if scelti is None else scelti.copy()
+    conteggi = np.bincount(regione[scelti], minlength=len(tetti))
+    residuo = budget - costo[scelti].sum()
+    valori, costi, regioni = valore.tolist(), costo.tolist(), regione.tolist()
+    for i in candidati.tolist():
+        if scelti[i] or valori[i] <= 0:
+            continue
+        r = regioni[i]
+        if costi[i] <= residuo and conteggi[r] < tetti[r]:
+            scelti[i] = True
+            residuo -= costi[i]
+            conteggi[r] += 1
+    return scelti
+
+def _zaino_nucleo(nucleo, valore, costo, capienza_euro, passi_budget):
+    """Zaino 0/1 esatto sul nucleo (costi arrotondati per eccesso). Ritorna gli indici scelti."""
+    passo = max(capienza_euro / passi_budget, 1e-9)
+    capienza = int(capienza_euro / passo + 1e-9)
+    pesi = np.ceil(costo[nucleo] / passo - 1e-9).astype(np.int64)
+    valori = valore[nucleo]
+    if capienza <= 0:
+        return nucleo[(pesi <= 0) & (valori > 0)]
+
+    migliore = np.zeros(capienza + 1)
+    prende = np.zeros((len(nucleo), capienza + 1), dtype=bool)
+    for j, (peso, v) in enumerate(zip(pesi.tolist(), valori.tolist())):
+        if v <= 0 or peso > capienza:
+            continue
+        candidato = migliore[:capienza + 1 - peso] + v
+        meglio = candidato > migliore[peso:]
+        prende[j, peso:] = meglio
+        migliore[peso:] = np.where(meglio, candidato, migliore[peso:])
+
+    scelti, residuo = [], capienza
+    for j in range(len(nucleo) - 1, -1, -1):
+        if prende[j, residuo]:
+            scelti.append(nucleo[j])
+            residuo -= pesi[j]
+    return np.array(scelti, dtype=np.int64)
+
+def _risolvi(valore, costo, regione, tetti, budget, dimensione_nucleo, passi_budget):
+    """Greedy con tetti, ottimizzazione del nucleo e, con tetti stringenti, greedy sui guadagni ridotti."""
+    ordine = _ordine_densita(valore, costo)
+    greedy = _greedy(ordine, valore, costo, regione, tetti, budget)
+    soluzioni = [greedy]
+
+    # Con tetti stringenti la densità non basta: in ogni regione conta anche il valore assoluto.
+    # Il prezzo del budget del duale lagrangiano ordina per guadagno ridotto valore - μ·costo.
+    positivi = np.bincount(regione[valore > 0], minlength=len(tetti))
+    guadagno = valore / np.where(costo > 0, costo, 1.0)
+    if np.any(positivi > tetti):
+        _, prezzo = _duale(valore, costo, regione, tetti, budget)
+        guadagno = valore - prezzo * costo
+        soluzioni.append(_greedy(np.argsort(-guadagno, kind='stable'), valore, costo, regione, tetti, budget))
+
+    esclusi = np.flatnonzero(~greedy[ordine] & (valore[ordine] > 0))
+    if len(esclusi) and dimensione_nucleo > 0:
+        inizio = max(0, esclusi[0] - dimensione_nucleo // 2)
+        nucleo = ordine[inizio:inizio + dimensione_nucleo]
+        fissi = greedy.copy()
+        fissi[nucleo] = False
+        scelti = fissi.copy()
+        scelti[_zaino_nucleo(nucleo, valore, costo, budget - costo[fissi].sum(), passi_budget)] = True
+
+        # Tetti regionali: si tolgono dal nucleo i candidati con guadagno più basso delle regioni oltre il tetto
+        eccesso = np.bincount(regione[scelti], minlength=len(tetti)) - tetti
+        for r in np.flatnonzero(eccesso > 0):
+            nella_regione = nucleo[scelti[nucleo] & (regione[nucleo] == r)]
+            nella_regione = nella_regione[np.argsort(guadagno[nella_regione], kind='stable')]
+            scelti[nella_regione[:int(eccesso[r])]] = False
+        # Il budget liberato (arrotondamenti, tetti) viene riempito in ordine di densità
+        soluzioni.append(_greedy(ordine, valore, costo, regione, tetti, budget, scelti))
+
+    return max(soluzioni, key=lambda scelti: valore[scelti].sum())
+
+def seleziona_portafoglio(risultati, regioni, budget, massimo_per_regione=None, minimo_dipendenti=0,
+                          solo_convenienti=True, dimensione_nucleo=DIMENSIONE_NUCLEO, passi_budget=PASSI_BUDGET):
+    """
+    Sceglie i dipendenti a cui offrire l'incentivo.
+
+    `risultati` è l'output di calcola_scenari_batch (usa incentivo_proposto e risparmio_aziendale),
+    `regioni` la colonna regione dei dipendenti. `massimo_per_regione` è un intero (stesso tetto
+    per tutte le regioni) o un dict regione -> tetto; `minimo_dipendenti` il numero minimo di
+    uscite. Con solo_convenienti=False anche le uscite in perdita possono servire a raggiungere
+    il minimo.
+
+    Ritorna un dict con 'selezionati' (maschera booleana per riga), dipendenti, incentivo,
+    risparmio e costo evitato totali, budget residuo, limite superiore e gap, 'fattibile'
+    (False se il minimo di uscite non è raggiungibile) e 'per_regione' (DataFrame).
+    """
+    costo = np.maximum(risultati['incentivo_proposto'].to_numpy(dtype=float), 0.0)
+    valore = risultati['risparmio_aziendale'].to_numpy(dtype=float)
+    codici, etichette = pd.factorize(np.asarray(regioni))
+    if isinstance(massimo_per_regione, dict):
+        tetti = np.array([massimo_per_regione.get(r, len(costo)) for r in etichette], dtype=np.int64)
+    else:
+        tetti = np.full(len(etichette), len(costo) if massimo_per_regione is None else massimo_per_regione,
+                        dtype=np.int64)
+    candidati = (valore > 0) if solo_convenienti else np.ones(len(valore), dtype=bool)
+
+    def risolvi(bonus):
+        valore_effettivo = np.where(candidati, valore + bonus, 0.0)
+        return _risolvi(valore_effettivo, costo, codici, tetti, budget, dimensione_nucleo, passi_budget)
+
+    scelti = risolvi(0.0)
+    fattibile = True
+    if scelti.sum() < minimo_dipendenti:
+        # Con il bonus massimo conta solo il numero di uscite: se non basta, il minimo è irraggiungibile
+        bonus_alto = np.abs(valore).sum() + costo.sum() + 1.0
+        massimo = risolvi(bonus_alto)
+        if massimo.sum() < minimo_dipendenti:
+            scelti, fattibile = massimo, False
+        else:
+            # Bisezione geometrica: il bonus utile va da pochi euro a bonus_alto
+            basso, alto, scelti = 1.0, bonus_alto, massimo
+            for _ in range(ITERAZIONI_BISEZIONE):
+                medio = np.sqrt(basso * alto)
+                prova = risolvi(medio)
+                if prova.sum() >= minimo_dipendenti:
+                    alto, scelti = medio, prova
+                else:
+                    basso = medio
+
+    per_regione = pd.DataFrame({
+        'dipendenti': np.bincount(codici[scelti], minlength=len(etichette)),
+        'incentivo': np.bincount(codici[scelti], weights=costo[scelti], minlength=len(etichette)),
+        'risparmio': np.bincount(codici[scelti], weights=valore[scelti], minlength=len(etichette)),
+        'candidati': np.bincount(codici[candidati], minlength=len(etichette)),
+        'tetto': np.minimum(tetti, len(costo))
+    }, index=pd.Index(etichette, name='regione')).sort_values('risparmio', ascending=False)
+
+    risparmio = float(valore[scelti].sum())
+    limite, _ = _duale(np.where(candidati, valore, 0.0), costo, codici, tetti, budget)
+    return {
+        'selezionati': scelti,
+        'dipendenti': int(scelti.sum()),
+        'incentivo_totale': float(costo[scelti].sum()),
+        'risparmio_totale': risparmio,
+        'costo_evitato': float(risultati['costo_totale_mantenimento'].to_numpy()[scelti].sum()),
+        'budget_residuo': float(budget - costo[scelti].sum()),
+        'limite_superiore': limite,
+        'gap': 1 - risparmio / limite if limite > 0 else 0.0,
+        'fattibile': fattibile,
+        'per_regione': per_regione
+    }
@@ -0,0 +1,112 @@
+"""
+Parametri normativi per anno di legislazione.
+
+Le soglie (età di vecchiaia, requisiti di anticipata, Quota 97.6, soglia NASPI, massimale APE,
+aliquote R.I.T.A., ...) non sono più costanti sparse nelle funzioni ma righe di una tabella
+per anno (dati/regole_pensionistiche.csv). La tabella viene letta e validata una sola volta e
+compilata in un array per parametro, indicizzato per anno - primo anno: nei calcoli vettoriali
+la lookup delle regole di un anno è un semplice indexing numpy.
+
+Anni fuori tabella usano la riga più vicina (il primo o l'ultimo anno disponibile).
+I valori forniti riproducono le costanti storiche dei calcoli e vanno aggiornati con
+quelli ufficiali aggiungendo una riga per ogni nuovo anno.
+"""
+import csv
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+PERCORSO_REGOLE = Path(__file__).parent / "dati" / "regole_pensionistiche.csv"
+
+# Parametro -> (tipo, minimo, massimo) usati nella validazione
+PARAMETRI_REGOLE = {
+    'eta_vecchiaia': (int, 60, 75),
+    'anni_anticipata_uomini': (int, 30, 50),
+    'anni_anticipata_donne': (int, 30, 50),
+    'mesi_extra_anticipata': (int, 0, 11),
+    'anni_anticipata_precoci': (int, 30, 50),
+    'mesi_extra_precoci': (int, 0, 11),
+    'quota_usuranti': (float, 80, 110),
+    'eta_minima_usuranti': (float, 55, 70),
+    'soglia_naspi': (float, 0, 10000),
+    'quota_naspi_sotto_soglia': (float, 0, 1),
+    'quota_naspi_sopra_soglia': (float, 0, 1),
+    'durata_massima_naspi': (int, 1, 48),
+    'eta_minima_ape': (int, 55, 70),
+    'anni_contributi_ape': (int, 10, 45),
+    'anni_contributi_ape_usuranti': (int, 10, 45),
+    'massimale_ape': (float, 0, 10000),
+    'anni_massimi_rita': (int, 1, 15),
+    'aliquota_rita': (float, 0, 1),
+    'riduzione_annua_rita': (float, 0, 1),
+    'aliquota_minima_rita': (float, 0, 1),
+    'anni_fondo_esenti_rita': (int, 0, 50),
+    'anni_fondo_rita': (int, 0, 60)
+}
+
+def carica_regole(percorso=PERCORSO_REGOLE):
+    """
+    Legge e valida la tabella delle regole. Ritorna un dict con 'anni' (array crescente e
+    contiguo), un array per parametro e 'per_anno' (una dict di scalari Python per riga,
+    per le funzioni scalari).
+    """
+    with open(percorso, newline='') as f:
+        righe = list(csv.DictReader(f))
+    if not righe:
+        raise ValueError(f"Tabella regole vuota: {percorso}")
+
+    mancanti = (set(PARAMETRI_REGOLE) | {'anno'}) - set(righe[0])
+    if mancanti:
+        raise ValueError(f"Colonne mancanti nella tabella regole: {', '.join(sorted(mancanti))}")
+
+    righe.sort(key=lambda r: int(r['anno']))
+    anni = np.array([int(r['anno']) for r in righe])
+    if np.any(np.diff(anni) != 1):
+        raise ValueError("Gli anni della tabella regole devono essere unici e consecutivi")
+
+    regole = {'anni': anni}
+    for nome, (tipo, minimo, massimo) in PARAMETRI_REGOLE.items():
+        valori = np.array([tipo(r[nome]) for r in righe])
+        fuori = (valori < minimo) | (valori > massimo)
+        if fuori.any():
+            anno = anni[fuori.argmax()]
+            raise ValueError(f"Valore di {nome} fuori intervallo [{minimo}, {massimo}] per l'anno {anno}")
+        regole[nome] = valori
+
+    regole['per_anno'] = [
+        {nome: regole[nome][i].item() for nome in PARAMETRI_REGOLE} for i in range(len(anni))
+    ]
+    return regole
+
+_regole = None
+
+def regole_pensionistiche():
+    """Tabella delle regole compilata, caricata al primo utilizzo e poi condivisa."""
+    global _regole
+    if _regole is None:
+        _regole = carica_regole()
+    return _regole
+
+def indice_anno(anni):
+    """Indice di riga per uno o più anni (limitato agli anni in tabella)."""
+    tabella = regole_pensionistiche()['anni']
+    return np.clip(np.asarray(anni) - tabella[0], 0, len(tabella) - 1)
+
+def parametri_anno(anno=None):
+    """Parametri di un anno (default: anno corrente) come dict di scalari."""
+    regole = regole_pensionistiche()
+    anno = date.today().year if anno is None else anno
+    return regole['per_anno'][min(max(anno - regole['anni'][0], 0), len(regole['anni']) - 1)]
+
+def parametri_batch(indici, *nomi):
+    """Valori dei parametri `nomi` per un array di indici di riga (un array per nome)."""
+    regole = regole_pensionistiche()
+    valori = tuple(regole[nome][indici] for nome in nomi)
+    return valori[0] if len(valori) == 1 else valori
+
+def aliquota_rita(parametri):
+    """Tassazione agevolata R.I.T.A.: ridotta per ogni anno nel fondo oltre la soglia, con un minimo."""
+    return max(parametri['aliquota_minima_rita'],
+               parametri['aliquota_rita'] - parametri['riduzione_annua_rita'] *
+               max(0, parametri['anni_fondo_rita'] - parametri['anni_fondo_esenti_rita']))
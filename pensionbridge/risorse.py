@@ -0,0 +1,42 @@
+"""
+Risorse costanti condivise da tutte le sessioni del processo.
+
+Streamlit riesegue lo script di ogni sessione a ogni interazione: quello che non dipende
+dagli input (l'elenco ordinato delle regioni, i fattori di costo della vita, i layout dei
+grafici) è costruito qui una volta per processo e riusato da tutte le sessioni, invece di
+essere ricostruito a ogni rerun di ciascuna.
+
+Le risorse sono in sola lettura: tuple, array NumPy non scrivibili e layout Plotly che le
+figure copiano alla costruzione (go.Figure(layout=...) non modifica l'originale).
+"""
+import numpy as np
+
+from .cache import memoizza
+from .calcoli import COSTO_VITA_REGIONALE
+
+REGIONI = tuple(sorted(COSTO_VITA_REGIONALE))
+INDICE_REGIONE = {regione: i for i, regione in enumerate(REGIONI)}
+
+# Fattore costo vita nell'ordine di REGIONI
+FATTORI_COSTO_VITA = np.array([COSTO_VITA_REGIONALE[r] for r in REGIONI])
+FATTORI_COSTO_VITA.flags.writeable = False
+
+@memoizza(dimensione_massima=1)
+def layout_grafici():
+    """
+    Layout Plotly dei grafici dello scenario singolo, per nome: costruiti al primo uso (così
+    l'import di Plotly resta fuori dall'avvio a freddo) e poi condivisi.
+    """
+    import plotly.graph_objects as go
+
+    legenda_orizzontale = dict(orientation='h', y=-0.2)
+    return {
+        'composizione': go.Layout(title="Composizione Incentivo"),
+        'regioni': go.Layout(title="Incentivo Esodo per Regione", yaxis_title="€", xaxis_tickangle=-45),
+        'flussi': go.Layout(xaxis_title="Mese", yaxis_title="€ / mese", hovermode='x unified',
+                            legend=legenda_orizzontale),
+        'proiezione': go.Layout(xaxis_title="Anni Extra Lavoro", yaxis_title="Pensione Stimata (€)",
+                                xaxis_dtick=1),
+        'breakeven': go.Layout(xaxis_title="Mesi di Lavoro Extra", yaxis_title="Valore attuale (€)",
+                               hovermode='x unified', legend=legenda_orizzontale),
+    }
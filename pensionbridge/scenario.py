@@ -0,0 +1,214 @@
+"""
+Scenario completo di un dipendente: la catena dei "CALCOLI CORE" dell'app e la proiezione
+degli anni extra (tab 5) in un'unica funzione, definita come grafo di nodi (NODI_SCENARIO):
+calcola_scenario lo valuta per intero, grafo_scenario ne mantiene lo stato tra valutazioni
+successive e ricalcola solo i nodi che dipendono dagli input cambiati.
+
+calcola_scenario_memo aggiunge una cache LRU/TTL condivisa da tutte le sessioni del processo,
+con chiave sulla tupla normalizzata degli input: interazioni ripetute o avanti-e-indietro
+sui widget non ricalcolano nulla.
+"""
+from datetime import date
+from inspect import signature
+
+from .cache import CacheLRU
+from .grafo import GrafoCalcolo, ordine_topologico, valuta_nodi
+from .calcoli import (
+    calcola_data_pensione,
+    stima_pensione_netta,
+    calcola_naspi,
+    calcola_ape_sociale,
+    calcola_rita,
+    calcola_incentivo_esodo_regionale,
+)
+from .fisco import incentivo_netto, stipendio_netto_mensile
+
+# Anni di lavoro extra nella proiezione "Strategia Temporale"
+ANNI_EXTRA_PROIEZIONE = [0, 1, 2, 3, 4, 5]
+
+# Limiti della cache condivisa tra sessioni
+DIMENSIONE_CACHE_SCENARI = 512
+TTL_CACHE_SCENARI = 3600  # secondi
+
+# Input di calcola_scenario, nell'ordine degli argomenti posizionali
+NOMI_INPUT_SCENARIO = (
+    'sesso', 'eta', 'regione', 'tipo_contribuzione', 'anni_contributi', 'ral',
+    'is_lavoratore_precoce', 'is_lavoratore_usurante', 'montante_complementare',
+    'mesi_contributi_ultimi_4_anni', 'is_disoccupato', 'is_caregiver', 'is_invalido',
+    'incentivo_proposto'
+)
+
+def _anni_a_pensione(date_pensione, oggi):
+    data_target = date_pensione[0]
+    return (data_target.year - oggi.year) + (data_target.month - oggi.month) / 12
+
+def _mesi_mancanti(date_pensione, oggi):
+    data_target = date_pensione[0]
+    return max((data_target.year - oggi.year) * 12 + (data_target.month - oggi.month), 1)
+
+def _pensioni_future(ral, anni_contributi, tipo_contribuzione, regione):
+    # Proiezione anni extra di lavoro (tab 5)
+    return [
+        stima_pensione_netta(ral * (1.01**a), anni_contributi + a, tipo_contribuzione, regione)
+        for a in ANNI_EXTRA_PROIEZIONE
+    ]
+
+# Catena dei "CALCOLI CORE" come grafo: nodo -> (funzione, dipendenze tra nodi e input).
+# Cambiare solo la regione, ad esempio, sporca l'incentivo e il risparmio aziendale ma non
+# la data di pensione, la NASPI o l'APE Sociale.
+NODI_SCENARIO = {
+    'date_pensione': (calcola_data_pensione, (
+        'eta', 'anni_contributi', 'sesso', 'is_lavoratore_precoce', 'is_lavoratore_usurante',
+        'tipo_contribuzione', 'oggi'
+    )),
+    'pensione_stimata': (stima_pensione_netta, ('ral', 'anni_contributi', 'tipo_contribuzione', 'regione')),
+    'stipendio_netto_mensile': (stipendio_netto_mensile, ('ral', 'regione')),
+    'naspi': (
+        lambda ral, mesi, oggi: calcola_naspi(ral, mesi, oggi.year),
+        ('ral', 'mesi_contributi_ultimi_4_anni', 'oggi')
+    ),
+    'ape': (
+        lambda eta, anni, ral, disoccupato, caregiver, invalido, usurante, oggi: calcola_ape_sociale(
+            eta, anni, ral, disoccupato, caregiver, invalido, usurante, anno=oggi.year
+        ),
+        ('eta', 'anni_contributi', 'ral', 'is_disoccupato', 'is_caregiver', 'is_invalido',
+         'is_lavoratore_usurante', 'oggi')
+    ),
+    'anni_a_pensione': (_anni_a_pensione, ('date_pensione', 'oggi')),
+    'rita': (
+        lambda montante, eta, anni_a_pensione, oggi: calcola_rita(montante, eta, anni_a_pensione, oggi.year),
+        ('montante_complementare', 'eta', 'anni_a_pensione', 'oggi')
+    ),
+    'mesi_mancanti': (_mesi_mancanti, ('date_pensione', 'oggi')),
+    # Incentivo esodo regionale: l'APE Sociale conta solo se spettante
+    'risultato_incentivo': (
+        lambda ral, mesi, regione, naspi, ape: calcola_incentivo_esodo_regionale(
+            ral, mesi, regione, naspi[0], ape[0] if ape[1] else 0
+        ),
+        ('ral', 'mesi_mancanti', 'regione', 'naspi', 'ape')
+    ),
+    'incentivo': (
+        lambda risultato, proposto: risultato['incentivo_totale'] if proposto is None else proposto,
+        ('risultato_incentivo', 'incentivo_proposto')
+    ),
+    # Analisi aziendale: stima costo azienda (INPS + TFR)
+    # Tassazione separata dell'incentivo
+    'incentivo_netto': (incentivo_netto, ('incentivo', 'ral')),
+    'costo_azienda_annuo': (lambda ral: ral * 1.35, ('ral',)),
+    'costo_totale_mantenimento': (
+        lambda costo, mesi: costo * (mesi / 12), ('costo_azienda_annuo', 'mesi_mancanti')
+    ),
+    'risparmio_aziendale': (lambda costo, incentivo: costo - incentivo, ('costo_totale_mantenimento', 'incentivo')),
+    'pensioni_future': (_pensioni_future, ('ral', 'anni_contributi', 'tipo_contribuzione', 'regione'))
+}
+ORDINE_SCENARIO = ordine_topologico(NODI_SCENARIO)
+
+def _componi_scenario(valori, ingressi):
+    """Dict dello scenario (le chiavi usate dall'app) dai valori dei nodi."""
+    data_target, data_vecchiaia, data_anticipata = valori['date_pensione']
+    naspi_mensile, durata_naspi = valori['naspi']
+    ape_importo, ape_ammissibile, ape_messaggio = valori['ape']
+    rita_mensile, rita_disponibile, rita_messaggio = valori['rita']
+    return {
+        'oggi': ingressi['oggi'],
+        'data_target': data_target,
+        'data_vecchiaia': data_vecchiaia,
+        'data_anticipata': data_anticipata,
+        'pensione_stimata': valori['pensione_stimata'],
+        'stipendio_netto_mensile': valori['stipendio_netto_mensile'],
+        'naspi_mensile': naspi_mensile,
+        'durata_naspi': durata_naspi,
+        'ape_importo': ape_importo,
+        'ape_ammissibile': ape_ammissibile,
+        'ape_messaggio': ape_messaggio,
+        'anni_a_pensione': valori['anni_a_pensione'],
+        'rita_mensile': rita_mensile,
+        'rita_disponibile': rita_disponibile,
+        'rita_messaggio': rita_messaggio,
+        'mesi_mancanti': valori['mesi_mancanti'],
+        'risultato_incentivo': valori['risultato_incentivo'],
+        'incentivo_proposto': valori['incentivo'],
+        'incentivo_netto': valori['incentivo_netto'],
+        'costo_azienda_annuo': valori['costo_azienda_annuo'],
+        'costo_totale_mantenimento': valori['costo_totale_mantenimento'],
+        'risparmio_aziendale': valori['risparmio_aziendale'],
+        'pensioni_future': valori['pensioni_future']
+    }
+
+def calcola_scenario(sesso, eta, regione, tipo_contribuzione, anni_contributi, ral,
+                     is_lavoratore_precoce=False, is_lavoratore_usurante=False,
+                     montante_complementare=0, mesi_contributi_ultimi_4_anni=48,
+                     is_disoccupato=False, is_caregiver=False, is_invalido=False,
+                     incentivo_proposto=None, oggi=None):
+    """
+    Calcola tutti i valori derivati mostrati nelle cinque tab.
+    Con incentivo_proposto=None viene usato l'incentivo calcolato automaticamente.
+    `oggi` è la data di riferimento (default: data odierna), riportata nel risultato.
+    """
+    ingressi = dict(zip(NOMI_INPUT_SCENARIO, (
+        sesso, eta, regione, tipo_contribuzione, anni_contributi, ral,
+        is_lavoratore_precoce, is_lavoratore_usurante, montante_complementare,
+        mesi_contributi_ultimi_4_anni, is_disoccupato, is_caregiver, is_invalido,
+        incentivo_proposto
+    )), oggi=oggi or date.today())
+    valori, _, _ = valuta_nodi(NODI_SCENARIO, ORDINE_SCENARIO, ingressi)
+    return _componi_scenario(valori, ingressi)
+
+def grafo_scenario():
+    """
+    Grafo incrementale dello scenario (uno per sessione): aggiorna(**input) accetta gli
+    argomenti di calcola_scenario, con `oggi` obbligatorio, e ricalcola solo i nodi sporchi.
+    """
+    predefiniti = {nome: parametro.default for nome, parametro in signature(calcola_scenario).parameters.items()
+                   if parametro.default is not parametro.empty and nome != 'oggi'}
+    return GrafoCalcolo(NODI_SCENARIO, _componi_scenario, predefiniti)
+
+def normalizza_input_scenario(sesso, eta, regione, tipo_contribuzione, anni_contributi, ral,
+                              is_lavoratore_precoce=False, is_lavoratore_usurante=False,
+                              montante_complementare=0, mesi_contributi_ultimi_4_anni=48,
+                              is_disoccupato=False, is_caregiver=False, is_invalido=False,
+                              incentivo_proposto=None):
+    """
+    Tupla canonica degli input: valori equivalenti (62 e 62.0, 1 e True) danno la stessa chiave.
+    L'ordine coincide con gli argomenti posizionali di calcola_scenario.
+    """
+    return (
+        str(sesso),
+        float(eta),
+        str(regione),
+        str(tipo_contribuzione),
+        float(anni_contributi),
+        float(ral),
+        bool(is_lavoratore_precoce),
+        bool(is_lavoratore_usurante),
+        float(montante_complementare),
+        float(mesi_contributi_ultimi_4_anni),
+        bool(is_disoccupato),
+        bool(is_caregiver),
+        bool(is_invalido),
+        None if incentivo_proposto is None else float(incentivo_proposto)
+    )
+
+_cache_scenari = CacheLRU(DIMENSIONE_CACHE_SCENARI, TTL_CACHE_SCENARI)
+
+def calcola_scenario_memo(*args, oggi=None, grafo=None, **kwargs):
+    """
+    Come calcola_scenario, ma con cache condivisa tra sessioni.
+    Il dict ritornato è condiviso: non va modificato.
+    Con `grafo` (da grafo_scenario) uno scenario non in cache viene ricalcolato in modo
+    incrementale rispetto all'ultima valutazione del grafo.
+    """
+    # Il giorno fa parte della chiave: le date dipendono dalla data di riferimento
+    giorno = oggi or date.today()
+    input_normalizzato = normalizza_input_scenario(*args, **kwargs)
+
+    def calcola():
+        if grafo is None:
+            return calcola_scenario(*input_normalizzato, oggi=giorno)
+        return grafo.aggiorna(**dict(zip(NOMI_INPUT_SCENARIO, input_normalizzato)), oggi=giorno)
+
+    return _cache_scenari.ottieni((giorno, *input_normalizzato), calcola)
+
+def statistiche_cache_scenari():
+    """Contatori hit/miss/evizioni della cache scenari."""
+    return _cache_scenari.statistiche()
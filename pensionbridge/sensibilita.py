@@ -0,0 +1,121 @@
+"""
+Sensibilità dell'incentivo suggerito a ogni input, in un'unica valutazione vettoriale.
+
+Per ogni input dello scenario si costruiscono le varianti (valori perturbati); lo scenario
+base e tutte le varianti diventano le righe di un solo DataFrame, valutato con una chiamata
+a calcola_scenari_batch. Data di pensione, NASPI, APE Sociale e incentivo regionale sono
+quindi ricalcolati per ogni variante lungo l'intera catena, senza una rerun per valore.
+
+- input numerici (RAL, età, anni di contributi, montante, mesi di contribuzione): un passo
+  in basso e uno in alto, limitati ai valori ammessi dalla sidebar. L'elasticità è la
+  variazione percentuale della metrica su quella dell'input (differenza centrata);
+- input categorici e condizioni (regione, contribuzione, sesso, flag): tutte le
+  alternative; il tornado riporta quella con la metrica più bassa e quella con la più alta.
+"""
+import numpy as np
+import pandas as pd
+
+from .batch import COLONNE_BATCH_DEFAULT, calcola_scenari_batch
+from .calcoli import TIPI_CONTRIBUZIONE
+from .risorse import REGIONI
+
+# Input numerico -> (passo, passo relativo, minimo, massimo)
+PERTURBAZIONI_NUMERICHE = {
+    'ral': (0.10, True, 20000, 200000),
+    'eta': (1, False, 50, 70),
+    'anni_contributi': (2, False, 20, 50),
+    'montante_complementare': (10000, False, 0, None),
+    'mesi_contributi_ultimi_4_anni': (12, False, 0, 48)
+}
+
+# Input categorico -> valori alternativi
+ALTERNATIVE_CATEGORICHE = {
+    'regione': list(REGIONI),
+    'tipo_contribuzione': TIPI_CONTRIBUZIONE,
+    'sesso': ["Uomo", "Donna"],
+    'is_lavoratore_precoce': [False, True],
+    'is_lavoratore_usurante': [False, True],
+    'is_disoccupato': [False, True],
+    'is_caregiver': [False, True],
+    'is_invalido': [False, True]
+}
+
+ETICHETTE_INPUT = {
+    'ral': "RAL",
+    'eta': "Età",
+    'anni_contributi': "Anni di contributi",
+    'montante_complementare': "Montante complementare",
+    'mesi_contributi_ultimi_4_anni': "Mesi contributi ultimi 4 anni",
+    'regione': "Regione",
+    'tipo_contribuzione': "Tipo di contribuzione",
+    'sesso': "Sesso",
+    'is_lavoratore_precoce': "Lavoratore precoce",
+    'is_lavoratore_usurante': "Lavoro usurante",
+    'is_disoccupato': "Disoccupato",
+    'is_caregiver': "Caregiver",
+    'is_invalido': "Invalido ≥74%"
+}
+
+def _valori_numerici(valore, passo, relativo, minimo, massimo):
+    delta = abs(valore) * passo if relativo else passo
+    return [float(np.clip(valore - delta, minimo, massimo)), float(np.clip(valore + delta, minimo, massimo))]
+
+def varianti_scenario(input_scenario, perturbazioni=PERTURBAZIONI_NUMERICHE, alternative=ALTERNATIVE_CATEGORICHE):
+    """
+    Righe da valutare: lo scenario base (input None) e, per ogni input, una riga per valore
+    alternativo. Ritorna un DataFrame con gli argomenti di calcola_scenario più 'input' e 'valore'.
+    """
+    # Gli input assenti assumono i default del batch, così vengono perturbati anch'essi
+    base = {**COLONNE_BATCH_DEFAULT, **input_scenario}
+    base = {k: v for k, v in base.items() if k not in ('oggi', 'incentivo_proposto')}
+    righe = [{**base, 'input': None, 'valore': None}]
+    for nome, (passo, relativo, minimo, massimo) in perturbazioni.items():
+        if nome in base:
+            valori = _valori_numerici(base[nome], passo, relativo, minimo, massimo)
+            righe += [{**base, nome: v, 'input': nome, 'valore': v} for v in valori]
+    for nome, valori in alternative.items():
+        if nome in base:
+            righe += [{**base, nome: v, 'input': nome, 'valore': v} for v in valori]
+    return pd.DataFrame(righe)
+
+def analisi_sensibilita(input_scenario, metrica='incentivo_totale', perturbazioni=PERTURBAZIONI_NUMERICHE,
+                        alternative=ALTERNATIVE_CATEGORICHE):
+    """
+    Sensibilità di `metrica` (una colonna di calcola_scenari_batch) a ogni input di
+    `input_scenario` (argomenti di calcola_scenario), con una sola valutazione batch.
+
+    Ritorna un dict con 'base' (valore della metrica nello scenario base), 'varianti'
+    (DataFrame input/valore/metrica per ogni riga valutata) e 'tornado': un DataFrame per input
+    con valore e metrica bassi e alti, escursione ed elasticità (solo input numerici),
+    ordinato per escursione decrescente.
+    """
+    righe = varianti_scenario(input_scenario, perturbazioni, alternative)
+    risultati = calcola_scenari_batch(righe.drop(columns=['input', 'valore']), input_scenario.get('oggi'))
+    varianti = righe[['input', 'valore']].assign(**{metrica: risultati[metrica].to_numpy()})
+    base = float(varianti[metrica].iloc[0])
+    varianti = varianti.iloc[1:].reset_index(drop=True)
+
+    tornado = []
+    for nome, gruppo in varianti.groupby('input', sort=False):
+        if nome in perturbazioni:
+            basso, alto = gruppo.iloc[0], gruppo.iloc[-1]
+            valore_base = righe.loc[0, nome]
+            variazione_input = (alto['valore'] - basso['valore']) / valore_base if valore_base else np.nan
+            elasticita = ((alto[metrica] - basso[metrica]) / base / variazione_input
+                          if base and variazione_input else np.nan)
+        else:
+            basso, alto = gruppo.loc[gruppo[metrica].idxmin()], gruppo.loc[gruppo[metrica].idxmax()]
+            elasticita = np.nan
+        tornado.append({
+            'input': nome,
+            'etichetta': ETICHETTE_INPUT.get(nome, nome),
+            'valore_basso': basso['valore'],
+            'valore_alto': alto['valore'],
+            'metrica_bassa': basso[metrica],
+            'metrica_alta': alto[metrica],
+            'escursione': abs(alto[metrica] - basso[metrica]),
+            'elasticita': elasticita
+        })
+
+    tornado = pd.DataFrame(tornado).sort_values('escursione', ascending=False, kind='stable')
+    return {'base': base, 'varianti': varianti, 'tornado': tornado.reset_index(drop=True)}
@@ -0,0 +1,346 @@
+"""
+Servizio HTTP locale per i sistemi interni (paghe, pianificazione HR).
+
+Endpoint:
+    GET  /salute     stato del servizio e contatori della coda
+    POST /scenario   un dipendente: gli argomenti di calcola_scenario (+ "oggi" opzionale),
+                     risposta con lo scenario completo
+    POST /batch      {"dipendenti": [{...}, ...], "oggi": "AAAA-MM-GG", "colonne": [...],
+                      "colonna_id": "matricola"}: le colonne di calcola_scenari_batch per dipendente
+
+Il front end è asincrono (Starlette su uvicorn, già dipendenze di Streamlit) e non fa calcoli
+pesanti: i corpi delle richieste batch passano così come sono a un pool di processi, dove vengono
+decodificati, valutati e serializzati in JSON.
+
+- Coalescenza: con tutti i worker occupati le richieste batch in attesa si accumulano e il
+  primo worker libero le valuta insieme, concatenate in una chiamata vettoriale per gruppo di
+  richieste con le stesse colonne opzionali; richieste identiche in volo condividono la stessa
+  risposta.
+- Backpressure: oltre un limite di byte in coda (/batch) o di scenari in calcolo (/scenario)
+  il servizio risponde 503 con Retry-After, invece di accumulare lavoro e latenza; i corpi
+  troppo grandi ricevono 413 appena superano il limite, anche senza Content-Length.
+
+Avvio:
+    python -m pensionbridge.servizio --porta 8765 --processi 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import partial
+
+import numpy as np
+
+from .scenario import calcola_scenario_memo
+
+BYTE_MASSIMI_RICHIESTA = 64 * 1024 * 1024
+BYTE_MASSIMI_CODA = 256 * 1024 * 1024
+# Byte di richieste valutati insieme da un worker (un lotto coalescente)
+BYTE_MASSIMI_LOTTO = 8 * 1024 * 1024
+# Richieste /scenario in calcolo nei thread allo stesso tempo; oltre, 503
+SCENARI_MASSIMI_IN_CORSO = 32
+
+class CodaPiena(Exception):
+    """La coda ha raggiunto il limite di byte: la richiesta va ritentata più tardi."""
+
+def _json_default(valore):
+    if isinstance(valore, date):
+        return valore.isoformat()
+    if isinstance(valore, np.generic):
+        return valore.item()
+    raise TypeError(f"Valore non serializzabile: {type(valore).__name__}")
+
+def _errore(messaggio):
+    return 400, json.dumps({'errore': messaggio}, ensure_ascii=False).encode()
+
+# --- Lato worker ---
+
+def _leggi_richiesta_batch(corpo):
+    """Decodifica e valida un corpo /batch. Ritorna (dati, oggi, colonne, colonna_id)."""
+    import pandas as pd
+
+    from .batch import COLONNE_BATCH_OBBLIGATORIE, COLONNE_OUTPUT
+    from .calendario import data_riferimento
+
+    richiesta = json.loads(corpo)
+    if not isinstance(richiesta, dict) or not isinstance(richiesta.get('dipendenti'), list):
+        raise ValueError("Il corpo deve essere un oggetto con la lista 'dipendenti'")
+    dati = pd.DataFrame.from_records(richiesta['dipendenti'])
+    mancanti = [c for c in COLONNE_BATCH_OBBLIGATORIE if c not in dati]
+    if mancanti and len(dati):
+        raise ValueError(f"Colonne obbligatorie mancanti: {', '.join(mancanti)}")
+    colonne = richiesta.get('colonne') or COLONNE_OUTPUT
+    colonna_id = richiesta.get('colonna_id')
+    if colonna_id and colonna_id not in dati:
+        raise ValueError(f"Colonna identificativa assente: {colonna_id}")
+    return dati, data_riferimento(richiesta.get('oggi')), list(colonne), colonna_id
+
+def _serializza(risultati, colonne, id_dipendenti=None):
+    risultati = risultati[colonne].copy()
+    for c in colonne:
+        if risultati[c].dtype.kind == 'M':
+            risultati[c] = risultati[c].to_numpy().astype('datetime64[D]').astype(str)
+    if id_dipendenti is not None:
+        risultati.insert(0, id_dipendenti.name, id_dipendenti.to_numpy())
+    n = len(risultati)
+    return f'{{"n":{n},"risultati":'.encode() + risultati.to_json(orient='records').encode() + b'}'
+
+def _valuta_lotto(corpi):
+    """
+    Valuta un lotto di corpi /batch con una chiamata vettoriale per gruppo di richieste con le
+    stesse colonne opzionali (righe concatenate, una data di riferimento per riga). Ritorna una
+    lista di (status, corpo JSON), una per richiesta.
+    """
+    import pandas as pd
+
+    from .batch import COLONNE_BATCH_DEFAULT, calcola_scenari_batch
+
+    esiti = [None] * len(corpi)
+    valide = []
+    for i, corpo in enumerate(corpi):
+        try:
+            richiesta = _leggi_richiesta_batch(corpo)
+        except (ValueError, TypeError) as e:
+            esiti[i] = _errore(str(e))
+            continue
+        if len(richiesta[0]):
+            valide.append((i, *richiesta))
+        else:
+            esiti[i] = 200, b'{"n":0,"risultati":[]}'
+    if not valide:
+        return esiti
+
+    def valuta(gruppo):
+        dati = pd.concat([g[1] for g in gruppo], ignore_index=True)
+        oggi = np.concatenate([np.full(len(g[1]), g[2]) for g in gruppo])
+        return calcola_scenari_batch(dati, oggi)
+
+    # Concatenando richieste con colonne opzionali diverse, quelle assenti in una richiesta
+    # diventerebbero NaN invece dei default (o del calcolo automatico dell'incentivo): ogni
+    # richiesta è valutata solo insieme a quelle con le stesse colonne opzionali
+    opzionali = {*COLONNE_BATCH_DEFAULT, 'incentivo_proposto'}
+    per_colonne = {}
+    for richiesta in valide:
+        per_colonne.setdefault(frozenset(opzionali.intersection(richiesta[1].columns)), []).append(richiesta)
+
+    gruppi = []
+    for gruppo in per_colonne.values():
+        try:
+            gruppi.append((gruppo, valuta(gruppo)))
+        except (ValueError, TypeError, KeyError):
+            # Un input non valido fa fallire il gruppo: si valutano le richieste una per una
+            for richiesta in gruppo:
+                try:
+                    gruppi.append(([richiesta], valuta([richiesta])))
+                except (ValueError, TypeError, KeyError) as e:
+                    esiti[richiesta[0]] = _errore(f"Input non valido: {e}")
+
+    for gruppo, risultati in gruppi:
+        inizio = 0
+        for i, dati, _, colonne, colonna_id in gruppo:
+            fine = inizio + len(dati)
+            parte = risultati.iloc[inizio:fine]
+            try:
+                esiti[i] = 200, _serializza(parte, colonne, dati[colonna_id] if colonna_id else None)
+            except KeyError as e:
+                esiti[i] = _errore(f"Colonna di output sconosciuta: {e}")
+            inizio = fine
+    return esiti
+
+def _riscalda():
+    """Importa il motore batch nel worker, così la prima richiesta non ne paga l'avvio."""
+    from . import batch  # noqa: F401
+    return os.getpid()
+
+# --- Lato front end ---
+
+class Coalescitore:
+    """
+    Coda delle richieste batch verso il pool. Al massimo un lotto per worker è in esecuzione:
+    le richieste arrivate nel frattempo partono insieme nel lotto successivo (fino a
+    `byte_massimi_lotto`). Oltre `byte_massimi_coda` byte in attesa o in esecuzione, invia()
+    solleva CodaPiena.
+    """
+
+    def __init__(self, pool, processi, byte_massimi_coda=BYTE_MASSIMI_CODA, byte_massimi_lotto=BYTE_MASSIMI_LOTTO):
+        self.pool = pool
+        self.processi = processi
+        self.byte_massimi_coda = byte_massimi_coda
+        self.byte_massimi_lotto = byte_massimi_lotto
+        self._coda = deque()
+        self._in_volo = {}
+        self._lotti_in_esecuzione = 0
+        self.byte_in_coda = 0
+        self.contatori = {'richieste': 0, 'lotti': 0, 'richieste_coalescenti': 0, 'duplicate': 0, 'rifiutate': 0}
+
+    async def invia(self, corpo):
+        """Ritorna (status, corpo JSON) per un corpo /batch."""
+        self.contatori['richieste'] += 1
+        chiave = hashlib.sha1(corpo).digest()
+        if chiave in self._in_volo:
+            self.contatori['duplicate'] += 1
+            return await asyncio.shield(self._in_volo[chiave])
+        if self.byte_in_coda + len(corpo) > self.byte_massimi_coda:
+            self.contatori['rifiutate'] += 1
+            raise CodaPiena()
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._in_volo[chiave] = futuro
+        self.byte_in_coda += len(corpo)
+        self._coda.append((corpo, futuro))
+        self._avvia_lotti()
+        try:
+            return await asyncio.shield(futuro)
+        finally:
+            if self._in_volo.get(chiave) is futuro:
+                del self._in_volo[chiave]
+
+    def _avvia_lotti(self):
+        loop = asyncio.get_running_loop()
+        while self._coda and self._lotti_in_esecuzione < self.processi:
+            lotto, byte_lotto = [], 0
+            while self._coda and (not lotto or byte_lotto + len(self._coda[0][0]) <= self.byte_massimi_lotto):
+                corpo, futuro = self._coda.popleft()
+                lotto.append((corpo, futuro))
+                byte_lotto += len(corpo)
+            self._lotti_in_esecuzione += 1
+            self.contatori['lotti'] += 1
+            if len(lotto) > 1:
+                self.contatori['richieste_coalescenti'] += len(lotto)
+            esecuzione = loop.run_in_executor(self.pool, _valuta_lotto, [corpo for corpo, _ in lotto])
+            esecuzione.add_done_callback(lambda e, lotto=lotto, byte_lotto=byte_lotto: self._completato(lotto, byte_lotto, e))
+
+    def _completato(self, lotto, byte_lotto, esecuzione):
+        self._lotti_in_esecuzione -= 1
+        self.byte_in_coda -= byte_lotto
+        for i, (_, futuro) in enumerate(lotto):
+            if futuro.done():
+                continue
+            if esecuzione.exception() is not None:
+                futuro.set_exception(esecuzione.exception())
+            else:
+                futuro.set_result(esecuzione.result()[i])
+        self._avvia_lotti()
+
+    def statistiche(self):
+        return {**self.contatori, 'byte_in_coda': self.byte_in_coda, 'richieste_in_attesa': len(self._coda),
+                'lotti_in_esecuzione': self._lotti_in_esecuzione}
+
+def crea_app(processi=None, byte_massimi_coda=BYTE_MASSIMI_CODA, byte_massimi_richiesta=BYTE_MASSIMI_RICHIESTA,
+             scenari_massimi_in_corso=SCENARI_MASSIMI_IN_CORSO):
+    """Applicazione ASGI (Starlette) con il proprio pool di `processi` worker (default: CPU disponibili)."""
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    processi = processi or os.cpu_count() or 1
+    stato = {}
+    scenari_in_corso = asyncio.BoundedSemaphore(scenari_massimi_in_corso)
+    contatori_scenari = {'scenari_rifiutati': 0}
+
+    @asynccontextmanager
+    async def ciclo_di_vita(app):
+        # spawn: i worker non ereditano thread e socket del server
+        pool = ProcessPoolExecutor(max_workers=processi, mp_context=multiprocessing.get_context('spawn'))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, _riscalda) for _ in range(processi)))
+        stato['coalescitore'] = Coalescitore(pool, processi, byte_massimi_coda)
+        try:
+            yield
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def risposta(status, corpo, **intestazioni):
+        return Response(corpo, status_code=status, media_type='application/json', headers=intestazioni or None)
+
+    def sovraccarico():
+        return risposta(503, *_errore("Servizio sovraccarico, riprovare")[1:], **{'Retry-After': '1'})
+
+    async def leggi_corpo(request):
+        """Ritorna (corpo, None), oppure (None, risposta 400/413) se il corpo non è accettabile."""
+        troppo_grande = risposta(413, *_errore("Richiesta troppo grande")[1:])
+        lunghezza = request.headers.get('content-length')
+        if lunghezza is not None:
+            try:
+                lunghezza = int(lunghezza)
+            except ValueError:
+                lunghezza = -1
+            if lunghezza < 0:
+                return None, risposta(*_errore("Intestazione Content-Length non valida"))
+            if lunghezza > byte_massimi_richiesta:
+                return None, troppo_grande
+        # Il limite vale anche senza Content-Length (chunked): il corpo è letto a pezzi e la
+        # lettura si ferma appena i byte ricevuti superano il limite
+        parti, ricevuti = [], 0
+        async for parte in request.stream():
+            ricevuti += len(parte)
+            if ricevuti > byte_massimi_richiesta:
+                return None, troppo_grande
+            parti.append(parte)
+        return b"".join(parti), None
+
+    async def salute(request):
+        return risposta(200, json.dumps({'stato': 'ok', 'processi': processi,
+                                         **stato['coalescitore'].statistiche(), **contatori_scenari}).encode())
+
+    async def scenario(request):
+        corpo, errore = await leggi_corpo(request)
+        if errore is not None:
+            return errore
+        # Come /batch: con tutti i posti occupati si risponde 503 invece di accodare nei thread
+        if scenari_in_corso.locked():
+            contatori_scenari['scenari_rifiutati'] += 1
+            return sovraccarico()
+        async with scenari_in_corso:
+            try:
+                argomenti = json.loads(corpo)
+                if not isinstance(argomenti, dict):
+                    raise TypeError("Il corpo deve essere un oggetto JSON")
+                oggi = argomenti.pop('oggi', None)
+                # Un miss della cache calcola lo scenario: in un thread, per non fermare il loop
+                # (e con esso /batch e /salute)
+                risultato = await asyncio.get_running_loop().run_in_executor(None, partial(
+                    calcola_scenario_memo, **argomenti, oggi=date.fromisoformat(oggi) if oggi else None
+                ))
+            except (ValueError, TypeError, KeyError) as e:
+                return risposta(*_errore(f"Input non valido: {e}"))
+        return risposta(200, json.dumps(risultato, default=_json_default).encode())
+
+    async def batch(request):
+        corpo, errore = await leggi_corpo(request)
+        if errore is not None:
+            return errore
+        try:
+            return risposta(*await stato['coalescitore'].invia(corpo))
+        except CodaPiena:
+            return sovraccarico()
+
+    return Starlette(routes=[
+        Route('/salute', salute, methods=['GET']),
+        Route('/scenario', scenario, methods=['POST']),
+        Route('/batch', batch, methods=['POST']),
+    ], lifespan=ciclo_di_vita)
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="pensionbridge.servizio", description="Servizio HTTP locale PensionBridge")
+    parser.add_argument("--host", default="127.0.0.1", help="Indirizzo di ascolto (default: solo locale)")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--processi", type=int, default=None, help="Worker del pool (default: CPU disponibili)")
+    parser.add_argument("--coda-mb", type=int, default=BYTE_MASSIMI_CODA // 2**20,
+                        help="Byte di richieste batch in coda oltre cui rispondere 503 (MB)")
+    args = parser.parse_args(argv)
+
+    uvicorn.run(crea_app(args.processi, args.coda_mb * 2**20), host=args.host, port=args.porta, log_level="warning")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Tabella precalcolata dell'incentivo all'esodo: tutte le regioni × griglia RAL × griglia
+dei mesi alla pensione, costruita una volta per configurazione di copertura con il
+broadcasting e tenuta in cache.
+
+La configurazione di copertura è ciò che, oltre a RAL e mesi, determina l'incentivo:
+mesi di contributi per la NASPI, anni di contributi e ammissibilità all'APE Sociale.
+La ricerca di un valore è O(1): posizione sulle griglie uniformi per aritmetica e
+interpolazione bilineare tra i punti vicini (esatta sui punti della griglia e lungo i mesi,
+dove l'incentivo è lineare).
+"""
+import numpy as np
+
+from .batch import calcola_naspi_batch, stima_pensione_netta_batch
+from .cache import memoizza
+from .fisco import indice_regione_fiscale, stipendio_netto_mensile
+from .regole import parametri_anno
+from .risorse import FATTORI_COSTO_VITA, INDICE_REGIONE, REGIONI
+
+# Griglie uniformi: stessi limiti e passo della RAL in sidebar, fino a 20 anni alla pensione
+GRIGLIA_RAL = np.arange(20000, 200001, 1000, dtype=float)
+GRIGLIA_MESI = np.arange(1, 241, dtype=float)
+
+def costruisci_tabella_incentivi(mesi_contributi_ultimi_4_anni=48, anni_contributi=38, ape_ammissibile=False,
+                                 griglia_ral=GRIGLIA_RAL, griglia_mesi=GRIGLIA_MESI):
+    """
+    Costruisce il tensore incentivo[regione, ral, mesi] con la stessa formula di
+    calcola_incentivo_esodo_regionale. Le griglie devono essere uniformi e crescenti.
+    """
+    griglia_ral = np.asarray(griglia_ral, dtype=float)
+    griglia_mesi = np.asarray(griglia_mesi, dtype=float)
+
+    naspi_mensile, _ = calcola_naspi_batch(griglia_ral, mesi_contributi_ultimi_4_anni)
+    ape_importo = np.minimum(stima_pensione_netta_batch(griglia_ral, anni_contributi),
+                             parametri_anno()['massimale_ape']) \
+        if ape_ammissibile else 0.0
+    # Lo stipendio netto dipende dalle addizionali: gap per regione × RAL
+    stipendio_netto = stipendio_netto_mensile(griglia_ral[None, :], indice_regione_fiscale(np.array(REGIONI))[:, None])
+    gap_mensile = stipendio_netto - (naspi_mensile + ape_importo)
+
+    fattore_regionale = FATTORI_COSTO_VITA[:, None, None]
+    mesi = griglia_mesi[None, None, :]
+    incentivo_base = gap_mensile[:, :, None] * fattore_regionale * mesi
+    valore_tempo = 1000 * (1.5 - fattore_regionale) * mesi
+
+    return {
+        'regioni': REGIONI,
+        'ral': griglia_ral,
+        'mesi': griglia_mesi,
+        'incentivo': incentivo_base + valore_tempo
+    }
+
+# Configurazioni tenute in cache per processo: ogni tensore sulle griglie di default occupa
+# circa 7 MB e si ricostruisce in una decina di millisecondi, quindi poche voci bastano
+TABELLE_IN_CACHE = 4
+
+@memoizza(dimensione_massima=TABELLE_IN_CACHE)
+def _tabella_incentivi(mesi_contributi_ultimi_4_anni, anni_contributi, ape_ammissibile):
+    return costruisci_tabella_incentivi(mesi_contributi_ultimi_4_anni, anni_contributi, ape_ammissibile)
+
+def tabella_incentivi(mesi_contributi_ultimi_4_anni=48, anni_contributi=38, ape_ammissibile=False):
+    """Tabella sulle griglie di default, calcolata una volta per configurazione e condivisa."""
+    return _tabella_incentivi(float(mesi_contributi_ultimi_4_anni), float(anni_contributi), bool(ape_ammissibile))
+
+def _posizione(griglia, valori):
+    """Indice della cella e peso di interpolazione su una griglia uniforme (valori fuori griglia limitati)."""
+    passo = griglia[1] - griglia[0]
+    x = (np.clip(valori, griglia[0], griglia[-1]) - griglia[0]) / passo
+    indice = np.minimum(x.astype(np.int64), len(griglia) - 2)
+    return indice, x - indice
+
+def cerca_incentivo(tabella, regione, ral, mesi_mancanti):
+    """
+    Incentivo totale interpolato per regione, RAL e mesi alla pensione (scalari o array).
+    RAL e mesi fuori dalle griglie vengono limitati agli estremi.
+    """
+    try:
+        r = np.vectorize(INDICE_REGIONE.__getitem__, otypes=[np.int64])(regione)
+    except KeyError as e:
+        raise ValueError(f"Regione non presente nella tabella: {e.args[0]}") from None
+    i, peso_ral = _posizione(tabella['ral'], np.asarray(ral, dtype=float))
+    j, peso_mesi = _posizione(tabella['mesi'], np.asarray(mesi_mancanti, dtype=float))
+
+    t = tabella['incentivo']
+    lungo_mesi_basso = t[r, i, j] * (1 - peso_mesi) + t[r, i, j + 1] * peso_mesi
+    lungo_mesi_alto = t[r, i + 1, j] * (1 - peso_mesi) + t[r, i + 1, j + 1] * peso_mesi
+    return lungo_mesi_basso * (1 - peso_ral) + lungo_mesi_alto * peso_ral
+
+def confronto_regioni(tabella, ral, mesi_mancanti):
+    """Incentivo di tutte le regioni per una RAL e un numero di mesi: array allineato a REGIONI."""
+    return cerca_incentivo(tabella, REGIONI, np.full(len(REGIONI), ral), np.full(len(REGIONI), mesi_mancanti))
+
+def matrice_heatmap(tabella, ral=None, mesi_mancanti=None):
+    """
+    Sezione 2-D della tabella per la heatmap: regioni × mesi a RAL fissata, oppure
+    regioni × RAL a mesi fissati (esattamente uno dei due va indicato).
+    Ritorna (valori asse x, matrice regioni × asse x).
+    """
+    if (ral is None) == (mesi_mancanti is None):
+        raise ValueError("Indicare esattamente uno tra ral e mesi_mancanti")
+    t = tabella['incentivo']
+    if ral is not None:
+        i, peso = _posizione(tabella['ral'], float(ral))
+        return tabella['mesi'], t[:, i, :] * (1 - peso) + t[:, i + 1, :] * peso
+    j, peso = _posizione(tabella['mesi'], float(mesi_mancanti))
+    return tabella['ral'], t[:, :, j] * (1 - peso) + t[:, :, j + 1] * peso
@@ -0,0 +1,152 @@
+"""
+Motore dei flussi di cassa mese per mese, da oggi fino a data_target (più un periodo di pensione).
+
+Ogni fonte di reddito è una colonna di una matrice (dipendenti × mesi):
+- stipendio: netto mensile che il dipendente percepirebbe restando (termine di confronto)
+- naspi: importo con riduzione del 3% al mese dal 4° mese, limitato alla durata
+- ape: APE Sociale per tutto il periodo di uscita
+- rita: rendita R.I.T.A. per la durata di erogazione
+- pensione: pensione stimata dalla data target in poi
+
+Totali, gap e incentivo derivano da somme cumulate lungo l'asse dei mesi: nessun ciclo
+Python sui mesi. Per forze lavoro molto grandi riepiloga_timeline_batch lavora a blocchi
+di dipendenti, così la memoria resta limitata.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+FONTI_TIMELINE = ['stipendio', 'naspi', 'ape', 'rita', 'pensione']
+
+# La NASPI si riduce del 3% ogni mese dal 4° mese
+RIDUZIONE_MENSILE_NASPI = 0.03
+MESE_INIZIO_RIDUZIONE_NASPI = 4
+
+def costruisci_timeline_batch(stipendio_netto_mensile, mesi_mancanti, naspi_mensile, durata_naspi,
+                              ape_importo, rita_mensile, anni_a_pensione, pensione_stimata,
+                              mesi_dopo_pensione=12):
+    """
+    Costruisce le matrici mensili (dipendenti × mesi) di ciascuna fonte di reddito.
+    Il mese 0 è il mese corrente; l'orizzonte copre il dipendente più lontano dalla pensione
+    più `mesi_dopo_pensione`, e ogni dipendente riceve la pensione per `mesi_dopo_pensione` mesi.
+    Gli importi APE e R.I.T.A. vanno passati a 0 se non spettanti.
+    Oltre alle fonti, il dict contiene 'mesi_mancanti' (mesi di uscita per dipendente).
+    """
+    stipendio_netto_mensile = np.atleast_1d(np.asarray(stipendio_netto_mensile, dtype=float))
+    mesi_mancanti = np.atleast_1d(np.asarray(mesi_mancanti, dtype=np.int64))
+    n = np.broadcast(stipendio_netto_mensile, mesi_mancanti).size
+    colonna = lambda v: np.broadcast_to(np.asarray(v, dtype=float), (n,))[:, None]
+
+    orizzonte = int(mesi_mancanti.max()) + mesi_dopo_pensione if n else mesi_dopo_pensione
+    mese = np.arange(orizzonte)[None, :]
+
+    mesi_uscita = np.broadcast_to(mesi_mancanti, (n,))[:, None]
+    in_uscita = mese < mesi_uscita
+
+    # Frazione di mese coperta (una durata NASPI di 23.5 mesi paga metà del 24° mese)
+    frazione_naspi = np.clip(colonna(durata_naspi) - mese, 0, 1)
+    decalage = (1 - RIDUZIONE_MENSILE_NASPI) ** np.maximum(0, mese - (MESE_INIZIO_RIDUZIONE_NASPI - 2))
+
+    # Come calcola_rita: erogazione spalmata su almeno 12 mesi
+    mesi_rita = np.maximum(colonna(anni_a_pensione), 1) * 12
+    frazione_rita = np.clip(mesi_rita - mese, 0, 1)
+
+    return {
+        'stipendio': np.where(in_uscita, colonna(stipendio_netto_mensile), 0.0),
+        'naspi': np.where(in_uscita, colonna(naspi_mensile) * decalage * frazione_naspi, 0.0),
+        'ape': np.where(in_uscita, colonna(ape_importo), 0.0),
+        'rita': np.where(in_uscita, colonna(rita_mensile) * frazione_rita, 0.0),
+        'pensione': np.where(~in_uscita & (mese < mesi_uscita + mesi_dopo_pensione), colonna(pensione_stimata), 0.0),
+        'mesi_mancanti': mesi_uscita[:, 0]
+    }
+
+def analizza_timeline(flussi, fattore_regionale=1.0, incentivo_proposto=None):
+    """
+    Deriva dai flussi mensili copertura, gap e incentivo con somme cumulate.
+
+    Ritorna un dict con le matrici cumulate ('copertura_cumulata', 'gap_cumulato')
+    e gli array per dipendente: totali per fonte, gap totale, incentivo con decalage
+    (stessa formula di calcola_incentivo_esodo_regionale ma sui flussi effettivi)
+    e il mese in cui l'incentivo proposto viene esaurito dal gap (-1 se non si esaurisce).
+    """
+    copertura = flussi['naspi'] + flussi['ape'] + flussi['rita']
+    mesi_uscita = flussi['mesi_mancanti']
+    in_uscita = np.arange(copertura.shape[1])[None, :] < mesi_uscita[:, None]
+    gap = np.where(in_uscita, flussi['stipendio'] - copertura, 0.0)
+
+    copertura_cumulata = np.cumsum(np.where(in_uscita, copertura, 0.0), axis=1)
+    gap_cumulato = np.cumsum(gap, axis=1)
+
+    fattore_regionale = np.asarray(fattore_regionale, dtype=float)
+    incentivo = gap_cumulato[:, -1] * fattore_regionale + 1000 * (1.5 - fattore_regionale) * mesi_uscita
+
+    risultato = {
+        'copertura_cumulata': copertura_cumulata,
+        'gap_cumulato': gap_cumulato,
+        'gap_totale': gap_cumulato[:, -1],
+        'copertura_totale': copertura_cumulata[:, -1],
+        'incentivo_timeline': incentivo
+    }
+    for fonte in FONTI_TIMELINE:
+        risultato[f'totale_{fonte}'] = flussi[fonte].sum(axis=1)
+
+    if incentivo_proposto is not None:
+        soglia = np.asarray(incentivo_proposto, dtype=float).reshape(-1, 1)
+        esaurito = gap_cumulato > soglia
+        risultato['mese_esaurimento_incentivo'] = np.where(esaurito.any(axis=1), esaurito.argmax(axis=1), -1)
+    return risultato
+
+def _argomenti_timeline(risultati):
+    return (
+        risultati['stipendio_netto_mensile'], risultati['mesi_mancanti'],
+        risultati['naspi_mensile'], risultati['durata_naspi'],
+        np.where(risultati['ape_ammissibile'], risultati['ape_importo'], 0.0),
+        np.where(risultati['rita_disponibile'], risultati['rita_mensile'], 0.0),
+        risultati['anni_a_pensione'], risultati['pensione_stimata']
+    )
+
+def timeline_da_scenario(scenario, mesi_dopo_pensione=12, oggi=None):
+    """
+    Timeline mensile di un singolo scenario (dict di calcola_scenario) come DataFrame
+    indicizzato per mese, con una colonna per fonte più copertura e gap cumulati.
+    """
+    risultati = {k: np.atleast_1d(scenario[k]) for k in (
+        'stipendio_netto_mensile', 'mesi_mancanti', 'naspi_mensile', 'durata_naspi', 'ape_importo',
+        'ape_ammissibile', 'rita_mensile', 'rita_disponibile', 'anni_a_pensione', 'pensione_stimata')}
+    flussi = costruisci_timeline_batch(*_argomenti_timeline(risultati), mesi_dopo_pensione=mesi_dopo_pensione)
+    analisi = analizza_timeline(flussi, scenario['risultato_incentivo']['fattore_regionale'])
+
+    oggi = oggi or scenario.get('oggi') or date.today()
+    mesi = np.datetime64(oggi, 'M') + np.arange(flussi['stipendio'].shape[1])
+    df = pd.DataFrame({fonte: flussi[fonte][0] for fonte in FONTI_TIMELINE}, index=pd.DatetimeIndex(mesi))
+    df['copertura_cumulata'] = analisi['copertura_cumulata'][0]
+    df['gap_cumulato'] = analisi['gap_cumulato'][0]
+    df.index.name = 'mese'
+    return df
+
+def riepiloga_timeline_batch(risultati, mesi_dopo_pensione=0, dimensione_blocco=5000):
+    """
+    Riepilogo per dipendente dei flussi mensili, a partire dall'output di calcola_scenari_batch.
+    Lavora a blocchi di `dimensione_blocco` dipendenti per limitare la memoria delle matrici.
+    """
+    blocchi = []
+    for inizio in range(0, len(risultati), dimensione_blocco):
+        blocco = risultati.iloc[inizio:inizio + dimensione_blocco]
+        flussi = costruisci_timeline_batch(
+            *_argomenti_timeline({c: blocco[c].to_numpy() for c in blocco.columns}),
+            mesi_dopo_pensione=mesi_dopo_pensione
+        )
+        analisi = analizza_timeline(flussi, blocco['fattore_regionale'].to_numpy(),
+                                    blocco['incentivo_proposto'].to_numpy())
+        blocchi.append(pd.DataFrame({
+            **{f'totale_{fonte}': analisi[f'totale_{fonte}'] for fonte in FONTI_TIMELINE},
+            'copertura_totale': analisi['copertura_totale'],
+            'gap_totale': analisi['gap_totale'],
+            'incentivo_timeline': analisi['incentivo_timeline'],
+            'mese_esaurimento_incentivo': analisi['mese_esaurimento_incentivo']
+        }, index=blocco.index))
+    if not blocchi:
+        return pd.DataFrame(columns=[f'totale_{f}' for f in FONTI_TIMELINE] + [
+            'copertura_totale', 'gap_totale', 'incentivo_timeline', 'mese_esaurimento_incentivo'])
+    return pd.concat(blocchi)
@@ -0,0 +1,43 @@
+"""Dati condivisi dai test: una forza lavoro sintetica e una data di riferimento fissa."""
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RADICE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RADICE))
+
+from pensionbridge import REGIONI, TIPI_CONTRIBUZIONE  # noqa: E402
+
+OGGI = date(2025, 1, 15)
+
+INPUT_SCENARIO = dict(
+    sesso="Uomo", eta=62, regione="Lombardia", tipo_contribuzione="Dipendente Privato",
+    anni_contributi=38, ral=45000, montante_complementare=50000, is_disoccupato=True, oggi=OGGI
+)
+
+def genera_forza_lavoro(n, seme=0):
+    """Forza lavoro casuale con gli stessi intervalli degli input della sidebar."""
+    rng = np.random.default_rng(seme)
+    return pd.DataFrame({
+        'eta': rng.integers(50, 71, n),
+        'anni_contributi': rng.integers(20, 51, n),
+        'sesso': rng.choice(["Uomo", "Donna"], n),
+        'ral': rng.integers(20, 201, n) * 1000.0,
+        'regione': rng.choice(REGIONI, n),
+        'tipo_contribuzione': rng.choice(TIPI_CONTRIBUZIONE, n),
+        'is_lavoratore_precoce': rng.random(n) < 0.1,
+        'is_lavoratore_usurante': rng.random(n) < 0.1,
+        'montante_complementare': rng.choice([0.0, 30000.0, 80000.0], n),
+        'mesi_contributi_ultimi_4_anni': rng.integers(0, 49, n),
+        'is_disoccupato': rng.random(n) < 0.2,
+        'is_caregiver': rng.random(n) < 0.05,
+        'is_invalido': rng.random(n) < 0.05
+    })
+
+@pytest.fixture
+def forza_lavoro():
+    return genera_forza_lavoro(500)
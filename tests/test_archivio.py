@@ -0,0 +1,76 @@
+"""Archivio degli scenari: salvataggio e ricarica, e archiviazione di ogni caso valutato nell'app."""
+import pytest
+
+from conftest import INPUT_SCENARIO, OGGI
+from pensionbridge import archivio as modulo_archivio
+from pensionbridge.archivio import ArchivioScenari
+from pensionbridge.scenario import calcola_scenario
+
+@pytest.fixture
+def archivio(tmp_path, monkeypatch):
+    """Archivio su un database temporaneo, installato anche come archivio predefinito del processo."""
+    archivio = ArchivioScenari(tmp_path / "scenari.sqlite")
+    monkeypatch.setattr(modulo_archivio, '_archivio', archivio)
+    yield archivio
+    archivio.chiudi()
+
+def test_salva_carica_elenca(archivio):
+    scenario = calcola_scenario(**INPUT_SCENARIO)
+    id_scenario = archivio.salva(INPUT_SCENARIO, scenario, "M001")
+    input_salvato, scenario_salvato = archivio.carica(id_scenario)
+
+    assert input_salvato == {k: v for k, v in INPUT_SCENARIO.items() if k != 'oggi'}
+    assert scenario_salvato['oggi'] == OGGI
+    assert scenario_salvato['pensione_stimata'] == scenario['pensione_stimata']
+    assert scenario_salvato['data_target'] == scenario['data_target']
+    assert archivio.dipendenti() == ["M001"]
+    assert list(archivio.elenca(regione=INPUT_SCENARIO['regione']).index) == [id_scenario]
+    assert archivio.elenca(regione="Sicilia").empty
+
+def test_salvataggio_ripetuto_non_duplica(archivio):
+    scenario = calcola_scenario(**INPUT_SCENARIO)
+    assert archivio.salva(INPUT_SCENARIO, scenario, "M001") == archivio.salva(INPUT_SCENARIO, scenario, "M001")
+    assert len(archivio) == 1
+
+def test_app_archivia_ogni_caso_valutato(archivio):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    from conftest import RADICE
+
+    at = testing.AppTest.from_file(str(RADICE / "app.py"), default_timeout=120).run()
+    assert not at.exception
+    assert len(archivio) == 1
+    at.sidebar.number_input(key='eta_0').set_value(63).run()
+    assert len(archivio) == 2
+    # Una rerun senza modifiche non scrive
+    salvato = archivio.elenca()['salvato'].tolist()
+    at.run()
+    assert archivio.elenca()['salvato'].tolist() == salvato
+    at.sidebar.text_input(key='dipendente_0').input("M001").run()
+    assert len(archivio) == 3
+
+    at.sidebar.checkbox(key='archivia').uncheck().run()
+    at.sidebar.number_input(key='eta_0').set_value(64).run()
+    assert len(archivio) == 3
+
+def test_app_archivia_scenario_ricaricato_con_altro_nome(archivio):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    from conftest import RADICE
+
+    # Tutti gli input della sidebar, come li salva l'app
+    input_app = dict(INPUT_SCENARIO, is_lavoratore_precoce=False, is_lavoratore_usurante=False,
+                     mesi_contributi_ultimi_4_anni=48, is_caregiver=False, is_invalido=False,
+                     incentivo_proposto=None)
+    id_scenario = archivio.salva(input_app, calcola_scenario(**input_app), "M001")
+    input_salvato, scenario_salvato = archivio.carica(id_scenario)
+    at = testing.AppTest.from_file(str(RADICE / "app.py"), default_timeout=120)
+    at.session_state['scenario_ricaricato'] = {'input': input_salvato, 'scenario': scenario_salvato,
+                                               'dipendente': "M001"}
+    at.session_state['versione_ricarica'] = 1
+    at.session_state['ultimo_archiviato'] = ("M001", dict(input_salvato, oggi=OGGI))
+    at.run()
+    assert not at.exception
+    assert len(archivio) == 1
+    # Solo il nome cambia: stessi risultati ricaricati, nuovo caso in archivio
+    at.sidebar.text_input(key='dipendente_1').input("M002").run()
+    assert archivio.dipendenti() == ["M001", "M002"]
+    assert set(archivio.elenca()['data_riferimento']) == {OGGI.isoformat()}
@@ -0,0 +1,34 @@
+"""Avvio a freddo: il nucleo non importa pandas, Plotly né pyarrow; i moduli differiti arrivano al primo accesso."""
+import importlib
+import subprocess
+import sys
+
+import pytest
+
+import pensionbridge
+from conftest import RADICE
+
+PESANTI = ('pandas', 'plotly', 'pyarrow', 'streamlit', 'starlette')
+
+def _moduli_caricati(codice):
+    uscita = subprocess.run(
+        [sys.executable, "-c", f"import sys; {codice}; print(sorted(m for m in {PESANTI!r} if m in sys.modules))"],
+        cwd=RADICE, capture_output=True, text=True, check=True
+    )
+    return uscita.stdout.strip()
+
+def test_nucleo_senza_moduli_pesanti():
+    assert _moduli_caricati("import pensionbridge as pb; pb.calcola_scenario_memo; pb.netto_annuo") == "[]"
+
+def test_moduli_differiti_al_primo_accesso():
+    assert "'pandas'" in _moduli_caricati("import pensionbridge as pb; pb.calcola_scenari_batch")
+
+@pytest.mark.parametrize("nome", sorted(pensionbridge._DIFFERITI))
+def test_nomi_differiti_risolti(nome):
+    modulo = importlib.import_module(f"pensionbridge.{pensionbridge._DIFFERITI[nome]}")
+    assert getattr(pensionbridge, nome) is getattr(modulo, nome)
+
+def test_nome_sconosciuto():
+    with pytest.raises(AttributeError):
+        pensionbridge.funzione_inesistente
+    assert 'calcola_scenari_batch' in dir(pensionbridge)
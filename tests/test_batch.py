@@ -0,0 +1,80 @@
+"""Il motore batch deve dare, dipendente per dipendente, gli stessi valori della catena scalare."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import OGGI, genera_forza_lavoro
+from pensionbridge import (
+    calcola_ape_sociale,
+    calcola_ape_sociale_batch,
+    calcola_naspi,
+    calcola_naspi_batch,
+    calcola_scenari_batch,
+    calcola_scenario,
+    stima_pensione_netta,
+    stima_pensione_netta_batch,
+)
+from pensionbridge.batch import COLONNE_BATCH_DEFAULT
+
+COLONNE_NUMERICHE = [
+    'pensione_stimata', 'stipendio_netto_mensile', 'naspi_mensile', 'durata_naspi', 'ape_importo',
+    'anni_a_pensione', 'rita_mensile', 'mesi_mancanti', 'incentivo_proposto', 'incentivo_netto',
+    'costo_totale_mantenimento', 'risparmio_aziendale'
+]
+
+def _scenario_scalare(riga):
+    return calcola_scenario(
+        riga.sesso, riga.eta, riga.regione, riga.tipo_contribuzione, riga.anni_contributi, riga.ral,
+        riga.is_lavoratore_precoce, riga.is_lavoratore_usurante, riga.montante_complementare,
+        riga.mesi_contributi_ultimi_4_anni, riga.is_disoccupato, riga.is_caregiver, riga.is_invalido,
+        oggi=OGGI
+    )
+
+def test_scenari_batch_come_scalare():
+    dati = genera_forza_lavoro(400, seme=1)
+    risultati = calcola_scenari_batch(dati, OGGI)
+    for riga, (_, atteso) in zip(dati.itertuples(), risultati.iterrows()):
+        scalare = _scenario_scalare(riga)
+        for colonna in COLONNE_NUMERICHE:
+            assert atteso[colonna] == pytest.approx(scalare[colonna], rel=1e-9, abs=1e-6), colonna
+        assert bool(atteso['ape_ammissibile']) == scalare['ape_ammissibile']
+        assert bool(atteso['rita_disponibile']) == scalare['rita_disponibile']
+        assert atteso['ape_messaggio'] == scalare['ape_messaggio']
+        for colonna in ('data_target', 'data_vecchiaia', 'data_anticipata'):
+            assert pd.Timestamp(atteso[colonna]).date() == scalare[colonna], colonna
+        assert atteso['incentivo_totale'] == pytest.approx(scalare['risultato_incentivo']['incentivo_totale'])
+
+def test_colonne_opzionali_assenti_usano_i_default():
+    dati = genera_forza_lavoro(50, seme=2)
+    completi = dati.assign(**{c: v for c, v in COLONNE_BATCH_DEFAULT.items()})
+    ridotti = dati.drop(columns=list(COLONNE_BATCH_DEFAULT))
+    pd.testing.assert_frame_equal(calcola_scenari_batch(ridotti, OGGI), calcola_scenari_batch(completi, OGGI))
+
+def test_incentivo_proposto_sostituisce_il_calcolo_automatico():
+    dati = genera_forza_lavoro(20, seme=3).assign(incentivo_proposto=100000.0)
+    risultati = calcola_scenari_batch(dati, OGGI)
+    np.testing.assert_array_equal(risultati['incentivo_proposto'], 100000.0)
+    np.testing.assert_allclose(risultati['risparmio_aziendale'], risultati['costo_totale_mantenimento'] - 100000.0)
+
+def test_colonne_obbligatorie_mancanti():
+    with pytest.raises(ValueError, match="ral"):
+        calcola_scenari_batch(genera_forza_lavoro(5).drop(columns=['ral']), OGGI)
+
+@pytest.mark.parametrize("ral", [20000.0, 45000.0, 120000.0])
+def test_funzioni_batch_elementari(ral):
+    mesi = np.array([0, 12, 30, 48])
+    naspi, durata = calcola_naspi_batch(np.full(4, ral), mesi, 2025)
+    for i, m in enumerate(mesi):
+        assert (naspi[i], durata[i]) == pytest.approx(calcola_naspi(ral, int(m), 2025))
+
+    tipi = np.array(["Dipendente Privato", "Dipendente Pubblico", "Artigiani", "Commercianti"])
+    pensioni = stima_pensione_netta_batch(np.full(4, ral), np.full(4, 38), tipi)
+    for tipo, pensione in zip(tipi, pensioni):
+        assert pensione == pytest.approx(stima_pensione_netta(ral, 38, str(tipo)))
+
+    importo, ammissibile, _ = calcola_ape_sociale_batch(
+        np.array([63, 64, 66]), np.array([30, 36, 40]), np.full(3, ral), np.array([True, False, True]), anno=2025
+    )
+    for i, (eta, anni, disoccupato) in enumerate([(63, 30, True), (64, 36, False), (66, 40, True)]):
+        scalare = calcola_ape_sociale(eta, anni, ral, disoccupato, anno=2025)
+        assert (importo[i], bool(ammissibile[i])) == pytest.approx(scalare[:2])
@@ -0,0 +1,75 @@
+"""Break-even dell'uscita: somme cumulate contro la somma diretta, batch contro scalare, età limite."""
+import numpy as np
+import pytest
+
+from pensionbridge.breakeven import (TASSO_SCONTO_DEFAULT, calcola_breakeven, calcola_breakeven_batch,
+                                     tavola_mortalita)
+from pensionbridge.calcoli import stima_pensione_netta
+from pensionbridge.fisco import netto_annuo
+
+def _rendita_diretta(eta, colonna_sesso, mese_uscita, tasso=TASSO_SCONTO_DEFAULT):
+    """Valore di una rendita unitaria mensile dal mese di uscita, ciclo mese per mese."""
+    tavola = tavola_mortalita()
+    sopravvivenza, valore, t = 1.0, 0.0, 0
+    while True:
+        eta_mese = eta + t / 12
+        if eta_mese >= tavola['eta'][-1] + 1:
+            return valore
+        riga = min(max(int(np.floor(eta_mese)) - tavola['eta'][0], 0), len(tavola['eta']) - 1)
+        sopravvivenza *= (1 - tavola['q'][colonna_sesso, riga]) ** (1 / 12)
+        if t >= mese_uscita:
+            valore += sopravvivenza * (1 + tasso) ** (-(t + 1) / 12)
+        t += 1
+
+def test_valore_pensione_come_somma_diretta():
+    analisi = calcola_breakeven(63, "Donna", 40000, 38, mesi_mancanti=10, mesi_extra=24)
+    for k in (0, 7, 24):
+        # Pensione mensile in 13 mensilità, riportata alla base di 12 rate dello stipendio
+        atteso = analisi['pensione'][k] * 13 / 12 * _rendita_diretta(63, 1, 10 + k)
+        assert analisi['van_pensione'][k] == pytest.approx(atteso, rel=1e-9)
+
+def test_risultati_coerenti():
+    analisi = calcola_breakeven(62, "Uomo", 45000, 38, mesi_mancanti=6)
+    assert analisi['mesi_uscita'][0] == 6
+    assert np.all(np.diff(analisi['pensione']) >= 0)
+    assert analisi['mese_ottimale'] in analisi['mesi_uscita']
+    pareggio = analisi['mese_pareggio'] - 6
+    assert analisi['van_pensione'][pareggio] >= analisi['van_pensione'][0] * (1 - 1e-12)
+    assert np.all(analisi['van_pensione'][pareggio + 1:] < analisi['van_pensione'][0])
+    assert 10 < analisi['speranza_vita'] < 40
+
+def test_stipendio_e_pensione_sulla_stessa_base():
+    analisi = calcola_breakeven(62, "Uomo", 45000, 38, mesi_mancanti=1, tasso_sconto=0.0, regione="Lazio")
+    assert analisi['pensione'][0] == pytest.approx(stima_pensione_netta(45000, 38, regione="Lazio"))
+    # Un mese di stipendio (sopravvivenza del primo mese) è un dodicesimo del netto annuo della regione
+    primo_mese = analisi['van_stipendio'][0] / (netto_annuo(45000, "Lazio") / 12)
+    rendita = analisi['van_pensione'][0] / (analisi['pensione'][0] * 13 / 12)
+    assert 0.99 < primo_mese < 1
+    assert rendita == pytest.approx(_rendita_diretta(62, 0, 1, tasso=0.0), rel=1e-9)
+
+    nazionale = calcola_breakeven(62, "Uomo", 45000, 38, mesi_mancanti=1, tasso_sconto=0.0)
+    assert analisi['van_stipendio'][0] != pytest.approx(nazionale['van_stipendio'][0])
+
+def test_batch_come_scalare(forza_lavoro):
+    dati = forza_lavoro.head(50)
+    mesi_mancanti = np.arange(50) % 40
+    batch = calcola_breakeven_batch(dati['eta'], dati['sesso'], dati['ral'], dati['anni_contributi'],
+                                    dati['tipo_contribuzione'], mesi_mancanti, regione=dati['regione'],
+                                    dimensione_blocco=16)
+    for i, riga in enumerate(dati.itertuples()):
+        scalare = calcola_breakeven(riga.eta, riga.sesso, riga.ral, riga.anni_contributi,
+                                    riga.tipo_contribuzione, mesi_mancanti[i], regione=riga.regione)
+        assert batch['mese_ottimale'][i] == scalare['mese_ottimale']
+        assert batch['mese_pareggio'][i] == scalare['mese_pareggio']
+        assert batch['van_pensione_prima_uscita'][i] == pytest.approx(scalare['van_pensione'][0], rel=1e-12)
+        assert batch['speranza_vita'][i] == pytest.approx(scalare['speranza_vita'], rel=1e-12)
+
+@pytest.mark.parametrize("eta", [110, 115])
+def test_eta_oltre_la_tavola(eta):
+    analisi = calcola_breakeven(eta, "Uomo", 40000, 40, mesi_mancanti=3)
+    assert np.all(analisi['van_pensione'] == 0)
+    assert analisi['mese_pareggio'] == 3
+    assert analisi['mese_ottimale'] == 3
+    batch = calcola_breakeven_batch([eta, 62], "Uomo", 40000, 40, mesi_mancanti=3)
+    assert batch['mese_pareggio'][0] == 3
+    assert batch['mese_pareggio'][1] >= 3
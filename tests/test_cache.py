@@ -0,0 +1,68 @@
+"""Cache LRU/TTL e memoizzazione degli scenari."""
+import threading
+
+import pytest
+
+from conftest import INPUT_SCENARIO, OGGI
+from pensionbridge import cache as modulo_cache
+from pensionbridge.cache import CacheLRU, memoizza
+from pensionbridge.scenario import calcola_scenario, calcola_scenario_memo, statistiche_cache_scenari
+
+def test_evizione_della_voce_meno_usata():
+    cache = CacheLRU(dimensione_massima=2)
+    cache.ottieni('a', lambda: 1)
+    cache.ottieni('b', lambda: 2)
+    cache.ottieni('a', lambda: 0)  # 'a' diventa la più recente
+    cache.ottieni('c', lambda: 3)
+    assert cache.ottieni('a', lambda: 0) == 1
+    assert cache.ottieni('b', lambda: 20) == 20
+    statistiche = cache.statistiche()
+    assert (statistiche['hit'], statistiche['miss'], statistiche['voci']) == (2, 4, 2)
+    assert statistiche['evizioni'] == 2
+
+def test_scadenza(monkeypatch):
+    adesso = [100.0]
+    monkeypatch.setattr(modulo_cache.time, 'monotonic', lambda: adesso[0])
+    cache = CacheLRU(ttl=10)
+    assert cache.ottieni('a', lambda: 1) == 1
+    adesso[0] = 109.0
+    assert cache.ottieni('a', lambda: 2) == 1
+    adesso[0] = 111.0
+    assert cache.ottieni('a', lambda: 3) == 3
+
+def test_dimensione_non_valida():
+    with pytest.raises(ValueError):
+        CacheLRU(dimensione_massima=0)
+
+def test_memoizza_su_argomenti_e_thread():
+    chiamate = []
+
+    @memoizza(dimensione_massima=8)
+    def quadrato(x, esponente=2):
+        chiamate.append(x)
+        return x ** esponente
+
+    thread = [threading.Thread(target=quadrato, args=(3,)) for _ in range(8)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    assert quadrato(3) == 9
+    assert quadrato(3, esponente=3) == 27
+    assert quadrato.cache.statistiche()['voci'] == 2
+    assert len(chiamate) <= 9
+
+def test_scenario_memo_input_equivalenti():
+    prima = statistiche_cache_scenari()
+    scenario = calcola_scenario_memo(**dict(INPUT_SCENARIO, eta=61, ral=51234))
+    uguale = calcola_scenario_memo(**dict(INPUT_SCENARIO, eta=61.0, ral=51234.0, is_disoccupato=1))
+    dopo = statistiche_cache_scenari()
+    assert uguale is scenario
+    assert (dopo['miss'] - prima['miss'], dopo['hit'] - prima['hit']) == (1, 1)
+    assert scenario == calcola_scenario(**dict(INPUT_SCENARIO, eta=61, ral=51234))
+
+def test_scenario_memo_giorno_nella_chiave():
+    oggi = calcola_scenario_memo(**dict(INPUT_SCENARIO, ral=47777))
+    domani = calcola_scenario_memo(**dict(INPUT_SCENARIO, ral=47777, oggi=OGGI.replace(day=OGGI.day + 1)))
+    assert oggi is not domani
+    assert domani['oggi'] != oggi['oggi']
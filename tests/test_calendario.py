@@ -0,0 +1,42 @@
+"""Aritmetica dei mesi su datetime64 contro la versione scalare su datetime.date."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from pensionbridge.calendario import (aggiungi_mesi, aggiungi_mesi_data, anni_frazionari_tra, data_riferimento,
+                                      mesi_alla_pensione, mesi_tra)
+
+@pytest.mark.parametrize("base, mesi, attesa", [
+    (date(2024, 1, 31), 1, date(2024, 2, 29)),
+    (date(2025, 1, 31), 1, date(2025, 2, 28)),
+    (date(2025, 3, 31), -1, date(2025, 2, 28)),
+    (date(2025, 12, 15), 1, date(2026, 1, 15)),
+    (date(2025, 1, 15), -13, date(2023, 12, 15)),
+    (date(2024, 2, 29), 12, date(2025, 2, 28)),
+])
+def test_fine_mese(base, mesi, attesa):
+    assert aggiungi_mesi_data(base, mesi) == attesa
+    assert aggiungi_mesi(base, mesi) == np.datetime64(attesa)
+
+def test_vettoriale_come_scalare():
+    basi = [date(2020, 1, 1) + timedelta(days=int(g)) for g in np.arange(0, 2200, 7)]
+    mesi = np.arange(len(basi)) % 61 - 20
+    vettoriale = aggiungi_mesi(basi, mesi)
+    assert vettoriale.tolist() == [aggiungi_mesi_data(b, int(m)) for b, m in zip(basi, mesi)]
+    # Broadcasting: una data per tanti scostamenti
+    assert aggiungi_mesi(date(2025, 1, 31), np.arange(3)).tolist() == \
+        [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)]
+
+def test_differenze():
+    assert mesi_tra(date(2025, 1, 31), date(2025, 2, 1)) == 1
+    assert mesi_tra(date(2025, 3, 1), date(2024, 3, 31)) == -12
+    assert anni_frazionari_tra(date(2020, 11, 1), date(2025, 2, 1)) == pytest.approx(4.25)
+    assert mesi_tra([date(2025, 1, 1)] * 2, [date(2025, 6, 1), date(2030, 1, 1)]).tolist() == [5, 60]
+
+def test_mesi_alla_pensione_e_data_riferimento():
+    oggi = date(2025, 1, 15)
+    assert mesi_alla_pensione([date(2027, 3, 1), date(2020, 1, 1), date(2025, 1, 20)], oggi).tolist() == [26, 1, 1]
+    assert data_riferimento(oggi) == np.datetime64('2025-01-15')
+    assert data_riferimento("2025-01-15").dtype == np.dtype('datetime64[D]')
+    assert data_riferimento() == np.datetime64(date.today())
@@ -0,0 +1,56 @@
+"""Batch HR da riga di comando: CSV a blocchi come il batch in memoria e scelta del formato."""
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import OGGI
+from pensionbridge.batch import COLONNE_OUTPUT, calcola_scenari_batch
+from pensionbridge.cli import elabora_csv, main
+
+@pytest.fixture
+def csv_dipendenti(forza_lavoro):
+    # Colonne estranee nel file HR vengono ignorate
+    return forza_lavoro.assign(matricola=[f"M{i:04d}" for i in range(len(forza_lavoro))], note="x") \
+        .to_csv(index=False)
+
+def _elabora(csv_dipendenti, chunksize):
+    destinazione = StringIO()
+    righe = elabora_csv(StringIO(csv_dipendenti), destinazione, chunksize=chunksize, colonna_id='matricola', oggi=OGGI)
+    return righe, destinazione.getvalue()
+
+def test_indipendente_dai_blocchi(csv_dipendenti):
+    righe, intero = _elabora(csv_dipendenti, 10 ** 6)
+    righe_blocchi, a_blocchi = _elabora(csv_dipendenti, 37)
+    assert righe == righe_blocchi == 500
+    assert intero == a_blocchi
+
+def test_come_batch_in_memoria(csv_dipendenti, forza_lavoro):
+    _, testo = _elabora(csv_dipendenti, 64)
+    ottenuti = pd.read_csv(StringIO(testo))
+    attesi = calcola_scenari_batch(forza_lavoro, OGGI)[list(COLONNE_OUTPUT)]
+    assert list(ottenuti.columns) == ['matricola', *COLONNE_OUTPUT]
+    assert ottenuti['matricola'].iloc[-1] == "M0499"
+    for colonna in COLONNE_OUTPUT:
+        atteso = attesi[colonna]
+        if atteso.dtype.kind in 'fi':
+            assert np.allclose(ottenuti[colonna], atteso, atol=0.006, equal_nan=True), colonna
+        elif atteso.dtype.kind == 'M':
+            assert ottenuti[colonna].tolist() == atteso.dt.strftime('%Y-%m-%d').tolist(), colonna
+        else:
+            assert ottenuti[colonna].astype(str).tolist() == atteso.astype(str).tolist(), colonna
+
+def test_main_csv_e_colonnare(tmp_path, forza_lavoro, capsys):
+    sorgente = tmp_path / "dipendenti.csv"
+    forza_lavoro.to_csv(sorgente, index=False)
+    assert main([str(sorgente), str(tmp_path / "risultati.csv"), "--data-riferimento", OGGI.isoformat()]) == 0
+    assert "Elaborati 500 dipendenti" in capsys.readouterr().err
+    assert len(pd.read_csv(tmp_path / "risultati.csv")) == 500
+
+    parquet = tmp_path / "dipendenti.parquet"
+    forza_lavoro.to_parquet(parquet, index=False)
+    assert main([str(parquet), str(tmp_path / "risultati.parquet"), "--chunksize", "128"]) == 0
+    assert len(pd.read_parquet(tmp_path / "risultati.parquet")) == 500
+    with pytest.raises(SystemExit):
+        main([str(parquet), str(tmp_path / "risultati.csv")])
@@ -0,0 +1,70 @@
+"""Formati colonnari: andata e ritorno dei dati ed elaborazione a blocchi come il batch in memoria."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import OGGI
+from pensionbridge.batch import COLONNE_OUTPUT, calcola_scenari_batch
+from pensionbridge.colonnare import elabora_colonnare, formato_colonnare, leggi_blocchi, scrivi_colonnare
+
+FORMATI = {'arrow': "forza_lavoro.arrow", 'parquet': "forza_lavoro.parquet", 'npy': "forza_lavoro"}
+USCITE = {'arrow': "risultati.feather", 'parquet': "risultati.pq", 'npy': "risultati"}
+
+def _rileggi(percorso, dimensione_blocco=10 ** 6):
+    blocchi = [pd.DataFrame(b) for b in leggi_blocchi(percorso, dimensione_blocco=dimensione_blocco)]
+    return pd.concat(blocchi, ignore_index=True)
+
+@pytest.fixture
+def dati(forza_lavoro):
+    return forza_lavoro.assign(matricola=np.arange(len(forza_lavoro)) + 1000)
+
+@pytest.mark.parametrize("formato", FORMATI)
+def test_formato_dal_percorso(tmp_path, formato):
+    assert formato_colonnare(tmp_path / FORMATI[formato]) == formato
+    assert formato_colonnare(tmp_path / "dati.csv") is None
+
+@pytest.mark.parametrize("formato", FORMATI)
+def test_andata_e_ritorno(tmp_path, dati, formato):
+    percorso = tmp_path / FORMATI[formato]
+    scrivi_colonnare(dati, percorso, dimensione_blocco=64)
+    riletti = _rileggi(percorso)
+
+    assert set(riletti.columns) == set(dati.columns)
+    for colonna in dati:
+        if colonna in ('sesso', 'regione', 'tipo_contribuzione'):
+            assert isinstance(riletti[colonna].dtype, pd.CategoricalDtype)
+            assert riletti[colonna].astype(str).tolist() == dati[colonna].tolist()
+        else:
+            assert np.array_equal(riletti[colonna].to_numpy(), dati[colonna].to_numpy())
+
+    blocchi = list(leggi_blocchi(percorso, colonne=['eta', 'regione'], dimensione_blocco=100))
+    # Il Parquet è scritto in gruppi di 64 righe e i blocchi letti non attraversano i gruppi
+    assert sum(len(b['eta']) for b in blocchi) == len(dati)
+    assert max(len(b['eta']) for b in blocchi) == (100 if formato != 'parquet' else 64)
+    assert all(set(b) == {'eta', 'regione'} for b in blocchi)
+
+@pytest.mark.parametrize("formato", FORMATI)
+def test_elaborazione_come_batch_in_memoria(tmp_path, dati, formato):
+    sorgente, destinazione = tmp_path / FORMATI[formato], tmp_path / USCITE[formato]
+    scrivi_colonnare(dati, sorgente)
+    righe = elabora_colonnare(sorgente, destinazione, dimensione_blocco=128, colonna_id='matricola', oggi=OGGI)
+    assert righe == len(dati)
+
+    attesi = calcola_scenari_batch(dati, OGGI)[list(COLONNE_OUTPUT)]
+    ottenuti = _rileggi(destinazione)
+    assert ottenuti['matricola'].tolist() == dati['matricola'].tolist()
+    for colonna in COLONNE_OUTPUT:
+        atteso, ottenuto = attesi[colonna], ottenuti[colonna]
+        if isinstance(ottenuto.dtype, pd.CategoricalDtype) or ottenuto.dtype == object:
+            assert ottenuto.astype(str).tolist() == atteso.astype(str).tolist(), colonna
+        elif atteso.dtype.kind == 'M':
+            assert np.array_equal(ottenuto.to_numpy().astype('datetime64[D]'),
+                                  atteso.to_numpy().astype('datetime64[D]')), colonna
+        else:
+            assert np.allclose(ottenuto.to_numpy(dtype=float), atteso.to_numpy(dtype=float), equal_nan=True), colonna
+
+def test_destinazione_di_formato_diverso(tmp_path, dati):
+    sorgente = tmp_path / FORMATI['parquet']
+    scrivi_colonnare(dati, sorgente)
+    with pytest.raises(ValueError, match="stesso formato"):
+        elabora_colonnare(sorgente, tmp_path / USCITE['arrow'], oggi=OGGI)
@@ -0,0 +1,77 @@
+"""Calcolo contributivo: montante vettoriale contro la rivalutazione anno per anno."""
+import numpy as np
+import pytest
+
+from pensionbridge.contributivo import (ALIQUOTE_COMPUTO, calcola_pensione_contributiva,
+                                        calcola_pensione_contributiva_batch, carica_coefficienti_trasformazione,
+                                        coefficiente_trasformazione, coefficienti_trasformazione,
+                                        montante_contributivo, storia_retributiva)
+
+def _montante_diretto(retribuzioni, aliquota, tassi, iniziale=0.0):
+    """Montante a fine di ogni anno, un anno alla volta: rivalutazione e poi contributo."""
+    montante, traiettoria = iniziale, []
+    for imponibile, tasso in zip(retribuzioni, tassi):
+        montante = montante * (1 + tasso) + np.nan_to_num(imponibile) * aliquota
+        traiettoria.append(montante)
+    return np.array(traiettoria)
+
+@pytest.fixture
+def storie():
+    rng = np.random.default_rng(0)
+    retribuzioni = rng.uniform(15000, 80000, (6, 30))
+    retribuzioni[rng.random(retribuzioni.shape) < 0.1] = np.nan
+    retribuzioni[0, :5] = 0
+    return retribuzioni
+
+def test_montante_come_ciclo_annuale(storie):
+    tassi = np.random.default_rng(1).uniform(-0.01, 0.04, storie.shape[1])
+    tipi = np.array(["Dipendente Privato", "Artigiani", "Commercianti", "Autonomi", "Coltivatori Diretti", "Altro"])
+    iniziali = np.arange(6) * 10000.0
+    traiettorie = montante_contributivo(storie, tipi, tassi, iniziali)
+    for i, tipo in enumerate(tipi):
+        attese = _montante_diretto(storie[i], ALIQUOTE_COMPUTO.get(tipo, 0.33), tassi, iniziali[i])
+        assert np.allclose(traiettorie[i], attese, rtol=1e-12)
+
+def test_tassi_per_dipendente(storie):
+    tassi = np.random.default_rng(2).uniform(0, 0.03, storie.shape)
+    traiettorie = montante_contributivo(storie, tasso_rivalutazione=tassi)
+    for i in range(len(storie)):
+        assert np.allclose(traiettorie[i], _montante_diretto(storie[i], 0.33, tassi[i]), rtol=1e-12)
+
+def test_coefficienti_interpolati():
+    tavola = coefficienti_trasformazione()
+    assert coefficiente_trasformazione(57) == pytest.approx(0.04270)
+    assert coefficiente_trasformazione(57.5) == pytest.approx((0.04270 + 0.04378) / 2)
+    assert coefficiente_trasformazione(40) == tavola['coefficiente'][0]
+    assert coefficiente_trasformazione(90) == tavola['coefficiente'][-1]
+    assert np.all(np.diff(tavola['coefficiente']) > 0)
+
+def test_batch_come_scalare(storie):
+    eta = np.array([60, 62.5, 64, 67, 67, 71])
+    colonne = np.array([29, 20, 25, 29, 10, 0])
+    batch = calcola_pensione_contributiva_batch(storie, eta, colonna_uscita=colonne)
+    for i in range(len(storie)):
+        scalare = calcola_pensione_contributiva(storie[i, :colonne[i] + 1], eta[i])
+        assert batch['montante'][i] == pytest.approx(scalare['montante'], rel=1e-12)
+        assert batch['pensione_lorda_mensile'][i] == pytest.approx(scalare['pensione_lorda_mensile'], rel=1e-12)
+    assert np.allclose(batch['pensione_lorda_annua'], batch['montante'] * batch['coefficiente'])
+
+def test_storia_retributiva():
+    retribuzioni, colonne = storia_retributiva([30000, 50000], [2.5, 1], anni_futuri=[1.5, 0], crescita=0.0)
+    # Anni da -3 a +1: 2,5 anni passati (il più lontano per metà) e 1,5 futuri (l'ultimo per metà)
+    # Con un solo anno di contributi pesa per intero l'anno appena concluso
+    assert retribuzioni.shape == (2, 5)
+    assert np.allclose(retribuzioni[0], [15000, 30000, 30000, 30000, 15000])
+    assert np.allclose(retribuzioni[1], [0, 0, 50000, 0, 0])
+    assert colonne.tolist() == [4, 2]
+
+@pytest.mark.parametrize("contenuto, messaggio", [
+    ("eta,valore\n60,0.04\n", "Colonne mancanti"),
+    ("eta,coefficiente\n60,0.04\n60,0.05\n", "uniche"),
+    ("eta,coefficiente\n60,1.5\n", "compresi"),
+])
+def test_tavola_non_valida(tmp_path, contenuto, messaggio):
+    percorso = tmp_path / "coefficienti.csv"
+    percorso.write_text(contenuto)
+    with pytest.raises(ValueError, match=messaggio):
+        carica_coefficienti_trasformazione(percorso)
@@ -0,0 +1,78 @@
+"""Tempi per fase e profilazione: fasi annidate, isolamento tra thread e profilo cProfile."""
+import json
+import logging
+import marshal
+import threading
+
+import pytest
+
+from pensionbridge import diagnostica
+from pensionbridge.diagnostica import fase, interrompi_attive, misura, profila, registra_json
+
+def test_fase_senza_misura_non_fa_nulla():
+    assert fase("qualunque") is fase("altra")
+
+def test_fasi_annidate():
+    with misura() as m:
+        with fase("scenario"):
+            with fase("grafo"):
+                pass
+        with fase("grafici"):
+            pass
+    assert [(v['fase'], v['livello']) for v in m.fasi] == [("scenario", 0), ("scenario/grafo", 1), ("grafici", 0)]
+    assert all(0 <= v['ms'] <= m.totale_ms for v in m.fasi)
+    assert fase("dopo") is fase("altra")
+
+def test_fase_interrotta_da_eccezione():
+    with pytest.raises(RuntimeError):
+        with misura() as m:
+            with fase("fallisce"):
+                raise RuntimeError
+    assert m.fasi[0]['ms'] is not None and m.fasi[0]['ms'] <= m.totale_ms
+
+def test_misure_separate_tra_thread():
+    barriera = threading.Barrier(2)
+    fasi = {}
+
+    def sessione(nome):
+        with misura() as m:
+            with fase(nome):
+                barriera.wait()
+        fasi[nome] = [v['fase'] for v in m.fasi]
+
+    thread = [threading.Thread(target=sessione, args=(nome,)) for nome in ("a", "b")]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    assert fasi == {"a": ["a"], "b": ["b"]}
+
+def _lavoro():
+    return sum(i * i for i in range(20000))
+
+def test_profilo():
+    with profila(righe=5) as profilo:
+        _lavoro()
+    assert "_lavoro" in profilo['testo']
+    assert any(funzione[2] == "_lavoro" for funzione in marshal.loads(profilo['dati']))
+
+def test_interrompi_attive():
+    # Una rerun interrotta non esce dal blocco profila()
+    interrotto = profila()
+    interrotto.__enter__()
+    assert diagnostica._profilo_attivo.get() is not None
+    interrompi_attive()
+    assert diagnostica._profilo_attivo.get() is None
+    assert fase("x") is fase("y")
+
+def test_registra_json(caplog, monkeypatch):
+    # configura_log (chiamata dall'app) stacca il logger dalla radice
+    monkeypatch.setattr(diagnostica.logger, 'propagate', True)
+    with misura() as m:
+        with fase("scenario"):
+            pass
+    with caplog.at_level(logging.INFO, logger=diagnostica.logger.name):
+        registra_json("rerun", m, sessione="s1")
+    evento = json.loads(caplog.records[-1].getMessage())
+    assert evento['evento'] == "rerun" and evento['sessione'] == "s1"
+    assert [v['fase'] for v in evento['fasi']] == ["scenario"]
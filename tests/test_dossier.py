@@ -0,0 +1,66 @@
+"""Esportazione dei dossier: un file per dipendente anche con identificativi ripetuti, e rilettura xlsx."""
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import OGGI, genera_forza_lavoro
+from pensionbridge.batch import calcola_scenari_batch
+from pensionbridge.dossier import FILE_SCRIPT, esporta_dossier
+from pensionbridge.risorse import REGIONI
+
+def _forza_lavoro_con_duplicati():
+    dati = genera_forza_lavoro(40)
+    dati['matricola'] = [f"M{i % 30:03d}" for i in range(40)]
+    return dati
+
+def test_identificativi_duplicati_nello_zip():
+    destinazione = BytesIO()
+    scritti = esporta_dossier(_forza_lavoro_con_duplicati(), destinazione, colonna_id='matricola',
+                              oggi=OGGI, processi=1, dimensione_blocco=7)
+    nomi = zipfile.ZipFile(destinazione).namelist()
+    assert scritti == 40
+    assert len(nomi) == len(set(nomi)) == 41
+    assert FILE_SCRIPT in nomi
+    assert "dossier_M000.html" in nomi and "dossier_M000_30.html" in nomi
+
+def test_identificativi_duplicati_in_directory(tmp_path):
+    scritti = esporta_dossier(_forza_lavoro_con_duplicati(), tmp_path, colonna_id='matricola',
+                              oggi=OGGI, processi=1, dimensione_blocco=7)
+    assert scritti == 40
+    assert len(list(tmp_path.glob("dossier_*.html"))) == 40
+
+def test_identificativi_resi_uguali_dal_nome_file():
+    dati = genera_forza_lavoro(3)
+    dati['matricola'] = ["A B", "A_B", "A/B"]
+    destinazione = BytesIO()
+    esporta_dossier(dati, destinazione, colonna_id='matricola', oggi=OGGI, processi=1)
+    nomi = set(zipfile.ZipFile(destinazione).namelist()) - {FILE_SCRIPT}
+    assert nomi == {"dossier_A_B.html", "dossier_A_B_1.html", "dossier_A_B_2.html"}
+
+def test_xlsx_riletto():
+    pytest.importorskip("openpyxl")
+    dati = genera_forza_lavoro(4)
+    dati['matricola'] = ["A", "B", "C", "D"]
+    destinazione = BytesIO()
+    assert esporta_dossier(dati, destinazione, formato='xlsx', colonna_id='matricola', oggi=OGGI, processi=1) == 4
+    archivio = zipfile.ZipFile(destinazione)
+    assert sorted(archivio.namelist()) == [f"dossier_{m}.xlsx" for m in "ABCD"]
+
+    risultati = calcola_scenari_batch(dati, OGGI)
+    for i, matricola in enumerate("ABCD"):
+        fogli = pd.read_excel(BytesIO(archivio.read(f"dossier_{matricola}.xlsx")), sheet_name=None)
+        assert list(fogli) == ['Dossier', 'Regioni', 'Proiezione']
+        voci = fogli['Dossier'].set_index('Voce')['Valore']
+        assert float(voci["RAL"]) == dati['ral'].iloc[i]
+        assert voci["Regione"] == dati['regione'].iloc[i]
+        assert float(voci["Pensione netta stimata (mese)"]) == pytest.approx(risultati['pensione_stimata'].iloc[i])
+        assert fogli['Regioni']['Regione'].tolist() == list(REGIONI)
+        regione = fogli['Regioni'].set_index('Regione').loc[dati['regione'].iloc[i], 'Incentivo (€)']
+        assert regione == pytest.approx(risultati['incentivo_totale'].iloc[i])
+        proiezione = fogli['Proiezione']
+        assert proiezione['Pensione Stimata (€)'].iloc[0] == pytest.approx(risultati['pensione_stimata'].iloc[i])
+        assert np.allclose(proiezione['Incremento Mensile (€)'],
+                           proiezione['Pensione Stimata (€)'] - proiezione['Pensione Stimata (€)'].iloc[0])
@@ -0,0 +1,70 @@
+"""Dal lordo al netto: scaglioni IRPEF, detrazioni, addizionali e tassazione separata."""
+import numpy as np
+import pytest
+
+from pensionbridge.fisco import (ADDIZIONALE_COMUNALE_DEFAULT, CONTRIBUTI_DIPENDENTE, SCAGLIONI_IRPEF,
+                                 TABELLA_DETRAZIONI_LAVORO, TABELLA_DETRAZIONI_PENSIONE, _valuta, addizionali,
+                                 aliquota_tassazione_separata, imposta_irpef, incentivo_netto, netto_annuo)
+
+def _irpef_diretta(imponibile):
+    """IRPEF scaglione per scaglione."""
+    soglie = [*SCAGLIONI_IRPEF, np.inf]
+    return sum(aliquota * min(max(imponibile - inizio, 0), fine - inizio)
+               for (inizio, aliquota), fine in zip(SCAGLIONI_IRPEF.items(), soglie[1:]))
+
+@pytest.mark.parametrize("imponibile, attesa", [(0, 0), (10000, 2300), (28000, 6440), (50000, 14140),
+                                                (60000, 18440)])
+def test_scaglioni_irpef(imponibile, attesa):
+    assert imposta_irpef(imponibile) == pytest.approx(attesa)
+
+def test_irpef_vettoriale_come_diretta():
+    imponibili = np.linspace(-1000, 200000, 2001)
+    attese = [_irpef_diretta(i) for i in imponibili]
+    assert np.allclose(imposta_irpef(imponibili), attese)
+    assert np.allclose(imposta_irpef(imponibili.reshape(-1, 23)), np.reshape(attese, (-1, 23)))
+
+@pytest.mark.parametrize("tabella, valori", [
+    (TABELLA_DETRAZIONI_LAVORO, {0: 1955, 15000: 3100, 28000: 1910, 50000: 0, 80000: 0}),
+    (TABELLA_DETRAZIONI_PENSIONE, {0: 1955, 8500: 1955, 28000: 700, 50000: 0}),
+])
+def test_detrazioni_ai_bordi(tabella, valori):
+    for imponibile, attesa in valori.items():
+        assert _valuta(tabella, imponibile) == pytest.approx(attesa, abs=1e-9)
+        # Continue da sinistra, tranne all'origine e nel salto delle detrazioni da lavoro a 15000
+        if imponibile not in (0, 15000):
+            assert _valuta(tabella, imponibile - 1e-6) == pytest.approx(attesa, abs=1e-3)
+
+def test_no_tax_area_senza_addizionali():
+    # Imponibile 8000: IRPEF lorda 1840 < detrazione 1955
+    lordo = 8000 / (1 - CONTRIBUTI_DIPENDENTE)
+    assert netto_annuo(lordo, "Lazio") == pytest.approx(8000)
+
+def test_netto_stipendio_e_pensione():
+    imponibile = 45000 * (1 - CONTRIBUTI_DIPENDENTE)
+    irpef = _irpef_diretta(imponibile) - float(_valuta(TABELLA_DETRAZIONI_LAVORO, imponibile))
+    atteso = imponibile - irpef - float(addizionali(imponibile, "Lombardia"))
+    assert netto_annuo(45000, "Lombardia") == pytest.approx(atteso)
+
+    irpef_pensione = _irpef_diretta(30000) - float(_valuta(TABELLA_DETRAZIONI_PENSIONE, 30000))
+    atteso_pensione = 30000 - irpef_pensione - float(addizionali(30000, "Lombardia"))
+    assert netto_annuo(30000, "Lombardia", pensione=True) == pytest.approx(atteso_pensione)
+
+def test_netto_crescente_e_regioni():
+    lordi = np.arange(0, 300001, 500.0)
+    for regione in (None, "Lazio", "Veneto"):
+        assert np.all(np.diff(netto_annuo(lordi, regione)) > 0)
+    assert netto_annuo(50000, "Atlantide") == netto_annuo(50000)
+    regioni = np.array(["Lazio", "Veneto", "Atlantide"])
+    assert np.allclose(netto_annuo(50000, regioni), [netto_annuo(50000, r) for r in regioni])
+
+def test_addizionale_comunale_media_nazionale():
+    assert addizionali(10000) == pytest.approx(10000 * (0.0150 + ADDIZIONALE_COMUNALE_DEFAULT))
+
+def test_tassazione_separata():
+    ral = 60000
+    aliquota = aliquota_tassazione_separata(ral)
+    imponibile = ral * (1 - CONTRIBUTI_DIPENDENTE)
+    assert aliquota == pytest.approx(_irpef_diretta(imponibile) / imponibile)
+    assert incentivo_netto(100000, ral) == pytest.approx(100000 * (1 - aliquota))
+    assert incentivo_netto(-5000, ral) == -5000
+    assert aliquota_tassazione_separata(0) == 0
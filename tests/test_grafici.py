@@ -0,0 +1,39 @@
+"""Grafici della forza lavoro: sfoltimento della dispersione e cache delle figure."""
+import json
+
+import numpy as np
+
+from conftest import OGGI
+from pensionbridge.batch import calcola_scenari_batch
+from pensionbridge.grafici import CELLE_GRIGLIA, figura_bande_timeline, figura_dispersione, sfoltisci
+
+def _celle(x, y, celle=CELLE_GRIGLIA):
+    def cella(v):
+        return ((v - v.min()) * (celle - 1) / (v.max() - v.min())).astype(np.int64)
+    return cella(x) * celle + cella(y)
+
+def test_sfoltisci_rispetta_il_limite_e_tiene_ogni_cella():
+    rng = np.random.default_rng(0)
+    # Un nucleo denso e qualche punto isolato
+    x = np.concatenate([rng.normal(0, 1, 50000), rng.uniform(-40, 40, 200)])
+    y = np.concatenate([rng.normal(0, 1, 50000), rng.uniform(-40, 40, 200)])
+    indici = sfoltisci(x, y, massimo_punti=5000)
+
+    assert len(indici) <= 5000
+    assert np.all(np.diff(indici) > 0)
+    celle = _celle(x, y)
+    assert set(celle[indici]) == set(celle)
+
+def test_sfoltisci_sotto_il_limite_tiene_tutto():
+    assert np.array_equal(sfoltisci(np.arange(10), np.arange(10), massimo_punti=10), np.arange(10))
+
+def test_titolo_nella_chiave_della_cache(forza_lavoro):
+    risultati = calcola_scenari_batch(forza_lavoro, OGGI)
+    prima = json.loads(figura_bande_timeline(risultati, titolo="Reparto A"))
+    seconda = json.loads(figura_bande_timeline(risultati, titolo="Reparto B"))
+    assert prima['layout']['title']['text'] == "Reparto A"
+    assert seconda['layout']['title']['text'] == "Reparto B"
+
+    x, y = forza_lavoro['eta'].to_numpy(), forza_lavoro['ral'].to_numpy()
+    assert json.loads(figura_dispersione(x, y, titolo="A"))['layout']['title']['text'] == "A"
+    assert json.loads(figura_dispersione(x, y, titolo="B"))['layout']['title']['text'] == "B"
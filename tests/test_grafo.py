@@ -0,0 +1,81 @@
+"""Grafo incrementale: ordine, nodi sporchi, arresto sui valori invariati e scenario completo."""
+import numpy as np
+import pytest
+
+from conftest import INPUT_SCENARIO
+from pensionbridge.grafo import GrafoCalcolo, ordine_topologico
+from pensionbridge.risorse import REGIONI
+from pensionbridge.scenario import calcola_scenario, grafo_scenario
+
+def _grafo_contato():
+    chiamate = []
+
+    def nodo(nome, funzione):
+        def conta(*argomenti):
+            chiamate.append(nome)
+            return funzione(*argomenti)
+        return conta
+
+    nodi = {
+        'somma': (nodo('somma', lambda a, b: a + b), ('a', 'b')),
+        'segno': (nodo('segno', lambda s: s >= 0), ('somma',)),
+        'doppio_c': (nodo('doppio_c', lambda c: 2 * c), ('c',)),
+        'totale': (nodo('totale', lambda segno, d: (segno, d)), ('segno', 'doppio_c')),
+    }
+    return nodi, chiamate
+
+def test_ordine_topologico():
+    nodi, _ = _grafo_contato()
+    ordine = ordine_topologico(nodi)
+    assert set(ordine) == set(nodi)
+    for nome, (_, dipendenze) in nodi.items():
+        assert all(ordine.index(d) < ordine.index(nome) for d in dipendenze if d in nodi)
+    with pytest.raises(ValueError, match="circolare"):
+        ordine_topologico({'x': (None, ('y',)), 'y': (None, ('x',))})
+
+def test_solo_nodi_sporchi_e_arresto():
+    nodi, chiamate = _grafo_contato()
+    grafo = GrafoCalcolo(nodi, predefiniti={'c': 1})
+    assert grafo.aggiorna(a=1, b=2)['totale'] == (True, 2)
+    assert len(chiamate) == 4
+
+    chiamate.clear()
+    grafo.aggiorna(a=1, b=2, c=5)
+    assert chiamate == ['doppio_c', 'totale']
+
+    # La somma cambia ma il segno no: 'totale' non si ricalcola
+    chiamate.clear()
+    assert grafo.aggiorna(a=3, b=2, c=5)['totale'] == (True, 10)
+    assert chiamate == ['somma', 'segno']
+
+    chiamate.clear()
+    grafo.aggiorna(a=3, b=2, c=5)
+    assert chiamate == []
+    assert grafo.statistiche()['valutazioni'] == 4
+
+def test_scenario_incrementale_come_completo():
+    rng = np.random.default_rng(0)
+    grafo = grafo_scenario()
+    variazioni = {
+        'eta': lambda: int(rng.integers(55, 68)),
+        'ral': lambda: float(rng.integers(20, 200) * 1000),
+        'regione': lambda: str(rng.choice(REGIONI)),
+        'anni_contributi': lambda: int(rng.integers(25, 43)),
+        'montante_complementare': lambda: float(rng.choice([0, 20000, 80000])),
+        'is_disoccupato': lambda: bool(rng.random() < 0.5),
+        'is_caregiver': lambda: bool(rng.random() < 0.5),
+        'incentivo_proposto': lambda: None if rng.random() < 0.5 else float(rng.integers(0, 100) * 1000),
+    }
+    ingressi = dict(INPUT_SCENARIO)
+    for _ in range(40):
+        nome = list(variazioni)[rng.integers(len(variazioni))]
+        ingressi[nome] = variazioni[nome]()
+        assert grafo.aggiorna(**ingressi) == calcola_scenario(**ingressi), nome
+    assert grafo.statistiche()['nodi_saltati'] > 0
+
+def test_montante_ricalcola_solo_la_rita():
+    grafo = grafo_scenario()
+    grafo.aggiorna(**INPUT_SCENARIO)
+    grafo.aggiorna(**dict(INPUT_SCENARIO, montante_complementare=90000))
+    statistiche = grafo.statistiche()
+    assert statistiche['ultimi_ricalcolati'] == ['rita']
@@ -0,0 +1,48 @@
+"""Monte Carlo: riproducibilità a parità di seme, budget di tempo e pool condiviso tra thread."""
+import threading
+
+import numpy as np
+
+from conftest import INPUT_SCENARIO
+from pensionbridge import montecarlo
+from pensionbridge.montecarlo import METRICHE, simula_montecarlo
+
+def test_stesso_seme_stesso_risultato_con_qualsiasi_numero_di_processi():
+    seriale = simula_montecarlo(INPUT_SCENARIO, 6000, seme=7, processi=1, dimensione_blocco=2000)
+    parallelo = simula_montecarlo(INPUT_SCENARIO, 6000, seme=7, processi=2, dimensione_blocco=2000)
+    assert seriale['n_percorsi'] == parallelo['n_percorsi'] == 6000
+    for metrica in METRICHE:
+        np.testing.assert_array_equal(seriale['campioni'][metrica], parallelo['campioni'][metrica])
+
+def test_bande_ordinate():
+    bande = simula_montecarlo(INPUT_SCENARIO, 5000, seme=1)['bande']
+    assert (np.diff(bande.to_numpy(), axis=1) >= 0).all()
+
+def test_budget_scaduto_completa_almeno_un_blocco():
+    for processi in (1, 2):
+        esito = simula_montecarlo(INPUT_SCENARIO, 40000, seme=2, processi=processi, budget_secondi=0.0,
+                                  dimensione_blocco=1000)
+        assert esito['n_percorsi'] >= 1000
+        assert not esito['completa']
+
+def test_pool_condiviso_tra_thread():
+    pool = []
+    thread = [threading.Thread(target=lambda: pool.append(montecarlo._ottieni_pool(3))) for _ in range(8)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    assert len({id(p) for p in pool}) == 1
+    # Chiedere un'altra dimensione non chiude il pool in uso
+    montecarlo._ottieni_pool(1)
+    assert pool[0].submit(int, "5").result() == 5
+
+def test_crescita_salariale_alza_la_pensione():
+    # Con lo stesso seme le estrazioni coincidono: cambia solo la media della crescita
+    bande = [
+        simula_montecarlo(INPUT_SCENARIO, 4000, seme=3, parametri={'crescita_salario_media': crescita})['bande']
+        .loc[METRICHE['pensione_lifetime']]
+        for crescita in (0.0, 0.05)
+    ]
+    assert (bande[1] >= bande[0]).all()
+    assert bande[1]['P50'] > bande[0]['P50'] * 1.05
@@ -0,0 +1,63 @@
+"""Ottimizzatore dell'offerta: frontiera di Pareto, vincoli, obiettivi e batch contro singolo."""
+import numpy as np
+import pytest
+
+from conftest import INPUT_SCENARIO, OGGI
+from pensionbridge import ottimizzatore
+from pensionbridge.ottimizzatore import frontiera_pareto, ottimizza_incentivo, ottimizza_incentivo_batch
+
+def test_frontiera_come_confronto_a_coppie():
+    rng = np.random.default_rng(0)
+    beneficio = rng.integers(0, 30, 300).astype(float)
+    risparmio = rng.integers(0, 30, 300).astype(float)
+    punti = frontiera_pareto(beneficio, risparmio)
+
+    dominato = [np.any((beneficio >= b) & (risparmio >= r) & ((beneficio > b) | (risparmio > r)))
+                for b, r in zip(beneficio, risparmio)]
+    attesi = {(b, r) for b, r, d in zip(beneficio, risparmio, dominato) if not d}
+    assert {(beneficio[i], risparmio[i]) for i in punti} == attesi
+    assert len(punti) == len(attesi)
+    assert np.all(np.diff(beneficio[punti]) < 0)
+
+@pytest.mark.parametrize("obiettivo", ['equo', 'azienda', 'lavoratore'])
+def test_migliore_e_il_massimo_della_griglia(obiettivo):
+    esito = ottimizza_incentivo(INPUT_SCENARIO, n_importi=51, obiettivo=obiettivo)
+    beneficio, risparmio = esito['beneficio'], esito['risparmio']
+    punteggio = {'equo': np.minimum(beneficio, risparmio), 'azienda': risparmio, 'lavoratore': beneficio}[obiettivo]
+    ammesso = (beneficio >= 0) & (risparmio >= 0)
+    migliore = esito['migliore']
+    atteso = {'equo': min(migliore['beneficio_lavoratore'], migliore['risparmio_azienda']),
+              'azienda': migliore['risparmio_azienda'], 'lavoratore': migliore['beneficio_lavoratore']}[obiettivo]
+    assert atteso == pytest.approx(punteggio[ammesso].max())
+    assert migliore['mese_uscita'] in esito['mesi_uscita']
+
+def test_vincoli():
+    libero = ottimizza_incentivo(INPUT_SCENARIO, n_importi=51)['migliore']
+    budget, mese_massimo = 0.9 * libero['incentivo'], libero['mese_uscita'] - 2
+    migliore = ottimizza_incentivo(INPUT_SCENARIO, n_importi=51, budget_massimo=budget,
+                                   mese_uscita_massimo=mese_massimo, beneficio_minimo=1000)['migliore']
+    assert migliore['incentivo'] <= budget
+    assert migliore['mese_uscita'] <= mese_massimo
+    assert migliore['beneficio_lavoratore'] >= 1000
+    assert min(migliore['beneficio_lavoratore'], migliore['risparmio_azienda']) <= \
+        min(libero['beneficio_lavoratore'], libero['risparmio_azienda'])
+
+    assert ottimizza_incentivo(INPUT_SCENARIO, n_importi=11, beneficio_minimo=1e9)['migliore'] is None
+    with pytest.raises(ValueError, match="Obiettivo"):
+        ottimizza_incentivo(INPUT_SCENARIO, obiettivo='massimo')
+
+def test_batch_come_singolo(forza_lavoro, monkeypatch):
+    dati = forza_lavoro.head(12)
+    # Blocchi piccoli: il batch attraversa più blocchi
+    monkeypatch.setattr(ottimizzatore, 'ELEMENTI_PER_BLOCCO', 20000)
+    batch = ottimizza_incentivo_batch(dati, n_importi=21, oggi=OGGI)
+    assert batch.index.equals(dati.index)
+    for (_, riga), (_, offerta) in zip(dati.iterrows(), batch.iterrows()):
+        singolo = ottimizza_incentivo(dict(riga.to_dict(), oggi=OGGI), n_importi=21)['migliore']
+        if singolo is None:
+            assert not offerta['fattibile'] and np.isnan(offerta['incentivo'])
+        else:
+            assert offerta['fattibile']
+            assert offerta['mese_uscita'] == singolo['mese_uscita']
+            assert offerta['incentivo'] == pytest.approx(singolo['incentivo'])
+            assert offerta['risparmio_azienda'] == pytest.approx(singolo['risparmio_azienda'])
@@ -0,0 +1,85 @@
+"""Selezione del portafoglio di uscite: vincoli, ottimo su istanze piccole, minimo di uscite."""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import OGGI
+from pensionbridge.batch import calcola_scenari_batch
+from pensionbridge.portafoglio import seleziona_portafoglio
+
+def _istanza(n, seme):
+    """Costi e risparmi interi: con abbastanza passi di budget lo zaino del nucleo è esatto."""
+    rng = np.random.default_rng(seme)
+    risultati = pd.DataFrame({
+        'incentivo_proposto': rng.integers(10, 200, n).astype(float),
+        'risparmio_aziendale': rng.integers(-50, 300, n).astype(float),
+        'costo_totale_mantenimento': rng.integers(100, 1000, n).astype(float)
+    })
+    return risultati, rng.choice(["Lazio", "Veneto", "Sicilia"], n)
+
+def _ottimo_esaustivo(risultati, regioni, budget, tetto=None):
+    costo = risultati['incentivo_proposto'].to_numpy()
+    valore = risultati['risparmio_aziendale'].to_numpy()
+    migliore = 0.0
+    indici = [i for i in range(len(costo)) if valore[i] > 0]
+    for k in range(len(indici) + 1):
+        for scelta in combinations(indici, k):
+            scelta = list(scelta)
+            if costo[scelta].sum() > budget:
+                continue
+            if tetto is not None and np.max(np.unique(regioni[scelta], return_counts=True)[1], initial=0) > tetto:
+                continue
+            migliore = max(migliore, valore[scelta].sum())
+    return migliore
+
+@pytest.mark.parametrize("seme", range(5))
+def test_ottimo_senza_tetti(seme):
+    risultati, regioni = _istanza(14, seme)
+    portafoglio = seleziona_portafoglio(risultati, regioni, budget=600)
+    ottimo = _ottimo_esaustivo(risultati, regioni, 600)
+    assert portafoglio['risparmio_totale'] == pytest.approx(ottimo)
+    assert portafoglio['limite_superiore'] >= ottimo - 1e-6
+
+@pytest.mark.parametrize("seme", range(5))
+def test_tetti_regionali(seme):
+    risultati, regioni = _istanza(14, seme)
+    portafoglio = seleziona_portafoglio(risultati, regioni, budget=800, massimo_per_regione=2)
+    scelti = portafoglio['selezionati']
+    assert portafoglio['incentivo_totale'] <= 800
+    assert np.max(np.unique(regioni[scelti], return_counts=True)[1], initial=0) <= 2
+    assert portafoglio['per_regione']['dipendenti'].sum() == portafoglio['dipendenti']
+    ottimo = _ottimo_esaustivo(risultati, regioni, 800, tetto=2)
+    # Con i tetti il risolutore è euristico: vicino all'ottimo, mai oltre
+    assert 0.95 * ottimo <= portafoglio['risparmio_totale'] <= ottimo + 1e-6
+    assert portafoglio['limite_superiore'] >= ottimo - 1e-6
+
+def test_solo_convenienti():
+    risultati, regioni = _istanza(40, 7)
+    portafoglio = seleziona_portafoglio(risultati, regioni, budget=1e9)
+    assert np.array_equal(portafoglio['selezionati'], risultati['risparmio_aziendale'].to_numpy() > 0)
+    assert portafoglio['gap'] == pytest.approx(0.0, abs=1e-9)
+
+def test_minimo_dipendenti():
+    risultati, regioni = _istanza(40, 3)
+    convenienti = int((risultati['risparmio_aziendale'] > 0).sum())
+    portafoglio = seleziona_portafoglio(risultati, regioni, budget=1e9, minimo_dipendenti=convenienti + 3,
+                                        solo_convenienti=False)
+    assert portafoglio['fattibile']
+    assert portafoglio['dipendenti'] >= convenienti + 3
+
+    impossibile = seleziona_portafoglio(risultati, regioni, budget=100, minimo_dipendenti=30)
+    assert not impossibile['fattibile']
+    assert impossibile['incentivo_totale'] <= 100
+
+def test_forza_lavoro(forza_lavoro):
+    risultati = calcola_scenari_batch(forza_lavoro, OGGI)
+    budget = float(risultati['incentivo_proposto'].clip(lower=0).sum()) / 5
+    portafoglio = seleziona_portafoglio(risultati, forza_lavoro['regione'], budget, massimo_per_regione={"Lazio": 3})
+    scelti = portafoglio['selezionati']
+    assert portafoglio['incentivo_totale'] <= budget
+    assert portafoglio['budget_residuo'] >= 0
+    assert (forza_lavoro['regione'][scelti] == "Lazio").sum() <= 3
+    assert np.all(risultati['risparmio_aziendale'][scelti] > 0)
+    assert 0 <= portafoglio['gap'] < 0.05
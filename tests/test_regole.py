@@ -0,0 +1,74 @@
+"""Tabella delle regole per anno: caricamento, validazione e lookup negli scalari e nei batch."""
+import csv
+
+import numpy as np
+import pytest
+
+from pensionbridge import regole as modulo_regole
+from pensionbridge.batch import calcola_naspi_batch
+from pensionbridge.regole import (PARAMETRI_REGOLE, PERCORSO_REGOLE, aliquota_rita, carica_regole, indice_anno,
+                                  parametri_anno, parametri_batch, regole_pensionistiche)
+
+def _scrivi_tabella(percorso, modifica=lambda righe: righe):
+    with open(PERCORSO_REGOLE, newline='') as f:
+        righe = modifica(list(csv.DictReader(f)))
+    with open(percorso, 'w', newline='') as f:
+        scrittore = csv.DictWriter(f, fieldnames=list(righe[0]))
+        scrittore.writeheader()
+        scrittore.writerows(righe)
+    return percorso
+
+def test_tabella_compilata():
+    regole = regole_pensionistiche()
+    assert np.all(np.diff(regole['anni']) == 1)
+    for i, anno in enumerate(regole['anni'].tolist()):
+        assert parametri_anno(anno) == regole['per_anno'][i]
+        assert parametri_anno(anno)['eta_vecchiaia'] == regole['eta_vecchiaia'][i]
+    assert set(regole['per_anno'][0]) == set(PARAMETRI_REGOLE)
+
+def test_anni_fuori_tabella():
+    regole = regole_pensionistiche()
+    primo, ultimo = regole['anni'][0], regole['anni'][-1]
+    ultima_riga = len(regole['anni']) - 1
+    assert indice_anno([primo - 10, primo, ultimo, ultimo + 10]).tolist() == [0, 0, ultima_riga, ultima_riga]
+    assert parametri_anno(primo - 10) is regole['per_anno'][0]
+    assert parametri_anno(ultimo + 10) is regole['per_anno'][-1]
+
+def test_aliquota_rita():
+    parametri = dict(aliquota_rita=0.15, riduzione_annua_rita=0.003, aliquota_minima_rita=0.09,
+                     anni_fondo_esenti_rita=15, anni_fondo_rita=20)
+    assert aliquota_rita(parametri) == pytest.approx(0.135)
+    assert aliquota_rita(dict(parametri, anni_fondo_rita=10)) == pytest.approx(0.15)
+    assert aliquota_rita(dict(parametri, anni_fondo_rita=60)) == pytest.approx(0.09)
+
+@pytest.mark.parametrize("modifica, messaggio", [
+    (lambda righe: [{k: v for k, v in r.items() if k != 'soglia_naspi'} for r in righe], "Colonne mancanti"),
+    (lambda righe: righe[:1] + righe[2:], "consecutivi"),
+    (lambda righe: [dict(righe[0], eta_vecchiaia='90'), *righe[1:]], "eta_vecchiaia fuori intervallo"),
+])
+def test_tabella_non_valida(tmp_path, modifica, messaggio):
+    with pytest.raises(ValueError, match=messaggio):
+        carica_regole(_scrivi_tabella(tmp_path / "regole.csv", modifica))
+
+def test_tabella_vuota(tmp_path):
+    percorso = tmp_path / "regole.csv"
+    percorso.write_text("")
+    with pytest.raises(ValueError, match="vuota"):
+        carica_regole(percorso)
+
+def test_regole_diverse_per_anno_nei_batch(tmp_path, monkeypatch):
+    def soglia_raddoppiata_nell_ultimo_anno(righe):
+        righe[-1] = dict(righe[-1], soglia_naspi=str(2 * float(righe[-1]['soglia_naspi'])))
+        return righe
+
+    monkeypatch.setattr(modulo_regole, '_regole',
+                        carica_regole(_scrivi_tabella(tmp_path / "regole.csv", soglia_raddoppiata_nell_ultimo_anno)))
+    anni = regole_pensionistiche()['anni']
+    soglie = parametri_batch(indice_anno([anni[0], anni[-1]]), 'soglia_naspi')
+    assert soglie[1] == 2 * soglie[0]
+
+    # Retribuzione mensile tra le due soglie: sopra soglia nel primo anno, sotto nell'ultimo
+    ral = 13 * 1.5 * soglie[0]
+    naspi, _ = calcola_naspi_batch(np.full(2, ral), 48, anno=np.array([anni[0], anni[-1]]))
+    assert naspi[1] == pytest.approx(ral / 13 * 0.75)
+    assert naspi[0] < naspi[1]
@@ -0,0 +1,23 @@
+"""Risorse condivise tra le sessioni: costanti in sola lettura e layout dei grafici non modificati dalle figure."""
+import numpy as np
+import pytest
+
+from pensionbridge.calcoli import COSTO_VITA_REGIONALE
+from pensionbridge.risorse import FATTORI_COSTO_VITA, INDICE_REGIONE, REGIONI, layout_grafici
+
+def test_regioni_e_fattori():
+    assert REGIONI == tuple(sorted(COSTO_VITA_REGIONALE))
+    assert all(REGIONI[INDICE_REGIONE[r]] == r for r in REGIONI)
+    assert FATTORI_COSTO_VITA.tolist() == [COSTO_VITA_REGIONALE[r] for r in REGIONI]
+    with pytest.raises(ValueError):
+        FATTORI_COSTO_VITA[0] = 2.0
+
+def test_layout_condivisi_e_non_modificati():
+    go = pytest.importorskip("plotly.graph_objects")
+
+    layout = layout_grafici()
+    assert layout_grafici() is layout
+    prima = layout['regioni'].to_plotly_json()
+    figura = go.Figure(data=[go.Bar(x=list(REGIONI), y=np.ones(len(REGIONI)))], layout=layout['regioni'])
+    figura.update_layout(title="Altro titolo", yaxis_title="k€")
+    assert layout['regioni'].to_plotly_json() == prima
@@ -0,0 +1,51 @@
+"""Sensibilità dell'incentivo: ogni variante come uno scenario scalare, tornado ed elasticità."""
+import numpy as np
+import pytest
+
+from conftest import INPUT_SCENARIO
+from pensionbridge.risorse import REGIONI
+from pensionbridge.scenario import calcola_scenario
+from pensionbridge.sensibilita import PERTURBAZIONI_NUMERICHE, analisi_sensibilita, varianti_scenario
+
+def test_varianti():
+    varianti = varianti_scenario(INPUT_SCENARIO)
+    assert varianti['input'].isna().tolist() == [True] + [False] * (len(varianti) - 1)
+    ral = varianti.loc[varianti['input'] == 'ral', 'valore'].tolist()
+    assert ral == pytest.approx([45000 * 0.9, 45000 * 1.1])
+    regioni = varianti.loc[varianti['input'] == 'regione', 'valore'].tolist()
+    assert regioni == list(REGIONI)
+    # Valori limitati agli estremi della sidebar
+    eta = varianti_scenario(dict(INPUT_SCENARIO, eta=70))
+    assert eta.loc[eta['input'] == 'eta', 'valore'].tolist() == [69, 70]
+
+def test_ogni_variante_come_scenario_scalare():
+    analisi = analisi_sensibilita(INPUT_SCENARIO)
+    assert analisi['base'] == pytest.approx(calcola_scenario(**INPUT_SCENARIO)['risultato_incentivo']['incentivo_totale'])
+    varianti = analisi['varianti']
+    for indice in np.random.default_rng(0).choice(len(varianti), 12, replace=False):
+        riga = varianti.iloc[indice]
+        valore = riga['valore']
+        if riga['input'] in PERTURBAZIONI_NUMERICHE:
+            valore = float(valore)
+        scenario = calcola_scenario(**dict(INPUT_SCENARIO, **{riga['input']: valore}))
+        assert riga['incentivo_totale'] == pytest.approx(scenario['risultato_incentivo']['incentivo_totale']), \
+            (riga['input'], valore)
+
+def test_tornado():
+    analisi = analisi_sensibilita(INPUT_SCENARIO)
+    tornado = analisi['tornado'].set_index('input')
+    assert np.all(np.diff(tornado['escursione'].to_numpy()) <= 0)
+    assert np.allclose(tornado['escursione'], (tornado['metrica_alta'] - tornado['metrica_bassa']).abs())
+
+    regioni = analisi['varianti'].query("input == 'regione'")
+    assert tornado.loc['regione', 'metrica_bassa'] == regioni['incentivo_totale'].min()
+    assert tornado.loc['regione', 'metrica_alta'] == regioni['incentivo_totale'].max()
+    assert np.isnan(tornado.loc['regione', 'elasticita'])
+
+    ral = tornado.loc['ral']
+    elasticita = (ral['metrica_alta'] - ral['metrica_bassa']) / analisi['base'] / 0.2
+    assert ral['elasticita'] == pytest.approx(elasticita)
+
+def test_altra_metrica():
+    analisi = analisi_sensibilita(INPUT_SCENARIO, metrica='risparmio_aziendale')
+    assert analisi['base'] == pytest.approx(calcola_scenario(**INPUT_SCENARIO)['risparmio_aziendale'])
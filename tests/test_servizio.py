@@ -0,0 +1,129 @@
+"""Servizio HTTP: lotti coalescenti, lettura del corpo e backpressure di /scenario (senza rete, via ASGI)."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from conftest import INPUT_SCENARIO, genera_forza_lavoro
+
+pytest.importorskip("starlette")
+
+from pensionbridge import servizio  # noqa: E402
+
+def _corpo(dati, **altro):
+    return json.dumps({'dipendenti': dati.to_dict(orient='records'), 'oggi': "2025-01-15", **altro}).encode()
+
+async def _richiesta(app, metodo, percorso, corpo=b"", intestazioni=None, parti=None):
+    """
+    Una richiesta HTTP direttamente sull'app ASGI. Ritorna (status, corpo JSON). Con `parti` il
+    corpo arriva a pezzi senza Content-Length (chunked); le parti lette sono tolte dalla lista.
+    """
+    if parti is None:
+        intestazioni = {'content-length': str(len(corpo)), **(intestazioni or {})}
+        parti = [corpo]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': metodo, 'scheme': 'http',
+        'path': percorso, 'raw_path': percorso.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(k.encode(), v.encode()) for k, v in (intestazioni or {}).items()],
+        'client': ('127.0.0.1', 1), 'server': ('127.0.0.1', 80),
+    }
+    messaggi = []
+
+    async def ricevi():
+        if not parti:
+            return {'type': 'http.disconnect'}
+        return {'type': 'http.request', 'body': parti.pop(0), 'more_body': bool(parti)}
+
+    async def invia(messaggio):
+        messaggi.append(messaggio)
+
+    await app(scope, ricevi, invia)
+    return messaggi[0]['status'], json.loads(b"".join(m.get('body', b"") for m in messaggi[1:]))
+
+def _chiama(app, metodo, percorso, corpo=b"", intestazioni=None, parti=None):
+    return asyncio.run(_richiesta(app, metodo, percorso, corpo, intestazioni, parti))
+
+def test_richiesta_uguale_da_sola_e_nel_lotto():
+    # A senza colonne opzionali, B con tutte: nel lotto A deve comunque usare i default
+    a = genera_forza_lavoro(30, seme=1)[['eta', 'anni_contributi', 'sesso', 'ral', 'regione']]
+    b = genera_forza_lavoro(30, seme=2).assign(incentivo_proposto=50000.0)
+    (stato_solo, da_sola), = servizio._valuta_lotto([_corpo(a)])
+    stato_a, nel_lotto = servizio._valuta_lotto([_corpo(a), _corpo(b)])[0]
+    assert stato_solo == stato_a == 200
+    assert json.loads(nel_lotto) == json.loads(da_sola)
+    assert None not in json.loads(nel_lotto)['risultati'][0].values()
+
+def test_richieste_con_le_stesse_colonne_sono_valutate_insieme():
+    a, b = genera_forza_lavoro(10, seme=3), genera_forza_lavoro(15, seme=4)
+    esiti = servizio._valuta_lotto([_corpo(a, colonna_id='eta'), _corpo(b)])
+    assert [json.loads(e[1])['n'] for e in esiti] == [10, 15]
+    assert [r['eta'] for r in json.loads(esiti[0][1])['risultati']] == a['eta'].tolist()
+
+def test_richiesta_non_valida_non_fa_fallire_il_lotto():
+    esiti = servizio._valuta_lotto([b"{", _corpo(genera_forza_lavoro(5))])
+    assert esiti[0][0] == 400 and esiti[1][0] == 200
+
+def test_content_length_non_valido():
+    app = servizio.crea_app(processi=1)
+    stato, risposta = _chiama(app, "POST", "/scenario", b"{}", {'content-length': "abc"})
+    assert stato == 400 and 'Content-Length' in risposta['errore']
+
+def test_corpo_troppo_grande():
+    app = servizio.crea_app(processi=1, byte_massimi_richiesta=10)
+    stato, _ = _chiama(app, "POST", "/scenario", b"x" * 100)
+    assert stato == 413
+
+def test_corpo_a_pezzi_troppo_grande():
+    # Senza Content-Length il limite interrompe la lettura appena superato
+    app = servizio.crea_app(processi=1, byte_massimi_richiesta=10)
+    parti = [b"x" * 4 for _ in range(10)]
+    stato, _ = _chiama(app, "POST", "/scenario", parti=parti)
+    assert stato == 413
+    assert len(parti) == 7
+
+def test_corpo_a_pezzi_entro_il_limite():
+    corpo = json.dumps({**INPUT_SCENARIO, 'oggi': INPUT_SCENARIO['oggi'].isoformat()}).encode()
+    parti = [corpo[i:i + 16] for i in range(0, len(corpo), 16)]
+    stato, scenario = _chiama(servizio.crea_app(processi=1), "POST", "/scenario", parti=parti)
+    assert stato == 200 and scenario['mesi_mancanti'] > 0
+
+def test_scenari_oltre_il_limite_rifiutati(monkeypatch):
+    avviato, rilascia = threading.Event(), threading.Event()
+    originale = servizio.calcola_scenario_memo
+
+    def bloccato(*args, **kwargs):
+        avviato.set()
+        rilascia.wait(10)
+        return originale(*args, **kwargs)
+
+    monkeypatch.setattr(servizio, 'calcola_scenario_memo', bloccato)
+    app = servizio.crea_app(processi=1, scenari_massimi_in_corso=1)
+    corpo = json.dumps({**INPUT_SCENARIO, 'oggi': INPUT_SCENARIO['oggi'].isoformat()}).encode()
+
+    async def esegui():
+        primo = asyncio.create_task(_richiesta(app, "POST", "/scenario", corpo))
+        await asyncio.to_thread(avviato.wait, 10)
+        secondo = await _richiesta(app, "POST", "/scenario", corpo)
+        rilascia.set()
+        return await primo, secondo
+
+    (stato_primo, _), (stato_secondo, errore) = asyncio.run(esegui())
+    assert stato_primo == 200
+    assert stato_secondo == 503 and 'sovraccarico' in errore['errore']
+    # Liberato il posto, le richieste tornano ad essere accettate
+    assert _chiama(app, "POST", "/scenario", corpo)[0] == 200
+
+def test_scenario_calcolato_fuori_dal_loop(monkeypatch):
+    thread = []
+    originale = servizio.calcola_scenario_memo
+
+    def registra(*args, **kwargs):
+        thread.append(threading.current_thread())
+        return originale(*args, **kwargs)
+
+    monkeypatch.setattr(servizio, 'calcola_scenario_memo', registra)
+    corpo = json.dumps({**INPUT_SCENARIO, 'oggi': INPUT_SCENARIO['oggi'].isoformat()}).encode()
+    stato, scenario = _chiama(servizio.crea_app(processi=1), "POST", "/scenario", corpo)
+    assert stato == 200 and scenario['mesi_mancanti'] > 0
+    assert thread and thread[0] is not threading.main_thread()
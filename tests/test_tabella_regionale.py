@@ -0,0 +1,57 @@
+"""Tabella precalcolata dell'incentivo: esatta sui punti della griglia, interpolazione e sezioni."""
+import numpy as np
+import pytest
+
+from pensionbridge.batch import calcola_incentivo_esodo_regionale_batch, calcola_naspi_batch
+from pensionbridge.risorse import REGIONI
+from pensionbridge.tabella_regionale import (GRIGLIA_MESI, GRIGLIA_RAL, _tabella_incentivi, cerca_incentivo,
+                                             confronto_regioni, matrice_heatmap, tabella_incentivi)
+
+def _incentivo_diretto(regione, ral, mesi, mesi_contributi=48):
+    naspi, _ = calcola_naspi_batch(ral, mesi_contributi)
+    return calcola_incentivo_esodo_regionale_batch(ral, mesi, regione, naspi)['incentivo_totale']
+
+@pytest.fixture(scope='module')
+def tabella():
+    return tabella_incentivi(mesi_contributi_ultimi_4_anni=36)
+
+def test_esatta_sui_punti_della_griglia(tabella):
+    rng = np.random.default_rng(0)
+    regioni = rng.choice(REGIONI, 200)
+    ral = rng.choice(GRIGLIA_RAL, 200)
+    mesi = rng.choice(GRIGLIA_MESI, 200)
+    assert np.allclose(cerca_incentivo(tabella, regioni, ral, mesi),
+                       _incentivo_diretto(regioni, ral, mesi, mesi_contributi=36), rtol=1e-12)
+
+def test_lineare_lungo_i_mesi(tabella):
+    # Tra due RAL della griglia, mesi frazionari: l'incentivo è lineare nei mesi
+    assert cerca_incentivo(tabella, "Lazio", 45000, 30.5) == pytest.approx(
+        _incentivo_diretto("Lazio", 45000, 30.5, mesi_contributi=36), rel=1e-12)
+    # Fuori griglia la RAL è interpolata: vicina al valore esatto, non uguale
+    interpolato = cerca_incentivo(tabella, "Lazio", 45500, 30)
+    assert interpolato == pytest.approx(_incentivo_diretto("Lazio", 45500, 30, mesi_contributi=36), rel=1e-3)
+
+def test_valori_fuori_griglia_limitati(tabella):
+    assert cerca_incentivo(tabella, "Veneto", 10000, 0) == cerca_incentivo(tabella, "Veneto", 20000, 1)
+    assert cerca_incentivo(tabella, "Veneto", 500000, 400) == cerca_incentivo(tabella, "Veneto", 200000, 240)
+    with pytest.raises(ValueError, match="Atlantide"):
+        cerca_incentivo(tabella, "Atlantide", 50000, 12)
+
+def test_sezioni_e_confronto(tabella):
+    mesi, per_mesi = matrice_heatmap(tabella, ral=60000)
+    assert per_mesi.shape == (len(REGIONI), len(GRIGLIA_MESI))
+    assert np.allclose(per_mesi[:, 23], confronto_regioni(tabella, 60000, mesi[23]))
+    ral, per_ral = matrice_heatmap(tabella, mesi_mancanti=24)
+    assert np.allclose(per_ral[:, 40], confronto_regioni(tabella, ral[40], 24))
+    with pytest.raises(ValueError):
+        matrice_heatmap(tabella)
+
+def test_tabella_condivisa():
+    assert tabella_incentivi(48, 38, False) is tabella_incentivi(48.0, 38, 0)
+
+def test_memoria_della_cache(tabella):
+    # Anche piena, la cache delle tabelle resta sotto i 32 MB per processo
+    assert _tabella_incentivi.cache.dimensione_massima * tabella['incentivo'].nbytes < 32 * 2 ** 20
+    for mesi_contributi in range(10, 10 + 2 * _tabella_incentivi.cache.dimensione_massima):
+        tabella_incentivi(mesi_contributi_ultimi_4_anni=mesi_contributi)
+    assert _tabella_incentivi.cache.statistiche()['voci'] == _tabella_incentivi.cache.dimensione_massima
@@ -0,0 +1,62 @@
+"""Flussi mensili: importi a mano, riferimento mese per mese e riepilogo a blocchi."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import INPUT_SCENARIO, OGGI
+from pensionbridge.batch import calcola_scenari_batch
+from pensionbridge.scenario import calcola_scenario
+from pensionbridge.timeline import (FONTI_TIMELINE, analizza_timeline, costruisci_timeline_batch,
+                                    riepiloga_timeline_batch, timeline_da_scenario)
+
+def test_importi_di_un_dipendente():
+    flussi = costruisci_timeline_batch(2000, 6, 1000, 4.5, 300, 200, 0.25, 1500, mesi_dopo_pensione=3)
+    assert flussi['stipendio'][0].tolist() == [2000] * 6 + [0] * 3
+    # Riduzione del 3% dal 4° mese, metà del 5° mese per una durata di 4,5 mesi
+    assert np.allclose(flussi['naspi'][0], [1000, 1000, 1000, 970, 1000 * 0.97 ** 2 / 2, 0, 0, 0, 0])
+    assert flussi['ape'][0].tolist() == [300] * 6 + [0] * 3
+    # R.I.T.A. spalmata su almeno 12 mesi, limitata al periodo di uscita
+    assert flussi['rita'][0].tolist() == [200] * 6 + [0] * 3
+    assert flussi['pensione'][0].tolist() == [0] * 6 + [1500] * 3
+
+def _gap_diretto(stipendio, mesi, naspi, durata, ape, rita, anni_rita):
+    gap = 0.0
+    for mese in range(mesi):
+        naspi_mese = naspi * 0.97 ** max(0, mese - 2) * min(max(durata - mese, 0), 1)
+        rita_mese = rita * min(max(max(anni_rita, 1) * 12 - mese, 0), 1)
+        gap += stipendio - naspi_mese - ape - rita_mese
+    return gap
+
+def test_gap_come_ciclo_mensile():
+    rng = np.random.default_rng(0)
+    n = 30
+    argomenti = (rng.uniform(1500, 4000, n), rng.integers(1, 60, n), rng.uniform(0, 1500, n),
+                 rng.uniform(0, 24, n), rng.choice([0.0, 1200.0], n), rng.choice([0.0, 500.0], n),
+                 rng.uniform(0, 5, n), rng.uniform(1000, 3000, n))
+    analisi = analizza_timeline(costruisci_timeline_batch(*argomenti), incentivo_proposto=np.full(n, 20000.0))
+    for i in range(n):
+        atteso = _gap_diretto(*(a[i] for a in argomenti[:7]))
+        assert analisi['gap_totale'][i] == pytest.approx(atteso, rel=1e-10)
+        cumulato = analisi['gap_cumulato'][i]
+        esaurito = analisi['mese_esaurimento_incentivo'][i]
+        if esaurito >= 0:
+            assert cumulato[esaurito] > 20000 and np.all(cumulato[:esaurito] <= 20000)
+        else:
+            assert np.all(cumulato <= 20000)
+
+def test_riepilogo_indipendente_dai_blocchi(forza_lavoro):
+    risultati = calcola_scenari_batch(forza_lavoro, OGGI)
+    intero = riepiloga_timeline_batch(risultati)
+    a_blocchi = riepiloga_timeline_batch(risultati, dimensione_blocco=37)
+    pd.testing.assert_frame_equal(intero, a_blocchi)
+    assert intero.index.equals(risultati.index)
+    assert riepiloga_timeline_batch(risultati.iloc[:0]).empty
+
+def test_timeline_di_uno_scenario():
+    scenario = calcola_scenario(**INPUT_SCENARIO)
+    df = timeline_da_scenario(scenario, mesi_dopo_pensione=12)
+    assert len(df) == scenario['mesi_mancanti'] + 12
+    assert df.index[0] == pd.Timestamp(OGGI.replace(day=1))
+    assert list(df.columns) == [*FONTI_TIMELINE, 'copertura_cumulata', 'gap_cumulato']
+    assert df['gap_cumulato'].iloc[-1] == pytest.approx(
+        (df['stipendio'] - df['naspi'] - df['ape'] - df['rita']).iloc[:scenario['mesi_mancanti']].sum())